@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark of the release-tools commands on synthetic repositories.
+
+It generates throwaway Git repositories with a given number of
+unreleased changelog entries, a large NEWS and AUTHORS files and
+many release tags. Then, it times `changelog`, `semverup`, `notes`
+and `publish` end to end, running them as the console scripts do,
+and the phases of each of them calling the library functions.
+
+Results are stored as JSON. When a baseline file is given, the
+script fails if any command is slower than the baseline by more
+than the regression threshold.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from release_tools.changelog import (create_changelog_entry_content,
+                                     write_changelog_entry)
+from release_tools.entry import CategoryChange
+from release_tools.notes import (compose_author_content,
+                                 compose_release_notes,
+                                 move_processed_unreleased_entries,
+                                 read_unreleased_changelog_entries,
+                                 write_authors_file,
+                                 write_release_notes)
+from release_tools.profiling import phase_times
+from release_tools.project import Project
+from release_tools.publish import (add_release_files,
+                                   commit,
+                                   remove_unreleased_changelog_entries)
+from release_tools.semverup import (determine_new_version_number,
+                                    find_pyproject_file,
+                                    find_version_file,
+                                    read_version_number,
+                                    write_version_number,
+                                    write_version_number_pyproject)
+from release_tools.summary import update_bump_summary
+from release_tools.tracing import start_tracer, stop_tracer
+
+
+RESULTS_FORMAT_VERSION = 1
+
+COMMANDS = ['changelog', 'semverup', 'notes', 'publish']
+
+PROJECT_NAME = 'bench'
+RELEASE_VERSION = '1.0.0'
+RELEASE_AUTHOR = 'John Smith <jsmith@example.com>'
+
+
+WORDS = [
+    'add', 'fix', 'remove', 'update', 'parser', 'cache', 'crash', 'file',
+    'option', 'command', 'version', 'release', 'notes', 'entry', 'tag',
+    'error', 'message', 'support', 'default', 'config', 'output', 'index'
+]
+
+
+class SyntheticRepo:
+    """Throwaway Git repository to run the benchmarks.
+
+    :param dirpath: directory where the repository is created
+    :param entries: number of unreleased changelog entries
+    :param tags: number of release tags
+    :param authors: number of authors in the AUTHORS file
+    :param seed: seed of the generator of random contents
+    """
+    def __init__(self, dirpath, entries, tags, authors, seed=0):
+        self.dirpath = dirpath
+        self.entries = entries
+        self.tags = tags
+        self.authors = authors
+        self.rng = random.Random(seed)
+        self.base = None
+
+    @property
+    def unreleased_path(self):
+        return os.path.join(self.dirpath, 'releases', 'unreleased')
+
+    def git(self, *args, stdin=None):
+        return subprocess.run(['git'] + list(args), cwd=self.dirpath,
+                              input=stdin, check=True, universal_newlines=True,
+                              stdout=subprocess.PIPE).stdout
+
+    def generate(self):
+        """Create the repository and its initial commit."""
+
+        os.makedirs(self.unreleased_path)
+        os.makedirs(os.path.join(self.dirpath, PROJECT_NAME))
+
+        # Commands run git with a clean environment, so the
+        # identity of the committer must be set in the repository
+        self.git('init', '-q')
+        self.git('config', 'user.name', 'John Smith')
+        self.git('config', 'user.email', 'jsmith@example.com')
+        self._write('pyproject.toml',
+                    '[tool.poetry]\nname = "{}"\nversion = "0.1.0"\n'.format(PROJECT_NAME))
+        self._write(os.path.join(PROJECT_NAME, '_version.py'),
+                    '# File auto-generated by semverup on 2020-01-01 00:00:00.000000\n'
+                    '__version__ = "0.1.0"\n')
+        self._write('AUTHORS', ''.join(
+            'Author {0} <author{0}@example.com>\n'.format(i) for i in range(self.authors)
+        ))
+        self._write('NEWS', self._news_content())
+
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'Initial commit')
+
+        # Lightweight tags are created at once
+        head = self.git('rev-parse', 'HEAD').strip()
+        refs = ''.join(
+            'create refs/tags/0.{}.0 {}\n'.format(i, head) for i in range(self.tags)
+        )
+        self.git('update-ref', '--stdin', stdin=refs)
+
+        for i in range(self.entries):
+            title = ' '.join(self.rng.choice(WORDS) for _ in range(6)) + ' {}'.format(i)
+            category = self.rng.choice(list(CategoryChange)).category
+            author = 'Author {}'.format(self.rng.randrange(self.authors))
+            content = create_changelog_entry_content(title, category, author=author,
+                                                     issue=i, run_editor=False)
+            self._write(os.path.join('releases', 'unreleased', 'entry-{}.yml'.format(i)), content)
+
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'Add changelog entries')
+        self.base = self.git('rev-parse', 'HEAD').strip()
+
+    def reset(self):
+        """Undo the changes made by a command."""
+
+        self.git('reset', '-q', '--hard', self.base)
+        self.git('clean', '-q', '-f', '-d')
+
+        if self.git('tag', '-l', RELEASE_VERSION).strip():
+            self.git('tag', '-d', RELEASE_VERSION)
+
+    def _news_content(self):
+        sections = []
+
+        for i in reversed(range(self.tags)):
+            lines = ['## {} 0.{}.0 - (2020-01-01)'.format(PROJECT_NAME, i), '',
+                     '**New features:**', '']
+            lines += [' * Feature {} of release {}'.format(j, i) for j in range(50)]
+            sections.append('\n'.join(lines) + '\n\n')
+
+        return '# Releases\n\n' + ''.join(sections)
+
+    def _write(self, filename, content):
+        with open(os.path.join(self.dirpath, filename), mode='w') as fd:
+            fd.write(content)
+
+
+def run_command(repo, args):
+    """Run a command as a console script and time it."""
+
+    cmd = [sys.executable, '-m', 'release_tools.cli'] + args
+
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=repo.dirpath,
+                            universal_newlines=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        msg = "command '{}' failed: {}".format(' '.join(args), result.stderr.strip())
+        raise click.ClickException(msg)
+
+    return elapsed
+
+
+@contextlib.contextmanager
+def working_directory(dirpath):
+    cwd = os.getcwd()
+    os.chdir(dirpath)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+
+
+@contextlib.contextmanager
+def recording_phases(repo, name):
+    """Time the phases of the library calls run in the block.
+
+    Phases come from the spans of the instrumented functions, as
+    with the '--profile' option of the commands.
+    """
+    phases = {}
+
+    with working_directory(repo.dirpath):
+        tracer = start_tracer(name)
+        try:
+            yield phases
+        finally:
+            stop_tracer()
+
+    phases.update(phase_times(tracer))
+
+
+def phases_changelog(repo):
+    with recording_phases(repo, 'changelog') as phases:
+        project = Project(repo.dirpath)
+        content = create_changelog_entry_content('benchmark change', 'added',
+                                                 run_editor=False)
+        write_changelog_entry(project.unreleased_changes_path, 'benchmark change', content,
+                              cache_path=project.cache_path)
+        update_bump_summary(project)
+
+    return phases
+
+
+def phases_semverup(repo):
+    with recording_phases(repo, 'semverup') as phases:
+        project = Project(repo.dirpath)
+        version_file = find_version_file(project)
+        pyproject_file = find_pyproject_file(project)
+        current_version = read_version_number(version_file)
+        new_version = determine_new_version_number(project, current_version, False)
+        write_version_number(version_file, new_version)
+        write_version_number_pyproject(pyproject_file, new_version)
+
+    return phases
+
+
+def phases_notes(repo):
+    with recording_phases(repo, 'notes') as phases:
+        project = Project(repo.dirpath)
+        entries = read_unreleased_changelog_entries(project, False)
+        content = compose_release_notes(PROJECT_NAME, RELEASE_VERSION, entries)
+        authors = compose_author_content(project, entries)
+        write_release_notes(project, RELEASE_VERSION, content, news=True)
+        write_authors_file(project, authors)
+        move_processed_unreleased_entries(project)
+
+    return phases
+
+
+def total_publish(repo):
+    prepare_publish(repo)
+    return run_command(repo, ['publish', RELEASE_VERSION, RELEASE_AUTHOR])
+
+
+def phases_publish(repo):
+    prepare_publish(repo)
+
+    with recording_phases(repo, 'publish') as phases:
+        project = Project(repo.dirpath)
+        remove_unreleased_changelog_entries(project)
+        add_release_files(project, RELEASE_VERSION, False)
+        commit(project, RELEASE_VERSION, RELEASE_AUTHOR)
+
+    return phases
+
+
+def prepare_publish(repo):
+    """Generate the release notes needed to publish a release."""
+
+    run_command(repo, ['notes', PROJECT_NAME, RELEASE_VERSION, '--news', '--authors'])
+
+
+BENCHMARKS = {
+    'changelog': (
+        lambda repo: run_command(repo, ['changelog', '-t', 'benchmark change',
+                                        '-c', 'added', '--no-editor']),
+        phases_changelog
+    ),
+    'semverup': (
+        lambda repo: run_command(repo, ['semverup']),
+        phases_semverup
+    ),
+    'notes': (
+        lambda repo: run_command(repo, ['notes', PROJECT_NAME, RELEASE_VERSION,
+                                        '--news', '--authors']),
+        phases_notes
+    ),
+    'publish': (total_publish, phases_publish)
+}
+
+
+def run_benchmarks(sizes, commands, tags, authors, runs, workdir=None):
+    """Run the benchmarks on repositories of several sizes.
+
+    Each measure is taken `runs` times, keeping the fastest one.
+    The repository is reset after every run.
+
+    :returns: dict of results by number of entries and command
+    """
+    results = {}
+
+    for size in sizes:
+        tmp_path = tempfile.mkdtemp(prefix='release_tools_bench_', dir=workdir)
+
+        try:
+            repo = SyntheticRepo(os.path.join(tmp_path, 'repo'), size, tags, authors)
+
+            start = time.perf_counter()
+            repo.generate()
+            click.echo("Repository with {} entries generated in {:.2f} s".format(
+                size, time.perf_counter() - start), err=True)
+
+            results[str(size)] = {}
+
+            for name in commands:
+                total_func, phases_func = BENCHMARKS[name]
+                totals = []
+                phases = []
+
+                for _ in range(runs):
+                    totals.append(total_func(repo))
+                    repo.reset()
+                    phases.append(phases_func(repo))
+                    repo.reset()
+
+                best = min(range(runs), key=lambda i: sum(phases[i].values()))
+                results[str(size)][name] = {
+                    'total': min(totals),
+                    'phases': phases[best]
+                }
+                click.echo("  {}: {:.3f} s".format(name, min(totals)), err=True)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Compare the total times of two sets of results.
+
+    :param results: results of the current run
+    :param baseline: results to compare with
+    :param threshold: maximum allowed slowdown, as a fraction
+
+    :returns: list of `(size, command, baseline, current)` tuples
+        of the commands slower than allowed
+    """
+    regressions = []
+
+    for size, commands in sorted(results.items(), key=lambda item: int(item[0])):
+        for name, measure in commands.items():
+            previous = baseline.get(size, {}).get(name)
+
+            if previous is None:
+                continue
+            if measure['total'] > previous['total'] * (1 + threshold):
+                regressions.append((size, name, previous['total'], measure['total']))
+
+    return regressions
+
+
+@click.command()
+@click.option('--entries', 'sizes', type=int, multiple=True, default=[100, 10000],
+              show_default=True,
+              help="Number of changelog entries of a repository; can be repeated.")
+@click.option('--command', 'commands', type=click.Choice(COMMANDS), multiple=True,
+              help="Command to benchmark; can be repeated. Default: all of them.")
+@click.option('--tags', default=200, show_default=True,
+              help="Number of release tags of the repositories.")
+@click.option('--authors', default=1000, show_default=True,
+              help="Number of authors of the AUTHORS files.")
+@click.option('--runs', default=3, show_default=True,
+              help="Number of runs of each command; the fastest one is kept.")
+@click.option('--output', type=click.Path(dir_okay=False),
+              help="Store the results in a JSON file.")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help="Results file to compare with.")
+@click.option('--threshold', default=0.2, show_default=True,
+              help="Maximum slowdown allowed against the baseline, as a fraction.")
+@click.option('--workdir', type=click.Path(file_okay=False),
+              help="Directory where repositories are generated.")
+def main(sizes, commands, tags, authors, runs, output, baseline, threshold, workdir):
+    """Time the release-tools commands on synthetic repositories.
+
+    Use '--entries 100 --entries 10000 --entries 100000' to set the
+    sizes of the repositories. Results are printed and stored in the
+    file given with '--output'. With '--baseline', the command fails
+    when a command is slower than in the baseline file by more than
+    '--threshold'.
+    """
+    commands = commands or COMMANDS
+    results = run_benchmarks(sizes, commands, tags, authors, runs, workdir=workdir)
+
+    data = {
+        'version': RESULTS_FORMAT_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    content = json.dumps(data, indent=2, sort_keys=True)
+
+    if output:
+        with open(output, mode='w') as fd:
+            fd.write(content + '\n')
+    else:
+        click.echo(content)
+
+    if not baseline:
+        return
+
+    with open(baseline, mode='r') as fd:
+        previous = json.load(fd)
+
+    if previous.get('version') != RESULTS_FORMAT_VERSION:
+        raise click.ClickException("unsupported baseline file {}".format(baseline))
+
+    regressions = find_regressions(results, previous['results'], threshold)
+
+    if regressions:
+        lines = [
+            "{} with {} entries: {:.3f} s -> {:.3f} s".format(name, size, before, after)
+            for size, name, before, after in regressions
+        ]
+        msg = "performance regressions found\n" + "\n".join(lines)
+        raise click.ClickException(msg)
+
+    click.echo("No performance regressions found", err=True)
+
+
+if __name__ == '__main__':
+    main()
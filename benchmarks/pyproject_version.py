@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark of the update of the version of a pyproject file.
+
+It compares the time needed to replace the version in place
+with `patch_pyproject_version` against a full tomlkit round-trip.
+"""
+
+import timeit
+
+import click
+import semver
+import tomlkit
+
+from release_tools.semverup import patch_pyproject_version
+
+
+def generate_pyproject(dependencies):
+    """Generate a pyproject document with many dependencies."""
+
+    lines = [
+        "[tool.poetry]",
+        "name = \"benchmark\"",
+        "version = \"0.1.0\"",
+        "description = \"Benchmark project\"",
+        "",
+        "[tool.poetry.dependencies]",
+        "python = \"^3.9\"",
+    ]
+    lines += [
+        "package-{0} = {{ version = \"^{0}.0\", optional = true }}".format(i)
+        for i in range(dependencies)
+    ]
+    lines += [
+        "",
+        "[build-system]",
+        "requires = [\"poetry-core>=1.0.0\"]",
+        ""
+    ]
+    return '\n'.join(lines)
+
+
+def tomlkit_update(content, version):
+    """Replace the version with a tomlkit round-trip."""
+
+    metadata = tomlkit.parse(content)
+    metadata["tool"]["poetry"]["version"] = str(version)
+    return metadata.as_string()
+
+
+@click.command()
+@click.option('--dependencies', default=500, show_default=True,
+              help="Number of dependencies of the generated file.")
+@click.option('--runs', default=10, show_default=True,
+              help="Number of runs of each method.")
+def main(dependencies, runs):
+    """Time the update of the version of a pyproject file."""
+
+    content = generate_pyproject(dependencies)
+    version = semver.VersionInfo.parse("0.2.0")
+
+    assert patch_pyproject_version(content, version) == tomlkit_update(content, version)
+
+    for name, func in [('tomlkit', tomlkit_update), ('patch', patch_pyproject_version)]:
+        elapsed = timeit.timeit(lambda: func(content, version), number=runs)
+        click.echo("{}: {:.3f} ms/run".format(name, elapsed * 1000 / runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Library API of the release tools.
+
+The functions of this module run the steps of the command line
+tools without printing anything. They return their results as
+typed objects and raise `ReleaseToolsError` on failure, so many
+packages can be released from the same Python process.
+"""
+
+import contextlib
+import dataclasses
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple, Union
+
+import click
+
+from release_tools.archive import (determine_archive_filepath,
+                                   write_release_archive)
+from release_tools.entry import (ChangelogEntry,
+                                 list_entry_files,
+                                 read_changelog_entries)
+from release_tools.notes import (AuthorsFileComposer,
+                                 ReleaseNotesComposer,
+                                 determine_release_notes_filepath,
+                                 move_processed_unreleased_entries,
+                                 organize_entries_by_category,
+                                 prepend_news_section)
+from release_tools.project import Project
+from release_tools.repo import RepositoryError
+from release_tools.search import update_search_index
+from release_tools.semverup import (determine_next_version_from_bump,
+                                    get_next_version,
+                                    read_unreleased_bump_version,
+                                    read_version_number,
+                                    write_version_number,
+                                    write_version_number_pyproject)
+from release_tools.store import PackedEntryStore
+from release_tools.summary import (max_bump_version,
+                                   strongest_bump_version,
+                                   update_bump_summary)
+from release_tools.tracing import span
+from release_tools.trailers import read_trailer_entries
+from release_tools.utils import write_file
+
+
+class ReleaseToolsError(Exception):
+    """Error raised by the functions of the library API."""
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class VersionBump:
+    """Next version number of a package.
+
+    :param current: current version number
+    :param version: next version number
+    :param bump: 'major', 'minor' or 'patch' version bump required
+        by the unreleased entries, or the forced one; `None` when
+        only the pre-release part changes
+    :param warnings: errors of the commits skipped because their
+        trailers are not valid
+    """
+    current: str
+    version: str
+    bump: Optional[str]
+    warnings: List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass(frozen=True)
+class ReleaseNotes:
+    """Release notes rendered from a set of changelog entries.
+
+    :param title: title of the release notes
+    :param version: version of the release
+    :param content: Markdown document
+    :param entries: number of entries included in the notes
+    :param authors: authors of the entries, in order of appearance
+    :param warnings: errors of the commits skipped because their
+        trailers are not valid
+    """
+    title: str
+    version: str
+    content: str
+    entries: int
+    authors: List[str]
+    warnings: List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass(frozen=True)
+class PublishResult:
+    """Outcome of the release of a package.
+
+    :param version: version number of the release
+    :param notes: release notes of the release
+    :param notes_file: path to the release notes file; `None` on
+        dry run mode
+    :param files: files added to the release commit
+    :param news_updated: whether the NEWS file was updated
+    :param authors_updated: whether the AUTHORS file was updated
+    :param removed_entries: number of entries removed
+    :param moved_entries: number of entries moved to the
+        processed directory
+    :param committed: whether the release commit and tag were created
+    :param pushed: whether the release was pushed to a remote
+    """
+    version: str
+    notes: ReleaseNotes
+    notes_file: Optional[str] = None
+    files: List[str] = dataclasses.field(default_factory=list)
+    news_updated: bool = False
+    authors_updated: bool = False
+    removed_entries: int = 0
+    moved_entries: int = 0
+    committed: bool = False
+    pushed: bool = False
+
+
+ProjectLike = Union[str, pathlib.PurePath, Project]
+Entries = Dict[str, ChangelogEntry]
+
+
+def next_version(path: ProjectLike, bump_version: Optional[str] = None,
+                 pre_release: bool = False, trailers: bool = False) -> VersionBump:
+    """Compute the next version number of a package.
+
+    The version is read from the version file of the package and
+    increased following its unreleased entries, like `semverup`
+    does. Nothing is written.
+
+    :param path: directory of the package or its `Project`
+    :param bump_version: force a 'major', 'minor' or 'patch' bump
+    :param pre_release: compute a release candidate version
+    :param trailers: include the entries defined by commit trailers
+
+    :returns: a `VersionBump`
+
+    :raises ReleaseToolsError: when the version cannot be computed
+    """
+    with _library_errors():
+        project = _open_project(path)
+        version_file, _ = _find_version_files(project)
+        current_version = read_version_number(version_file)
+
+        warnings = []
+
+        if bump_version:
+            bump = bump_version.lower()
+            new_version = get_next_version(current_version, bump.upper(), pre_release)
+        else:
+            dirpath = project.unreleased_changes_path
+            bump = None
+            if not trailers or os.path.exists(dirpath):
+                bump = read_unreleased_bump_version(dirpath, cache_path=project.cache_path)
+            if trailers:
+                committed, warnings = _read_trailer_entries(project, pre_release)
+                bump = max_bump_version(bump, strongest_bump_version(
+                    entry.category.category for entry in committed.values()))
+            new_version = determine_next_version_from_bump(current_version, bump, pre_release)
+
+    return VersionBump(str(current_version), str(new_version), bump, warnings)
+
+
+def render_notes(path: ProjectLike, title: str, version: str,
+                 pre_release: bool = False, date: Optional[str] = None,
+                 trailers: bool = False) -> ReleaseNotes:
+    """Render the release notes of the unreleased entries.
+
+    Processed entries of previous release candidates are also
+    included, unless `pre_release` is set. Nothing is written.
+
+    :param path: directory of the package or its `Project`
+    :param title: title of the release notes
+    :param version: version of the release
+    :param pre_release: render the notes of a release candidate
+    :param date: date of the release, as 'YYYY-MM-DD'; by default,
+        the current date
+    :param trailers: include the entries defined by commit trailers
+
+    :returns: a `ReleaseNotes`
+
+    :raises ReleaseToolsError: when the entries cannot be read
+    """
+    with _library_errors():
+        project = _open_project(path)
+        unreleased, processed = _read_release_entries(project, pre_release, trailers=trailers)
+        committed, warnings = _read_trailer_entries(project, pre_release) if trailers else ({}, [])
+
+    entries = dict(unreleased)
+    entries.update(processed)
+    entries.update(committed)
+
+    return _compose_notes(title, version, entries, date=date, warnings=warnings)
+
+
+@span('publish_release')
+def publish_release(path: ProjectLike, title: str, author: str,
+                    bump_version: Optional[str] = None, pre_release: bool = False,
+                    news: bool = False, authors: bool = False, add_all: bool = False,
+                    archive: bool = False, cleanup: bool = True,
+                    remote: Optional[str] = None, remote_branch: str = "master",
+                    trailers: bool = False, dry_run: bool = False) -> PublishResult:
+    """Create a new release of a package.
+
+    The function runs the steps of `semverup`, `notes` and `publish`
+    reading the project and the changelog entries only once. The
+    version and pyproject files are updated, the release notes are
+    written and the entries are removed from the repository with a
+    single call to Git, unless `cleanup` is not set; in that case,
+    they are moved to the processed directory. Then, the release
+    commit and tag are created and, optionally, pushed.
+
+    :param path: directory of the package or its `Project`
+    :param title: title of the release notes
+    :param author: author of the release commit
+    :param bump_version: force a 'major', 'minor' or 'patch' bump
+    :param pre_release: create a release candidate
+    :param news: update the NEWS file
+    :param authors: update the AUTHORS file
+    :param add_all: add every changed file to the release commit
+    :param archive: pack the entries of the release into an archive
+    :param cleanup: remove the entries of the release
+    :param remote: push the release to this remote
+    :param remote_branch: branch of the remote to push
+    :param trailers: include the entries defined by commit trailers;
+        they are part of the history, so they are never removed
+    :param dry_run: compute the version and the notes without
+        changing anything
+
+    :returns: a `PublishResult`
+
+    :raises ReleaseToolsError: when any of the steps fails
+    """
+    with _library_errors():
+        project = _open_project(path)
+        version_file, pyproject_file = _find_version_files(project)
+        current_version = read_version_number(version_file)
+
+        unreleased, processed = _read_release_entries(project, pre_release, trailers=trailers)
+        committed, warnings = _read_trailer_entries(project, pre_release) if trailers else ({}, [])
+
+        if bump_version:
+            new_version = get_next_version(current_version, bump_version.upper(), pre_release)
+        else:
+            bump = strongest_bump_version(entry.category.category
+                                          for group in (unreleased, committed)
+                                          for entry in group.values())
+            new_version = determine_next_version_from_bump(current_version, bump, pre_release)
+
+    version = str(new_version)
+
+    entries = dict(unreleased)
+    entries.update(processed)
+    entries.update(committed)
+
+    entry_list = organize_entries_by_category(entries)
+    notes = _compose_notes(title, version, entries, entry_list=entry_list, warnings=warnings)
+
+    if dry_run:
+        return PublishResult(version, notes)
+
+    with _library_errors():
+        write_version_number(version_file, new_version)
+        write_version_number_pyproject(pyproject_file, new_version)
+
+        notes_file = determine_release_notes_filepath(project, version)
+        os.makedirs(os.path.dirname(notes_file), exist_ok=True)
+        try:
+            write_file(notes_file, notes.content, mode='x')
+        except FileExistsError:
+            msg = "Release notes for version {} already exist.".format(version)
+            raise ReleaseToolsError(msg)
+
+        update_search_index(project, version, notes_file, entry_list)
+
+        files = [version_file, pyproject_file, notes_file]
+        news_updated = authors_updated = False
+
+        if news:
+            news_updated = prepend_news_section(project, version, notes.content)
+            files.append(project.news_file)
+        if authors:
+            content = AuthorsFileComposer().compose(project, entry_list)
+            authors_updated = write_file(project.authors_file, content)
+            files.append(project.authors_file)
+
+        if archive:
+            archive_file = determine_archive_filepath(project, version)
+            write_release_archive(archive_file, {
+                os.path.basename(name): entry for name, entry in entries.items()
+            })
+            files.append(archive_file)
+
+        if cleanup:
+            removed, moved = _remove_release_entries(project), 0
+        else:
+            removed, moved = 0, len(unreleased)
+            move_processed_unreleased_entries(project)
+        update_bump_summary(project, create=False)
+
+        if add_all:
+            project.repo.add_all()
+        else:
+            project.repo.add_files(files)
+
+        _commit_release(project, version, author)
+
+        if remote:
+            project.repo.push(remote, remote_branch)
+            project.repo.push(remote, version)
+
+    return PublishResult(version, notes, notes_file=notes_file, files=files,
+                         news_updated=news_updated, authors_updated=authors_updated,
+                         removed_entries=removed, moved_entries=moved,
+                         committed=True, pushed=bool(remote))
+
+
+@contextlib.contextmanager
+def _library_errors():
+    """Convert the errors of the command line tools."""
+
+    try:
+        yield
+    except click.ClickException as exc:
+        raise ReleaseToolsError(exc.format_message()) from exc
+    except RepositoryError as exc:
+        raise ReleaseToolsError(str(exc)) from exc
+
+
+def _open_project(path: ProjectLike) -> Project:
+    if isinstance(path, (str, pathlib.PurePath)):
+        return Project(str(path))
+    return path
+
+
+def _find_version_files(project: Project) -> Tuple[str, str]:
+    """Find the version files of the project.
+
+    Git returns paths relative to the repository, so they are joined
+    to the base path of the project; that way, the API does not depend
+    on the current working directory.
+    """
+    version_file = project.version_file
+    if not version_file:
+        raise ReleaseToolsError("version file not found")
+
+    pyproject_file = project.pyproject_file
+    if not pyproject_file:
+        raise ReleaseToolsError("pyproject file not found")
+
+    return (os.path.join(project.basepath, version_file),
+            os.path.join(project.basepath, pyproject_file))
+
+
+def _read_release_entries(project: Project, pre_release: bool,
+                          trailers: bool = False) -> Tuple[Entries, Entries]:
+    """Read the unreleased and, unless `pre_release` is set, the processed entries.
+
+    Projects using commit trailers may not have an entries
+    directory; when `trailers` is set, it is not required.
+    """
+    dirpath = project.unreleased_changes_path
+
+    if not os.path.exists(dirpath):
+        if trailers:
+            return {}, {}
+        msg = "changelog entries directory '{}' does not exist.".format(dirpath)
+        raise ReleaseToolsError(msg)
+
+    processed = {}
+
+    try:
+        unreleased = read_changelog_entries(dirpath, cache_path=project.cache_path)
+
+        dirpath = project.unreleased_processed_entries_path
+        if not pre_release and os.path.exists(dirpath):
+            processed = read_changelog_entries(dirpath, cache_path=project.cache_path)
+    except Exception as exc:
+        raise ReleaseToolsError(str(exc)) from exc
+
+    return unreleased, processed
+
+
+def _read_trailer_entries(project: Project, pre_release: bool) -> Tuple[Entries, List[str]]:
+    """Read the entries defined by the trailers of the commits since the latest release.
+
+    :returns: the entries and the errors of the commits skipped
+        because their trailers are not valid
+    """
+    warnings = []
+    entries = read_trailer_entries(project, pre_release=pre_release,
+                                   on_invalid=warnings.append)
+
+    return entries, warnings
+
+
+def _compose_notes(title: str, version: str, entries: Entries,
+                   date: Optional[str] = None, entry_list=None,
+                   warnings: Optional[List[str]] = None) -> ReleaseNotes:
+    if entry_list is None:
+        entry_list = organize_entries_by_category(entries)
+
+    content = ReleaseNotesComposer().compose(title, version, entry_list, date=date)
+
+    authors = []
+    for entry in entries.values():
+        names = entry.author if isinstance(entry.author, list) else [entry.author]
+        authors.extend(name for name in names if name and name not in authors)
+
+    return ReleaseNotes(title, version, content, len(entries), authors, warnings or [])
+
+
+@span('remove_release_entries')
+def _remove_release_entries(project: Project) -> int:
+    """Remove the unreleased and processed entries with one call to Git.
+
+    Packed entries of the unreleased directory are removed from
+    their store, which is kept; the store of processed entries is
+    removed.
+
+    :returns: number of entries removed
+    """
+    filepaths = []
+    count = 0
+
+    for dirpath in [project.unreleased_changes_path,
+                    project.unreleased_processed_entries_path]:
+        if not os.path.exists(dirpath):
+            continue
+
+        filenames = list_entry_files(dirpath)
+        filepaths.extend(os.path.join(dirpath, f) for f in filenames)
+        count += len(filenames)
+
+        store = PackedEntryStore(dirpath, cache_path=project.cache_path)
+        if not store.exists():
+            continue
+
+        count += len(set(store.names()) - {os.path.basename(f) for f in filenames})
+
+        if dirpath == project.unreleased_changes_path:
+            store.write_all({})
+            project.repo.add_files([store.filepath])
+        else:
+            filepaths.append(store.filepath)
+
+    project.repo.rm_files(filepaths)
+
+    processed_store = PackedEntryStore(project.unreleased_processed_entries_path,
+                                       cache_path=project.cache_path)
+    processed_store.remove()
+
+    return count
+
+
+def _commit_release(project: Project, version: str, author: str) -> None:
+    """Create the release commit and tag, undoing the commit on errors."""
+
+    project.repo.commit("Release {}".format(version), author)
+
+    try:
+        project.repo.tag(version)
+    except RepositoryError:
+        project.repo.reset_head()
+        raise
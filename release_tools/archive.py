@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import gzip
+import json
+import os
+import tempfile
+
+from release_tools.entry import ChangelogEntry
+
+
+ARCHIVE_FILE_EXTENSION = '.jsonl.gz'
+
+
+def determine_archive_filepath(project, version):
+    """Return the path of the entries archive of a release."""
+
+    return os.path.join(project.releases_path, version + ARCHIVE_FILE_EXTENSION)
+
+
+def write_release_archive(filepath, entries):
+    """Pack the changelog entries of a release into an archive.
+
+    The archive is a gzip compressed JSONL file, with a record
+    per entry sorted by name. Records have the name of the entry
+    and its data. Timestamps and filenames are not stored in the
+    gzip header, so the same entries always produce the same file.
+    The archive replaces any previous one atomically.
+
+    :param filepath: path to the archive
+    :param entries: dict of `ChangelogEntry` instances by name
+    """
+    lines = [
+        json.dumps({'name': name, 'entry': entries[name].to_dict()},
+                   ensure_ascii=False) + '\n'
+        for name in sorted(entries)
+    ]
+    data = ''.join(lines).encode('utf-8')
+
+    dirpath = os.path.dirname(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix='.tmp-')
+
+    try:
+        with os.fdopen(fd, mode='wb') as f:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0) as gz:
+                gz.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_release_archive(filepath):
+    """Read the changelog entries stored in a release archive.
+
+    The archive is decompressed and parsed sequentially.
+
+    :param filepath: path to the archive
+
+    :returns: dict of `ChangelogEntry` instances by name
+    """
+    entries = {}
+
+    with gzip.open(filepath, mode='rt', encoding='utf-8') as fd:
+        for lineno, line in enumerate(fd, start=1):
+            try:
+                record = json.loads(line)
+                name = record['name']
+                data = record['entry']
+            except (ValueError, KeyError, TypeError):
+                msg = "invalid record in {} on line {}".format(filepath, lineno)
+                raise ValueError(msg)
+
+            entries[name] = ChangelogEntry.from_dict(data, name)
+
+    return entries
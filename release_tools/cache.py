@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import json
+
+from release_tools.entry import ChangelogEntry
+from release_tools.utils import write_json_file
+
+
+class EntryCache:
+    """Cache of parsed and rendered changelog entries.
+
+    Parsed entries are indexed by the hash of the content of their
+    files, while rendered fragments are indexed by the hash of the
+    entry data and the templates used to render them. This way,
+    an entry is only parsed and rendered again when it changes.
+
+    The cache is stored in a JSON file. Call `load` to read it
+    and `save` to store its new state.
+
+    :param filepath: path to the cache file
+    """
+    CACHE_FORMAT_VERSION = 1
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._entries = {}
+        self._fragments = {}
+        self._used_entries = set()
+        self._used_fragments = set()
+
+    def load(self):
+        """Load the contents of the cache file.
+
+        Missing, invalid or outdated cache files are ignored.
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') != self.CACHE_FORMAT_VERSION:
+            return
+
+        self._entries = data.get('entries', {})
+        self._fragments = data.get('fragments', {})
+
+    def save(self, prune=False):
+        """Store the cache in its file.
+
+        :param prune: when set, remove the items that were
+            not used since the cache was loaded
+        """
+        entries = self._entries
+        fragments = self._fragments
+
+        if prune:
+            entries = {k: v for k, v in entries.items() if k in self._used_entries}
+            fragments = {k: v for k, v in fragments.items() if k in self._used_fragments}
+
+        data = {
+            'version': self.CACHE_FORMAT_VERSION,
+            'entries': entries,
+            'fragments': fragments
+        }
+        write_json_file(self.filepath, data)
+
+    def read_entry(self, filepath):
+        """Read a changelog entry from a YAML file.
+
+        The entry is only parsed when its content is not
+        in the cache.
+
+        :param filepath: path to the entry file
+
+        :returns: a `ChangelogEntry` instance
+        """
+        with open(filepath, mode='rb') as fd:
+            content = fd.read()
+
+        key = hashlib.sha256(content).hexdigest()
+        self._used_entries.add(key)
+
+        data = self._entries.get(key, None)
+
+        if data is not None:
+            return ChangelogEntry(**data)
+
+        entry = ChangelogEntry.from_yaml(content.decode('utf-8'), filepath)
+        self._entries[key] = entry.to_dict()
+
+        return entry
+
+    def render_entry(self, entry, render, context=''):
+        """Get the text of an entry, rendering it only once.
+
+        :param entry: `ChangelogEntry` to render
+        :param render: function that renders the entry
+        :param context: data, such as the templates, which also
+            determines the result of `render`
+
+        :returns: the rendered text
+        """
+        data = json.dumps([context, entry.to_dict()], sort_keys=True)
+        key = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        self._used_fragments.add(key)
+
+        fragment = self._fragments.get(key, None)
+
+        if fragment is None:
+            fragment = render(entry)
+            self._fragments[key] = fragment
+
+        return fragment
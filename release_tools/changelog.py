@@ -40,16 +40,27 @@ The tool provides an interactive mode to help the user to
 define the relevant fields.
 """
 
+import csv
+import json
 import os
 
 import click
 import yaml
 
+from release_tools.duplicates import (find_duplicate_entries,
+                                      format_duplicate_clusters)
 from release_tools.entry import (CategoryChange,
                                  ChangelogEntry,
-                                 determine_filepath)
+                                 determine_filepath,
+                                 entry_filepath,
+                                 read_changelog_entries)
+from release_tools.names import open_entry_name_index
+from release_tools.profiling import profile_option
 from release_tools.project import Project
 from release_tools.repo import RepositoryError
+from release_tools.store import PackedEntryStore
+from release_tools.summary import update_bump_summary
+from release_tools.tracing import span, trace_option
 
 
 def title_prompt():
@@ -69,9 +80,24 @@ def category_prompt():
     return prompt_msg
 
 
+ENTRY_FILE_FIELDS = ['title', 'category', 'author', 'issue', 'notes']
+
+
+class EntryOption(click.Option):
+    """Option that is not prompted when no entry is created interactively."""
+
+    def prompt_for_value(self, ctx):
+        if ctx.params.get('from_file') or ctx.params.get('find_duplicates'):
+            return None
+        return super().prompt_for_value(ctx)
+
+
 def validate_title(ctx, param, value):
     """Check title option values."""
 
+    if value is None:
+        return value
+
     value = value.strip("\n\r ")
 
     if not value:
@@ -85,6 +111,9 @@ def validate_category(ctx, param, value):
     Valid values for a category are integer indexes and
     strings.
     """
+    if value is None:
+        return value
+
     # Check if the value is an index
     try:
         value = int(value)
@@ -110,10 +139,10 @@ def validate_category(ctx, param, value):
 
 @click.command()
 @click.option('-t', '--title', prompt=title_prompt(),
-              callback=validate_title,
+              callback=validate_title, cls=EntryOption,
               help="Title for the changelog entry.")
 @click.option('-c', '--category', prompt=category_prompt(),
-              callback=validate_category,
+              callback=validate_category, cls=EntryOption,
               help="The category of the change.")
 @click.option('--dry-run', is_flag=True,
               help="Do not generate an entry. Print to the standard output instead.")
@@ -121,7 +150,17 @@ def validate_category(ctx, param, value):
               help="Force to replace an existing entry.")
 @click.option('--editor/--no-editor', default=True,
               help="Open entry in the default editor.")
-def changelog(title, category, dry_run, overwrite, editor):
+@click.option('--from-file', is_eager=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help="Create the entries stored in a JSONL or CSV file.")
+@click.option('--auto-suffix', is_flag=True,
+              help="Add a numeric suffix to the filename of entries which name is in use.")
+@click.option('--find-duplicates', is_flag=True, is_eager=True,
+              help="List clusters of near-duplicate entries and exit.")
+@profile_option
+@trace_option
+def changelog(title, category, dry_run, overwrite, editor, from_file, auto_suffix,
+              find_duplicates):
     """Interactive tool to create unreleased Changelog entries.
 
     This tool will help you to create valid Changelog entries
@@ -137,7 +176,9 @@ def changelog(title, category, dry_run, overwrite, editor):
     in advance such as the title ('-t') or the category ('-c')
     of the entry.
 
-    New entries will be stored in "releases/unreleased" directory.
+    New entries will be stored in "releases/unreleased" directory,
+    together with a summary of their categories that 'semverup'
+    uses to determine the next version without parsing them.
     This directory must be available under the Git root path. If you
     don't want to create a new entry and see only the final result,
     please active '--dry-run' flag.
@@ -146,9 +187,34 @@ def changelog(title, category, dry_run, overwrite, editor):
     will be raised. Use '--overwrite' to force to replace the existing
     entry.
 
+    When the entries directory has a packed store, created with
+    'release-tools entries --pack', new entries are added to the
+    store instead of creating a file for each of them.
+
     You can also use this tool to create entries in a Git submodule.
     Just run the script under the submodule directory.
+
+    To import many entries at once, use '--from-file' with a JSONL
+    file, with an object per line, or a CSV file with a header row.
+    The fields of each entry are 'title', 'category', 'author', 'issue'
+    and 'notes'; only the first two are required. Entries are validated
+    before writing any of them and they are added to the Git index
+    with a single call.
+
+    Filenames are derived from the titles. To create entries with
+    titles already in use, unreleased or processed, set '--auto-suffix';
+    a numeric suffix, like in 'my-change-2.yml', is added to their
+    filenames. Names in use are kept in an index, so they are not
+    looked up on the filesystem for every new entry.
+
+    Use '--find-duplicates' to list the unreleased and processed
+    entries which titles and notes are very similar. Entries are
+    compared using MinHash signatures, so only a small fraction
+    of the pairs of entries are checked.
     """
+    if auto_suffix and overwrite:
+        raise click.UsageError("'--auto-suffix' and '--overwrite' are mutually exclusive")
+
     click.echo()
 
     try:
@@ -156,7 +222,18 @@ def changelog(title, category, dry_run, overwrite, editor):
     except RepositoryError as e:
         raise click.ClickException(e)
 
+    if find_duplicates:
+        report_duplicate_entries(project)
+        return
+
     dirpath = check_changelog_entries_dir(project)
+
+    if from_file:
+        import_changelog_entries(project, dirpath, from_file,
+                                 dry_run=dry_run, overwrite=overwrite,
+                                 auto_suffix=auto_suffix)
+        return
+
     content = create_changelog_entry_content(title, category,
                                              run_editor=editor)
     content = validate_changelog_entry(content)
@@ -165,9 +242,23 @@ def changelog(title, category, dry_run, overwrite, editor):
 
     if dry_run:
         click.echo(content)
-    else:
-        write_changelog_entry(dirpath, title, content,
-                              overwrite=overwrite)
+        return
+
+    # Unreleased and processed names are in use, as on imports
+    names = open_entry_name_index(project)
+    filename = os.path.basename(determine_filepath(dirpath, title))
+
+    if auto_suffix:
+        filename = names.reserve(filename)
+    elif not overwrite and filename in names:
+        msg = "Changelog entry {} already exists. Use '--overwrite' to replace it.".format(filename)
+        raise click.ClickException(msg)
+
+    write_changelog_entry(dirpath, title, content, overwrite=overwrite,
+                          filename=filename, cache_path=project.cache_path)
+    names.update([filename])
+    names.save()
+    update_bump_summary(project)
 
 
 def check_changelog_entries_dir(project):
@@ -195,11 +286,48 @@ def check_changelog_entries_dir(project):
     return dirpath
 
 
+def report_duplicate_entries(project):
+    """List the clusters of near-duplicate unreleased entries."""
+
+    dirpath = project.unreleased_changes_path
+    processed_dirpath = project.unreleased_processed_entries_path
+
+    if not os.path.exists(dirpath):
+        msg = "changelog entries directory {} does not exist.".format(dirpath)
+        raise click.ClickException(msg)
+
+    try:
+        entries = read_changelog_entries(dirpath, cache_path=project.cache_path)
+
+        if os.path.exists(processed_dirpath):
+            prefix = os.path.relpath(processed_dirpath, dirpath)
+            processed = read_changelog_entries(processed_dirpath,
+                                               cache_path=project.cache_path)
+            entries.update({
+                os.path.join(prefix, name): entry
+                for name, entry in processed.items()
+            })
+    except Exception as exc:
+        raise click.ClickException(exc)
+
+    clusters = find_duplicate_entries(entries)
+
+    if not clusters:
+        click.echo("No near-duplicate entries found")
+        return
+
+    click.echo(format_duplicate_clusters(clusters, entries))
+    click.echo()
+    click.echo("{} clusters of near-duplicate entries found".format(len(clusters)))
+
+
+@span('create_changelog_entry_content', phase='compose')
 def create_changelog_entry_content(title, category, author=None, issue=None,
-                                   run_editor=True):
+                                   run_editor=True, notes=None):
     """Generates the content of a changelog entry."""
 
-    entry = ChangelogEntry(title, category, author=author, issue=issue)
+    entry = ChangelogEntry(title, category, author=author, issue=issue,
+                           notes=notes)
     contents = entry.to_dict()
     stream = yaml.dump(contents, sort_keys=False,
                        explicit_start=True)
@@ -245,13 +373,38 @@ def validate_changelog_entry(content):
     return content
 
 
-def write_changelog_entry(dirpath, title, content, overwrite=False):
-    """Store the contents of an entry in a file."""
+@span('write_changelog_entry', phase='write')
+def write_changelog_entry(dirpath, title, content, overwrite=False,
+                          filename=None, cache_path=None):
+    """Store the contents of an entry in a file.
+
+    When the directory has a packed store, the entry is added
+    to the store instead. The filename is derived from the title,
+    unless `filename` is given. The index of the store is kept
+    under `cache_path`.
+    """
+    if filename:
+        filepath = entry_filepath(dirpath, filename)
+    else:
+        filepath = determine_filepath(dirpath, title)
+
+    store = PackedEntryStore(dirpath, cache_path=cache_path)
+
+    if store.exists():
+        filename = os.path.basename(filepath)
+
+        if not overwrite and (filename in store or os.path.exists(filepath)):
+            msg = "Changelog entry {} already exists. Use '--overwrite' to replace it.".format(filename)
+            raise click.ClickException(msg)
 
-    filepath = determine_filepath(dirpath, title)
+        store.append(filename, yaml.safe_load(content))
+        click.echo("Changelog entry '{}' created".format(filename))
+        return
 
     mode = 'w' if overwrite else 'x'
 
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
     try:
         filename = os.path.basename(filepath)
 
@@ -264,5 +417,165 @@ def write_changelog_entry(dirpath, title, content, overwrite=False):
         click.echo("Changelog entry '{}' created".format(filename))
 
 
+def import_changelog_entries(project, dirpath, filepath,
+                             dry_run=False, overwrite=False,
+                             auto_suffix=False):
+    """Create the changelog entries stored in a file.
+
+    All the entries are validated before writing them. Entries
+    with the same filename, or whose name is already in use when
+    `overwrite` is not set, are reported as errors. With
+    `auto_suffix`, those entries get a numeric suffix instead.
+    Names in use are read from the entry names index. New files
+    are added to the Git index with a single call.
+    """
+    records = read_entries_file(filepath)
+
+    store = PackedEntryStore(dirpath, cache_path=project.cache_path)
+    names = open_entry_name_index(project)
+
+    entries = {}
+    lines = {}
+    errors = []
+
+    for lineno, record in records:
+        try:
+            content = create_entry_content_from_record(record)
+        except click.ClickException as e:
+            errors.append("line {}: {}".format(lineno, e.message))
+            continue
+
+        entry_path = determine_filepath(dirpath, record['title'].strip("\n\r "))
+        filename = os.path.basename(entry_path)
+
+        if auto_suffix:
+            filename = names.reserve(filename)
+            entry_path = entry_filepath(dirpath, filename)
+
+        if filename in lines:
+            msg = "line {}: entry {} already defined on line {}"
+            errors.append(msg.format(lineno, filename, lines[filename]))
+        elif not overwrite and not auto_suffix and filename in names:
+            msg = "line {}: changelog entry {} already exists"
+            errors.append(msg.format(lineno, filename))
+        else:
+            entries[entry_path] = (lineno, content)
+            lines[filename] = lineno
+
+    if errors:
+        msg = "invalid entries in {}\n{}".format(filepath, "\n".join(errors))
+        raise click.ClickException(msg)
+
+    if dry_run:
+        for _, content in entries.values():
+            click.echo(content, nl=False)
+        return
+
+    if store.exists():
+        store.append_many({
+            os.path.basename(entry_path): yaml.safe_load(content)
+            for entry_path, (_, content) in entries.items()
+        })
+        added = [store.filepath]
+    else:
+        for entry_path, (_, content) in entries.items():
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with open(entry_path, mode='w') as fd:
+                fd.write(content)
+        added = list(entries)
+
+    names.update(lines)
+    names.save()
+
+    try:
+        project.repo.add_files(added)
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    update_bump_summary(project)
+
+    click.echo("{} changelog entries created".format(len(entries)))
+
+
+def read_entries_file(filepath):
+    """Read the records of a JSONL or CSV entries file.
+
+    :returns: a list of `(line number, record)` tuples
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+
+    try:
+        with open(filepath, mode='r', encoding='utf-8', newline='') as fd:
+            if ext in ('.jsonl', '.json'):
+                return _read_jsonl_records(fd)
+            elif ext == '.csv':
+                return _read_csv_records(fd)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise click.ClickException("unable to read {}; {}".format(filepath, e))
+
+    msg = "unsupported entries file {}; valid formats are JSONL and CSV".format(filepath)
+    raise click.ClickException(msg)
+
+
+def _read_jsonl_records(fd):
+    records = []
+
+    for lineno, line in enumerate(fd, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise click.ClickException("invalid JSON on line {}; {}".format(lineno, e))
+        if not isinstance(record, dict):
+            raise click.ClickException("invalid JSON on line {}; object expected".format(lineno))
+        records.append((lineno, record))
+
+    return records
+
+
+def _read_csv_records(fd):
+    reader = csv.DictReader(fd)
+
+    return [
+        (reader.line_num, {key: value or None for key, value in row.items()})
+        for row in reader
+    ]
+
+
+def create_entry_content_from_record(record):
+    """Validate a record and generate the content of its entry."""
+
+    unknown = sorted(set(record) - set(ENTRY_FILE_FIELDS))
+    if unknown:
+        raise click.ClickException("unknown fields {}".format(", ".join(map(str, unknown))))
+
+    title = record.get('title')
+    category = record.get('category')
+
+    if not isinstance(title, str) or not title.strip("\n\r "):
+        raise click.ClickException("title cannot be empty")
+    if category is None:
+        raise click.ClickException("category cannot be empty")
+
+    try:
+        category = validate_category(None, None, str(category))
+    except click.BadParameter as e:
+        raise click.ClickException("invalid category; {}".format(e.message))
+
+    # CSV files store every field as text
+    issue = record.get('issue')
+    if isinstance(issue, str) and issue.strip().isascii() and issue.strip().isdigit():
+        issue = int(issue)
+    if issue is not None and (isinstance(issue, bool) or not isinstance(issue, int)):
+        raise click.ClickException("invalid issue {!r}; a number is expected".format(issue))
+
+    return create_changelog_entry_content(title.strip("\n\r "), category,
+                                          author=record.get('author'),
+                                          issue=issue,
+                                          notes=record.get('notes'),
+                                          run_editor=False)
+
+
 if __name__ == '__main__':
     changelog()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Entry point to run every release tool from a single command.
+"""
+
+import click
+
+from release_tools.changelog import changelog
+from release_tools.entries import entries
+from release_tools.farm import farm
+from release_tools.notes import notes
+from release_tools.publish import publish
+from release_tools.release import release
+from release_tools.search import search
+from release_tools.semverup import semverup
+
+
+@click.group()
+def release_tools():
+    """Set of tools to generate Python releases.
+
+    The tools with generic names, like 'search', are only
+    available as subcommands.
+    """
+    pass
+
+
+release_tools.add_command(changelog)
+release_tools.add_command(semverup)
+release_tools.add_command(notes)
+release_tools.add_command(publish)
+release_tools.add_command(search)
+release_tools.add_command(entries)
+release_tools.add_command(release)
+release_tools.add_command(farm)
+
+
+if __name__ == '__main__':
+    release_tools()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import concurrent.futures
+import functools
+import hashlib
+import re
+
+
+# Number of hash functions of the MinHash signatures
+NUM_HASHES = 64
+
+# Locality-sensitive hashing splits signatures in bands of rows;
+# entries sharing a band are compared. 16 bands of 4 rows find
+# pairs with a similarity over 0.5 with high probability.
+LSH_BANDS = 16
+LSH_ROWS = NUM_HASHES // LSH_BANDS
+
+DEFAULT_SIMILARITY = 0.5
+
+SHINGLE_SIZE = 3
+
+# Signatures are computed in parallel from this number of entries
+PARALLEL_MIN_ENTRIES = 20000
+
+# Empty bins borrow the value of the next bin plus this offset
+# for each step, so they never match values of non-empty bins
+_BIN_BITS = NUM_HASHES.bit_length() - 1
+_DENSIFY_OFFSET = 1 << (64 - _BIN_BITS)
+
+
+def entry_text(entry):
+    """Return the normalized text of an entry.
+
+    Title and notes are joined, lowercased and every run of
+    characters which are not letters or digits is replaced
+    by a single space.
+    """
+    text = entry.title + ' ' + (entry.notes or '')
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text):
+    """Return the set of character shingles of a text."""
+
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def shingle_hash(shingle):
+    """Return the 64-bit hash of a shingle.
+
+    Shingles are shared by many entries, so hashes are cached.
+    """
+    digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def minhash_signature(text):
+    """Compute the MinHash signature of a text.
+
+    Signatures use one permutation hashing: each shingle is hashed
+    once and the hash selects one of the `NUM_HASHES` bins of the
+    signature, which keeps the minimum value it gets. Empty bins,
+    common on short texts, take the value of the next non-empty
+    bin, so signatures of similar texts stay aligned.
+
+    :param text: normalized text
+
+    :returns: a tuple of `NUM_HASHES` integers
+    """
+    mask = NUM_HASHES - 1
+    bins = [None] * NUM_HASHES
+
+    for h in map(shingle_hash, shingles(text)):
+        i = h & mask
+        value = h >> _BIN_BITS
+        current = bins[i]
+        if current is None or value < current:
+            bins[i] = value
+
+    signature = list(bins)
+
+    for i in range(NUM_HASHES):
+        if signature[i] is not None:
+            continue
+        for step in range(1, NUM_HASHES):
+            value = bins[(i + step) & mask]
+            if value is not None:
+                signature[i] = value + step * _DENSIFY_OFFSET
+                break
+
+    return tuple(signature)
+
+
+def signature_similarity(a, b):
+    """Estimate the Jaccard similarity of two signatures."""
+
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def compute_signatures(texts, max_workers=None):
+    """Compute the MinHash signatures of a list of texts.
+
+    Large lists are split among several processes.
+    """
+    if len(texts) < PARALLEL_MIN_ENTRIES:
+        return [minhash_signature(text) for text in texts]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(minhash_signature, texts, chunksize=256))
+
+
+def find_duplicate_entries(entries, similarity=DEFAULT_SIMILARITY,
+                           max_workers=None):
+    """Find clusters of near-duplicate changelog entries.
+
+    Entries are compared by the Jaccard similarity of the shingles
+    of their titles and notes, estimated with MinHash signatures.
+    To avoid comparing every pair, signatures are split in bands,
+    and only the entries which share a band are compared, with the
+    first entry found on that band. Similar entries are merged into
+    clusters, so the cost grows linearly with the number of entries.
+
+    :param entries: dict of `ChangelogEntry` instances by name
+    :param similarity: minimum estimated similarity of duplicates
+    :param max_workers: maximum number of processes
+
+    :returns: list of clusters, sorted by their first name; each
+        cluster is a sorted list of names
+    """
+    names = sorted(entries)
+    texts = [entry_text(entries[name]) for name in names]
+    signatures = compute_signatures(texts, max_workers=max_workers)
+
+    parents = list(range(len(names)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    buckets = {}
+
+    for i, signature in enumerate(signatures):
+        for band in range(LSH_BANDS):
+            key = (band,) + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+            first = buckets.setdefault(key, i)
+
+            if first == i:
+                continue
+
+            a, b = find(first), find(i)
+            if a != b and signature_similarity(signatures[first], signature) >= similarity:
+                parents[b] = a
+
+    clusters = {}
+    for i, name in enumerate(names):
+        clusters.setdefault(find(i), []).append(name)
+
+    return sorted(cluster for cluster in clusters.values() if len(cluster) > 1)
+
+
+def format_duplicate_clusters(clusters, entries):
+    """Describe clusters of near-duplicate entries.
+
+    :param clusters: list of clusters of entry names
+    :param entries: dict of `ChangelogEntry` instances by name
+
+    :returns: a string with the names and titles of the entries
+        of each cluster; clusters are separated by blank lines
+    """
+    return '\n\n'.join(
+        '\n'.join("  {}: {}".format(name, entries[name].title) for name in cluster)
+        for cluster in clusters
+    )
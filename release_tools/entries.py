@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Script to manage the storage of unreleased Changelog entries.
+
+It converts the entries stored as YAML files into a single
+packed store and back, compacts packed stores and moves the
+YAML files between the flat and the sharded layouts.
+"""
+
+import os
+
+import click
+import yaml
+
+from release_tools.entry import (ChangelogEntry,
+                                 SHARDED_LAYOUT_FILENAME,
+                                 SHARD_DIRNAME_REGEX,
+                                 entry_filepath,
+                                 is_sharded_dir,
+                                 list_entry_files)
+from release_tools.project import Project
+from release_tools.repo import RepositoryError
+from release_tools.store import (PACKED_STORE_FILENAME,
+                                 PackedEntryStore)
+from release_tools.summary import update_bump_summary
+
+
+@click.command()
+@click.option('--pack', 'action', flag_value='pack',
+              help="Move the YAML entries into a packed store.")
+@click.option('--unpack', 'action', flag_value='unpack',
+              help="Move the packed entries into YAML files.")
+@click.option('--compact', 'action', flag_value='compact',
+              help="Drop replaced and removed records of the packed store.")
+@click.option('--shard', 'action', flag_value='shard',
+              help="Move the YAML entries into shard subdirectories.")
+@click.option('--unshard', 'action', flag_value='unshard',
+              help="Move the YAML entries back to a flat directory.")
+@click.option('--processed', is_flag=True,
+              help="Use the processed entries directory.")
+def entries(action, processed):
+    """Manage the storage of unreleased Changelog entries.
+
+    By default, each changelog entry is a YAML file stored under
+    'releases/unreleased'. With thousands of entries, a packed store
+    keeps all of them in a single file. Once the store exists,
+    'changelog' adds new entries to it and the rest of the tools
+    read them transparently.
+
+    Use '--pack' to move the YAML entries into a packed store and
+    '--unpack' to convert it back to YAML files. Replacing entries
+    leaves the old records in the store; use '--compact' to drop them.
+
+    Directories with many YAML entries can also be sharded. Use
+    '--shard' to distribute the entries among subdirectories named
+    after the first digits of the hash of their filenames, and
+    '--unshard' to go back to a flat directory. Once a directory
+    is sharded, new entries are created on their shards and the
+    rest of the tools find them transparently.
+
+    Changes are added to the Git index.
+
+    Use '--processed' to work with the entries that were already
+    included in release candidates, under 'unreleased/processed'.
+    """
+    if not action:
+        msg = "one of '--pack', '--unpack', '--compact', '--shard' or '--unshard' is required"
+        raise click.UsageError(msg)
+
+    try:
+        project = Project(os.getcwd())
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    if processed:
+        dirpath = project.unreleased_processed_entries_path
+    else:
+        dirpath = project.unreleased_changes_path
+
+    if not os.path.exists(dirpath):
+        msg = "changelog entries directory {} does not exist.".format(dirpath)
+        raise click.ClickException(msg)
+
+    store = PackedEntryStore(dirpath, cache_path=project.cache_path)
+
+    try:
+        if action == 'pack':
+            pack_entries(project, store)
+        elif action == 'unpack':
+            unpack_entries(project, store)
+        elif action == 'compact':
+            compact_entries(project, store)
+        else:
+            reshard_entries(project, dirpath, sharded=(action == 'shard'))
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+
+def pack_entries(project, store):
+    """Move the YAML entries of a directory into a packed store."""
+
+    relpaths = list_entry_files(store.dirpath)
+    filenames = [os.path.basename(relpath) for relpath in relpaths]
+    filepaths = [os.path.join(store.dirpath, relpath) for relpath in relpaths]
+
+    try:
+        packed = {
+            filename: ChangelogEntry.from_yaml_file(filepath).to_dict()
+            for filename, filepath in zip(filenames, filepaths)
+        }
+    except Exception as exc:
+        raise click.ClickException(exc)
+
+    store.append_many(packed)
+
+    project.repo.rm_files(filepaths)
+    for filepath in filepaths:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    project.repo.add_files([store.filepath])
+
+    msg = "{} entries packed into '{}'".format(len(packed), PACKED_STORE_FILENAME)
+    click.echo(msg)
+
+
+def unpack_entries(project, store):
+    """Move the entries of a packed store into YAML files."""
+
+    if not store.exists():
+        raise click.ClickException("packed store not found")
+
+    packed = store.read_all()
+    filepaths = [entry_filepath(store.dirpath, name) for name in sorted(packed)]
+
+    existing = [os.path.basename(f) for f in filepaths if os.path.exists(f)]
+    if existing:
+        msg = "changelog entries {} already exist".format(", ".join(existing))
+        raise click.ClickException(msg)
+
+    for filepath in filepaths:
+        content = yaml.dump(packed[os.path.basename(filepath)],
+                            sort_keys=False, explicit_start=True)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, mode='x') as fd:
+            fd.write(content)
+
+    project.repo.add_files(filepaths)
+    project.repo.rm_files([store.filepath])
+    store.remove()
+
+    msg = "{} entries unpacked from '{}'".format(len(packed), PACKED_STORE_FILENAME)
+    click.echo(msg)
+
+
+def compact_entries(project, store):
+    """Drop the records of a packed store that are not live."""
+
+    if not store.exists():
+        raise click.ClickException("packed store not found")
+
+    dropped = store.compact()
+
+    project.repo.add_files([store.filepath])
+
+    click.echo("Packed store compacted; {} records dropped".format(dropped))
+
+
+def reshard_entries(project, dirpath, sharded):
+    """Move the YAML entries of a directory to a new layout.
+
+    Entries are moved with a `git mv` call per target directory.
+    The marker file of the sharded layout is created or removed,
+    and empty shard directories are deleted.
+
+    :param project: project of the entries
+    :param dirpath: path to the entries directory
+    :param sharded: whether the target layout is the sharded one
+    """
+    moves = {}
+    targets = {}
+
+    for relpath in list_entry_files(dirpath):
+        filename = os.path.basename(relpath)
+        srcpath = os.path.join(dirpath, relpath)
+        destpath = entry_filepath(dirpath, filename, sharded=sharded)
+
+        if destpath in targets:
+            msg = "changelog entries {} and {} have the same name".format(targets[destpath], relpath)
+            raise click.ClickException(msg)
+        targets[destpath] = relpath
+
+        if srcpath != destpath:
+            moves.setdefault(os.path.dirname(destpath), []).append(srcpath)
+
+    for dest_dirpath in sorted(moves):
+        os.makedirs(dest_dirpath, exist_ok=True)
+        project.repo.mv_files(moves[dest_dirpath], dest_dirpath)
+
+    marker = os.path.join(dirpath, SHARDED_LAYOUT_FILENAME)
+
+    if sharded and not is_sharded_dir(dirpath):
+        open(marker, mode='w').close()
+        project.repo.add_files([marker])
+    elif not sharded and is_sharded_dir(dirpath):
+        project.repo.rm_files([marker])
+        if os.path.exists(marker):
+            os.remove(marker)
+
+    with os.scandir(dirpath) as it:
+        shards = [f.path for f in it if SHARD_DIRNAME_REGEX.match(f.name) and f.is_dir()]
+
+    for shard in shards:
+        if not os.listdir(shard):
+            os.rmdir(shard)
+
+    update_bump_summary(project, create=False)
+
+    layout = 'sharded' if sharded else 'flat'
+    moved = sum(len(srcpaths) for srcpaths in moves.values())
+    click.echo("{} entries moved to the {} layout".format(moved, layout))
+
+
+if __name__ == '__main__':
+    entries()
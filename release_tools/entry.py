@@ -29,17 +29,29 @@
 #
 
 import enum
+import hashlib
 import os
 import re
 
 import yaml
 
+from release_tools.store import PackedEntryStore
+from release_tools.tracing import span
+
 
 YAML_FILE_EXTENSION = '.yml'
 
 # GNU tar has a 99 character limit
 MAX_FILENAME_LENGTH = 99 - len(YAML_FILE_EXTENSION)
 
+# Marker file of the directories using the sharded layout
+SHARDED_LAYOUT_FILENAME = '.sharded'
+
+# Number of hexadecimal digits of the shard directory names
+SHARD_PREFIX_LENGTH = 2
+
+SHARD_DIRNAME_REGEX = re.compile(r'^[0-9a-f]{%d}$' % SHARD_PREFIX_LENGTH)
+
 
 @enum.unique
 class CategoryChange(enum.Enum):
@@ -101,8 +113,26 @@ class ChangelogEntry:
         """Create an instance from a YAML file."""
 
         with open(filepath, mode='r') as fd:
-            data = yaml.safe_load(fd)
+            return cls.from_yaml(fd, filepath)
+
+    @classmethod
+    def from_yaml(cls, stream, name):
+        """Create an instance from a YAML stream.
+
+        :param stream: YAML stream or string with the entry data
+        :param name: name of the entry, used on error messages
+        """
+        data = yaml.safe_load(stream)
+
+        return cls.from_dict(data, name)
+
+    @classmethod
+    def from_dict(cls, data, name):
+        """Create an instance from a dict with the entry data.
 
+        :param data: dict with the entry data
+        :param name: name of the entry, used on error messages
+        """
         try:
             entry = cls(data['title'],
                         data['category'],
@@ -110,14 +140,15 @@ class ChangelogEntry:
                         issue=data['issue'],
                         notes=data['notes'])
         except KeyError as exc:
-            msg = "invalid format for {}; '{}' attribute not found".format(filepath,
+            msg = "invalid format for {}; '{}' attribute not found".format(name,
                                                                            exc.args[0])
             raise Exception(msg)
 
         return entry
 
 
-def read_changelog_entries(dirpath):
+@span('read_changelog_entries', phase='entry load')
+def read_changelog_entries(dirpath, cache=None, cache_path=None):
     """Read the changelog entries from a directory.
 
     The function reads the changelog entry fields from a directory,
@@ -125,24 +156,113 @@ def read_changelog_entries(dirpath):
     are returned in a `dict`, where the keys are the path to the
     their files.
 
+    When a `cache` is given, entries which content was already
+    parsed are taken from it instead of parsing their files again.
+
+    Entries stored in a packed store in the same directory are also
+    read; their keys are their names. YAML files take precedence
+    over packed entries with the same name, even when they are
+    stored on a shard.
+
     :param dirpath: path to the directory storing the changelog entries
+    :param cache: `EntryCache` to read and store parsed entries
+    :param cache_path: cache directory where the index of the
+        packed store is kept
 
     :returns: `dict` of `ChangelogEntry` instances; keys are the path
         to corresponding files.
     """
-    return {
-        filepath: ChangelogEntry.from_yaml_file(os.path.join(dirpath, filepath))
-        for filepath in os.listdir(dirpath)
-        if filepath.endswith('.yml')
-    }
+    if cache is not None:
+        read_entry = cache.read_entry
+    else:
+        read_entry = ChangelogEntry.from_yaml_file
+
+    entries = {}
+
+    store = PackedEntryStore(dirpath, cache_path=cache_path)
+
+    if store.exists():
+        entries = {
+            name: ChangelogEntry.from_dict(data, os.path.join(dirpath, name))
+            for name, data in store.read_all().items()
+        }
+
+    for filepath in list_entry_files(dirpath):
+        # Files on shards are named like the packed records
+        entries.pop(os.path.basename(filepath), None)
+        entries[filepath] = read_entry(os.path.join(dirpath, filepath))
+
+    return entries
 
 
 def determine_filepath(dirpath, title):
-    """Returns the changelog entry filename."""
+    """Returns the changelog entry filename.
 
+    On directories using the sharded layout, the path includes
+    the shard subdirectory of the entry.
+    """
     filename = title.replace(' ', '-').lower()
     filename = re.sub('[^a-zA-Z0-9_-]', '', filename)
     filename = filename[0:MAX_FILENAME_LENGTH - 1] + YAML_FILE_EXTENSION
-    filepath = os.path.join(dirpath, filename)
 
-    return filepath
+    return entry_filepath(dirpath, filename)
+
+
+def is_sharded_dir(dirpath):
+    """Check whether an entries directory uses the sharded layout."""
+
+    return os.path.exists(os.path.join(dirpath, SHARDED_LAYOUT_FILENAME))
+
+
+def shard_dirname(filename):
+    """Return the name of the shard subdirectory of an entry.
+
+    The shard is given by the first digits of the SHA-1 hash
+    of the filename, so entries are spread evenly among them.
+    """
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return digest[:SHARD_PREFIX_LENGTH]
+
+
+def entry_filepath(dirpath, filename, sharded=None):
+    """Return the path of an entry file in a directory.
+
+    :param dirpath: path to the entries directory
+    :param filename: name of the entry file
+    :param sharded: whether the directory uses the sharded layout;
+        when it is `None`, the layout of the directory is checked
+    """
+    if sharded is None:
+        sharded = is_sharded_dir(dirpath)
+
+    if sharded:
+        return os.path.join(dirpath, shard_dirname(filename), filename)
+    else:
+        return os.path.join(dirpath, filename)
+
+
+def list_entry_files(dirpath):
+    """List the entry files of a directory.
+
+    Files stored on the root of the directory and on its shard
+    subdirectories are listed, no matter the layout of the
+    directory, so entries created before changing it are
+    also found.
+
+    :param dirpath: path to the entries directory
+
+    :returns: sorted list of paths relative to `dirpath`
+    """
+    filepaths = []
+
+    with os.scandir(dirpath) as it:
+        for f in it:
+            if f.name.endswith(YAML_FILE_EXTENSION) and f.is_file():
+                filepaths.append(f.name)
+            elif SHARD_DIRNAME_REGEX.match(f.name) and f.is_dir():
+                filepaths.extend(
+                    os.path.join(f.name, name) for name in os.listdir(f.path)
+                    if name.endswith(YAML_FILE_EXTENSION)
+                )
+
+    return sorted(filepaths)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Script to release many repositories at once.
+
+It reads a manifest with the repositories to release and creates
+a new release of each one of them, running several releases at
+the same time.
+"""
+
+import concurrent.futures
+import contextlib
+import os
+import re
+import traceback
+
+import click
+import yaml
+
+from release_tools.project import Project
+from release_tools.release import run_release
+from release_tools.repo import RepositoryError
+from release_tools.utils import write_json_file
+
+
+REQUIRED_FIELDS = ['path', 'name', 'author']
+OPTIONAL_FIELDS = {
+    'remote': None,
+    'remote_branch': 'master',
+    'bump_version': None,
+    'pre_release': False,
+    'news': False,
+    'authors': False,
+    'trailers': False
+}
+
+STATUS_RELEASED = 'released'
+STATUS_CHECKED = 'checked'
+STATUS_FAILED = 'failed'
+
+
+@click.command()
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('-j', '--jobs', type=click.IntRange(min=1),
+              help="Number of repositories released at the same time. Default: number of CPUs.")
+@click.option('--log-dir', default='farm-logs', show_default=True,
+              type=click.Path(file_okay=False),
+              help="Directory where the log of each repository is written.")
+@click.option('--report', type=click.Path(dir_okay=False),
+              help="Write a JSON report of the releases to the given file.")
+@click.option('--dry-run', is_flag=True,
+              help="Compute the versions and the notes; do not change anything.")
+def farm(manifest, jobs, log_dir, report, dry_run):
+    """Release many repositories at once.
+
+    This script creates a new release of each repository listed on
+    'MANIFEST', as 'release' does: it increments the version number,
+    generates the release notes and publishes the release.
+
+    The manifest is a YAML file with a list of 'repositories'. Each
+    repository has a 'path', relative to the manifest, the 'name'
+    used as the title of the notes and the 'author' of the release.
+    Optional fields are 'remote' and 'remote_branch', to push the
+    release, 'bump_version', 'pre_release', 'news', 'authors' and
+    'trailers'. Fields set under 'defaults' apply to every repository.
+
+    Repositories are released by a pool of processes; use '--jobs'
+    to set its size. The output of each release is written to its
+    own file in '--log-dir'. A failed release does not stop the
+    others; once all of them finish, a summary is printed and the
+    script fails if any of them failed. Use '--report' to write
+    the summary to a JSON file too.
+
+    Use '--dry-run' to compute the new versions and the notes
+    without changing any repository.
+    """
+    repositories = read_manifest(manifest)
+
+    if not repositories:
+        raise click.ClickException("no repositories found in manifest")
+
+    os.makedirs(log_dir, exist_ok=True)
+
+    for i, repository in enumerate(repositories, start=1):
+        repository.log_file = os.path.abspath(
+            os.path.join(log_dir, determine_log_filename(i, repository))
+        )
+
+    release_repositories(repositories, dry_run=dry_run, max_workers=jobs)
+
+    click.echo(format_farm_summary(repositories))
+
+    if report:
+        write_json_file(os.path.abspath(report), compose_farm_report(repositories), indent=2)
+
+    failed = len([r for r in repositories if r.status == STATUS_FAILED])
+    if failed:
+        msg = "{} of {} repositories failed".format(failed, len(repositories))
+        raise click.ClickException(msg)
+
+
+class FarmRepository:
+    """Class to store the release settings and outcome of a repository."""
+
+    def __init__(self, path, name, author, remote=None, remote_branch='master',
+                 bump_version=None, pre_release=False, news=False, authors=False,
+                 trailers=False):
+        self.path = path
+        self.name = name
+        self.author = author
+        self.remote = remote
+        self.remote_branch = remote_branch
+        self.bump_version = bump_version
+        self.pre_release = pre_release
+        self.news = news
+        self.authors = authors
+        self.trailers = trailers
+        self.log_file = None
+        self.status = None
+        self.version = None
+        self.error = None
+
+
+def read_manifest(filepath):
+    """Read the repositories listed on a manifest file.
+
+    Paths of the repositories are relative to the directory
+    of the manifest.
+
+    :returns: a list of `FarmRepository` instances
+    """
+    try:
+        with open(filepath, 'r') as fd:
+            data = yaml.safe_load(fd)
+    except (OSError, yaml.YAMLError) as exc:
+        raise click.ClickException("invalid manifest; {}".format(exc))
+
+    if not isinstance(data, dict) or not isinstance(data.get('repositories', []), list):
+        raise click.ClickException("invalid manifest; 'repositories' must be a list")
+
+    defaults = data.get('defaults') or {}
+    basepath = os.path.dirname(os.path.abspath(filepath))
+    fields = set(REQUIRED_FIELDS) | set(OPTIONAL_FIELDS)
+
+    repositories = []
+
+    for i, item in enumerate(data.get('repositories') or [], start=1):
+        if not isinstance(item, dict):
+            msg = "invalid manifest; repository {} is not a mapping".format(i)
+            raise click.ClickException(msg)
+
+        settings = dict(OPTIONAL_FIELDS)
+        settings.update(defaults)
+        settings.update(item)
+
+        unknown = sorted(set(settings) - fields)
+        if unknown:
+            msg = "invalid manifest; repository {}: unknown field '{}'".format(i, unknown[0])
+            raise click.ClickException(msg)
+
+        for field in REQUIRED_FIELDS:
+            if not settings.get(field):
+                msg = "invalid manifest; repository {}: '{}' not set".format(i, field)
+                raise click.ClickException(msg)
+
+        settings['path'] = os.path.join(basepath, settings['path'])
+        repositories.append(FarmRepository(**settings))
+
+    return repositories
+
+
+def determine_log_filename(index, repository):
+    """Name of the log file of a repository.
+
+    The position of the repository in the manifest is part of
+    the name, so repositories with the same name do not share it.
+    """
+    basename = os.path.basename(os.path.normpath(repository.path))
+    basename = re.sub('[^a-zA-Z0-9_.-]', '_', basename)
+
+    return "{:03d}-{}.log".format(index, basename)
+
+
+def release_repositories(repositories, dry_run=False, max_workers=None):
+    """Release a set of repositories in parallel.
+
+    Each repository is released by a pool of processes. The
+    progress is printed to the standard error as releases finish.
+    The outcome is stored in the `status`, `version` and `error`
+    attributes of the repositories.
+
+    :returns: the list of repositories
+    """
+    workers = max_workers or os.cpu_count() or 1
+    total = len(repositories)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_release_repository, repository, dry_run): repository
+            for repository in repositories
+        }
+
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            repository = futures[future]
+
+            try:
+                repository.version, repository.error = future.result()
+            except Exception as exc:
+                repository.version, repository.error = None, "release process failed; {}".format(exc)
+
+            if repository.error:
+                repository.status = STATUS_FAILED
+                outcome = "failed; see {}".format(repository.log_file)
+            else:
+                repository.status = STATUS_CHECKED if dry_run else STATUS_RELEASED
+                outcome = "{} {}".format(repository.status, repository.version)
+
+            click.echo("[{}/{}] {}: {}".format(done, total, repository.path, outcome), err=True)
+
+    return repositories
+
+
+def _release_repository(repository, dry_run):
+    """Release a repository, writing its output to its log file.
+
+    :returns: a `(version, error)` tuple
+    """
+    with open(repository.log_file, 'w') as fd, \
+            contextlib.redirect_stdout(fd), contextlib.redirect_stderr(fd):
+        try:
+            project = Project(repository.path)
+            result = run_release(project, repository.name, repository.author,
+                                 bump_version=repository.bump_version,
+                                 pre_release=repository.pre_release,
+                                 news=repository.news, authors=repository.authors,
+                                 remote=repository.remote,
+                                 remote_branch=repository.remote_branch,
+                                 trailers=repository.trailers,
+                                 dry_run=dry_run)
+        except (click.ClickException, RepositoryError) as exc:
+            error = str(exc.format_message() if isinstance(exc, click.ClickException) else exc)
+            click.echo("Error: " + error, err=True)
+            return None, error
+        except Exception as exc:
+            traceback.print_exc()
+            return None, "unexpected error; {}".format(exc)
+
+    return result.version, None
+
+
+def format_farm_summary(repositories):
+    """Format a table with the outcome of the releases."""
+
+    rows = [('Repository', 'Version', 'Status')]
+    rows += [
+        (os.path.relpath(repository.path), repository.version or '-',
+         repository.status + (": " + repository.error if repository.error else ''))
+        for repository in repositories
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(2)]
+
+    lines = [
+        "{}  {}  {}".format(row[0].ljust(widths[0]), row[1].ljust(widths[1]), row[2])
+        for row in rows
+    ]
+
+    counts = [
+        (len([r for r in repositories if r.status == status]), status)
+        for status in (STATUS_RELEASED, STATUS_CHECKED, STATUS_FAILED)
+    ]
+    lines.append(", ".join("{} {}".format(n, status) for n, status in counts if n))
+
+    return "\n".join(lines)
+
+
+def compose_farm_report(repositories):
+    """Compose the data of the JSON report of the releases."""
+
+    return {
+        'repositories': [
+            {
+                'path': repository.path,
+                'name': repository.name,
+                'status': repository.status,
+                'version': repository.version,
+                'error': repository.error,
+                'log': repository.log_file
+            }
+            for repository in repositories
+        ],
+        'summary': {
+            status: len([r for r in repositories if r.status == status])
+            for status in (STATUS_RELEASED, STATUS_CHECKED, STATUS_FAILED)
+        }
+    }
+
+
+if __name__ == '__main__':
+    farm()
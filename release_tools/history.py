@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+
+from release_tools.archive import (determine_archive_filepath,
+                                   read_release_archive)
+from release_tools.entry import (ChangelogEntry,
+                                 YAML_FILE_EXTENSION)
+from release_tools.project import UNRELEASED_ENTRIES_PROCESSED
+from release_tools.store import PACKED_STORE_FILENAME, read_packed_entries
+
+
+class Release:
+    """Class to store the data of a published release."""
+
+    def __init__(self, version, date, entries):
+        self.version = version
+        self.date = date
+        self.entries = entries
+
+
+def read_release_tags(project):
+    """Read the release tags of a project.
+
+    Release tags are those tags which name is a valid semver
+    string. They are returned sorted by version number as
+    `(tag, date)` tuples.
+
+    :param project: project to read the tags from
+
+    :returns: a sorted list of `(tag, date)` tuples
+    """
+    return list(project.release_tags.tags)
+
+
+def read_release_history(project):
+    """Read the changelog entries included on each release.
+
+    The function walks the release tags of the project, from the
+    oldest to the newest, and collects the changelog entries that
+    were part of each release. An entry belongs to a release when
+    it was removed from the unreleased entries directory between
+    the previous release tag and the tag of that release. Entries
+    moved to the processed directory, which is what `notes` does
+    for release candidates, are also part of the release.
+
+    Packed entries are found comparing the live entries of the
+    packed stores before and after each commit that changed them.
+    Entries packed or unpacked by a commit, which are removed and
+    added in the same commit, are not part of the release.
+
+    Releases published with an archive of their entries are read
+    from it, so their commits are not walked.
+
+    :param project: project to read the history from
+
+    :returns: a list of `Release` instances sorted by version
+    """
+    prefix = os.path.relpath(project.unreleased_changes_path,
+                             project.basepath)
+
+    history = []
+    store_changes = []
+    previous = None
+
+    for tag, date in read_release_tags(project):
+        rev_range = tag if not previous else previous + '..' + tag
+        previous = tag
+
+        archive = determine_archive_filepath(project, tag)
+
+        if os.path.exists(archive):
+            history.append((tag, date, None, read_release_archive(archive)))
+            continue
+
+        changes = project.repo.log_name_status(rev_range, prefix)
+        store_changes.extend(change for change in changes
+                             if _store_relpath(change[2][-1], prefix))
+        history.append((tag, date, changes, None))
+
+    stores = _read_store_changes(project, store_changes)
+
+    found = []
+    objects = []
+
+    for tag, date, changes, entries in history:
+        released = {}
+        if entries is None:
+            released = _find_released_entries(changes, prefix, stores)
+            objects.extend(released[filename] for filename in sorted(released)
+                           if isinstance(released[filename], str))
+        found.append(released)
+
+    contents = iter(project.repo.cat_files(objects))
+    releases = []
+
+    for (tag, date, changes, entries), released in zip(history, found):
+        if entries is None:
+            entries = {}
+            for filename in sorted(released):
+                if isinstance(released[filename], str):
+                    entries[filename] = ChangelogEntry.from_yaml(next(contents), filename)
+                else:
+                    entries[filename] = ChangelogEntry.from_dict(released[filename], filename)
+        releases.append(Release(tag, date, entries))
+
+    return releases
+
+
+def _find_released_entries(changes, prefix, stores):
+    """Find the entries released by a range of commits.
+
+    :returns: a dict with the object of the YAML file, as
+        `<rev>:<path>`, or the data of the packed entry by name
+    """
+    processed = UNRELEASED_ENTRIES_PROCESSED + '/'
+
+    # Entries created on the unreleased directory by each commit
+    added = set()
+    packed = set()
+
+    for commit, status, paths in changes:
+        relpath = os.path.relpath(paths[-1], prefix)
+
+        if _store_relpath(paths[-1], prefix) == PACKED_STORE_FILENAME:
+            before, after = stores[(commit, paths[-1])]
+            packed.update((commit, name) for name in set(after) - set(before))
+        elif status[0] in 'AR' and not relpath.startswith(processed):
+            added.add((commit, os.path.basename(relpath)))
+
+    found = {}
+
+    for commit, status, paths in changes:
+        srcpath = os.path.relpath(paths[0], prefix)
+        filename = os.path.basename(srcpath)
+
+        if _store_relpath(paths[-1], prefix):
+            before, after = stores[(commit, paths[-1])]
+            for name in sorted(set(before) - set(after)):
+                if name in found:
+                    continue
+                if not srcpath.startswith(processed) and (commit, name) in added:
+                    continue
+                found[name] = before[name]
+            continue
+
+        if not filename.endswith(YAML_FILE_EXTENSION) or filename in found:
+            continue
+        if status == 'D':
+            if not srcpath.startswith(processed) and (commit, filename) in packed:
+                continue
+            found[filename] = commit + '^:' + paths[0]
+        elif status.startswith('R') and not srcpath.startswith(processed):
+            # Entries renamed within the directory, like when it
+            # is resharded, are not part of the release
+            if os.path.relpath(paths[1], prefix).startswith(processed):
+                found[filename] = commit + ':' + paths[1]
+
+    return found
+
+
+def _read_store_changes(project, changes):
+    """Read the live entries of the stores before and after each change.
+
+    :returns: a dict with `(before, after)` entries by `(commit, path)`
+    """
+    objects = []
+
+    for commit, status, paths in changes:
+        objects.append(commit + '^:' + paths[0])
+        objects.append(commit + ':' + paths[-1])
+
+    contents = iter(project.repo.cat_files(objects))
+    stores = {}
+
+    for commit, status, paths in changes:
+        before = read_packed_entries(next(contents))
+        after = read_packed_entries(next(contents))
+        stores[(commit, paths[-1])] = (before, after)
+
+    return stores
+
+
+def _store_relpath(path, prefix):
+    """Return the path of a store relative to the entries directory.
+
+    :returns: the relative path or `None` when the path is not
+        the store of the unreleased or the processed directory
+    """
+    relpath = os.path.relpath(path, prefix)
+
+    if relpath in (PACKED_STORE_FILENAME, UNRELEASED_ENTRIES_PROCESSED + '/' + PACKED_STORE_FILENAME):
+        return relpath
+    return None
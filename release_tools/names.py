@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+
+from release_tools.entry import (MAX_FILENAME_LENGTH,
+                                 SHARD_DIRNAME_REGEX,
+                                 YAML_FILE_EXTENSION,
+                                 list_entry_files)
+from release_tools.store import PackedEntryStore
+from release_tools.utils import write_json_file
+
+
+ENTRY_NAMES_FILENAME = 'entry-names.json'
+
+
+class EntryNameIndex:
+    """Index of the names of the changelog entries of a project.
+
+    The index stores the filenames of the entries of a set of
+    directories, including the names of their packed entries,
+    so name collisions are detected without probing the
+    filesystem for each new entry.
+
+    The index is stored in a JSON file together with the
+    modification times of the directories, their shards and
+    their packed stores. It is valid while they do not change;
+    otherwise, it is built again listing the directories.
+
+    :param filepath: path to the index file
+    :param dirpaths: list of entries directories
+    :param cache_path: cache directory where the indexes of the
+        packed stores are kept
+    """
+    INDEX_FORMAT_VERSION = 1
+
+    def __init__(self, filepath, dirpaths, cache_path=None):
+        self.filepath = filepath
+        self.dirpaths = dirpaths
+        self.cache_path = cache_path
+        self.names = set()
+        self._stats = None
+        self._suffixes = {}
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def load(self):
+        """Load the index from its file.
+
+        Missing, invalid or outdated index files are ignored.
+
+        :returns: whether the index was loaded
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != self.INDEX_FORMAT_VERSION:
+            return False
+        if data.get('dirpaths') != self.dirpaths:
+            return False
+
+        self.names = set(data['names'])
+        self._stats = data['stats']
+        return True
+
+    def save(self):
+        """Store the index in its file."""
+
+        data = {
+            'version': self.INDEX_FORMAT_VERSION,
+            'dirpaths': self.dirpaths,
+            'stats': self._directory_stats(),
+            'names': sorted(self.names)
+        }
+        write_json_file(self.filepath, data)
+
+    def is_valid(self):
+        """Check whether the index is in sync with the directories.
+
+        Only the directories, shards and stores stored in the index
+        are checked; new shards change the time of their directory.
+        """
+        if self._stats is None:
+            return False
+
+        for path, mtime in self._stats.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except FileNotFoundError:
+                if mtime is not None:
+                    return False
+
+        return True
+
+    def build(self):
+        """Index the entries of the directories."""
+
+        self.names = set()
+
+        for dirpath in self.dirpaths:
+            if not os.path.exists(dirpath):
+                continue
+
+            self.names.update(os.path.basename(f) for f in list_entry_files(dirpath))
+
+            store = PackedEntryStore(dirpath, cache_path=self.cache_path)
+            if store.exists():
+                self.names.update(store.names())
+
+        self._stats = self._directory_stats()
+
+    def update(self, names):
+        """Add a set of names to the index."""
+
+        self.names.update(names)
+
+    def reserve(self, filename):
+        """Reserve a name for a new entry.
+
+        When `filename` is already in use, a numeric suffix is
+        added to it, starting with '-2'. Suffixes are assigned in
+        order, so the same set of entries always gets the same
+        names. Long names are truncated to make room for the suffix.
+
+        :param filename: filename derived from the title of the entry
+
+        :returns: the reserved filename
+        """
+        name = filename
+        stem = filename[:-len(YAML_FILE_EXTENSION)]
+        count = self._suffixes.get(stem, 1)
+
+        while name in self.names:
+            count += 1
+            suffix = '-{}'.format(count)
+            name = stem[:MAX_FILENAME_LENGTH - 1 - len(suffix)] + suffix + YAML_FILE_EXTENSION
+
+        self._suffixes[stem] = count
+        self.names.add(name)
+
+        return name
+
+    def _directory_stats(self):
+        paths = []
+
+        for dirpath in self.dirpaths:
+            paths.append(dirpath)
+            paths.append(PackedEntryStore(dirpath, cache_path=self.cache_path).filepath)
+
+            try:
+                with os.scandir(dirpath) as it:
+                    paths.extend(f.path for f in it
+                                 if SHARD_DIRNAME_REGEX.match(f.name) and f.is_dir())
+            except FileNotFoundError:
+                pass
+
+        stats = {}
+        for path in paths:
+            try:
+                stats[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                stats[path] = None
+
+        return stats
+
+
+def open_entry_name_index(project):
+    """Open the index of the entry names of a project.
+
+    The index covers the unreleased and the processed entries.
+    It is built again when it is out of sync with them.
+
+    :param project: project of the entries
+
+    :returns: an `EntryNameIndex` instance
+    """
+    filepath = os.path.join(project.cache_path, ENTRY_NAMES_FILENAME)
+    dirpaths = [project.unreleased_changes_path,
+                project.unreleased_processed_entries_path]
+
+    index = EntryNameIndex(filepath, dirpaths, cache_path=project.cache_path)
+    index.load()
+
+    if not index.is_valid():
+        index.build()
+
+    return index
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import mmap
+import os
+import re
+
+from release_tools.utils import write_json_file
+
+
+NEWS_INDEX_FILENAME = 'news-index.json'
+
+HEADLINE_REGEX = re.compile(rb'^## (?P<title>.*) (?P<version>\S+) - \(.*\)$')
+
+
+class NewsIndex:
+    """Index of the sections of a news file.
+
+    The index maps the version of each section of the news file
+    to its position in the file, given by the byte offset of its
+    headline and its length. Trailing new lines are not part of
+    the sections. The status of the news file is stored together
+    with the index to detect when they are out of sync.
+
+    :param filepath: path to the index file
+    :param news_file: path to the news file
+    """
+    INDEX_FORMAT_VERSION = 1
+
+    def __init__(self, filepath, news_file):
+        self.filepath = filepath
+        self.news_file = news_file
+        self.stat = None
+        self.sections = {}
+
+    def load(self):
+        """Load the index from its file.
+
+        Missing, invalid or outdated index files are ignored.
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') != self.INDEX_FORMAT_VERSION:
+            return
+
+        self.stat = data['stat']
+        self.sections = data['sections']
+
+    def save(self):
+        """Store the index in its file."""
+
+        self.stat = self._news_file_stat()
+
+        data = {
+            'version': self.INDEX_FORMAT_VERSION,
+            'stat': self.stat,
+            'sections': self.sections
+        }
+        write_json_file(self.filepath, data)
+
+    def is_valid(self):
+        """Check whether the index is in sync with the news file."""
+
+        return self.stat is not None and self.stat == self._news_file_stat()
+
+    def build(self):
+        """Build the index scanning the news file."""
+
+        self.sections = {}
+
+        if not os.path.exists(self.news_file):
+            return
+
+        offset = 0
+        current = None
+        end = 0
+
+        with open(self.news_file, mode='rb') as fd:
+            for line in fd:
+                text = line.rstrip(b'\r\n')
+                m = HEADLINE_REGEX.match(text)
+
+                if m:
+                    self._add_section(current, end)
+                    current = [m.group('version').decode('utf-8'), offset]
+
+                if text:
+                    end = offset + len(text)
+
+                offset += len(line)
+
+        self._add_section(current, end)
+
+    def prepend(self, version, offset, length, shift):
+        """Add a section before the sections already indexed.
+
+        :param version: version of the new section
+        :param offset: byte offset of the new section
+        :param length: length in bytes of the new section
+        :param shift: bytes moved by the sections already indexed
+        """
+        for section in self.sections.values():
+            section[0] += shift
+
+        self.sections[version] = [offset, length]
+
+    def read_section(self, version):
+        """Read the section of a version from the news file.
+
+        :param version: version to read
+
+        :returns: the text of the section or `None` when the
+            version is not in the news file
+        """
+        section = self.sections.get(version, None)
+
+        if not section:
+            return None
+
+        offset, length = section
+
+        with open(self.news_file, mode='rb') as fd:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[offset:offset + length].decode('utf-8')
+
+    def _add_section(self, section, end):
+        if not section:
+            return
+
+        version, offset = section
+
+        # Keep the newest section when a version is repeated
+        self.sections.setdefault(version, [offset, end - offset])
+
+    def _news_file_stat(self):
+        try:
+            stat = os.stat(self.news_file)
+        except FileNotFoundError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+
+def open_news_index(project, create=True):
+    """Open the index of the news file of a project.
+
+    :param project: project of the news file
+    :param create: when set, a new index is built if it does
+        not exist or it is out of sync with the news file
+
+    :returns: a `NewsIndex` instance or `None` when the index
+        does not exist and `create` is not set
+    """
+    filepath = os.path.join(project.cache_path, NEWS_INDEX_FILENAME)
+
+    if not create and not os.path.exists(filepath):
+        return None
+
+    index = NewsIndex(filepath, project.news_file)
+    index.load()
+
+    if create and not index.is_valid():
+        index.build()
+        index.save()
+
+    return index
@@ -29,22 +29,51 @@ directory and will generate a file with the list of changes.
 The script needs the name of the package and the version to release.
 """
 
+import concurrent.futures
 import datetime
+import itertools
 import os
+import stat
 import sys
+import tempfile
 import textwrap
 
 import click
 
+from release_tools.cache import EntryCache
+from release_tools.duplicates import find_duplicate_entries
 from release_tools.entry import (CategoryChange,
+                                 SHARDED_LAYOUT_FILENAME,
+                                 entry_filepath,
+                                 is_sharded_dir,
+                                 list_entry_files,
                                  read_changelog_entries)
+from release_tools.history import read_release_history
+from release_tools.news import open_news_index
+from release_tools.profiling import profile_option
 from release_tools.project import Project
 from release_tools.repo import RepositoryError
+from release_tools.search import update_search_index
+from release_tools.store import PackedEntryStore
+from release_tools.summary import update_bump_summary
+from release_tools.tracing import span, trace_option
+from release_tools.trailers import read_trailer_entries
+from release_tools.utils import write_file
+from release_tools.watch import EntryWatcher, watch_entries
+
+
+NOTES_CACHE_FILENAME = 'notes-cache.json'
+
+# Size of the blocks used to copy the news file
+NEWS_BLOCK_SIZE = 64 * 1024
 
 
 def validate_argument(ctx, param, value):
     """Check argument valid values."""
 
+    if value is None:
+        return value
+
     value = value.strip("\n\r ")
 
     if not value:
@@ -52,6 +81,28 @@ def validate_argument(ctx, param, value):
     return value
 
 
+def show_news_section(ctx, param, value):
+    """Print the section of the news file for the given version."""
+
+    if not value or ctx.resilient_parsing:
+        return
+
+    try:
+        project = Project(os.getcwd())
+        index = open_news_index(project)
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    content = index.read_section(value)
+
+    if content is None:
+        msg = "version {} not found in news file".format(value)
+        raise click.ClickException(msg)
+
+    click.echo(content)
+    ctx.exit()
+
+
 @click.command()
 @click.option('--dry-run', is_flag=True,
               help="Do not write release notes file. Print to the standard output instead.")
@@ -63,9 +114,27 @@ def validate_argument(ctx, param, value):
               help="Update AUTHORS file with the release notes.")
 @click.option('--pre-release', is_flag=True,
               help="Create pre-release notes; ignores notes from previous release candidates.")
+@click.option('--rebuild-history', is_flag=True,
+              help="Regenerate the release notes of every release tag.")
+@click.option('--verify', is_flag=True,
+              help="Compare the rebuilt release notes with the existing files.")
+@click.option('--cache', 'use_cache', is_flag=True,
+              help="Reuse entries parsed and rendered on previous runs.")
+@click.option('--check-duplicates', is_flag=True,
+              help="Warn about near-duplicate entries included in the notes.")
+@click.option('--watch', is_flag=True,
+              help="Print the release notes each time the unreleased entries change.")
+@click.option('--trailers', is_flag=True,
+              help="Include the changelog entries defined by commit trailers.")
+@click.option('--show', metavar='VERSION', is_eager=True, expose_value=False,
+              callback=show_news_section,
+              help="Print the notes of a version stored in the NEWS file and exit.")
+@profile_option
+@trace_option
 @click.argument('name', callback=validate_argument)
-@click.argument('version', callback=validate_argument)
-def notes(name, version, dry_run, overwrite, news, authors, pre_release):
+@click.argument('version', callback=validate_argument, required=False)
+def notes(name, version, dry_run, overwrite, news, authors, pre_release,
+          rebuild_history, verify, use_cache, check_duplicates, watch, trailers):
     """Generate release notes.
 
     When you run this script, it will generate the release notes of the
@@ -93,56 +162,212 @@ def notes(name, version, dry_run, overwrite, news, authors, pre_release):
     but not generate a new file, and not move the changelogs processed,
     please activate '--dry-run' flag.
 
+    To regenerate the release notes of all the published versions, use
+    '--rebuild-history'. Changelog entries of each release are recovered
+    from the history of the repository, between consecutive release
+    tags, so 'VERSION' is not needed. Use '--news' to rebuild the NEWS
+    file too. Together with '--verify', files are not written; they are
+    compared with the existing ones instead.
+
+    When you generate the notes of many release candidates, use '--cache'
+    to keep the entries parsed and rendered between runs. Only new or
+    modified entries will be processed again.
+
+    Set '--check-duplicates' to get a warning when the notes include
+    entries with very similar titles and notes, which usually describe
+    the same change. Notes are generated anyway.
+
+    Use '--watch' to keep the script running and print the release
+    notes each time they change. Entries are read once and kept in
+    memory; only the entries added, modified or removed afterwards are
+    read again. Files are never written in this mode, so it cannot be
+    used with '--news', '--authors', '--overwrite' or
+    '--rebuild-history'. Stop it with Ctrl+C.
+
+    Set '--trailers' to include the changes described by the trailers
+    of the commits added since the latest release, as 'semverup'
+    does. Their authors are the authors of the commits. This flag
+    cannot be used with '--watch' or '--rebuild-history'.
+
+    To print the notes of a version already published in the NEWS file,
+    use '--show VERSION'. Sections of the NEWS file are indexed, so the
+    file does not need to be read from the beginning.
+
     NAME: title of the package for the release notes.
 
     VERSION: version of the new release.
     """
+    if verify and not rebuild_history:
+        msg = "'--verify' flag must be set together with '--rebuild-history'"
+        raise click.ClickException(msg)
+    if not version and not rebuild_history:
+        raise click.UsageError("Missing argument 'VERSION'.")
+    if watch and (news or authors or overwrite or rebuild_history):
+        msg = "'--watch' cannot be used with '--news', '--authors', '--overwrite' or '--rebuild-history'"
+        raise click.UsageError(msg)
+    if trailers and (watch or rebuild_history):
+        raise click.UsageError("'--trailers' cannot be used with '--watch' or '--rebuild-history'")
+
     try:
         project = Project(os.getcwd())
     except RepositoryError as e:
         raise click.ClickException(e)
 
-    entry_list = read_unreleased_changelog_entries(project, pre_release)
+    if rebuild_history:
+        rebuild_release_history(project, name, dry_run=dry_run,
+                                news=news, verify=verify)
+        return
+
+    if watch:
+        watch_release_notes(project, name, version, pre_release,
+                            check_duplicates=check_duplicates)
+        return
+
+    cache = open_notes_cache(project) if use_cache else None
+
+    entry_list = read_unreleased_changelog_entries(project, pre_release,
+                                                   cache=cache, trailers=trailers)
+
+    if check_duplicates:
+        warn_duplicate_entries(entry_list)
 
-    md = compose_release_notes(name, version, entry_list)
+    md = compose_release_notes(name, version, entry_list, cache=cache)
+
+    # Dry runs leave the cache as it was
+    if use_cache and not dry_run:
+        # Final releases read every entry, so unused ones are stale
+        cache.save(prune=not pre_release)
 
     if dry_run:
         click.echo(md)
     else:
         write_release_notes(project, version, md,
                             overwrite=overwrite, news=news)
+        update_search_index(project, version,
+                            determine_release_notes_filepath(project, version),
+                            entry_list)
         move_processed_unreleased_entries(project)
+        update_bump_summary(project, create=False)
 
     if authors:
         au_content = compose_author_content(project, entry_list)
         write_authors_file(project, au_content)
 
 
-def read_unreleased_changelog_entries(project, pre_release):
-    """Import changelog entries to include in the notes."""
+def open_notes_cache(project):
+    """Load the cache of parsed and rendered entries."""
+
+    filepath = os.path.join(project.cache_path, NOTES_CACHE_FILENAME)
+
+    cache = EntryCache(filepath)
+    cache.load()
+
+    return cache
 
+
+@span('read_unreleased_changelog_entries')
+def read_unreleased_changelog_entries(project, pre_release, cache=None, trailers=False):
+    """Import changelog entries to include in the notes.
+
+    When `trailers` is set, entries defined by commit trailers
+    are added after the ones read from files; the entries directory
+    is not required in that case.
+    """
     dirpath = project.unreleased_changes_path
+    entries = {}
 
-    if not os.path.exists(dirpath):
+    if os.path.exists(dirpath):
+        try:
+            entries = read_changelog_entries(dirpath, cache=cache, cache_path=project.cache_path)
+        except Exception as exc:
+            raise click.ClickException(exc)
+    elif not trailers:
         msg = "changelog entries directory '{}' does not exist.".format(dirpath)
         raise click.ClickException(msg)
 
-    try:
-        entries = read_changelog_entries(dirpath)
-    except Exception as exc:
-        raise click.ClickException(exc)
-
     if not pre_release:
         dirpath = project.unreleased_processed_entries_path
         if os.path.exists(dirpath):
-            new_entries = read_changelog_entries(dirpath)
+            new_entries = read_changelog_entries(dirpath, cache=cache, cache_path=project.cache_path)
             entries.update(new_entries)
 
+    if trailers:
+        try:
+            entries.update(read_trailer_entries(project, pre_release=pre_release,
+                                                on_invalid=warn_invalid_trailers))
+        except RepositoryError as exc:
+            raise click.ClickException(exc)
+
     entries = organize_entries_by_category(entries)
 
     return entries
 
 
+def watch_release_notes(project, title, version, pre_release, check_duplicates=False):
+    """Print the release notes each time they change.
+
+    Unreleased entries and, unless `pre_release` is set, processed
+    ones are kept in memory by an `EntryWatcher`.
+    """
+    dirpath = project.unreleased_changes_path
+
+    if not os.path.exists(dirpath):
+        msg = "changelog entries directory '{}' does not exist.".format(dirpath)
+        raise click.ClickException(msg)
+
+    dirpaths = [dirpath]
+    if not pre_release:
+        dirpaths.append(project.unreleased_processed_entries_path)
+
+    watcher = EntryWatcher(dirpaths)
+    last_content = None
+
+    def update():
+        nonlocal last_content
+
+        for filepath, error in sorted(watcher.errors.items()):
+            click.echo("Warning: entry {} ignored; {}".format(filepath, error), err=True)
+
+        entries = {}
+        for path in dirpaths:
+            entries.update(watcher.entries(path))
+
+        entry_list = organize_entries_by_category(entries)
+        content = compose_release_notes(title, version, entry_list)
+
+        if content == last_content:
+            return
+
+        last_content = content
+
+        if check_duplicates:
+            warn_duplicate_entries(entry_list)
+
+        click.echo(content)
+
+    watch_entries(watcher, update)
+
+
+def warn_duplicate_entries(entry_list):
+    """Print a warning for each cluster of near-duplicate entries."""
+
+    entries = {
+        str(i): entry
+        for i, entry in enumerate(itertools.chain.from_iterable(entry_list.values()))
+    }
+
+    for cluster in find_duplicate_entries(entries):
+        titles = ", ".join("'{}'".format(entries[i].title) for i in sorted(cluster, key=int))
+        click.echo("Warning: possible duplicate entries {}".format(titles), err=True)
+
+
+def warn_invalid_trailers(error):
+    """Print a warning for a commit skipped because of its trailers."""
+
+    click.echo("Warning: {}; commit skipped".format(error), err=True)
+
+
+@span('organize_entries_by_category')
 def organize_entries_by_category(entry_list):
     """Sort entries by category."""
 
@@ -154,11 +379,11 @@ def organize_entries_by_category(entry_list):
     return entries
 
 
-def compose_release_notes(title, version, entries):
+def compose_release_notes(title, version, entries, date=None, cache=None):
     """Generate the release notes content."""
 
-    composer = ReleaseNotesComposer()
-    content = composer.compose(title, version, entries)
+    composer = ReleaseNotesComposer(cache=cache)
+    content = composer.compose(title, version, entries, date=date)
     return content
 
 
@@ -171,6 +396,7 @@ def compose_author_content(project, entries):
     return content
 
 
+@span('write_release_notes', phase='write')
 def write_release_notes(project, version, content,
                         overwrite=False, news=False):
     """Write the release notes."""
@@ -181,6 +407,7 @@ def write_release_notes(project, version, content,
         update_news_file(project, version, content)
 
 
+@span('write_release_notes_file')
 def write_release_notes_file(project, version, content, overwrite):
     """Write the release notes text to a file."""
 
@@ -192,62 +419,153 @@ def write_release_notes_file(project, version, content, overwrite):
 
     filepath = determine_release_notes_filepath(project, version)
 
+    # Projects using commit trailers may not have a releases directory
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
     try:
         filename = os.path.basename(filepath)
-
-        with open(filepath, mode=mode) as f:
-            f.write(content)
+        written = write_file(filepath, content, mode=mode)
     except FileExistsError:
         msg = ("Release notes for version {} already exist. "
                "Use '--overwrite' to replace it.").format(version)
         raise click.ClickException(msg)
-    else:
+
+    if written:
         click.echo("Release notes file '{}' created".format(filename))
+    else:
+        click.echo("Release notes file '{}' unchanged".format(filename))
 
     return filepath
 
 
+@span('write_authors_file', phase='write')
 def write_authors_file(project, content):
     """Write the authors content to the authors file."""
 
     authors_file = project.authors_file
 
-    with open(authors_file, 'w') as fd:
-        fd.write(content)
-
-    click.echo("Authors file updated")
+    if write_file(authors_file, content):
+        click.echo("Authors file updated")
+    else:
+        click.echo("Authors file unchanged")
 
 
+@span('update_news_file')
 def update_news_file(project, version, content):
     """Update the news file with content of the release notes."""
 
+    if prepend_news_section(project, version, content):
+        click.echo("News file updated to {}".format(version))
+    else:
+        click.echo("News file unchanged")
+
+
+def prepend_news_section(project, version, content):
+    """Add the release notes of a version on top of the news file.
+
+    The previous sections are copied to the new file in blocks,
+    so the news file is never loaded in memory. The index of the
+    sections is updated without scanning the file; it is built
+    the first time the file is written, if it does not exist yet.
+
+    :returns: whether the news file was updated; it is not when it
+        already starts with the same notes
+    """
     news_file = project.news_file
 
-    # Read old content
+    # Sections of the index must be in sync before updating the file;
+    # a missing or outdated index is built from the current file
+    index = open_news_index(project)
+
+    content = content.strip('\n').encode('utf-8')
+    header = b"# Releases\n\n"
+    section = content + b"\n\n"
+
     try:
-        # Skip the title line and read the content
-        with open(news_file, 'r') as fd:
-            fd.readline()
-            original_content = fd.read()
+        src = open(news_file, 'rb')
     except FileNotFoundError:
-        original_content = ''
+        src = None
 
-    content = content.strip('\n')
-    original_content = original_content.strip('\n')
+    try:
+        original_offset = 0
+
+        if src:
+            # Skip the title line and the new lines after it
+            original_offset = len(src.readline())
+            start = src.read(NEWS_BLOCK_SIZE)
+            original_offset += len(start) - len(start.lstrip(b'\n'))
+            src.seek(original_offset)
+
+            # These notes were already added to the file, on their
+            # own or followed by the previous sections
+            head = src.read(len(content) + 3)
+            tail = head[len(content):]
+            if head.startswith(content) and tail in (b'', b'\n', b'\n\n', b'\n\n\n'):
+                return False
+            src.seek(original_offset)
+
+        dirpath = os.path.dirname(os.path.abspath(news_file))
+        fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix='.tmp-')
 
-    with open(news_file, 'w') as fd:
-        fd.write("# Releases\n\n")
-        fd.write("{}\n\n".format(content))
+        try:
+            with os.fdopen(fd, mode='wb') as dest:
+                dest.write(header + section)
+                if src and _copy_stripped(src, dest, prefix=b"\n"):
+                    dest.write(b"\n\n")
+            os.chmod(tmp_path, _file_mode(news_file))
+            os.replace(tmp_path, news_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    finally:
+        if src:
+            src.close()
+
+    offset = len(header)
+    shift = offset + len(section) + 1 - original_offset
+    index.prepend(version, offset, len(content), shift)
+    index.save()
+
+    return True
+
+
+def _copy_stripped(src, dest, prefix=b''):
+    """Copy a file in blocks, dropping its trailing new lines.
+
+    :returns: whether anything was copied; `prefix` is written
+        before the content only when there is some
+    """
+    pending = prefix
+    copied = False
 
-        if original_content:
-            fd.write("\n{}\n\n".format(original_content))
+    for block in iter(lambda: src.read(NEWS_BLOCK_SIZE), b''):
+        stripped = block.rstrip(b'\n')
+
+        if stripped:
+            dest.write(pending + stripped)
+            pending = block[len(stripped):]
+            copied = True
+        else:
+            pending += block
 
-    click.echo("News file updated to {}".format(version))
+    return copied
 
 
+def _file_mode(filepath):
+    try:
+        return stat.S_IMODE(os.stat(filepath).st_mode)
+    except FileNotFoundError:
+        return 0o644
+
+
+@span('move_processed_unreleased_entries')
 def move_processed_unreleased_entries(project):
-    """Move processed entries to a new directory for future release notes"""
+    """Move processed entries to a new directory for future release notes.
 
+    When both directories use the sharded layout, shards which do
+    not exist yet in the processed directory are moved at once.
+    A new processed directory takes the layout of the unreleased one.
+    """
     src_dirpath = project.unreleased_changes_path
     dest_dirpath = project.unreleased_processed_entries_path
 
@@ -255,12 +573,129 @@ def move_processed_unreleased_entries(project):
         os.makedirs(dest_dirpath, mode=0o755)
     except FileExistsError:
         pass
+    else:
+        if is_sharded_dir(src_dirpath):
+            marker = os.path.join(dest_dirpath, SHARDED_LAYOUT_FILENAME)
+            open(marker, mode='w').close()
+            project.repo.add_files([marker])
+
+    dest_sharded = is_sharded_dir(dest_dirpath)
+    moved_shards = set()
+
+    for filepath in list_entry_files(src_dirpath):
+        shard = os.path.dirname(filepath)
+
+        if shard in moved_shards:
+            continue
 
-    for filename in os.listdir(src_dirpath):
-        if filename.endswith('.yml'):
-            src_filepath = os.path.join(src_dirpath, filename)
-            dest_filepath = os.path.join(dest_dirpath, filename)
-            project.repo.mv(src_filepath, dest_filepath)
+        dest_filepath = entry_filepath(dest_dirpath, os.path.basename(filepath),
+                                       sharded=dest_sharded)
+        dest_shard_dirpath = os.path.dirname(dest_filepath)
+
+        same_shard = shard and dest_filepath == os.path.join(dest_dirpath, filepath)
+
+        if same_shard and not os.path.exists(dest_shard_dirpath):
+            project.repo.mv(os.path.join(src_dirpath, shard), dest_shard_dirpath)
+            moved_shards.add(shard)
+            continue
+
+        os.makedirs(dest_shard_dirpath, exist_ok=True)
+        project.repo.mv(os.path.join(src_dirpath, filepath), dest_filepath)
+
+    src_store = PackedEntryStore(src_dirpath, cache_path=project.cache_path)
+
+    if src_store.exists():
+        dest_store = PackedEntryStore(dest_dirpath, cache_path=project.cache_path)
+        dest_store.append_many(src_store.read_all())
+        src_store.write_all({})
+        project.repo.add_files([src_store.filepath, dest_store.filepath])
+
+
+def rebuild_release_history(project, title, dry_run=False,
+                            news=False, verify=False):
+    """Regenerate the release notes of every published release.
+
+    Changelog entries of each release are read from the history
+    of the repository. Release notes are composed in parallel and
+    written to their files; when `verify` is set, the files are not
+    written but compared byte by byte with the existing ones.
+    """
+    try:
+        releases = read_release_history(project)
+    except Exception as exc:
+        raise click.ClickException(exc)
+
+    if not releases:
+        raise click.ClickException("no release tags found")
+
+    versions = [release.version for release in releases]
+    entries = [organize_entries_by_category(release.entries) for release in releases]
+    dates = [release.date for release in releases]
+
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        contents = list(executor.map(compose_release_notes,
+                                     [title] * len(releases),
+                                     versions, entries, dates))
+
+    files = [
+        (determine_release_notes_filepath(project, version), content)
+        for version, content in zip(versions, contents)
+    ]
+
+    if news:
+        files.append((project.news_file, compose_news_content(contents)))
+
+    if dry_run:
+        for _, content in files:
+            click.echo(content)
+    elif verify:
+        verify_release_history_files(files)
+    else:
+        os.makedirs(project.releases_path, exist_ok=True)
+
+        for filepath, content in files:
+            if write_file(filepath, content):
+                click.echo("File '{}' rebuilt".format(os.path.basename(filepath)))
+            else:
+                click.echo("File '{}' unchanged".format(os.path.basename(filepath)))
+
+
+def compose_news_content(contents):
+    """Generate the news file content from a list of release notes.
+
+    Release notes must be sorted from the oldest to the newest,
+    the same order they were added to the file.
+    """
+    sections = [content.strip('\n') for content in reversed(contents)]
+
+    return "# Releases\n\n" + "\n\n\n".join(sections) + "\n\n"
+
+
+def verify_release_history_files(files):
+    """Compare rebuilt files with the ones stored in the repository."""
+
+    mismatches = 0
+
+    for filepath, content in files:
+        filename = os.path.basename(filepath)
+
+        try:
+            with open(filepath, mode='rb') as fd:
+                original = fd.read()
+        except FileNotFoundError:
+            click.echo("File '{}' not found".format(filename))
+            mismatches += 1
+            continue
+
+        if original == content.encode('utf-8'):
+            click.echo("File '{}' matches".format(filename))
+        else:
+            click.echo("File '{}' differs".format(filename))
+            mismatches += 1
+
+    if mismatches:
+        msg = "{} rebuilt files do not match the existing ones".format(mismatches)
+        raise click.ClickException(msg)
 
 
 def determine_release_notes_filepath(project, version):
@@ -283,10 +718,17 @@ class ReleaseNotesComposer:
     NOTES_INDENT = "   "
     EMPTY_NOTES_TEMPLATE = "No changes list available.\n"
 
-    def compose(self, title, version, entries):
-        """Generate release notes using markdown format."""
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    @span('ReleaseNotesComposer.compose', phase='compose')
+    def compose(self, title, version, entries, date=None):
+        """Generate release notes using markdown format.
 
-        headline = self._compose_headline(title, version)
+        By default, the date of the release notes is the current
+        date. Use `date` parameter to set a different one.
+        """
+        headline = self._compose_headline(title, version, date)
         sections = []
 
         for category in CategoryChange:
@@ -307,13 +749,13 @@ class ReleaseNotesComposer:
 
         return content
 
-    def _compose_headline(self, title, version):
+    def _compose_headline(self, title, version, date=None):
         """Generate the headline of the document."""
 
         metadata = {
             'title': title,
             'version': version,
-            'date': self._datetime_utcnow_str()
+            'date': date or self._datetime_utcnow_str()
         }
 
         return self.HEADLINE_TEMPLATE.format(**metadata)
@@ -339,7 +781,24 @@ class ReleaseNotesComposer:
         return self.CATEGORY_TITLE_TEMPLATE.format(title=title)
 
     def _compose_entry(self, entry):
-        """Generate the changelog entry text."""
+        """Generate the changelog entry text.
+
+        When the composer has a cache, entries are only
+        rendered once.
+        """
+        if self.cache is None:
+            return self._render_entry(entry)
+
+        templates = [
+            self.ENTRY_DESC_PR_TEMPLATE,
+            self.ENTRY_DESC_NO_PR_TEMPLATE,
+            self.NOTES_INDENT
+        ]
+        return self.cache.render_entry(entry, self._render_entry,
+                                       context=templates)
+
+    def _render_entry(self, entry):
+        """Render the changelog entry text."""
 
         if entry.issue:
             content = self.ENTRY_DESC_PR_TEMPLATE.format(desc=entry.title,
@@ -373,6 +832,7 @@ class ReleaseNotesComposer:
 class AuthorsFileComposer:
     """Authors file content composer."""
 
+    @span('AuthorsFileComposer.compose', phase='compose')
     def compose(self, project, entries):
         """Generate authors file content from release notes."""
 
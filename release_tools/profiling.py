@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import cProfile
+
+import click
+
+from release_tools.tracing import trace_command
+
+
+PHASES = ['discovery', 'entry load', 'compose', 'write', 'git']
+
+# Value of '--profile' to get the phases breakdown only
+NO_PROFILE_FILE = '-'
+
+
+class Profile:
+    """Time spent by a command on each of its phases.
+
+    Phases are taken from the spans recorded while the command
+    runs; see `phase_times`. The total is the time of the root span
+    and the time spent outside of any phase is reported as 'other'.
+
+    When `filepath` is given, the command is also run under
+    `cProfile` and its statistics are dumped to that file in
+    `pstats` format.
+
+    :param filepath: path to the statistics file
+    """
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.total = 0.0
+        self._profiler = cProfile.Profile() if filepath else None
+
+    def start(self):
+        """Start profiling the command."""
+
+        if self._profiler:
+            self._profiler.enable()
+
+    def stop(self, tracer):
+        """Stop profiling and take the phases from the tracer spans."""
+
+        if self._profiler:
+            self._profiler.disable()
+
+        self.total = sum(s.duration for s in tracer.spans if s.parent_id is None)
+        self.phases = phase_times(tracer)
+
+        if self._profiler:
+            self._profiler.dump_stats(self.filepath)
+
+    def format(self):
+        """Return the breakdown of the time by phase."""
+
+        other = max(self.total - sum(self.phases.values()), 0.0)
+        rows = list(self.phases.items()) + [('other', other)]
+
+        lines = ["Profile: {:.3f} s".format(self.total)]
+        for name, elapsed in rows:
+            share = elapsed / self.total * 100 if self.total else 0.0
+            lines.append("  {:<12}{:>10.3f} s{:>7.1f}%".format(name, elapsed, share))
+
+        return '\n'.join(lines)
+
+
+def phase_times(tracer):
+    """Add up the time of the spans of a tracer by phase.
+
+    Spans with a phase are nested when an instrumented function
+    calls another one; the time is always added to the outermost
+    phase, so the sum of the phases never exceeds the total time.
+
+    :param tracer: stopped tracer
+
+    :returns: dict with the time in seconds of each phase
+    """
+    spans = {s.span_id: s for s in tracer.spans}
+    times = dict.fromkeys(PHASES, 0.0)
+
+    for s in tracer.spans:
+        if s.phase is None:
+            continue
+
+        parent = spans.get(s.parent_id)
+        while parent is not None and parent.phase is None:
+            parent = spans.get(parent.parent_id)
+
+        if parent is None:
+            times[s.phase] = times.get(s.phase, 0.0) + s.duration
+
+    return times
+
+
+def start_profiling(ctx, param, value):
+    """Start profiling a command when '--profile' is set.
+
+    The profile is reported when the command finishes, even if
+    it fails.
+    """
+    if value is None:
+        return
+
+    filepath = None if value == NO_PROFILE_FILE else value
+
+    profile = Profile(filepath)
+
+    tracer = trace_command(ctx)
+    tracer.on_finish.append(lambda t: stop_profiling(profile, t))
+
+    profile.start()
+
+
+def stop_profiling(profile, tracer):
+    """Stop profiling and print the phases breakdown."""
+
+    try:
+        profile.stop(tracer)
+    except OSError as exc:
+        msg = "unable to write profile statistics; {}".format(exc)
+        raise click.ClickException(msg)
+
+    click.echo(profile.format(), err=True)
+    if profile.filepath:
+        click.echo("Profile statistics written to '{}'".format(profile.filepath), err=True)
+
+
+profile_option = click.option(
+    '--profile', metavar='FILE', is_eager=True, expose_value=False,
+    callback=start_profiling,
+    help="Print the time spent on each phase and write pstats data to FILE; use '-' to skip the file."
+)
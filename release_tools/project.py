@@ -23,6 +23,8 @@
 import os
 
 from release_tools.repo import GitHandler
+from release_tools.tags import open_tag_index
+from release_tools.tracing import span
 
 
 NEWS_FILENAME = 'NEWS'
@@ -34,13 +36,23 @@ RELEASES_DIRNAME = 'releases'
 UNRELEASED_CHANGES_DIRNAME = 'unreleased'
 UNRELEASED_ENTRIES_PROCESSED = 'processed'
 
+CACHE_DIRNAME = 'release-tools'
+RELEASE_TAGS_FILENAME = 'release-tags.json'
+
 
 class Project:
-    """Class to store a Python project structure."""
+    """Class to store a Python project structure.
+
+    :param dirpath: path to a directory of the project
+    :param repo: repository backend of the project; by default,
+        a `GitHandler` running Git on `dirpath`
+    """
 
-    def __init__(self, dirpath):
-        self.repo = GitHandler(dirpath=dirpath)
+    @span('Project', phase='discovery')
+    def __init__(self, dirpath, repo=None):
+        self.repo = repo if repo is not None else GitHandler(dirpath=dirpath)
         self._basepath = self.repo.root_path
+        self._release_tags = None
 
     @property
     def basepath(self):
@@ -91,3 +103,26 @@ class Project:
         """Path where processed unreleased changes entries are stored."""
 
         return os.path.join(self.unreleased_changes_path, UNRELEASED_ENTRIES_PROCESSED)
+
+    @property
+    def cache_path(self):
+        """Path where cached data is stored.
+
+        Cached data is stored under the Git directory of the
+        repository, so it is never tracked.
+        """
+        return os.path.join(self.repo.git_dir, CACHE_DIRNAME)
+
+    @property
+    def release_tags(self):
+        """Sorted index of the release tags of the project.
+
+        Tags are read from the repository the first time the
+        index is requested; the same index is returned afterwards.
+        The index is also kept under the cache directory, so it is
+        only built again when the tags of the repository change.
+        """
+        if self._release_tags is None:
+            filepath = os.path.join(self.cache_path, RELEASE_TAGS_FILENAME)
+            self._release_tags = open_tag_index(self.repo, filepath)
+        return self._release_tags
@@ -32,10 +32,16 @@ and creating a new tag for the release.
 import os
 
 import click
+import semver
 
+from release_tools.archive import (determine_archive_filepath,
+                                   write_release_archive)
 from release_tools.entry import read_changelog_entries
+from release_tools.profiling import profile_option
 from release_tools.project import Project
 from release_tools.repo import RepositoryError
+from release_tools.store import PackedEntryStore
+from release_tools.tracing import span, trace_option
 
 
 @click.command()
@@ -50,7 +56,12 @@ from release_tools.repo import RepositoryError
               help="Remote branch to push. Default 'master'.")
 @click.option('--add-all', is_flag=True,
               help="Add all changed files to the release commit.")
-def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_all):
+@click.option('--archive', is_flag=True,
+              help="Pack the changelog entries of the release into an archive.")
+@profile_option
+@trace_option
+def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_all,
+            archive):
     """Publish a new release.
 
     This script will generate a new release in the repository.
@@ -77,6 +88,12 @@ def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_a
     release notes, news and authors files. To add all changed files to
     the release commit use the `--add-all` flag.
 
+    Use '--archive' to pack the changelog entries of the release into
+    a compressed JSONL file, 'releases/<VERSION>.jsonl.gz', that is
+    added to the release commit. Rebuilding the release history reads
+    the entries of archived releases from these files instead of
+    walking the history of the repository.
+
     VERSION: version of the new release.
 
     AUTHOR: author of the new release (e.g. John Smith <jsmith@example.com>)
@@ -84,6 +101,9 @@ def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_a
     if only_push and not remote:
         msg = "'--only-push' flag must be set together with '--push'"
         raise click.ClickException(msg)
+    if only_push and archive:
+        msg = "'--archive' flag cannot be set together with '--only-push'"
+        raise click.ClickException(msg)
 
     try:
         project = Project(os.getcwd())
@@ -92,6 +112,8 @@ def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_a
 
     try:
         if not only_push:
+            if archive:
+                archive_release_entries(project, version)
             if not no_cleanup:
                 remove_unreleased_changelog_entries(project)
             add_release_files(project, version, add_all)
@@ -103,6 +125,63 @@ def publish(version, author, remote, only_push, no_cleanup, remote_branch, add_a
         raise click.ClickException(e)
 
 
+@span('archive_release_entries')
+def archive_release_entries(project, version):
+    """Pack the changelog entries included within the release.
+
+    The entries of a release are the processed ones. Release
+    candidates only include the entries processed after the
+    previous release; entries processed by earlier release
+    candidates, and kept with '--no-cleanup', are left out.
+    """
+    click.echo("Archiving changelog entries...", nl=False)
+
+    dirpath = project.unreleased_processed_entries_path
+    entries = {}
+
+    try:
+        if os.path.exists(dirpath):
+            entries = {
+                os.path.basename(name): entry
+                for name, entry in read_changelog_entries(dirpath, cache_path=project.cache_path).items()
+            }
+        if entries and _is_prerelease(version):
+            for name in _read_previous_processed_entries(project, version):
+                entries.pop(name, None)
+    except Exception as exc:
+        raise click.ClickException(exc)
+
+    filepath = determine_archive_filepath(project, version)
+
+    os.makedirs(project.releases_path, exist_ok=True)
+    write_release_archive(filepath, entries)
+    project.repo.add(filepath)
+
+    click.echo("done")
+
+
+def _is_prerelease(version):
+    try:
+        return bool(semver.VersionInfo.parse(version).prerelease)
+    except ValueError:
+        return False
+
+
+def _read_previous_processed_entries(project, version):
+    """Names of the processed entries on the release previous to a version."""
+
+    previous = project.release_tags.previous(version)
+
+    if previous is None:
+        return set()
+
+    tag, _ = project.release_tags.tag(previous)
+    paths = project.repo.ls_tree(tag, project.unreleased_processed_entries_path)
+
+    return {os.path.basename(path) for path in paths}
+
+
+@span('remove_unreleased_changelog_entries')
 def remove_unreleased_changelog_entries(project):
     """Delete changelog entries files included within the release."""
 
@@ -114,12 +193,24 @@ def remove_unreleased_changelog_entries(project):
         click.echo("done")
         return
 
-    entries = read_changelog_entries(dirpath).keys()
+    entries = read_changelog_entries(dirpath, cache_path=project.cache_path).keys()
+
+    store = PackedEntryStore(dirpath, cache_path=project.cache_path)
+    packed = set(store.names())
 
     for filename in entries:
         filepath = os.path.join(dirpath, filename)
+
+        # Packed entries are removed together with their store
+        if filename in packed and not os.path.exists(filepath):
+            continue
+
         project.repo.rm(filepath)
 
+    if store.exists():
+        project.repo.rm(store.filepath)
+        store.remove()
+
     click.echo("done")
 
 
@@ -132,6 +223,7 @@ def rollback_add_release_files(project):
         pass
 
 
+@span('add_release_files')
 def add_release_files(project, version, add_all):
     """Add to the repository all the files needed to publish a release."""
 
@@ -200,6 +292,7 @@ def rollback_commit(project):
         pass
 
 
+@span('commit')
 def commit(project, version, author):
     """Add a release commit and tag."""
 
@@ -216,6 +309,7 @@ def commit(project, version, author):
     click.echo("done")
 
 
+@span('push')
 def push(project, remote, release_tag, branch="master"):
     """Publish the release in the given remote repository."""
 
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Script to create a new release in a single step.
+
+It increases the version number, generates the release notes
+and publishes the release, sharing the project and the changelog
+entries between the steps.
+"""
+
+import os
+
+import click
+
+from release_tools.api import ReleaseToolsError, publish_release
+from release_tools.notes import warn_invalid_trailers
+from release_tools.profiling import profile_option
+from release_tools.project import Project
+from release_tools.repo import RepositoryError
+from release_tools.tracing import trace_option
+
+
+@click.command()
+@click.argument('name')
+@click.argument('author')
+@click.option('--bump-version',
+              type=click.Choice(['MAJOR', 'MINOR', 'PATCH'], case_sensitive=False),
+              help="Increase only the defined version.")
+@click.option('--pre-release', is_flag=True,
+              help="Create a new release candidate.")
+@click.option('--news', is_flag=True,
+              help="Update NEWS file with the release notes.")
+@click.option('--authors', is_flag=True,
+              help="Update AUTHORS file with the release notes.")
+@click.option('--add-all', is_flag=True,
+              help="Add all changed files to the release commit.")
+@click.option('--archive', is_flag=True,
+              help="Pack the changelog entries of the release into an archive.")
+@click.option('--no-cleanup', is_flag=True,
+              help="Do not remove changelog entries from the repository.")
+@click.option('--push', 'remote', help="Push release to the given remote.")
+@click.option('--remote-branch', 'remote_branch', default="master",
+              help="Remote branch to push. Default 'master'.")
+@click.option('--trailers', is_flag=True,
+              help="Include the changelog entries defined by commit trailers.")
+@click.option('--dry-run', is_flag=True,
+              help="Print the new version and the release notes; do not change anything.")
+@profile_option
+@trace_option
+def release(name, author, bump_version, pre_release, news, authors, add_all,
+            archive, no_cleanup, remote, remote_branch, trailers, dry_run):
+    """Increment the version, generate the notes and publish a release.
+
+    This script runs 'semverup', 'notes' and 'publish' in a single
+    process. The project is discovered and the changelog entries are
+    read once, and they are shared by every step, so releases with
+    many entries are created much faster than calling each script.
+
+    The version number is increased following the unreleased entries,
+    unless '--bump-version' is set. Release notes use 'NAME' as title.
+    Options '--pre-release', '--news', '--authors', '--add-all',
+    '--archive', '--no-cleanup', '--push' and '--remote-branch' work
+    as they do in the other scripts.
+
+    When the entries are removed, which is the default, they are not
+    moved to the 'unreleased/processed' directory first; all of them are
+    removed from the repository with a single call to Git.
+
+    Set '--trailers' to include the entries defined by the trailers of
+    the commits added since the latest release, as 'notes' does.
+
+    Use '--dry-run' to print the new version and the release notes
+    without writing any file.
+
+    NAME: title of the package for the release notes.
+
+    AUTHOR: author of the new release (e.g. John Smith <jsmith@example.com>)
+    """
+    try:
+        project = Project(os.getcwd())
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    run_release(project, name, author, bump_version=bump_version,
+                pre_release=pre_release, news=news, authors=authors,
+                add_all=add_all, archive=archive, cleanup=not no_cleanup,
+                remote=remote, remote_branch=remote_branch, trailers=trailers,
+                dry_run=dry_run)
+
+
+def run_release(project, name, author, bump_version=None, pre_release=False,
+                news=False, authors=False, add_all=False, archive=False,
+                cleanup=True, remote=None, remote_branch="master", trailers=False,
+                dry_run=False):
+    """Create a new release of a project and print its outcome.
+
+    The release is created with `release_tools.api.publish_release`;
+    see its documentation for the parameters.
+
+    :returns: a `PublishResult`
+    """
+    try:
+        result = publish_release(project, name, author, bump_version=bump_version,
+                                 pre_release=pre_release, news=news, authors=authors,
+                                 add_all=add_all, archive=archive, cleanup=cleanup,
+                                 remote=remote, remote_branch=remote_branch,
+                                 trailers=trailers, dry_run=dry_run)
+    except ReleaseToolsError as e:
+        raise click.ClickException(e)
+
+    for error in result.notes.warnings:
+        warn_invalid_trailers(error)
+
+    if dry_run:
+        click.echo(result.version)
+        click.echo(result.notes.content)
+        return result
+
+    click.echo("Version number updated to {}".format(result.version))
+    click.echo("Release notes file '{}' created".format(os.path.basename(result.notes_file)))
+
+    if news:
+        if result.news_updated:
+            click.echo("News file updated to {}".format(result.version))
+        else:
+            click.echo("News file unchanged")
+    if authors:
+        click.echo("Authors file {}".format("updated" if result.authors_updated else "unchanged"))
+
+    if cleanup:
+        click.echo("{} changelog entries removed".format(result.removed_entries))
+    else:
+        click.echo("{} changelog entries moved to processed".format(result.moved_entries))
+
+    click.echo("Release {} committed and tagged".format(result.version))
+
+    if result.pushed:
+        click.echo("Release {} pushed to {}".format(result.version, remote))
+
+    return result
+
+
+if __name__ == '__main__':
+    release()
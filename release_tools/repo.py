@@ -21,8 +21,21 @@
 #     Venu Vardhan Reddy Tekula <venu@bitergia.com>
 #
 
+import abc
+import collections
+import datetime
+import fnmatch
+import hashlib
 import os
+import re
 import subprocess
+import tempfile
+
+from release_tools.tracing import span
+
+
+# Maximum number of paths passed to Git on a single command line
+MAX_CMD_PATHS = 1000
 
 
 class RepositoryError(Exception):
@@ -30,7 +43,117 @@ class RepositoryError(Exception):
     pass
 
 
-class GitHandler:
+class RepositoryBackend(abc.ABC):
+    """Interface of the repository backends.
+
+    A backend runs the Git operations needed to create a release.
+    `GitHandler` runs them with Git, while `MemoryGitHandler`
+    simulates them in memory. `Project` accepts any of them.
+
+    Paths given to the methods are absolute or relative to the
+    directory of the backend. Errors are raised as `RepositoryError`.
+    """
+
+    @property
+    @abc.abstractmethod
+    def root_path(self):
+        """Path to the root directory of the working tree."""
+
+    @property
+    @abc.abstractmethod
+    def git_dir(self):
+        """Path to the Git directory."""
+
+    @abc.abstractmethod
+    def add(self, filename):
+        """Add a file or a directory to the index."""
+
+    @abc.abstractmethod
+    def add_files(self, filenames):
+        """Add a set of files to the index."""
+
+    @abc.abstractmethod
+    def add_all(self):
+        """Add every change of the working tree to the index."""
+
+    @abc.abstractmethod
+    def rm(self, filename):
+        """Remove a tracked file from the index and the working tree."""
+
+    @abc.abstractmethod
+    def rm_files(self, filenames):
+        """Remove a set of files; untracked files are ignored."""
+
+    @abc.abstractmethod
+    def tag(self, version):
+        """Create an annotated tag for the release on HEAD."""
+
+    @abc.abstractmethod
+    def commit(self, msg, author):
+        """Commit the index."""
+
+    @abc.abstractmethod
+    def push(self, remote, ref):
+        """Push a branch or a tag to a remote."""
+
+    @abc.abstractmethod
+    def reset_head(self):
+        """Undo the last commit, keeping its changes in the working tree."""
+
+    @abc.abstractmethod
+    def restore_staged(self):
+        """Unstage every change of the index."""
+
+    @abc.abstractmethod
+    def restore_unstaged(self, dirpath):
+        """Restore the files of a directory from the index."""
+
+    @abc.abstractmethod
+    def mv(self, srcpath, destpath):
+        """Move or rename a tracked file."""
+
+    @abc.abstractmethod
+    def mv_files(self, srcpaths, dest_dirpath):
+        """Move a set of tracked files to a directory."""
+
+    @abc.abstractmethod
+    def tags(self):
+        """List the tags as `(tag, date)` tuples."""
+
+    @abc.abstractmethod
+    def tag_objects(self):
+        """List the tags as `(tag, object)` tuples."""
+
+    @abc.abstractmethod
+    def log_name_status(self, rev_range, path):
+        """List the files changed on a range of commits."""
+
+    @abc.abstractmethod
+    def log_trailers(self, revisions, keys):
+        """Generate the `(commit, author, trailers)` of a set of commits."""
+
+    @abc.abstractmethod
+    def is_ancestor(self, commit, rev):
+        """Check whether a commit is an ancestor of a revision."""
+
+    @abc.abstractmethod
+    def cat_files(self, objects):
+        """Read the content of a list of `<rev>:<path>` objects."""
+
+    @abc.abstractmethod
+    def find_file(self, filename):
+        """Find a tracked file; returns `None` when it does not exist."""
+
+    @abc.abstractmethod
+    def ls_files(self, *patterns):
+        """List the tracked files that match a set of expressions."""
+
+    @abc.abstractmethod
+    def ls_tree(self, rev, path):
+        """List the files under a path on a revision."""
+
+
+class GitHandler(RepositoryBackend):
     """Class to help to run Git commands."""
 
     def __init__(self, dirpath=os.getcwd()):
@@ -50,10 +173,31 @@ class GitHandler:
         root_path = self._exec(cmd, cwd=self.dirpath, env=self.gitenv).strip('\n')
         return root_path
 
+    @property
+    def git_dir(self):
+        cmd = ['git', 'rev-parse', '--absolute-git-dir']
+        git_dir = self._exec(cmd, cwd=self.dirpath, env=self.gitenv).strip('\n')
+        return git_dir
+
     def add(self, filename):
         cmd = ['git', 'add', filename]
         self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
 
+    def add_files(self, filenames):
+        """Add a set of files with a single call to Git.
+
+        Paths are passed through the standard input, so there
+        is no limit on the number of files.
+
+        :param filenames: list of paths to add
+        """
+        if not filenames:
+            return
+
+        cmd = ['git', 'add', '--pathspec-from-file=-', '--pathspec-file-nul']
+        self._exec(cmd, cwd=self.dirpath, env=self.gitenv,
+                   stdin='\0'.join(filenames))
+
     def add_all(self):
         cmd = ['git', 'add', '-A']
         self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
@@ -62,6 +206,21 @@ class GitHandler:
         cmd = ['git', 'rm', '-f', filename]
         self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
 
+    def rm_files(self, filenames):
+        """Remove a set of files with a single call to Git.
+
+        Files that are not tracked are ignored.
+
+        :param filenames: list of paths to remove
+        """
+        if not filenames:
+            return
+
+        cmd = ['git', 'rm', '-f', '-q', '--ignore-unmatch',
+               '--pathspec-from-file=-', '--pathspec-file-nul']
+        self._exec(cmd, cwd=self.dirpath, env=self.gitenv,
+                   stdin='\0'.join(filenames))
+
     def tag(self, version):
         cmd = ['git', 'tag', '-a', version, '-m', 'Release ' + version]
         self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
@@ -90,6 +249,171 @@ class GitHandler:
         cmd = ['git', 'mv', srcpath, destpath]
         self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
 
+    def mv_files(self, srcpaths, dest_dirpath):
+        """Move a set of files to a directory.
+
+        Files are moved in batches of `MAX_CMD_PATHS`, so the
+        command line is kept under the limits of the system.
+
+        :param srcpaths: list of paths to move
+        :param dest_dirpath: path to the existing target directory
+        """
+        for i in range(0, len(srcpaths), MAX_CMD_PATHS):
+            cmd = ['git', 'mv'] + srcpaths[i:i + MAX_CMD_PATHS] + [dest_dirpath]
+            self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+
+    def tags(self):
+        """List the tags of the repository.
+
+        The method returns a list of tuples with the name of each
+        tag and the date when it was created, using the format
+        `YYYY-MM-DD` in UTC.
+
+        :returns: a list of `(tag, date)` tuples
+        """
+        cmd = ['git', 'for-each-ref',
+               '--format=%(refname:short)%00%(creatordate:format-local:%Y-%m-%d)',
+               'refs/tags']
+        env = dict(self.gitenv, TZ='UTC')
+        outs = self._exec(cmd, cwd=self.dirpath, env=env)
+
+        return [tuple(line.split('\0', 1)) for line in outs.splitlines() if line]
+
+    def tag_objects(self):
+        """List the tags of the repository with their objects.
+
+        Unlike `tags`, the objects of the tags are not read, so
+        listing them only takes to read the refs.
+
+        :returns: a list of `(tag, object)` tuples
+        """
+        cmd = ['git', 'for-each-ref', '--format=%(refname:short)%00%(objectname)',
+               'refs/tags']
+        outs = self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+
+        return [tuple(line.split('\0', 1)) for line in outs.splitlines() if line]
+
+    def log_name_status(self, rev_range, path):
+        """List the files changed on a range of commits.
+
+        The method returns the name and status of the files under
+        `path` that were modified by the commits in `rev_range`.
+        Commits are returned from the newest to the oldest, as
+        tuples of `(commit, status, paths)`, where `paths` is the
+        list of paths of the change (two for renames and copies).
+
+        :param rev_range: range of commits (e.g. `0.1.0..0.2.0`)
+        :param path: only include files under this path
+
+        :returns: a list of `(commit, status, paths)` tuples
+        """
+        cmd = ['git', 'log', '-M', '--name-status', '--format=commit %H',
+               rev_range, '--', path]
+        outs = self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+
+        changes = []
+        commit = None
+
+        for line in outs.splitlines():
+            if not line:
+                continue
+            elif line.startswith('commit '):
+                commit = line[7:]
+            else:
+                status, *paths = line.split('\t')
+                changes.append((commit, status, paths))
+
+        return changes
+
+    def log_trailers(self, revisions, keys):
+        """Read the trailers of the messages of a set of commits.
+
+        Commits are listed by a single call to Git which output is
+        read while it runs, so the method generates the commits as
+        Git finds them, from the newest to the oldest. Each one is
+        a tuple of `(commit, author, trailers)`, where `author` is
+        the name of the author of the commit and `trailers` a list
+        of `(key, value)` tuples. Only the trailers named in `keys`
+        are included; their values are unfolded.
+
+        :param revisions: list of revisions as given to `git log`
+            (e.g. `['HEAD', '^0.1.0']`)
+        :param keys: names of the trailers to read
+
+        :returns: a generator of `(commit, author, trailers)` tuples
+        """
+        trailers_fmt = ','.join(['key=' + key for key in keys] + ['unfold', 'separator=%x1f'])
+        cmd = ['git', 'log', '--format=%H%x00%an%x00%(trailers:' + trailers_fmt + ')']
+        cmd += list(revisions) + ['--']
+
+        for line in self._exec_lines(cmd, cwd=self.dirpath, env=self.gitenv):
+            if not line:
+                continue
+
+            commit, author, values = line.split('\0', 2)
+            trailers = [
+                tuple(item.strip() for item in value.split(':', 1))
+                for value in values.split('\x1f') if ':' in value
+            ]
+            yield commit, author, trailers
+
+    def is_ancestor(self, commit, rev):
+        """Check whether a commit is an ancestor of a revision.
+
+        A commit is an ancestor of itself. Commits that do not
+        exist are not ancestors of any revision.
+        """
+        cmd = ['git', 'merge-base', '--is-ancestor', commit, rev]
+
+        try:
+            self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+        except RepositoryError:
+            return False
+
+        return True
+
+    def cat_files(self, objects):
+        """Read the content of a list of objects.
+
+        Objects are read in a single call to Git, so use this method
+        instead of reading them one by one when there are many of them.
+        Each object is defined using the format `<rev>:<path>`. The
+        method returns a list with the content of each object in the
+        same order; when an object does not exist, its content will
+        be `None`.
+
+        :param objects: list of objects to read
+
+        :returns: a list with the content of the objects
+        """
+        if not objects:
+            return []
+
+        cmd = ['git', 'cat-file', '--batch']
+        stdin = ''.join([obj + '\n' for obj in objects])
+        outs = self._exec(cmd, cwd=self.dirpath, env=self.gitenv,
+                          stdin=stdin)
+        data = outs.encode('utf-8', errors='surrogateescape')
+
+        contents = []
+        pos = 0
+
+        for _ in objects:
+            eol = data.index(b'\n', pos)
+            header = data[pos:eol].split(b' ')
+            pos = eol + 1
+
+            if header[-1] == b'missing':
+                contents.append(None)
+                continue
+
+            size = int(header[2])
+            content = data[pos:pos + size]
+            contents.append(content.decode('utf-8', errors='surrogateescape'))
+            pos += size + 1
+
+        return contents
+
     def find_file(self, filename):
         """Find a file in the repository.
 
@@ -109,16 +433,491 @@ class GitHandler:
         else:
             return filepath.strip('\n')
 
+    def ls_files(self, *patterns):
+        """List the tracked files that match a set of expressions.
+
+        All the expressions are searched with a single call to Git.
+        Paths are relative to the directory of the handler.
+
+        :param patterns: names of the files to look for; wildcards allowed
+
+        :returns: a sorted list of paths
+        """
+        cmd = ['git', 'ls-files', '-z', '--'] + list(patterns)
+        outs = self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+
+        return sorted(path for path in outs.split('\0') if path)
+
+    def ls_tree(self, rev, path):
+        """List the files under a path on a revision.
+
+        Paths are relative to the directory of the handler.
+
+        :param rev: revision to read
+        :param path: directory or file to list
+
+        :returns: a sorted list of paths; empty when the path
+            does not exist on that revision
+        """
+        cmd = ['git', 'ls-tree', '-r', '-z', '--name-only', rev, '--', path]
+        outs = self._exec(cmd, cwd=self.dirpath, env=self.gitenv)
+
+        return sorted(p for p in outs.split('\0') if p)
+
     @staticmethod
-    def _exec(cmd, cwd=None, env=None):
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                cwd=cwd, env=env)
-        (outs, errs) = proc.communicate()
+    def _exec(cmd, cwd=None, env=None, stdin=None):
+        if stdin is not None:
+            stdin = stdin.encode('utf-8', errors='surrogateescape')
+
+        with span('git ' + cmd[1], phase='git'):
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    stdin=subprocess.PIPE if stdin is not None else None,
+                                    cwd=cwd, env=env)
+            (outs, errs) = proc.communicate(input=stdin)
 
-        if proc.returncode != 0:
-            error = errs.decode('utf-8', errors='surrogateescape')
-            msg = "{}; code error: {}".format(error.strip('\n'), proc.returncode)
-            raise RepositoryError(msg)
+            if proc.returncode != 0:
+                error = errs.decode('utf-8', errors='surrogateescape')
+                msg = "{}; code error: {}".format(error.strip('\n'), proc.returncode)
+                raise RepositoryError(msg)
 
         return outs.decode('utf-8', errors='surrogateescape')
+
+    @staticmethod
+    def _exec_lines(cmd, cwd=None, env=None):
+        """Run a command, generating the lines of its output as it runs."""
+
+        with span('git ' + cmd[1], phase='git'), tempfile.TemporaryFile() as errs:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errs,
+                                    cwd=cwd, env=env)
+            try:
+                for line in proc.stdout:
+                    yield line.decode('utf-8', errors='surrogateescape').rstrip('\n')
+                proc.wait()
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+
+            if proc.returncode != 0:
+                errs.seek(0)
+                error = errs.read().decode('utf-8', errors='surrogateescape')
+                msg = "{}; code error: {}".format(error.strip('\n'), proc.returncode)
+                raise RepositoryError(msg)
+
+
+MemoryCommit = collections.namedtuple('MemoryCommit',
+                                      ['id', 'parent', 'message', 'author', 'tree'])
+
+AUTHOR_REGEX = re.compile(r'^[^<>]+ <[^<>]*>$')
+TRAILER_REGEX = re.compile(r'^([A-Za-z0-9-]+)[ \t]*:[ \t]*(.*)$')
+
+
+class MemoryGitHandler(RepositoryBackend):
+    """Repository backend that keeps the Git database in memory.
+
+    The index, the commits, the tags and the remotes are simulated
+    in memory, so Git is never run. The working tree is the directory
+    on disk: adding a file reads its content, while removing or moving
+    tracked files changes the directory, as Git does.
+
+    The Git directory, where the tools keep their caches, is not the
+    one of the repository on disk. Unless `git_dir` is given, it is
+    a temporary directory removed together with the backend.
+
+    History is linear; there is only one branch and merges are not
+    supported. Ignore rules are not supported either, so `add_all`
+    adds every file of the directory.
+
+    :param dirpath: root directory of the working tree
+    :param remotes: names of the remotes of the repository
+    :param branch: name of the current branch
+    :param git_dir: path to the Git directory
+    """
+    def __init__(self, dirpath=os.getcwd(), remotes=None, branch='master',
+                 git_dir=None):
+        self.dirpath = os.path.abspath(dirpath)
+        self._tmp_git_dir = None
+        if git_dir is None:
+            self._tmp_git_dir = tempfile.TemporaryDirectory(prefix='release_tools_git_')
+            git_dir = self._tmp_git_dir.name
+        self._git_dir = os.path.abspath(git_dir)
+        self.branch = branch
+        self.index = {}
+        self.commits = {}
+        self.head = None
+        self.tag_refs = {}
+        self.remotes = {name: {} for name in remotes or []}
+
+    @property
+    def root_path(self):
+        return self.dirpath
+
+    @property
+    def git_dir(self):
+        return self._git_dir
+
+    def add(self, filename):
+        self.add_files([filename])
+
+    def add_files(self, filenames):
+        for filename in filenames:
+            path = self._relpath(filename)
+            fullpath = self._fullpath(path)
+            found = False
+
+            for tracked in self._tracked(path):
+                if not os.path.isfile(self._fullpath(tracked)):
+                    del self.index[tracked]
+                    found = True
+
+            if os.path.isdir(fullpath):
+                for root, dirs, files in os.walk(fullpath):
+                    dirs[:] = [d for d in dirs if d != '.git']
+                    for name in files:
+                        self._stage(self._relpath(os.path.join(root, name)))
+                found = True
+            elif os.path.isfile(fullpath):
+                self._stage(path)
+                found = True
+
+            if not found:
+                msg = "fatal: pathspec '{}' did not match any files".format(filename)
+                raise self._error(msg)
+
+    def add_all(self):
+        self.add_files([self.dirpath])
+
+    def rm(self, filename):
+        path = self._relpath(filename)
+
+        if path not in self.index:
+            if self._tracked(path):
+                msg = "fatal: not removing '{}' recursively without -r".format(filename)
+            else:
+                msg = "fatal: pathspec '{}' did not match any files".format(filename)
+            raise self._error(msg)
+
+        self._remove(path)
+
+    def rm_files(self, filenames):
+        for filename in filenames:
+            path = self._relpath(filename)
+            if path in self.index:
+                self._remove(path)
+
+    def tag(self, version, date=None):
+        """Create a tag on HEAD.
+
+        :param version: name of the tag
+        :param date: date of the tag, as 'YYYY-MM-DD'; by default,
+            the current date in UTC
+        """
+        if version in self.tag_refs:
+            raise self._error("fatal: tag '{}' already exists".format(version))
+
+        commit = self._resolve('HEAD')
+        date = date or datetime.datetime.utcnow().strftime('%Y-%m-%d')
+
+        self.tag_refs[version] = (commit, date)
+
+    def commit(self, msg, author):
+        if not AUTHOR_REGEX.match(author):
+            error = "fatal: --author '{}' is not 'Name <email>' and matches no existing author"
+            raise self._error(error.format(author))
+
+        if self.index == self._tree(self.head):
+            raise self._error("nothing to commit, working tree clean", code=1)
+
+        sha = hashlib.sha1()
+        for value in [self.head or '', msg, author, str(len(self.commits))]:
+            sha.update(value.encode('utf-8') + b'\0')
+        for path, content in sorted(self.index.items()):
+            sha.update(path.encode('utf-8') + b'\0' + content)
+
+        commit = MemoryCommit(sha.hexdigest(), self.head, msg, author, dict(self.index))
+        self.commits[commit.id] = commit
+        self.head = commit.id
+
+    def push(self, remote, ref):
+        if remote not in self.remotes:
+            msg = "fatal: '{}' does not appear to be a git repository"
+            raise self._error(msg.format(remote))
+
+        if ref in self.tag_refs:
+            self.remotes[remote]['refs/tags/' + ref] = self.tag_refs[ref][0]
+        elif ref == self.branch and self.head:
+            self.remotes[remote]['refs/heads/' + ref] = self.head
+        else:
+            raise self._error("error: src refspec {} does not match any".format(ref), code=1)
+
+    def reset_head(self):
+        self.head = self._resolve('HEAD^')
+        self.index = self._tree(self.head)
+
+    def restore_staged(self):
+        self.index = self._tree(self.head)
+
+    def restore_unstaged(self, dirpath):
+        tracked = self._tracked(self._relpath(dirpath))
+
+        if not tracked:
+            msg = "error: pathspec '{}' did not match any file(s) known to git"
+            raise self._error(msg.format(dirpath), code=1)
+
+        for path in tracked:
+            fullpath = self._fullpath(path)
+            os.makedirs(os.path.dirname(fullpath), exist_ok=True)
+            with open(fullpath, 'wb') as fd:
+                fd.write(self.index[path])
+
+    def mv(self, srcpath, destpath):
+        src = self._relpath(srcpath)
+        dest = self._relpath(destpath)
+
+        if os.path.isdir(self._fullpath(dest)):
+            dest = self._relpath(os.path.join(self._fullpath(dest), os.path.basename(src)))
+
+        tracked = self._tracked(src)
+        error = None
+
+        if not tracked:
+            error = "fatal: not under version control"
+        elif os.path.exists(self._fullpath(dest)):
+            error = "fatal: destination exists"
+        elif not os.path.isdir(os.path.dirname(self._fullpath(dest))):
+            error = "fatal: destination directory does not exist"
+
+        if error:
+            msg = "{}, source={}, destination={}".format(error, src, dest)
+            raise self._error(msg)
+
+        os.rename(self._fullpath(src), self._fullpath(dest))
+
+        for path in tracked:
+            self.index[dest + path[len(src):]] = self.index.pop(path)
+
+    def mv_files(self, srcpaths, dest_dirpath):
+        for srcpath in srcpaths:
+            self.mv(srcpath, dest_dirpath)
+
+    def tags(self):
+        return [(tag, date) for tag, (_, date) in sorted(self.tag_refs.items())]
+
+    def tag_objects(self):
+        return [(tag, commit) for tag, (commit, _) in sorted(self.tag_refs.items())]
+
+    def log_name_status(self, rev_range, path):
+        if '..' in rev_range:
+            start, end = rev_range.split('..', 1)
+            excluded = set(self._ancestors(self._resolve(start)))
+        else:
+            end = rev_range
+            excluded = set()
+
+        prefix = self._relpath(path)
+        changes = []
+
+        for commit in self._ancestors(self._resolve(end)):
+            if commit in excluded:
+                break
+
+            parent = self.commits[commit].parent
+            for status, paths in self._diff(self._tree(parent), self._tree(commit), prefix):
+                changes.append((commit, status, paths))
+
+        return changes
+
+    def log_trailers(self, revisions, keys):
+        heads = [self._resolve(rev) for rev in revisions if not rev.startswith('^')]
+        excluded = set()
+        for rev in revisions:
+            if rev.startswith('^'):
+                excluded.update(self._ancestors(self._resolve(rev[1:])))
+
+        names = {key.lower() for key in keys}
+
+        for head in heads:
+            for commit in self._ancestors(head):
+                if commit in excluded:
+                    break
+                excluded.add(commit)
+
+                author = self.commits[commit].author.split(' <', 1)[0]
+                trailers = [
+                    (key, value) for key, value in self._trailers(self.commits[commit].message)
+                    if key.lower() in names
+                ]
+                yield commit, author, trailers
+
+    def is_ancestor(self, commit, rev):
+        if commit not in self.commits:
+            return False
+
+        return commit in self._ancestors(self._resolve(rev))
+
+    def cat_files(self, objects):
+        contents = []
+
+        for obj in objects:
+            rev, _, path = obj.partition(':')
+
+            try:
+                content = self._tree(self._resolve(rev)).get(path, None)
+            except RepositoryError:
+                content = None
+
+            if content is not None:
+                content = content.decode('utf-8', errors='surrogateescape')
+            contents.append(content)
+
+        return contents
+
+    def find_file(self, filename):
+        paths = self.ls_files(filename)
+        return '\n'.join(paths) if paths else None
+
+    def ls_files(self, *patterns):
+        return sorted(
+            path for path in self.index
+            if any(self._match(path, pattern) for pattern in patterns)
+        )
+
+    def ls_tree(self, rev, path):
+        path = self._relpath(path)
+        tree = self._tree(self._resolve(rev))
+
+        return sorted(p for p in tree if not path or p == path or p.startswith(path + '/'))
+
+    def _relpath(self, filename):
+        """Path relative to the root of the working tree, as Git writes it."""
+
+        fullpath = os.path.normpath(os.path.join(self.dirpath, filename))
+        path = os.path.relpath(fullpath, self.dirpath)
+
+        if path == os.curdir:
+            return ''
+        if path == os.pardir or path.startswith(os.pardir + os.sep):
+            msg = "fatal: {}: '{}' is outside repository at '{}'"
+            raise self._error(msg.format(filename, filename, self.dirpath))
+
+        return path.replace(os.sep, '/')
+
+    def _fullpath(self, path):
+        return os.path.join(self.dirpath, *path.split('/'))
+
+    def _tracked(self, path):
+        """List the tracked files equal to or under a path."""
+
+        if not path:
+            return sorted(self.index)
+
+        return sorted(p for p in self.index if p == path or p.startswith(path + '/'))
+
+    def _stage(self, path):
+        with open(self._fullpath(path), 'rb') as fd:
+            self.index[path] = fd.read()
+
+    def _remove(self, path):
+        del self.index[path]
+
+        fullpath = self._fullpath(path)
+        if os.path.exists(fullpath):
+            os.remove(fullpath)
+
+    def _resolve(self, rev):
+        """Return the commit a revision points to."""
+
+        name = rev.rstrip('^')
+
+        if name in ('HEAD', self.branch):
+            commit = self.head
+        elif name in self.tag_refs:
+            commit = self.tag_refs[name][0]
+        else:
+            commit = name if name in self.commits else None
+
+        for _ in range(len(rev) - len(name)):
+            commit = self.commits[commit].parent if commit else None
+
+        if commit is None:
+            msg = "fatal: ambiguous argument '{}': unknown revision or path not in the working tree."
+            raise self._error(msg.format(rev))
+
+        return commit
+
+    def _ancestors(self, commit):
+        while commit:
+            yield commit
+            commit = self.commits[commit].parent
+
+    def _tree(self, commit):
+        return dict(self.commits[commit].tree) if commit else {}
+
+    def _diff(self, old, new, prefix):
+        """Compare two trees, detecting renames of unchanged files."""
+
+        def under(path):
+            return not prefix or path == prefix or path.startswith(prefix + '/')
+
+        old = {p: c for p, c in old.items() if under(p)}
+        new = {p: c for p, c in new.items() if under(p)}
+
+        added = sorted(p for p in new if p not in old)
+        changes = []
+
+        for path in sorted(old):
+            if path in new:
+                if old[path] != new[path]:
+                    changes.append(('M', [path]))
+                continue
+
+            renamed = next((p for p in added if new[p] == old[path]), None)
+
+            if renamed:
+                added.remove(renamed)
+                changes.append(('R100', [path, renamed]))
+            else:
+                changes.append(('D', [path]))
+
+        changes.extend(('A', [path]) for path in added)
+
+        return sorted(changes, key=lambda change: change[1][-1])
+
+    @staticmethod
+    def _trailers(message):
+        """Parse the trailers of the last paragraph of a message."""
+
+        paragraphs = message.strip().split('\n\n')
+        if len(paragraphs) < 2:
+            return []
+
+        trailers = []
+
+        for line in paragraphs[-1].splitlines():
+            match = TRAILER_REGEX.match(line)
+
+            if match:
+                trailers.append([match.group(1), match.group(2).strip()])
+            elif line[:1].isspace() and trailers:
+                trailers[-1][1] += ' ' + line.strip()
+            else:
+                return []
+
+        return [tuple(trailer) for trailer in trailers]
+
+    @staticmethod
+    def _match(path, pattern):
+        """Match a path against a pathspec, as `git ls-files` does."""
+
+        if any(c in pattern for c in '*?['):
+            return fnmatch.fnmatchcase(path, pattern)
+
+        pattern = pattern.rstrip('/')
+
+        return path == pattern or path.startswith(pattern + '/')
+
+    @staticmethod
+    def _error(msg, code=128):
+        return RepositoryError("{}; code error: {}".format(msg, code))
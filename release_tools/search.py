@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Script to search the release notes of a package.
+
+It will look for changes in the release notes stored under
+'releases' directory. Release notes are indexed, so searches
+are fast even when there are thousands of releases.
+"""
+
+import json
+import os
+import re
+
+import click
+import semver
+
+from release_tools.entry import CategoryChange
+from release_tools.project import Project
+from release_tools.repo import RepositoryError
+from release_tools.utils import write_json_file
+
+
+SEARCH_INDEX_FILENAME = 'search-index.json'
+
+RELEASE_NOTES_FILE_EXTENSION = '.md'
+
+TERM_REGEX = re.compile(r'\w+')
+ENTRY_REGEX = re.compile(r'^ \* (?P<title>.*?)(?: \(#(?P<issue>\d+)\))?(?P<notes>\\)?$')
+CATEGORY_REGEX = re.compile(r'^\*\*(?P<title>.+):\*\*$')
+
+
+@click.command()
+@click.argument('query', nargs=-1, required=True)
+@click.option('--reindex', is_flag=True,
+              help="Rebuild the index from scratch before searching.")
+def search(query, reindex):
+    """Search changes in the release notes.
+
+    This script will look for the changes of the release notes
+    that match all the terms of 'QUERY'. Titles and notes of the
+    changes are searched. Use '#<number>' to find the changes
+    related to an issue and 'author:<name>' to find the changes
+    made by an author.
+
+    Searches are run against an index of the release notes stored
+    under the Git directory. The index is updated with the release
+    notes files that were added or modified since the last search.
+    Authors of the changes are only available when release notes
+    are generated with 'notes' and the index already exists.
+    Use '--reindex' to rebuild the index from scratch.
+
+    QUERY: terms to search.
+    """
+    try:
+        project = Project(os.getcwd())
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    index = SearchIndex(search_index_filepath(project))
+
+    if not reindex:
+        index.load()
+
+    if index.refresh(project.releases_path):
+        index.save()
+
+    results = index.search(' '.join(query))
+
+    for version, doc in results:
+        if doc['issue']:
+            click.echo("{}: {} (#{})".format(version, doc['title'], doc['issue']))
+        else:
+            click.echo("{}: {}".format(version, doc['title']))
+
+    if not results:
+        click.echo("No changes found")
+
+
+def search_index_filepath(project):
+    """Path to the search index of the project."""
+
+    return os.path.join(project.cache_path, SEARCH_INDEX_FILENAME)
+
+
+def update_search_index(project, version, filepath, entries):
+    """Index the changes of new release notes.
+
+    The index is only updated when it already exists.
+
+    :param project: project of the release notes
+    :param version: version of the release
+    :param filepath: path to the release notes file
+    :param entries: entries of the release, organized by category
+    """
+    index_filepath = search_index_filepath(project)
+
+    if not os.path.exists(index_filepath):
+        return
+
+    index = SearchIndex(index_filepath)
+    index.load()
+
+    docs = [
+        index.create_document(entry.title, entry.category.category,
+                              issue=entry.issue, notes=entry.notes,
+                              authors=entry.author)
+        for category in sorted(entries)
+        for entry in entries[category]
+    ]
+
+    index.update(version, docs, stat=index.file_stat(filepath))
+    index.save()
+
+
+def parse_release_notes(content):
+    """Extract the changes of a release notes document.
+
+    :param content: text of the release notes, in markdown
+
+    :returns: a list of `(title, category, issue, notes)` tuples
+    """
+    categories = {
+        category.title + ('es' if category.title.endswith('x') else 's'): category.category
+        for category in CategoryChange
+    }
+
+    changes = []
+    category = None
+    current = None
+
+    for line in content.splitlines():
+        m = CATEGORY_REGEX.match(line)
+        if m:
+            category = categories.get(m.group('title'), None)
+            current = None
+            continue
+
+        m = ENTRY_REGEX.match(line)
+        if m and category:
+            current = [m.group('title'), category, m.group('issue'), []]
+            changes.append(current)
+            continue
+
+        if current and line.startswith('   '):
+            current[3].append(line.strip())
+        else:
+            current = None
+
+    return [
+        (title, category, issue, ' '.join(notes) or None)
+        for title, category, issue, notes in changes
+    ]
+
+
+class SearchIndex:
+    """Inverted index of the changes of a set of release notes.
+
+    The index stores the changes of each version, together with
+    the terms found in their titles, notes, issue numbers and
+    authors. Each term points to the changes where it appears,
+    so queries do not need to read the release notes.
+
+    :param filepath: path to the index file
+    """
+    INDEX_FORMAT_VERSION = 1
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.versions = {}
+        self.postings = {}
+
+    def load(self):
+        """Load the index from its file.
+
+        Missing, invalid or outdated index files are ignored.
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') != self.INDEX_FORMAT_VERSION:
+            return
+
+        self.versions = data['versions']
+        self.postings = data['postings']
+
+    def save(self):
+        """Store the index in its file."""
+
+        data = {
+            'version': self.INDEX_FORMAT_VERSION,
+            'versions': self.versions,
+            'postings': self.postings
+        }
+        write_json_file(self.filepath, data)
+
+    def refresh(self, dirpath):
+        """Index the release notes stored in a directory.
+
+        Only files that are new or were modified since they were
+        indexed are read. Versions which release notes file does
+        not exist anymore are removed from the index.
+
+        :param dirpath: path to the release notes directory
+
+        :returns: whether the index was modified
+        """
+        found = set()
+        modified = False
+
+        try:
+            filenames = os.listdir(dirpath)
+        except FileNotFoundError:
+            filenames = []
+
+        for filename in filenames:
+            if not filename.endswith(RELEASE_NOTES_FILE_EXTENSION):
+                continue
+
+            version = filename[:-len(RELEASE_NOTES_FILE_EXTENSION)]
+            filepath = os.path.join(dirpath, filename)
+            stat = self.file_stat(filepath)
+            found.add(version)
+
+            if version in self.versions and self.versions[version]['stat'] == stat:
+                continue
+
+            with open(filepath, mode='r') as fd:
+                changes = parse_release_notes(fd.read())
+
+            docs = [
+                self.create_document(title, category, issue=issue, notes=notes)
+                for title, category, issue, notes in changes
+            ]
+            self.update(version, docs, stat=stat)
+            modified = True
+
+        for version in set(self.versions) - found:
+            self.remove(version)
+            modified = True
+
+        return modified
+
+    def update(self, version, docs, stat=None):
+        """Replace the changes indexed for a version.
+
+        :param version: version of the release
+        :param docs: list of documents with the changes
+        :param stat: status of the release notes file when
+            the documents were created
+        """
+        self.remove(version)
+
+        self.versions[version] = {
+            'stat': stat,
+            'docs': docs
+        }
+
+        for position, doc in enumerate(docs):
+            for term in self._document_terms(doc):
+                self.postings.setdefault(term, []).append([version, position])
+
+    def remove(self, version):
+        """Remove the changes of a version from the index."""
+
+        data = self.versions.pop(version, None)
+
+        if not data:
+            return
+
+        for doc in data['docs']:
+            for term in self._document_terms(doc):
+                postings = [p for p in self.postings.get(term, []) if p[0] != version]
+                if postings:
+                    self.postings[term] = postings
+                else:
+                    self.postings.pop(term, None)
+
+    def search(self, query):
+        """Find the changes that match all the terms of a query.
+
+        :param query: terms to search
+
+        :returns: list of `(version, document)` tuples sorted
+            from the newest version to the oldest one
+        """
+        terms = self._query_terms(query)
+
+        if not terms:
+            return []
+
+        matches = None
+
+        for term in terms:
+            found = {tuple(p) for p in self.postings.get(term, [])}
+            matches = found if matches is None else matches & found
+
+            if not matches:
+                return []
+
+        results = sorted(matches,
+                         key=lambda m: (self._version_key(m[0]), -m[1]),
+                         reverse=True)
+
+        return [
+            (version, self.versions[version]['docs'][position])
+            for version, position in results
+        ]
+
+    @staticmethod
+    def create_document(title, category, issue=None, notes=None, authors=None):
+        """Create a document to index a change."""
+
+        if authors and not isinstance(authors, list):
+            authors = [authors]
+
+        return {
+            'title': title,
+            'category': category,
+            'issue': str(issue) if issue else None,
+            'notes': notes,
+            'authors': authors or []
+        }
+
+    @staticmethod
+    def file_stat(filepath):
+        """Values used to detect changes in a file."""
+
+        stat = os.stat(filepath)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def _document_terms(doc):
+        """Extract the terms of a document."""
+
+        text = doc['title'] + ' ' + (doc['notes'] or '')
+        terms = {term.lower() for term in TERM_REGEX.findall(text)}
+
+        if doc['issue']:
+            terms.add('#' + doc['issue'])
+
+        for author in doc['authors']:
+            terms.update(['author:' + term.lower()
+                          for term in TERM_REGEX.findall(author)])
+
+        return terms
+
+    @staticmethod
+    def _query_terms(query):
+        """Extract the terms of a query."""
+
+        terms = set()
+
+        for token in query.split():
+            if token.startswith('#'):
+                terms.add(token)
+            elif token.lower().startswith('author:'):
+                terms.update(['author:' + term.lower()
+                              for term in TERM_REGEX.findall(token[7:])])
+            else:
+                terms.update([term.lower() for term in TERM_REGEX.findall(token)])
+
+        return terms
+
+    @staticmethod
+    def _version_key(version):
+        """Key to sort versions; invalid ones go first."""
+
+        try:
+            return (1, semver.VersionInfo.parse(version), version)
+        except ValueError:
+            return (0, None, version)
+
+
+if __name__ == '__main__':
+    search()
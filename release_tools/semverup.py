@@ -27,6 +27,7 @@ It will bump up the version following the rules defined
 by the semantic versioning specification.
 """
 
+import concurrent.futures
 import datetime
 import os
 import re
@@ -36,9 +37,37 @@ import semver
 import tomlkit.toml_file
 
 from release_tools.entry import read_changelog_entries
-from release_tools.project import Project
+from release_tools.notes import warn_invalid_trailers
+from release_tools.profiling import profile_option
+from release_tools.project import (PYPROJECT_FILENAME,
+                                   RELEASES_DIRNAME,
+                                   UNRELEASED_CHANGES_DIRNAME,
+                                   VERSION_FILENAME,
+                                   Project)
 from release_tools.repo import RepositoryError
+from release_tools.summary import (max_bump_version,
+                                   open_bump_summary,
+                                   strongest_bump_version)
+from release_tools.tracing import span, trace_option
+from release_tools.trailers import read_trailer_entries
+from release_tools.utils import write_file
+from release_tools.watch import EntryWatcher, watch_entries
+
+
+PYPROJECT_VERSION_KEY = 'tool.poetry.version'
+PYPROJECT_TABLE_REGEX = re.compile(
+    r'^[ \t]*(?P<open>\[\[?)(?P<name>[\w\-. \t]+)\]\]?[ \t]*(?:#.*)?\r?\n?$'
+)
+PYPROJECT_KEY_REGEX = re.compile(
+    r'^[ \t]*(?P<key>[\w\-"\'. \t]+?)[ \t]*='
+)
+PYPROJECT_VERSION_REGEX = re.compile(
+    r'^[ \t]*version[ \t]*=[ \t]*'
+    r'(?:"(?P<basic>[^"\\\r\n]*)"|\'(?P<literal>[^\'\r\n]*)\')'
+    r'[ \t]*(?:#.*)?\r?\n?$'
+)
 
+NO_CHANGES_ERROR = "no changes found; version number not updated"
 
 VERSION_FILE_TEMPLATE = (
     "# File auto-generated by semverup on {timestamp}\n"
@@ -56,7 +85,19 @@ VERSION_FILE_TEMPLATE = (
               help="Create a new release candidate version.")
 @click.option('--current-version',
               help="Use the given version instead of the version file.")
-def semverup(dry_run, bump_version, pre_release, current_version):
+@click.option('--from-tags', is_flag=True,
+              help="Use the latest release tag instead of the version file.")
+@click.option('--all', 'all_packages', is_flag=True,
+              help="Increment the version number of every package of the repository.")
+@click.option('--watch', is_flag=True,
+              help="Print the next version number each time the unreleased entries change.")
+@click.option('--trailers', is_flag=True,
+              help="Include the changelog entries defined by commit trailers.")
+@profile_option
+@trace_option
+@click.argument('packages', nargs=-1, type=click.Path())
+def semverup(dry_run, bump_version, pre_release, current_version, from_tags,
+             all_packages, watch, trailers, packages):
     """Increment version number following semver specification.
 
     This script will bump up the version number of a package in a
@@ -73,6 +114,10 @@ def semverup(dry_run, bump_version, pre_release, current_version):
     use '--current-version=<VERSION NUMBER>' with the one you would like
     to use.
 
+    To take the version number from the tags of the repository, use
+    '--from-tags'. The latest tag which name is a valid semver string,
+    release candidates included, will be used as the current version.
+
     Additionally, 'pyproject' file will also be updated. Take into
     account this file must be tracked by the repository.
 
@@ -93,6 +138,27 @@ def semverup(dry_run, bump_version, pre_release, current_version):
     increase the pre-release part of the version. If '--pre-release' is not used,
     it will remove any pre-release metadata from the version.
 
+    In repositories with many packages, use '--all' to increment the
+    version numbers of all of them at once. Each package is a directory
+    with a 'pyproject.toml' file, a '_version.py' file and its own
+    'releases/unreleased' directory. Packages are found in the
+    repository, unless their root directories are given as 'PACKAGES'.
+    Versions are computed in parallel and a table with the current
+    and the new version of each package is printed. Files are only
+    written when every package was processed without errors.
+
+    Use '--watch' to keep the script running and print the next version
+    number each time it changes. Entries are read once and kept in
+    memory; only the entries added, modified or removed afterwards are
+    read again. Files are never written in this mode. Stop it with
+    Ctrl+C.
+
+    Teams which describe their changes in the commit messages can
+    set '--trailers'. Commits added since the latest release which
+    message ends with 'Changelog-Title' and 'Changelog-Category'
+    trailers are taken as unreleased entries too. The last commit
+    read is stored, so the next runs only read the new commits.
+
     More info about semver specification can be found in the next
     link: https://semver.org/.
     """
@@ -101,7 +167,26 @@ def semverup(dry_run, bump_version, pre_release, current_version):
     except RepositoryError as e:
         raise click.ClickException(e)
 
-    if current_version:
+    if current_version and from_tags:
+        msg = "'--current-version' and '--from-tags' options are mutually exclusive"
+        raise click.UsageError(msg)
+    if packages and not all_packages:
+        raise click.UsageError("'PACKAGES' arguments must be set together with '--all'")
+    if all_packages and (current_version or from_tags):
+        msg = "'--all' cannot be used with '--current-version' or '--from-tags'"
+        raise click.UsageError(msg)
+    if watch and all_packages:
+        raise click.UsageError("'--watch' cannot be used with '--all'")
+    if trailers and (watch or all_packages):
+        raise click.UsageError("'--trailers' cannot be used with '--watch' or '--all'")
+
+    if all_packages:
+        bump_all_packages(project, packages, bump_version, pre_release, dry_run)
+        return
+
+    if from_tags:
+        current_version = read_version_number_from_tags(project)
+    elif current_version:
         try:
             current_version = semver.parse_version_info(current_version)
         except ValueError:
@@ -110,25 +195,75 @@ def semverup(dry_run, bump_version, pre_release, current_version):
             raise click.ClickException(msg)
     else:
         # Get the current version number
-        version_file = find_version_file(project)
-        current_version = read_version_number(version_file)
+        current_version = read_version_number(find_version_file(project))
+
+    if watch:
+        watch_next_version(project, current_version, bump_version, pre_release)
+        return
 
     # Determine the new version and produce the output
     if bump_version:
         new_version = get_next_version(current_version, bump_version, pre_release)
     else:
-        new_version = determine_new_version_number(project, current_version, pre_release)
+        new_version = determine_new_version_number(project, current_version, pre_release,
+                                                   trailers=trailers)
 
     if not dry_run:
-        # Get the pyproject file
+        # Get the version and pyproject files
+        version_file = find_version_file(project)
         pyproject_file = find_pyproject_file(project)
-        write_version_number(version_file, new_version)
-        write_version_number_pyproject(pyproject_file,
-                                       new_version)
+
+        if not write_version_number(version_file, new_version):
+            click.echo("Version file unchanged", err=True)
+        if not write_version_number_pyproject(pyproject_file,
+                                              new_version):
+            click.echo("Pyproject file unchanged", err=True)
 
     click.echo(new_version)
 
 
+def watch_next_version(project, current_version, bump_version, pre_release):
+    """Print the next version number each time it changes.
+
+    The version is computed from the entries kept in memory by
+    an `EntryWatcher`, so the bump summary is not used.
+    """
+    dirpath = project.unreleased_changes_path
+
+    if not os.path.exists(dirpath):
+        msg = "changelog entries directory {} does not exist.".format(dirpath)
+        raise click.ClickException(msg)
+
+    watcher = EntryWatcher([dirpath])
+    last_output = None
+
+    def update():
+        nonlocal last_output
+
+        for filepath, error in sorted(watcher.errors.items()):
+            click.echo("Warning: entry {} ignored; {}".format(filepath, error), err=True)
+
+        try:
+            if bump_version:
+                new_version = get_next_version(current_version, bump_version, pre_release)
+            else:
+                entries = watcher.entries(dirpath)
+                bump = strongest_bump_version([entry.category.category for entry in entries.values()])
+                new_version = determine_next_version_from_bump(current_version, bump, pre_release)
+            output = str(new_version)
+        except click.ClickException as exc:
+            output = "Error: " + exc.format_message()
+
+        if output == last_output:
+            return
+
+        last_output = output
+        click.echo(output, err=output.startswith("Error: "))
+
+    watch_entries(watcher, update)
+
+
+@span('find_version_file', phase='discovery')
 def find_version_file(project):
     """Find the version file in the repository."""
 
@@ -143,6 +278,7 @@ def find_version_file(project):
     return filepath
 
 
+@span('find_pyproject_file', phase='discovery')
 def find_pyproject_file(project):
     """Find the pyproject file in the repository."""
 
@@ -181,6 +317,20 @@ def read_version_number(filepath):
     return version
 
 
+def read_version_number_from_tags(project):
+    """Read the version number of the latest release tag."""
+
+    try:
+        version = project.release_tags.latest()
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    if not version:
+        raise click.ClickException("no release tags found")
+
+    return version
+
+
 def get_next_version(current_version, bump_version, do_prerelease=False):
     """Increment version number based on bump_version choice and do_prerelease"""
 
@@ -190,8 +340,7 @@ def get_next_version(current_version, bump_version, do_prerelease=False):
         next_version = _get_next_version_from_final_release(current_version, bump_version, do_prerelease)
 
     if not next_version:
-        msg = "no changes found; version number not updated"
-        raise click.ClickException(msg)
+        raise click.ClickException(NO_CHANGES_ERROR)
 
     return next_version
 
@@ -247,84 +396,432 @@ def _get_next_version_from_final_release(current_version, bump_version, do_prere
     return next_version
 
 
-def determine_new_version_number(project, current_version, prerelease):
-    """Guess the next version number."""
+def determine_new_version_number(project, current_version, prerelease, trailers=False):
+    """Guess the next version number.
 
-    entries = read_unreleased_changelog_entries(project)
+    When `trailers` is set, entries defined by commit trailers
+    are considered together with the unreleased entries.
+    """
+    if not trailers:
+        return determine_next_version(project.unreleased_changes_path,
+                                      current_version, prerelease,
+                                      cache_path=project.cache_path)
 
-    bump_patch = False
-    bump_minor = False
-    bump_major = False
+    dirpath = project.unreleased_changes_path
 
-    for entry in entries.values():
-        if entry.category.bump_version == 'major':
-            if current_version.major == 0:
-                bump_minor = True
-            else:
-                bump_major = True
-            break
-        elif entry.category.bump_version == 'minor':
-            bump_minor = True
-        elif entry.category.bump_version == 'patch':
-            bump_patch = True
-
-    if bump_major:
-        bump_version = 'MAJOR'
-    elif bump_minor:
-        bump_version = 'MINOR'
-    elif bump_patch:
-        bump_version = 'PATCH'
-    else:
-        bump_version = None
+    # Projects using trailers may not have an entries directory
+    bump = None
+    if os.path.exists(dirpath):
+        bump = read_unreleased_bump_version(dirpath, cache_path=project.cache_path)
+
+    try:
+        entries = read_trailer_entries(project, pre_release=prerelease,
+                                       on_invalid=warn_invalid_trailers)
+    except RepositoryError as exc:
+        raise click.ClickException(exc)
+
+    bump = max_bump_version(bump, strongest_bump_version(
+        entry.category.category for entry in entries.values()))
+
+    return determine_next_version_from_bump(current_version, bump, prerelease)
+
+
+def determine_next_version(dirpath, current_version, prerelease, cache_path=None):
+    """Guess the next version number using the entries of a directory.
+
+    The bump summary stored under `cache_path` is used when it is set.
+    """
+    bump = read_unreleased_bump_version(dirpath, cache_path=cache_path)
+
+    return determine_next_version_from_bump(current_version, bump, prerelease)
+
+
+def determine_next_version_from_bump(current_version, bump, prerelease):
+    """Guess the next version number from the strongest entries bump.
+
+    Breaking changes on versions lower than 1.0.0 only increase the
+    minor version.
+    """
+    if bump == 'major' and current_version.major == 0:
+        bump = 'minor'
+
+    bump_version = bump.upper() if bump else None
 
     next_version = get_next_version(current_version, bump_version, prerelease)
 
     if not next_version:
-        msg = "no changes found; version number not updated"
-        raise click.ClickException(msg)
+        raise click.ClickException(NO_CHANGES_ERROR)
 
     return next_version
 
 
-def read_unreleased_changelog_entries(project):
-    """Returns entries stored in the unreleased changelog entries dir."""
+@span('read_unreleased_bump_version', phase='entry load')
+def read_unreleased_bump_version(dirpath, cache_path=None):
+    """Return the strongest version bump of the unreleased entries.
 
-    dirpath = project.unreleased_changes_path
+    When `cache_path` is set, the bump summary maintained by
+    'changelog' under that directory is used if it is in sync
+    with the entries directory; otherwise, every entry is parsed.
+    """
+    if cache_path:
+        summary = open_bump_summary(cache_path, dirpath)
+        if summary.exists() and summary.is_valid():
+            return summary.bump_version
+
+    entries = read_unreleased_changelog_entries(dirpath, cache_path=cache_path)
+
+    return strongest_bump_version([entry.category.category for entry in entries.values()])
+
+
+def read_unreleased_changelog_entries(dirpath, cache_path=None):
+    """Returns entries stored in the unreleased changelog entries dir."""
 
     if not os.path.exists(dirpath):
         msg = "changelog entries directory {} does not exist.".format(dirpath)
         raise click.ClickException(msg)
 
     try:
-        entries = read_changelog_entries(dirpath)
+        entries = read_changelog_entries(dirpath, cache_path=cache_path)
     except Exception as exc:
         raise click.ClickException(exc)
 
     return entries
 
 
+@span('write_version_number', phase='write')
 def write_version_number(filepath, version):
-    """Write version number to the given file."""
+    """Write version number to the given file.
+
+    The file is not written when it already stores the same
+    version number; only its timestamp would change.
 
+    :returns: whether the file was written
+    """
     values = {
         'timestamp': datetime.datetime.utcnow(),
         'version': version
     }
     stream = VERSION_FILE_TEMPLATE.format(**values)
 
+    if _is_version_file_updated(filepath, stream):
+        return False
+
     with open(filepath, mode='w') as fd:
         fd.write(stream)
 
+    return True
+
+
+def _is_version_file_updated(filepath, stream):
+    """Check if a version file only differs in its timestamp."""
+
+    headline, content = stream.split('\n', 1)
+    prefix = headline[:headline.rindex(' on ') + 4]
+
+    try:
+        with open(filepath, mode='r') as fd:
+            original_headline = fd.readline()
+            original_content = fd.read()
+    except FileNotFoundError:
+        return False
+
+    return original_headline.startswith(prefix) and original_content == content
 
+
+@span('write_version_number_pyproject', phase='write')
 def write_version_number_pyproject(filepath, version):
-    """Write version number into the pyproject file."""
+    """Write version number into the pyproject file.
+
+    Only the value of the version key is replaced, so the rest
+    of the file is kept as it is. When the layout of the file is
+    not supported by `patch_pyproject_version`, the file is
+    parsed and serialized again with tomlkit.
+
+    :returns: whether the file was written
+    """
+    with open(filepath, mode='r', encoding='utf-8', newline='') as fd:
+        content = fd.read()
+
+    patched = patch_pyproject_version(content, version)
+
+    if patched is None:
+        metadata = tomlkit.parse(content)
+        poetry_metadata = metadata["tool"]["poetry"]
+        poetry_metadata["version"] = str(version)
+        patched = metadata.as_string()
+
+    return write_file(filepath, patched)
+
+
+def patch_pyproject_version(content, version):
+    """Replace the version of a pyproject document in place.
+
+    The document is scanned line by line looking for the `version`
+    key of the `[tool.poetry]` table. Only the characters of its
+    value are replaced; comments, spacing and quoting style are
+    kept.
+
+    Layouts that cannot be handled safely by the scanner, like
+    multi-line strings, dotted or quoted keys, or tables defined
+    more than once, are not supported.
+
+    :param content: text of the pyproject file
+    :param version: new version number
+
+    :returns: the patched document or `None` when the layout
+        of the document is not supported
+    """
+    span = _find_pyproject_version_span(content)
+
+    if not span:
+        return None
+
+    start, end = span
+
+    return content[:start] + str(version) + content[end:]
+
+
+def _find_pyproject_version_span(content):
+    """Find the position of the poetry version value.
+
+    :returns: a `(start, end)` tuple with the offsets of the
+        characters of the value, quotes excluded, or `None` when
+        the value cannot be located safely
+    """
+    if '"""' in content or "\'\'\'" in content:
+        return None
+
+    span = None
+    table = ''
+    poetry_tables = 0
+    offset = 0
+
+    for line in content.splitlines(keepends=True):
+        header = PYPROJECT_TABLE_REGEX.match(line)
+        m = PYPROJECT_KEY_REGEX.match(line)
+
+        if header:
+            table = re.sub(r'\s', '', header.group('name'))
+            if table == 'tool.poetry':
+                poetry_tables += 1
+            if header.group('open') == '[[':
+                # Keys of arrays of tables are never the version
+                table = None
+        elif table is not None and line.lstrip().startswith('['):
+            # Headers with quoted names or values of arrays
+            return None
+        elif table is not None and m:
+            key = re.sub(r'[\s"\']', '', m.group('key'))
+            key = table + '.' + key if table else key
+
+            if key == PYPROJECT_VERSION_KEY:
+                m = PYPROJECT_VERSION_REGEX.match(line)
+
+                if span or table != 'tool.poetry' or not m:
+                    return None
+
+                group = 'basic' if m.group('basic') is not None else 'literal'
+                span = (offset + m.start(group), offset + m.end(group))
+
+        offset += len(line)
+
+    if poetry_tables != 1:
+        return None
+
+    return span
+
+
+class PackageVersion:
+    """Class to store the version numbers of a package."""
+
+    def __init__(self, root, version_file, pyproject_file,
+                 current_version=None, new_version=None, error=None):
+        self.root = root
+        self.version_file = version_file
+        self.pyproject_file = pyproject_file
+        self.current_version = current_version
+        self.new_version = new_version
+        self.error = error
+
+
+def bump_all_packages(project, roots, bump_version, pre_release, dry_run):
+    """Increment the version number of a set of packages."""
+
+    try:
+        packages = find_packages(project, roots)
+    except RepositoryError as e:
+        raise click.ClickException(e)
+
+    if not packages:
+        raise click.ClickException("no packages found")
+
+    results = compute_package_versions(packages, bump_version, pre_release,
+                                       cache_path=project.cache_path)
+
+    errors = [
+        "{}: {}".format(package.root, package.error)
+        for package in results if package.error
+    ]
+    if errors:
+        raise click.ClickException("unable to update packages\n" + "\n".join(errors))
+
+    if not dry_run:
+        write_package_versions(results)
+
+    click.echo(format_package_versions(results))
+
+
+def find_packages(project, roots=None):
+    """Find the packages of the repository.
+
+    Package files are listed with a single call to Git. A package
+    is a directory with a tracked 'pyproject.toml' and version file.
+    The version file of a package is the closest one to its root
+    that does not belong to a nested package.
+
+    :param project: project of the repository
+    :param roots: root directories of the packages; when empty,
+        every directory with a pyproject file is a package
+
+    :returns: a list of `PackageVersion` instances
+    """
+    files = project.repo.ls_files(PYPROJECT_FILENAME, '*/' + PYPROJECT_FILENAME,
+                                  '*' + VERSION_FILENAME)
+
+    pyprojects = {
+        os.path.dirname(f): f for f in files
+        if os.path.basename(f) == PYPROJECT_FILENAME
+    }
+    version_files = [f for f in files if f.endswith(VERSION_FILENAME)]
+
+    if roots:
+        roots = [os.path.normpath(os.path.relpath(root)) for root in roots]
+        roots = ['' if root == '.' else root for root in roots]
+    else:
+        roots = sorted(pyprojects)
+
+    packages = []
+
+    for root in roots:
+        if root not in pyprojects:
+            msg = "pyproject file not found in package {}".format(root or '.')
+            raise click.ClickException(msg)
+
+        candidates = [
+            f for f in version_files
+            if _package_root(f, pyprojects) == root
+        ]
+        if not candidates:
+            msg = "version file not found in package {}".format(root or '.')
+            raise click.ClickException(msg)
+
+        version_file = min(candidates, key=lambda f: (f.count('/'), f))
+        packages.append(PackageVersion(root or '.', version_file, pyprojects[root]))
+
+    return packages
+
+
+def _package_root(filepath, roots):
+    """Return the closest package root of a file."""
+
+    dirpath = os.path.dirname(filepath)
+
+    while dirpath not in roots:
+        if not dirpath:
+            return None
+        dirpath = os.path.dirname(dirpath)
+
+    return dirpath
+
+
+def compute_package_versions(packages, bump_version, pre_release, max_workers=None,
+                             cache_path=None):
+    """Compute the next version of a set of packages in parallel.
+
+    Each package is processed by a pool of processes; errors are
+    stored in the `error` attribute of the packages. The bump
+    summaries of the packages are read from `cache_path`, when set.
+
+    :returns: the list of packages with their versions
+    """
+    args = [
+        (package.root, package.version_file, bump_version, pre_release, cache_path)
+        for package in packages
+    ]
+
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(args) // (4 * workers))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        versions = list(executor.map(_compute_package_version, *zip(*args),
+                                     chunksize=chunksize))
+
+    for package, (current_version, new_version, error) in zip(packages, versions):
+        package.current_version = current_version
+        package.new_version = new_version
+        package.error = error
+
+    return packages
+
+
+def _compute_package_version(root, version_file, bump_version, pre_release, cache_path):
+    """Compute the next version of a package.
+
+    :returns: a `(current_version, new_version, error)` tuple;
+        `new_version` is `None` when the package has no changes
+    """
+    try:
+        current_version = read_version_number(version_file)
+    except click.ClickException as e:
+        return None, None, e.message
+
+    dirpath = os.path.join(root, RELEASES_DIRNAME, UNRELEASED_CHANGES_DIRNAME)
+
+    try:
+        if bump_version:
+            new_version = get_next_version(current_version, bump_version, pre_release)
+        else:
+            new_version = determine_next_version(dirpath, current_version, pre_release,
+                                                 cache_path=cache_path)
+    except click.ClickException as e:
+        if e.message != NO_CHANGES_ERROR:
+            return str(current_version), None, e.message
+        new_version = None
+
+    return str(current_version), str(new_version) if new_version else None, None
+
+
+def write_package_versions(packages):
+    """Write the new versions of a set of packages.
+
+    Files of the packages are written in parallel by a pool of
+    threads. Packages without a new version are skipped.
+    """
+    def write(package):
+        version = semver.VersionInfo.parse(package.new_version)
+        write_version_number(package.version_file, version)
+        write_version_number_pyproject(package.pyproject_file, version)
+
+    updated = [package for package in packages if package.new_version]
+
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        list(executor.map(write, updated))
+
+
+def format_package_versions(packages):
+    """Format a table with the versions of a set of packages."""
 
-    fd = tomlkit.toml_file.TOMLFile(filepath)
+    rows = [('Package', 'Current', 'New')]
+    rows += [
+        (package.root, package.current_version, package.new_version or '-')
+        for package in packages
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(2)]
 
-    metadata = fd.read()
-    poetry_metadata = metadata["tool"]["poetry"]
-    poetry_metadata["version"] = str(version)
-    fd.write(metadata)
+    return "\n".join(
+        "{}  {}  {}".format(row[0].ljust(widths[0]), row[1].ljust(widths[1]), row[2])
+        for row in rows
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import json
+import os
+import tempfile
+
+from release_tools.utils import write_json_file
+
+
+PACKED_STORE_FILENAME = 'entries.jsonl'
+PACKED_INDEX_FILENAME = 'entries-index-{}.json'
+
+# Bytes at the end of the indexed data used to detect rewrites
+INDEX_TAIL_SIZE = 256
+
+
+class PackedEntryStore:
+    """Store of changelog entries packed in a single file.
+
+    Entries are stored as JSON records, one per line, in an
+    append-only file. Each record has the name of the entry,
+    which is the filename it would have as a YAML file, and
+    its data. Replacing an entry appends a new record, and
+    removing it appends a tombstone record, so previous records
+    are never modified. Use `compact` to drop them.
+
+    An index with the offset and length of the live record of
+    each entry is kept in memory. The index is updated
+    incrementally, reading only the records appended since it
+    was saved; it is rebuilt when the store is replaced. When
+    `cache_path` is given, the index is also saved under that
+    directory, so other runs do not need to scan the store.
+
+    :param dirpath: path to the directory of the store
+    :param cache_path: path to the cache directory of the project
+    """
+    INDEX_FORMAT_VERSION = 1
+
+    def __init__(self, dirpath, cache_path=None):
+        self.dirpath = dirpath
+        self.filepath = os.path.join(dirpath, PACKED_STORE_FILENAME)
+        self.index_filepath = None
+        if cache_path:
+            self.index_filepath = determine_packed_index_filepath(cache_path, dirpath)
+        self.offsets = {}
+        self._stat = None
+
+    def exists(self):
+        """Check whether the store file exists."""
+
+        return os.path.exists(self.filepath)
+
+    def names(self):
+        """Return the sorted names of the live entries."""
+
+        self._refresh()
+        return sorted(self.offsets)
+
+    def __contains__(self, name):
+        self._refresh()
+        return name in self.offsets
+
+    def read(self, name):
+        """Read the data of an entry.
+
+        :returns: a dict with the data of the entry or `None`
+            when the entry is not in the store
+        """
+        self._refresh()
+
+        if name not in self.offsets:
+            return None
+
+        offset, length = self.offsets[name]
+
+        with open(self.filepath, mode='rb') as fd:
+            fd.seek(offset)
+            record = json.loads(fd.read(length).decode('utf-8'))
+
+        return record['entry']
+
+    def read_all(self):
+        """Read the data of every live entry.
+
+        Superseded records and tombstones are skipped without
+        parsing them.
+
+        :returns: a dict with the data of the entries by name
+        """
+        self._refresh()
+
+        if not self.offsets:
+            return {}
+
+        with open(self.filepath, mode='rb') as fd:
+            data = fd.read()
+
+        return {
+            name: json.loads(data[offset:offset + length].decode('utf-8'))['entry']
+            for name, (offset, length) in self.offsets.items()
+        }
+
+    def append(self, name, entry):
+        """Add or replace an entry.
+
+        :param name: name of the entry
+        :param entry: dict with the data of the entry
+        """
+        self.append_many({name: entry})
+
+    def append_many(self, entries):
+        """Add or replace a set of entries with a single write.
+
+        :param entries: dict with the data of the entries by name
+        """
+        self._append([{'name': name, 'entry': entry} for name, entry in entries.items()])
+
+    def delete(self, name):
+        """Remove an entry appending a tombstone record."""
+
+        if name in self:
+            self._append([{'name': name, 'deleted': True}])
+
+    def compact(self):
+        """Rewrite the store keeping only the live records.
+
+        The new store replaces the old one atomically.
+
+        :returns: number of records dropped
+        """
+        if not self.exists():
+            return 0
+
+        entries = self.read_all()
+
+        with open(self.filepath, mode='rb') as fd:
+            total = sum(1 for line in fd if line.endswith(b'\n'))
+
+        self.write_all(entries)
+
+        return total - len(entries)
+
+    def write_all(self, entries):
+        """Replace the content of the store with a set of entries.
+
+        :param entries: dict with the data of the entries by name
+        """
+        lines = [
+            self._encode_record({'name': name, 'entry': entries[name]})
+            for name in sorted(entries)
+        ]
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.dirpath, prefix='.tmp-')
+
+        try:
+            with os.fdopen(fd, mode='wb') as f:
+                f.write(b''.join(lines))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.filepath)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self.offsets = {}
+        self._stat = None
+        self._refresh()
+
+    def remove(self):
+        """Delete the store and its index."""
+
+        for filepath in [self.filepath, self.index_filepath]:
+            if filepath is None:
+                continue
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+
+        self.offsets = {}
+        self._stat = None
+
+    def _append(self, records):
+        self._refresh()
+
+        with open(self.filepath, mode='ab') as fd:
+            fd.write(b''.join(self._encode_record(record) for record in records))
+
+        self._refresh()
+
+    def _refresh(self):
+        """Update the offsets with the records not indexed yet."""
+
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            self.offsets = {}
+            self._stat = None
+            return
+
+        if self._stat is None:
+            self._load_index()
+
+        if self._stat and self._stat[0] == stat.st_ino and self._stat[1] == stat.st_size:
+            return
+
+        start = 0
+
+        if self._stat and self._stat[0] == stat.st_ino and self._stat[1] < stat.st_size:
+            if self._read_tail(self._stat[1]) == self._stat[2]:
+                start = self._stat[1]
+
+        if start == 0:
+            self.offsets = {}
+
+        end = self._scan(start)
+
+        self._stat = [stat.st_ino, end, self._read_tail(end)]
+        self._save_index()
+
+    def _scan(self, start):
+        """Index the records found from an offset.
+
+        Incomplete records at the end of the file, left by an
+        interrupted write, are not indexed.
+
+        :returns: offset of the end of the last complete record
+        """
+        offset = start
+
+        with open(self.filepath, mode='rb') as fd:
+            fd.seek(start)
+
+            for line in fd:
+                if not line.endswith(b'\n'):
+                    break
+
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                    name = record['name']
+                except (ValueError, KeyError, TypeError):
+                    msg = "invalid record in {} at offset {}".format(self.filepath, offset)
+                    raise ValueError(msg)
+
+                if record.get('deleted'):
+                    self.offsets.pop(name, None)
+                else:
+                    self.offsets[name] = [offset, len(line)]
+
+                offset += len(line)
+
+        return offset
+
+    def _read_tail(self, end):
+        start = max(0, end - INDEX_TAIL_SIZE)
+
+        with open(self.filepath, mode='rb') as fd:
+            fd.seek(start)
+            return hashlib.sha256(fd.read(end - start)).hexdigest()
+
+    def _load_index(self):
+        if self.index_filepath is None:
+            return
+
+        try:
+            with open(self.index_filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get('version') != self.INDEX_FORMAT_VERSION:
+            return
+
+        self._stat = data['stat']
+        self.offsets = data['offsets']
+
+    def _save_index(self):
+        if self.index_filepath is None:
+            return
+
+        data = {
+            'version': self.INDEX_FORMAT_VERSION,
+            'stat': self._stat,
+            'offsets': self.offsets
+        }
+        write_json_file(self.index_filepath, data)
+
+    @staticmethod
+    def _encode_record(record):
+        return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def determine_packed_index_filepath(cache_path, dirpath):
+    """Return the path to the index of the store of a directory.
+
+    Each directory has its own index under the cache directory,
+    named after a digest of the path of the directory.
+    """
+    digest = hashlib.sha1(os.path.abspath(dirpath).encode('utf-8')).hexdigest()
+    return os.path.join(cache_path, PACKED_INDEX_FILENAME.format(digest[:16]))
+
+
+def read_packed_entries(content):
+    """Read the live entries of the content of a store file.
+
+    It is used to read stores from Git objects, which are not
+    indexed. Incomplete records at the end are ignored.
+
+    :param content: text of the store file; `None` is taken as
+        an empty store
+
+    :returns: a dict with the data of the entries by name
+    """
+    entries = {}
+
+    # The last item is an incomplete record or empty
+    for line in (content or '').split('\n')[:-1]:
+        record = json.loads(line)
+
+        if record.get('deleted'):
+            entries.pop(record['name'], None)
+        else:
+            entries[record['name']] = record['entry']
+
+    return entries
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import json
+import os
+
+from release_tools.entry import (SHARD_DIRNAME_REGEX,
+                                 YAML_FILE_EXTENSION,
+                                 CategoryChange,
+                                 ChangelogEntry)
+from release_tools.store import PACKED_STORE_FILENAME, PackedEntryStore
+from release_tools.tracing import span
+from release_tools.utils import write_json_file
+
+
+BUMP_SUMMARY_FILENAME = 'bump-summary-{}.json'
+
+BUMP_VERSIONS = ['patch', 'minor', 'major']
+
+
+def strongest_bump_version(categories):
+    """Return the strongest version bump of a set of categories.
+
+    :param categories: iterable of category names
+
+    :returns: 'major', 'minor', 'patch' or `None` when there
+        are no categories
+    """
+    bumps = [
+        BUMP_VERSIONS.index(CategoryChange[category.upper()].bump_version)
+        for category in categories
+    ]
+    return BUMP_VERSIONS[max(bumps)] if bumps else None
+
+
+def max_bump_version(*bumps):
+    """Return the strongest of a set of version bumps.
+
+    :param bumps: 'major', 'minor', 'patch' or `None` values
+
+    :returns: the strongest bump or `None` when all of them are `None`
+    """
+    bumps = [bump for bump in bumps if bump]
+    return max(bumps, key=BUMP_VERSIONS.index) if bumps else None
+
+
+class BumpSummary:
+    """Summary of the categories of the unreleased entries.
+
+    The summary stores the category of each entry of a directory,
+    together with the number of entries per category and the
+    strongest version bump they require. It is stored under the
+    cache directory, so the next version can be determined without
+    parsing the entries.
+
+    Entry files are stored with their modification time, size and
+    inode, and the directory and its shards with their modification
+    times. Entries of the packed store are stored with the offset
+    and length of their records, together with the stat of the
+    store. The summary is valid while none of them change. Files
+    modified after the summary was saved, within the resolution of
+    the clock, cannot be told apart by their stat, so they also
+    invalidate it, like Git does with its index.
+
+    :param filepath: path to the summary file
+    :param dirpath: path to the unreleased entries directory
+    :param cache_path: cache directory where the index of the
+        packed store is kept
+    """
+    SUMMARY_FORMAT_VERSION = 3
+
+    def __init__(self, filepath, dirpath, cache_path=None):
+        self.filepath = filepath
+        self.dirpath = dirpath
+        self.cache_path = cache_path
+        self.entries = {}
+        self.packed = {}
+        self.directories = {}
+        self.store = None
+        self._mtime = None
+
+    @property
+    def counts(self):
+        """Number of entries per category."""
+
+        categories = {name: category for name, (category, _) in self.packed.items()}
+
+        # Files on shards are named like the packed records
+        categories.update(
+            (os.path.basename(filepath), category)
+            for filepath, (category, _) in self.entries.items()
+        )
+
+        counts = {}
+        for category in categories.values():
+            counts[category] = counts.get(category, 0) + 1
+        return counts
+
+    @property
+    def bump_version(self):
+        """Strongest version bump required by the entries."""
+
+        return strongest_bump_version(self.counts)
+
+    def exists(self):
+        """Check whether the summary file exists."""
+
+        return os.path.exists(self.filepath)
+
+    def load(self):
+        """Load the summary from its file.
+
+        Missing, invalid or outdated summary files are ignored.
+
+        :returns: whether the summary was loaded
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+                mtime = os.fstat(fd.fileno()).st_mtime_ns
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict):
+            return False
+        if data.get('version') != self.SUMMARY_FORMAT_VERSION:
+            return False
+        if data.get('dirpath') != self.dirpath:
+            return False
+
+        self.entries = {
+            filename: tuple(values) for filename, values in data['entries'].items()
+            if values[0] in CategoryChange.values()
+        }
+        self.packed = {
+            name: tuple(values) for name, values in data['packed'].items()
+            if values[0] in CategoryChange.values()
+        }
+        self.directories = data['directories']
+        self.store = data['store']
+        self._mtime = mtime
+        return True
+
+    def save(self):
+        """Store the summary in its file."""
+
+        data = {
+            'version': self.SUMMARY_FORMAT_VERSION,
+            'dirpath': self.dirpath,
+            'bump_version': self.bump_version,
+            'counts': self.counts,
+            'directories': self.directories,
+            'store': self.store,
+            'entries': {
+                filename: list(values) for filename, values in self.entries.items()
+            },
+            'packed': {
+                name: list(values) for name, values in self.packed.items()
+            }
+        }
+        write_json_file(self.filepath, data, indent=2, sort_keys=True)
+        self._mtime = os.stat(self.filepath).st_mtime_ns
+
+    def is_valid(self):
+        """Check whether the summary is in sync with the directory.
+
+        Only the stat of the directory, its shards, its entry files
+        and its packed store are checked; no entry is read.
+        """
+        for dirname, mtime in self.directories.items():
+            if _stat(os.path.join(self.dirpath, dirname), mtime=True) != mtime:
+                return False
+
+        directories, files = self._scan_directory()
+
+        if directories != self.directories:
+            return False
+        if files != {filename: stat for filename, (_, stat) in self.entries.items()}:
+            return False
+
+        store = _stat(os.path.join(self.dirpath, PACKED_STORE_FILENAME))
+        if store != self.store:
+            return False
+
+        stats = list(files.values()) + ([store] if store else [])
+
+        return not any(self._is_racy(stat) for stat in stats)
+
+    def refresh(self):
+        """Update the summary with the entries of the directory.
+
+        Only entries that are new or which stat changed are
+        parsed; records of the packed store are parsed when their
+        offset changes. Entries that cannot be parsed are left
+        out of the summary, so it will not be valid until they
+        are fixed.
+
+        :returns: whether the summary was modified
+        """
+        directories, files = self._scan_directory()
+        modified = directories != self.directories
+        self.directories = directories
+
+        for filename in set(self.entries) - set(files):
+            del self.entries[filename]
+            modified = True
+
+        for filename, stat in files.items():
+            if filename in self.entries and self.entries[filename][1] == stat and not self._is_racy(stat):
+                continue
+
+            try:
+                entry = ChangelogEntry.from_yaml_file(os.path.join(self.dirpath, filename))
+            except Exception:
+                self.entries.pop(filename, None)
+            else:
+                self.entries[filename] = (entry.category.category, stat)
+            modified = True
+
+        return self._refresh_packed() or modified
+
+    def _refresh_packed(self):
+        """Update the packed entries with the records of the store."""
+
+        # The store is read after its stat is taken, so records
+        # appended meanwhile will invalidate the summary
+        stat = _stat(os.path.join(self.dirpath, PACKED_STORE_FILENAME))
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+
+        offsets = {}
+        if stat:
+            store.names()
+            offsets = store.offsets
+
+        # Compacted stores are new files; appends only grow them
+        rewritten = not (self.store and stat and self.store[2] == stat[2] and self.store[1] <= stat[1])
+        modified = stat != self.store
+        self.store = stat
+
+        for name in set(self.packed) - set(offsets):
+            del self.packed[name]
+            modified = True
+
+        for name, offset in offsets.items():
+            if name in self.packed and self.packed[name][1] == offset and not rewritten:
+                continue
+
+            try:
+                entry = ChangelogEntry.from_dict(store.read(name), name)
+            except Exception:
+                self.packed.pop(name, None)
+            else:
+                self.packed[name] = (entry.category.category, offset)
+            modified = True
+
+        return modified
+
+    def _scan_directory(self):
+        """Take the stat of the entry files and the shards.
+
+        :returns: a tuple with the modification times of the
+            directory and its shards, and the stats of the files
+        """
+        directories = {}
+        files = {}
+
+        try:
+            directories['.'] = _stat(self.dirpath, mtime=True)
+
+            with os.scandir(self.dirpath) as it:
+                for f in it:
+                    if f.name.endswith(YAML_FILE_EXTENSION) and f.is_file():
+                        files[f.name] = _stat_result(f.stat())
+                    elif SHARD_DIRNAME_REGEX.match(f.name) and f.is_dir():
+                        directories[f.name] = f.stat().st_mtime_ns
+                        with os.scandir(f.path) as shard:
+                            files.update(
+                                (os.path.join(f.name, e.name), _stat_result(e.stat()))
+                                for e in shard if e.name.endswith(YAML_FILE_EXTENSION)
+                            )
+        except FileNotFoundError:
+            return {}, {}
+
+        return directories, files
+
+    def _is_racy(self, stat):
+        return self._mtime is not None and stat[0] >= self._mtime
+
+
+def determine_bump_summary_filepath(cache_path, dirpath):
+    """Return the path to the bump summary of an entries directory.
+
+    Each directory has its own summary under the cache directory,
+    named after a digest of the path of the directory.
+    """
+    digest = hashlib.sha1(os.path.abspath(dirpath).encode('utf-8')).hexdigest()
+    return os.path.join(cache_path, BUMP_SUMMARY_FILENAME.format(digest[:16]))
+
+
+def open_bump_summary(cache_path, dirpath):
+    """Return the bump summary of an entries directory, loaded when it exists."""
+
+    filepath = determine_bump_summary_filepath(cache_path, dirpath)
+    summary = BumpSummary(filepath, os.path.abspath(dirpath), cache_path=cache_path)
+    summary.load()
+
+    return summary
+
+
+@span('update_bump_summary', phase='write')
+def update_bump_summary(project, create=True):
+    """Synchronize the bump summary of the unreleased entries.
+
+    :param project: project which summary is updated
+    :param create: when not set, the summary is only updated
+        if its file already exists
+    """
+    summary = open_bump_summary(project.cache_path, project.unreleased_changes_path)
+
+    if not create and not summary.exists():
+        return
+
+    if summary.refresh() or not summary.exists():
+        summary.save()
+
+
+def _stat(path, mtime=False):
+    try:
+        result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return result.st_mtime_ns if mtime else _stat_result(result)
+
+
+def _stat_result(result):
+    return [result.st_mtime_ns, result.st_size, result.st_ino]
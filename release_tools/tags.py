@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import bisect
+import hashlib
+import json
+
+import semver
+
+from release_tools.utils import write_json_file
+
+
+TAG_INDEX_FORMAT_VERSION = 1
+
+
+class TagIndex:
+    """Sorted index of the release tags of a repository.
+
+    Release tags are those tags which name is a valid semver
+    string. Tags are parsed only once, when the index is built,
+    and kept sorted by version number, so looking for the latest
+    release or the release previous to a version is done with
+    a binary search.
+
+    Final releases are also indexed on their own, to look them
+    up without walking over the release candidates.
+
+    :param tags: list of `(tag, date)` tuples
+    """
+    def __init__(self, tags):
+        releases = []
+
+        for tag, date in tags:
+            try:
+                version = semver.VersionInfo.parse(tag)
+            except ValueError:
+                continue
+            releases.append((version, tag, date))
+
+        releases.sort(key=lambda release: release[0])
+        self._set_releases(releases)
+
+    @classmethod
+    def from_sorted(cls, tags):
+        """Create an index of release tags already sorted by version.
+
+        Tags are not filtered nor sorted again, so this is only
+        meant to load the tags of an index stored before.
+
+        :param tags: list of `(tag, date)` tuples of release tags
+        """
+        index = cls([])
+        index._set_releases([
+            (semver.VersionInfo.parse(tag), tag, date) for tag, date in tags
+        ])
+        return index
+
+    def __len__(self):
+        return len(self.versions)
+
+    def __contains__(self, version):
+        return self._find(self.versions, version) is not None
+
+    def latest(self, prerelease=True):
+        """Return the version of the latest release.
+
+        :param prerelease: when not set, release candidates
+            are not considered
+
+        :returns: a `semver.VersionInfo` or `None` when there
+            are no releases
+        """
+        versions = self.versions if prerelease else self.final_versions
+        return versions[-1] if versions else None
+
+    def previous(self, version, prerelease=True):
+        """Return the version of the release previous to another.
+
+        :param version: version to compare with; it does not
+            need to be a released version
+        :param prerelease: when not set, release candidates
+            are not considered
+
+        :returns: a `semver.VersionInfo` or `None` when there
+            are no releases previous to `version`
+        """
+        version = self._parse(version)
+        versions = self.versions if prerelease else self.final_versions
+
+        pos = bisect.bisect_left(versions, version)
+        return versions[pos - 1] if pos > 0 else None
+
+    def tag(self, version):
+        """Return the `(tag, date)` tuple of a released version.
+
+        :returns: a `(tag, date)` tuple or `None` when the
+            version was not released
+        """
+        pos = self._find(self.versions, version)
+        return self.tags[pos] if pos is not None else None
+
+    def _set_releases(self, releases):
+        self.versions = [release[0] for release in releases]
+        self.tags = [(tag, date) for _, tag, date in releases]
+        self.final_versions = [version for version in self.versions
+                               if not version.prerelease]
+
+    def _find(self, versions, version):
+        version = self._parse(version)
+        pos = bisect.bisect_left(versions, version)
+
+        if pos < len(versions) and versions[pos] == version:
+            return pos
+        return None
+
+    @staticmethod
+    def _parse(version):
+        if isinstance(version, semver.VersionInfo):
+            return version
+        return semver.VersionInfo.parse(version)
+
+
+def open_tag_index(repo, filepath):
+    """Return the index of the release tags of a repository.
+
+    The sorted index is stored in `filepath` together with a
+    digest of the names and the objects of the tags. While they
+    do not change, the index is read from that file, so the dates
+    of the tags are not read from their objects and the versions
+    are not sorted again. Otherwise, the index is built from the
+    tags of the repository and stored.
+
+    :param repo: repository backend of the project
+    :param filepath: path to the index file
+    """
+    refs = '\n'.join(tag + '\0' + obj for tag, obj in repo.tag_objects())
+    key = hashlib.sha1(refs.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+    try:
+        with open(filepath, mode='r') as fd:
+            data = json.load(fd)
+    except (OSError, ValueError):
+        data = None
+
+    if isinstance(data, dict) and data.get('version') == TAG_INDEX_FORMAT_VERSION \
+            and data.get('key') == key:
+        return TagIndex.from_sorted(data['tags'])
+
+    index = TagIndex(repo.tags())
+
+    data = {
+        'version': TAG_INDEX_FORMAT_VERSION,
+        'key': key,
+        'tags': [list(tag) for tag in index.tags]
+    }
+    write_json_file(filepath, data)
+
+    return index
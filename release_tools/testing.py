@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Helpers to test code that creates releases on Git repositories.
+
+Creating a repository for each test runs Git several times. Instead,
+define a `RepositoryTemplate` with the files of the repository; the
+repository is built once, stored in a cache directory and copied for
+each test. Copies share the Git objects of the template using hard
+links, so they are created without running Git.
+
+    TEMPLATE = RepositoryTemplate({'pyproject.toml': '...'})
+
+    class TestRelease(unittest.TestCase):
+
+        def setUp(self):
+            self.tmp_path = tempfile.mkdtemp()
+            self.git_path = TEMPLATE.clone(os.path.join(self.tmp_path, 'repo'))
+
+Templates are safe to use from parallel test processes: each one is
+built on a temporary directory and then renamed, so no process reads
+a template that is not complete.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+from release_tools.repo import GitHandler
+
+
+TEMPLATE_FORMAT_VERSION = 1
+
+TEMPLATES_DIRNAME = 'release-tools-templates'
+
+DEFAULT_AUTHOR_NAME = 'John Smith'
+DEFAULT_AUTHOR_EMAIL = 'jsmith@example.com'
+DEFAULT_DATE = '2019-01-01T12:00:00+00:00'
+
+# Git never modifies the files under this directory once
+# they are written, so they can be shared between copies
+GIT_OBJECTS_DIRNAME = os.path.join('.git', 'objects')
+
+
+class RepositoryTemplate:
+    """Git repository built once and copied for each test.
+
+    The repository has a single commit, on branch 'master', with
+    the given files. Author and committer are set in the config of
+    the repository, so new commits can be created on the copies.
+
+    Templates are identified by their files and tags; templates
+    with the same content share the same directory of the cache.
+
+    :param files: dict with the content of each file, as `str`
+        or `bytes`; keys are paths relative to the repository
+    :param tags: list of annotated tags to create on the commit
+    :param cache_dirpath: directory where templates are stored;
+        by default, a directory on the temporary directory of
+        the system
+    """
+    def __init__(self, files, tags=None, cache_dirpath=None):
+        self.files = dict(files)
+        self.tags = list(tags or [])
+        self.cache_dirpath = cache_dirpath or os.path.join(tempfile.gettempdir(),
+                                                           TEMPLATES_DIRNAME)
+
+    @property
+    def key(self):
+        """Hash of the content of the template."""
+
+        sha = hashlib.sha256(str(TEMPLATE_FORMAT_VERSION).encode('utf-8'))
+
+        for path, content in sorted(self.files.items()):
+            kind = b'b' if isinstance(content, bytes) else b't'
+            data = content if isinstance(content, bytes) else content.encode('utf-8')
+            sha.update(b'\0'.join([path.encode('utf-8'), kind, str(len(data)).encode('ascii'), data]))
+
+        for tag in self.tags:
+            sha.update(b'\0tag\0' + tag.encode('utf-8'))
+
+        return sha.hexdigest()
+
+    @property
+    def path(self):
+        """Path to the template repository, which is built when needed."""
+
+        dirpath = os.path.join(self.cache_dirpath, self.key)
+
+        if not os.path.isdir(dirpath):
+            self._build(dirpath)
+
+        return dirpath
+
+    def clone(self, dirpath):
+        """Copy the template repository to a new directory.
+
+        Git objects are hard linked, or copied when the target is
+        on another file system; the rest of the files are copied,
+        so they can be modified without changing the template.
+
+        :param dirpath: path of the new repository; it must not exist
+
+        :returns: the path of the new repository
+        """
+        template_path = self.path
+        objects_path = os.path.join(template_path, GIT_OBJECTS_DIRNAME)
+
+        def link_or_copy(src, dest):
+            if os.path.commonpath([src, objects_path]) == objects_path:
+                try:
+                    os.link(src, dest)
+                    return dest
+                except OSError:
+                    pass
+            return shutil.copy2(src, dest)
+
+        shutil.copytree(template_path, dirpath, copy_function=link_or_copy)
+
+        return dirpath
+
+    def _build(self, dirpath):
+        """Build the template on a temporary directory and rename it."""
+
+        os.makedirs(self.cache_dirpath, exist_ok=True)
+        build_path = tempfile.mkdtemp(prefix='.build-', dir=self.cache_dirpath)
+
+        try:
+            self._init_repository(build_path)
+            os.rename(build_path, dirpath)
+        except OSError as exc:
+            shutil.rmtree(build_path, ignore_errors=True)
+            # Another process built the same template first
+            if exc.errno not in (errno.EEXIST, errno.ENOTEMPTY) or not os.path.isdir(dirpath):
+                raise
+        except Exception:
+            shutil.rmtree(build_path, ignore_errors=True)
+            raise
+
+    def _init_repository(self, dirpath):
+        for path, content in self.files.items():
+            filepath = os.path.join(dirpath, path)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+            mode = 'wb' if isinstance(content, bytes) else 'w'
+            with open(filepath, mode) as fd:
+                fd.write(content)
+
+        env = dict(GitHandler().gitenv,
+                   GIT_AUTHOR_DATE=DEFAULT_DATE,
+                   GIT_COMMITTER_DATE=DEFAULT_DATE)
+
+        cmds = [
+            ['git', 'init', '-q'],
+            ['git', 'symbolic-ref', 'HEAD', 'refs/heads/master'],
+            ['git', 'config', 'user.name', DEFAULT_AUTHOR_NAME],
+            ['git', 'config', 'user.email', DEFAULT_AUTHOR_EMAIL],
+            ['git', 'add', '-A'],
+            ['git', 'commit', '-q', '--allow-empty', '-m', 'Initial commit']
+        ]
+        cmds.extend(['git', 'tag', '-a', tag, '-m', 'Release ' + tag] for tag in self.tags)
+
+        for cmd in cmds:
+            GitHandler._exec(cmd, cwd=dirpath, env=env)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import json
+import os
+import secrets
+import sys
+import time
+
+import click
+
+from release_tools._version import __version__
+from release_tools.utils import write_json_file
+
+
+SERVICE_NAME = 'release-tools'
+SCOPE_NAME = 'release_tools'
+
+# Value of '--trace' to print the spans to the standard error
+STDERR_TRACE_FILE = '-'
+
+# OpenTelemetry span kind and status codes
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_UNSET = 0
+STATUS_CODE_ERROR = 2
+
+# Attribute of the spans with the phase they belong to
+PHASE_ATTRIBUTE = 'release_tools.phase'
+
+# Tracer of the running command, if any
+_active = None
+
+
+class Span:
+    """Timed operation of a trace.
+
+    :param name: name of the operation
+    :param trace_id: identifier of the trace, as 32 hex digits
+    :param parent_id: identifier of the parent span, if any
+    :param attributes: dict of attributes of the operation
+    :param phase: phase of the command the operation belongs to
+    """
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, phase=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.phase = phase
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Time taken by the operation, in seconds."""
+
+        return (self.end_time - self.start_time) / 1e9
+
+    def to_dict(self):
+        """Convert the span to a dict in OTLP/JSON format."""
+
+        attributes = dict(self.attributes)
+        if self.phase is not None:
+            attributes[PHASE_ATTRIBUTE] = self.phase
+
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time),
+            'attributes': _otlp_attributes(attributes),
+            'status': {'code': STATUS_CODE_UNSET}
+        }
+
+        if self.error is not None:
+            data['status'] = {'code': STATUS_CODE_ERROR, 'message': self.error}
+
+        return data
+
+
+class Tracer:
+    """Record the spans of a command.
+
+    Spans are nested following the order in which they are started
+    and ended. Every span of a tracer belongs to the same trace.
+
+    Functions added to `on_finish` are called with the tracer once
+    it is stopped; they export or report the recorded spans.
+    """
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.on_finish = []
+        self._stack = []
+
+    def start_span(self, name, attributes=None, phase=None):
+        """Start a span as a child of the current one."""
+
+        parent_id = self._stack[-1].span_id if self._stack else None
+
+        span = Span(name, self.trace_id, parent_id=parent_id,
+                    attributes=attributes, phase=phase)
+        self._stack.append(span)
+
+        return span
+
+    def end_span(self, error=None):
+        """End the current span.
+
+        :param error: exception raised by the operation, if any
+        """
+        span = self._stack.pop()
+        span.end_time = time.time_ns()
+
+        if error is not None:
+            span.error = str(error) or type(error).__name__
+
+        self.spans.append(span)
+
+        return span
+
+    def export(self):
+        """Return the finished spans as an OTLP/JSON document."""
+
+        resource = {
+            'service.name': SERVICE_NAME,
+            'service.version': __version__
+        }
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes(resource)},
+                'scopeSpans': [{
+                    'scope': {'name': SCOPE_NAME, 'version': __version__},
+                    'spans': [span.to_dict() for span in
+                              sorted(self.spans, key=lambda s: s.start_time)]
+                }]
+            }]
+        }
+
+
+class span(contextlib.ContextDecorator):
+    """Record a block of code as a span of the running trace.
+
+    It can be used as a context manager or as a decorator. It does
+    nothing unless a command is being traced or profiled. When
+    `phase` is given, the time of the span is also accounted to
+    that phase of the command.
+
+    :param name: name of the span
+    :param phase: phase of the command, if any
+    :param attributes: attributes of the span
+    """
+    def __init__(self, name, phase=None, **attributes):
+        self.name = name
+        self.phase = phase
+        self.attributes = attributes
+
+    def __enter__(self):
+        if _active is not None:
+            _active.start_span(self.name, self.attributes, phase=self.phase)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _active is not None:
+            _active.end_span(error=exc)
+        return False
+
+
+def start_tracer(name):
+    """Start recording spans under a root span called `name`.
+
+    When a tracer is already running, that one is returned.
+    """
+    global _active
+
+    if _active is None:
+        _active = Tracer()
+        _active.start_span(name)
+
+    return _active
+
+
+def stop_tracer(error=None):
+    """Stop the running tracer and call its `on_finish` functions.
+
+    :param error: exception that ends the spans left open, if any
+    """
+    global _active
+
+    tracer = _active
+    _active = None
+
+    while tracer._stack:
+        tracer.end_span(error=error)
+
+    for func in tracer.on_finish:
+        func(tracer)
+
+    return tracer
+
+
+def trace_command(ctx):
+    """Record the spans of the command of `ctx`.
+
+    There is a single tracer by command, shared by '--trace' and
+    '--profile'. It is stopped when the context of the command is
+    closed, even if the command fails.
+    """
+    if _active is None:
+        start_tracer(ctx.command.name)
+        ctx.call_on_close(_stop_command_tracer)
+
+    return _active
+
+
+def _stop_command_tracer():
+    # Spans left open by an error end together with the root
+    error = sys.exc_info()[1]
+    if isinstance(error, click.exceptions.Exit) and error.exit_code == 0:
+        error = None
+
+    stop_tracer(error=error)
+
+
+def start_tracing(ctx, param, value):
+    """Start tracing a command when '--trace' is set.
+
+    The root span is named after the command. Spans are exported
+    when the command finishes.
+    """
+    if value is None:
+        return
+
+    tracer = trace_command(ctx)
+    tracer.on_finish.append(lambda t: export_trace(t, value))
+
+
+def export_trace(tracer, filepath):
+    """Write the spans of a tracer to a file or the standard error."""
+
+    data = tracer.export()
+
+    if filepath == STDERR_TRACE_FILE:
+        click.echo(json.dumps(data, indent=2), err=True)
+        return
+
+    try:
+        write_json_file(os.path.abspath(filepath), data, indent=2)
+    except OSError as exc:
+        msg = "unable to write trace file; {}".format(exc)
+        raise click.ClickException(msg)
+
+
+def _otlp_attributes(attributes):
+    """Convert a dict into a list of OTLP key-value pairs."""
+
+    pairs = []
+
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            value = {'boolValue': value}
+        elif isinstance(value, int):
+            value = {'intValue': str(value)}
+        elif isinstance(value, float):
+            value = {'doubleValue': value}
+        else:
+            value = {'stringValue': str(value)}
+        pairs.append({'key': key, 'value': value})
+
+    return pairs
+
+
+trace_option = click.option(
+    '--trace', metavar='FILE', is_eager=True, expose_value=False,
+    callback=start_tracing,
+    help="Export the spans of the command as OpenTelemetry JSON to FILE; use '-' for the standard error."
+)
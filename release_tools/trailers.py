@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Changelog entries defined by the trailers of commit messages.
+
+Instead of adding an entry file, a change can be described by the
+trailers at the end of the message of its commit:
+
+    Fix crash on empty input
+
+    Changelog-Title: Fix crash on empty input
+    Changelog-Category: fixed
+    Changelog-Issue: 42
+
+The author of the entry is the author of the commit. Commits added
+since the latest release are read with a single call to Git. The
+last commit read is stored as a cursor under the cache directory,
+together with the entries found so far, so the next time only the
+commits added after the cursor are read.
+"""
+
+import json
+import os
+
+from release_tools.entry import CategoryChange, ChangelogEntry
+from release_tools.tracing import span
+from release_tools.utils import write_json_file
+
+
+TRAILER_TITLE = 'Changelog-Title'
+TRAILER_CATEGORY = 'Changelog-Category'
+TRAILER_ISSUE = 'Changelog-Issue'
+TRAILER_KEYS = [TRAILER_TITLE, TRAILER_CATEGORY, TRAILER_ISSUE]
+
+TRAILERS_CURSOR_FILENAME = 'trailers.json'
+
+# Names of the entries are this prefix followed by the commit id
+ENTRY_NAME_PREFIX = 'commit:'
+
+
+class TrailerCursor:
+    """Last commit read looking for trailers and the entries found.
+
+    The cursor is only valid for the commits added since the release
+    tagged as `base`; `None` means there are no releases yet. Entries
+    are stored as dicts, in the order their commits were created.
+    Commits with invalid trailers are stored with their error
+    messages in `invalid`, so they are reported on every read.
+
+    Call `load` to read the cursor file and `save` to store its
+    new state.
+
+    :param filepath: path to the cursor file
+    """
+    CURSOR_FORMAT_VERSION = 2
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.base = None
+        self.commit = None
+        self.entries = {}
+        self.invalid = {}
+
+    def load(self):
+        """Load the contents of the cursor file.
+
+        Missing, invalid or outdated cursor files are ignored.
+        """
+        try:
+            with open(self.filepath, mode='r') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict):
+            return
+        if data.get('version') != self.CURSOR_FORMAT_VERSION:
+            return
+
+        self.base = data.get('base', None)
+        self.commit = data.get('commit', None)
+        self.entries = data.get('entries', {})
+        self.invalid = data.get('invalid', {})
+
+    def save(self):
+        """Store the cursor in its file."""
+
+        data = {
+            'version': self.CURSOR_FORMAT_VERSION,
+            'base': self.base,
+            'commit': self.commit,
+            'entries': self.entries,
+            'invalid': self.invalid
+        }
+        write_json_file(self.filepath, data)
+
+
+@span('read_trailer_entries', phase='entry load')
+def read_trailer_entries(project, pre_release=False, on_invalid=None):
+    """Read the changelog entries defined by commit trailers.
+
+    Commits added since the latest final release are read; when
+    `pre_release` is set, release candidates are considered too,
+    as the unreleased entries of a release candidate do.
+
+    When the cursor is still valid, because the latest release did
+    not change and its commit was not rewritten, only the commits
+    added after it are read. Otherwise, every commit since the
+    latest release is read again.
+
+    Commits with invalid trailers are skipped. Their messages
+    cannot be fixed once they are pushed, so they must not block
+    the release. `on_invalid` is called with the error message of
+    each of them, every time the entries are read.
+
+    :param project: project which commits are read
+    :param pre_release: read the commits since the latest release,
+        release candidates included
+    :param on_invalid: function called with the error message of
+        each commit with invalid trailers
+
+    :returns: `dict` of `ChangelogEntry` instances; keys are the
+        prefix 'commit:' followed by the id of their commits
+    """
+    base = _find_base_tag(project, pre_release)
+
+    cursor = TrailerCursor(os.path.join(project.cache_path, TRAILERS_CURSOR_FILENAME))
+    cursor.load()
+
+    revisions = ['HEAD']
+    if base:
+        revisions.append('^' + base)
+
+    if cursor.commit and cursor.base == base and project.repo.is_ancestor(cursor.commit, 'HEAD'):
+        revisions.append('^' + cursor.commit)
+        entries = dict(cursor.entries)
+        invalid = dict(cursor.invalid)
+    else:
+        cursor.commit = None
+        entries = {}
+        invalid = {}
+
+    new_entries = []
+
+    for commit, author, trailers in project.repo.log_trailers(revisions, TRAILER_KEYS):
+        try:
+            data = parse_trailers(commit, author, trailers)
+        except ValueError as exc:
+            data, error = None, str(exc)
+        else:
+            error = None
+        new_entries.append((commit, data, error))
+
+    # Git lists the commits from the newest to the oldest
+    for commit, data, error in reversed(new_entries):
+        if data:
+            entries[ENTRY_NAME_PREFIX + commit] = data
+        elif error:
+            invalid[commit] = error
+
+    if new_entries or cursor.base != base:
+        cursor.base = base
+        cursor.commit = new_entries[0][0] if new_entries else cursor.commit
+        cursor.entries = entries
+        cursor.invalid = invalid
+        cursor.save()
+
+    if on_invalid:
+        for error in invalid.values():
+            on_invalid(error)
+
+    return {
+        name: ChangelogEntry.from_dict(data, name)
+        for name, data in entries.items()
+    }
+
+
+def parse_trailers(commit, author, trailers):
+    """Create the data of a changelog entry from commit trailers.
+
+    :param commit: id of the commit
+    :param author: name of the author of the commit
+    :param trailers: list of `(key, value)` trailers of the commit
+
+    :returns: dict with the data of the entry or `None` when the
+        commit does not define any entry
+
+    :raises ValueError: when the trailers are not valid
+    """
+    values = {}
+
+    for key, value in trailers:
+        key = next((k for k in TRAILER_KEYS if k.lower() == key.lower()), None)
+        if key is None:
+            continue
+        if key in values:
+            msg = "invalid trailers for commit {}; '{}' set more than once".format(commit, key)
+            raise ValueError(msg)
+        values[key] = value
+
+    if not values:
+        return None
+
+    for key in [TRAILER_TITLE, TRAILER_CATEGORY]:
+        if not values.get(key):
+            msg = "invalid trailers for commit {}; '{}' trailer not found".format(commit, key)
+            raise ValueError(msg)
+
+    category = values[TRAILER_CATEGORY].lower()
+
+    if category not in CategoryChange.values():
+        msg = "invalid trailers for commit {}; '{}' is not a valid category"
+        msg = msg.format(commit, category)
+        raise ValueError(msg)
+
+    issue = values.get(TRAILER_ISSUE, '').lstrip('#') or None
+    if issue and issue.isdigit():
+        issue = int(issue)
+
+    return {
+        'title': values[TRAILER_TITLE],
+        'category': category,
+        'author': author,
+        'issue': issue,
+        'notes': None
+    }
+
+
+def _find_base_tag(project, pre_release):
+    version = project.release_tags.latest(prerelease=pre_release)
+
+    if version is None:
+        return None
+
+    tag, _ = project.release_tags.tag(version)
+
+    return tag
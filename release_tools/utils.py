@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_content_equals(filepath, content):
+    """Check whether a file stores the given content.
+
+    The file is read in chunks, which are hashed to compare them
+    with the hash of `content`, so large files are never loaded
+    in memory. Files with a different size are not read at all.
+
+    :param filepath: path to the file
+    :param content: text to compare with
+
+    :returns: `True` when the file exists and its content is
+        the same; `False` otherwise
+    """
+    data = content.encode('utf-8')
+
+    try:
+        if os.path.getsize(filepath) != len(data):
+            return False
+
+        digest = hashlib.sha256()
+
+        with open(filepath, mode='rb') as fd:
+            for chunk in iter(lambda: fd.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return False
+
+    return digest.digest() == hashlib.sha256(data).digest()
+
+
+def write_file(filepath, content, mode='w'):
+    """Write content to a file unless it already stores it.
+
+    Skipping identical writes keeps the modification time of
+    the file, so neither Git nor other tools consider it changed.
+
+    :param filepath: path to the file
+    :param content: text to write
+    :param mode: mode to open the file; use 'x' to fail when
+        the file already exists
+
+    :returns: `True` when the file was written; `False` when
+        it was not modified
+
+    :raises FileExistsError: when mode is 'x' and the file exists
+    """
+    if mode != 'x' and file_content_equals(filepath, content):
+        return False
+
+    with open(filepath, mode=mode, encoding='utf-8') as fd:
+        fd.write(content)
+
+    return True
+
+
+def write_json_file(filepath, data, **kwargs):
+    """Write data to a JSON file atomically.
+
+    Data is written to a temporary file on the same directory,
+    which replaces the original file once it is complete. Extra
+    keyword arguments are passed to `json.dump`.
+    """
+    dirpath = os.path.dirname(filepath)
+    os.makedirs(dirpath, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix='.tmp-')
+
+    try:
+        with os.fdopen(fd, mode='w') as f:
+            json.dump(data, f, **kwargs)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
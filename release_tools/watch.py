@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from release_tools.entry import (ChangelogEntry,
+                                 SHARD_DIRNAME_REGEX,
+                                 YAML_FILE_EXTENSION,
+                                 list_entry_files)
+from release_tools.store import PACKED_STORE_FILENAME, PackedEntryStore
+
+
+# Seconds between scans of the directories when inotify is not available
+POLL_INTERVAL = 1.0
+
+# Seconds to wait for more events after the first one, so a file
+# written in several steps is read only once
+DEBOUNCE_DELAY = 0.1
+
+# Flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+INOTIFY_RESCAN_MASK = IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF | IN_ISDIR
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class EntryWatcher:
+    """Keep the changelog entries of a set of directories in memory.
+
+    Entries are read once and then updated incrementally by
+    `refresh`: only the files which were added, modified or
+    removed since the previous call are read again. Files are
+    compared using their modification time and their size.
+
+    Entries which cannot be parsed, usually because they are being
+    edited, are not included; their errors are kept in `errors`
+    until they are fixed or removed.
+
+    :param dirpaths: list of paths to entries directories; missing
+        directories are watched once they are created
+    """
+    def __init__(self, dirpaths):
+        self.dirpaths = [os.path.abspath(dirpath) for dirpath in dirpaths]
+        self.errors = {}
+        self._files = {}
+        self._stores = {}
+
+    def entries(self, dirpath):
+        """Return the entries of a directory.
+
+        Keys are the same that `read_changelog_entries` returns:
+        paths relative to the directory or names of packed entries.
+        """
+        dirpath = os.path.abspath(dirpath)
+
+        entries = dict(self._stores.get(dirpath, (None, {}))[1])
+
+        for (parent, relpath), (_, entry) in self._files.items():
+            if parent == dirpath:
+                entries.pop(os.path.basename(relpath), None)
+                entries[relpath] = entry
+
+        return entries
+
+    def directories(self):
+        """Return the existing directories which can store entries."""
+
+        dirs = []
+
+        for dirpath in self.dirpaths:
+            if not os.path.isdir(dirpath):
+                continue
+            dirs.append(dirpath)
+            with os.scandir(dirpath) as it:
+                dirs.extend(f.path for f in it
+                            if SHARD_DIRNAME_REGEX.match(f.name) and f.is_dir())
+
+        return dirs
+
+    def refresh(self, filepaths=None):
+        """Update the entries which changed on disk.
+
+        :param filepaths: paths to the files that might have changed;
+            when it is `None`, every directory is scanned
+
+        :returns: `True` when any entry was added, modified or removed,
+            or when the parsing errors changed
+        """
+        if filepaths is None:
+            candidates = self._scan()
+        else:
+            candidates = set()
+            for filepath in filepaths:
+                candidate = self._locate(filepath)
+                if candidate:
+                    candidates.add(candidate)
+
+        changed = False
+
+        for dirpath, relpath in sorted(candidates):
+            if relpath == PACKED_STORE_FILENAME:
+                changed |= self._refresh_store(dirpath)
+            else:
+                changed |= self._refresh_file(dirpath, relpath)
+
+        return changed
+
+    def _scan(self):
+        """List every known and existing entry file."""
+
+        candidates = set(self._files)
+        candidates.update((dirpath, PACKED_STORE_FILENAME) for dirpath in self.dirpaths)
+
+        for dirpath in self.dirpaths:
+            if os.path.isdir(dirpath):
+                candidates.update((dirpath, relpath) for relpath in list_entry_files(dirpath))
+
+        return candidates
+
+    def _locate(self, filepath):
+        """Find the entries directory and the key of a file."""
+
+        for dirpath in self.dirpaths:
+            relpath = os.path.relpath(filepath, dirpath)
+            parts = relpath.split(os.sep)
+
+            if relpath == PACKED_STORE_FILENAME:
+                return dirpath, relpath
+            if not relpath.endswith(YAML_FILE_EXTENSION):
+                continue
+            if len(parts) == 1 or (len(parts) == 2 and SHARD_DIRNAME_REGEX.match(parts[0])):
+                return dirpath, relpath
+
+        return None
+
+    def _refresh_file(self, dirpath, relpath):
+        filepath = os.path.join(dirpath, relpath)
+        key = (dirpath, relpath)
+
+        signature = _stat_signature(filepath)
+        current = self._files.get(key, None)
+
+        if signature is None:
+            error = self.errors.pop(filepath, None)
+            return self._files.pop(key, None) is not None or error is not None
+        if current and current[0] == signature:
+            return False
+
+        try:
+            entry = ChangelogEntry.from_yaml_file(filepath)
+        except OSError:
+            return False
+        except Exception as exc:
+            error = str(exc)
+            changed = self.errors.get(filepath, None) != error
+            self.errors[filepath] = error
+            return self._files.pop(key, None) is not None or changed
+
+        self.errors.pop(filepath, None)
+        self._files[key] = (signature, entry)
+
+        return True
+
+    def _refresh_store(self, dirpath):
+        store = PackedEntryStore(dirpath)
+
+        signature = _stat_signature(store.filepath)
+        current = self._stores.get(dirpath, None)
+
+        if signature is None:
+            return self._stores.pop(dirpath, None) is not None
+        if current and current[0] == signature:
+            return False
+
+        try:
+            entries = {
+                name: ChangelogEntry.from_dict(data, os.path.join(dirpath, name))
+                for name, data in store.read_all().items()
+            }
+        except (OSError, ValueError):
+            # The store is being written; wait for the next event
+            return False
+
+        self._stores[dirpath] = (signature, entries)
+
+        return True
+
+
+class PollingWaiter:
+    """Wait for changes checking the directories periodically.
+
+    :param interval: seconds between checks
+    """
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+
+    def watch(self, dirpaths):
+        """Directories are scanned on each check; nothing to do."""
+
+    def wait(self):
+        """Wait until the next check.
+
+        :returns: `None`, so every directory is scanned
+        """
+        time.sleep(self.interval)
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWaiter:
+    """Wait for changes using the inotify API of Linux.
+
+    Instead of scanning the directories, only the files that
+    generated events are checked.
+
+    :raises OSError: when inotify is not available
+    """
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._wds = {}
+
+    def watch(self, dirpaths):
+        """Watch a list of directories; watched ones are skipped."""
+
+        watched = set(self._wds.values())
+
+        for dirpath in dirpaths:
+            if dirpath in watched:
+                continue
+
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath),
+                                              INOTIFY_WATCH_MASK)
+            if wd >= 0:
+                self._wds[wd] = dirpath
+
+    def wait(self):
+        """Wait for events on the watched directories.
+
+        :returns: the set of paths which changed or `None` when
+            directories were created or removed, so every
+            directory must be scanned again
+        """
+        select.select([self.fd], [], [])
+        time.sleep(DEBOUNCE_DELAY)
+
+        filepaths = set()
+        rescan = False
+
+        while select.select([self.fd], [], [], 0)[0]:
+            data = os.read(self.fd, 64 * 1024)
+            for wd, mask, name in self._parse_events(data):
+                if mask & INOTIFY_RESCAN_MASK:
+                    rescan = True
+                    if mask & IN_IGNORED:
+                        self._wds.pop(wd, None)
+                elif wd in self._wds and name:
+                    filepaths.add(os.path.join(self._wds[wd], name))
+
+        return None if rescan else filepaths
+
+    def close(self):
+        os.close(self.fd)
+
+    @staticmethod
+    def _parse_events(data):
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+
+def open_waiter():
+    """Return an inotify waiter or, when not available, a polling one."""
+
+    try:
+        return InotifyWaiter()
+    except (OSError, AttributeError):
+        return PollingWaiter()
+
+
+def watch_entries(watcher, update):
+    """Call `update` each time the watched entries change.
+
+    The function is called once the entries are read and then
+    after every change, until the process is interrupted.
+
+    :param watcher: `EntryWatcher` of the entries
+    :param update: function to call; it takes no arguments
+    """
+    waiter = open_waiter()
+
+    try:
+        watcher.refresh()
+        waiter.watch(watcher.directories())
+        update()
+
+        while True:
+            filepaths = waiter.wait()
+
+            if watcher.refresh(filepaths):
+                update()
+            if filepaths is None:
+                waiter.watch(watcher.directories())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        waiter.close()
+
+
+def _stat_signature(filepath):
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+
+    return st.st_mtime_ns, st.st_size, st.st_ino
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.api import (PublishResult,
+                               ReleaseNotes,
+                               ReleaseToolsError,
+                               VersionBump,
+                               next_version,
+                               publish_release,
+                               render_notes)
+from release_tools.history import read_release_history
+from release_tools.project import Project
+from release_tools.repo import MemoryGitHandler
+from release_tools.testing import RepositoryTemplate
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: {author}\nissue: {issue}\nnotes: null\n"
+)
+RELEASE_NOTES = """## MyApp 0.2.0 - (2020-01-01)
+
+**New features:**
+
+ * Add spells (#2)
+
+**Bug fixes:**
+
+ * Fix bug (#1)
+
+"""
+
+
+REPOSITORY_TEMPLATE = RepositoryTemplate({
+    'pyproject.toml': '[tool.poetry]\nname = "myapp"\nversion = "0.1.0"\n',
+    'myapp/_version.py': '__version__ = "0.1.0"\n',
+    'NEWS': '',
+    'AUTHORS': '',
+    'releases/unreleased/fix-bug.yml': ENTRY_TEMPLATE.format(title='Fix bug', category='fixed',
+                                                             author='jsmith', issue=1),
+    'releases/unreleased/add-spells.yml': ENTRY_TEMPLATE.format(title='Add spells', category='added',
+                                                                author='jdoe', issue=2)
+})
+
+
+class TestCaseAPI(unittest.TestCase):
+    """Base class to test the API on a Git repo"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.git_path = REPOSITORY_TEMPLATE.clone(os.path.join(self.tmp_path, 'repo'))
+        self.changes_path = os.path.join(self.git_path, 'releases', 'unreleased')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def git(self, *args):
+        return subprocess.check_output(['git'] + list(args), cwd=self.git_path,
+                                       universal_newlines=True)
+
+    def write(self, filename, content):
+        with open(os.path.join(self.git_path, filename), 'w') as fd:
+            fd.write(content)
+
+    def read(self, filename):
+        with open(os.path.join(self.git_path, filename), 'r') as fd:
+            return fd.read()
+
+
+class TestNextVersion(TestCaseAPI):
+    """Unit tests for next_version"""
+
+    def test_next_version(self):
+        """Check whether the next version is computed from the entries"""
+
+        result = next_version(self.git_path)
+        self.assertEqual(result, VersionBump('0.1.0', '0.2.0', 'minor'))
+
+        # Nothing is written
+        self.assertEqual(self.read('myapp/_version.py'), '__version__ = "0.1.0"\n')
+
+    def test_bump_version(self):
+        """Check whether the version bump can be forced"""
+
+        result = next_version(self.git_path, bump_version='MAJOR')
+        self.assertEqual(result, VersionBump('0.1.0', '1.0.0', 'major'))
+
+        result = next_version(self.git_path, bump_version='patch', pre_release=True)
+        self.assertEqual(result, VersionBump('0.1.0', '0.1.1-rc.1', 'patch'))
+
+    def test_no_changes(self):
+        """Check whether an error is raised when there are no entries"""
+
+        self.git('rm', '-q', '-r', 'releases')
+        os.makedirs(self.changes_path)
+
+        with self.assertRaisesRegex(ReleaseToolsError, "no changes found"):
+            next_version(self.git_path)
+
+    def test_trailers(self):
+        """Check whether commit trailers are taken into account"""
+
+        self.git('rm', '-q', '-r', 'releases')
+        os.makedirs(self.changes_path)
+        self.git('commit', '-q', '-m', 'Fix crash\n\nChangelog-Title: Fix crash\nChangelog-Category: fixed')
+
+        result = next_version(self.git_path, trailers=True)
+        self.assertEqual(result, VersionBump('0.1.0', '0.1.1', 'patch'))
+
+        with self.assertRaisesRegex(ReleaseToolsError, "no changes found"):
+            next_version(self.git_path)
+
+        # Commits with invalid trailers are skipped
+        self.git('commit', '-q', '--allow-empty', '-m',
+                 'Add spells\n\nChangelog-Title: Add spells\nChangelog-Category: feature')
+
+        result = next_version(self.git_path, trailers=True)
+        self.assertEqual(result.version, '0.1.1')
+        self.assertEqual(len(result.warnings), 1)
+        self.assertRegex(result.warnings[0], "'feature' is not a valid category")
+
+    def test_not_a_repository(self):
+        """Check whether an error is raised outside of a repository"""
+
+        with self.assertRaisesRegex(ReleaseToolsError, "not a git repository"):
+            next_version(self.tmp_path)
+
+
+class TestRenderNotes(TestCaseAPI):
+    """Unit tests for render_notes"""
+
+    def test_render_notes(self):
+        """Check whether the notes are rendered without writing them"""
+
+        notes = render_notes(self.git_path, 'MyApp', '0.2.0', date='2020-01-01')
+
+        self.assertIsInstance(notes, ReleaseNotes)
+        self.assertEqual(notes.content, RELEASE_NOTES)
+        self.assertEqual(notes.entries, 2)
+        self.assertListEqual(sorted(notes.authors), ['jdoe', 'jsmith'])
+        self.assertFalse(os.path.exists(os.path.join(self.git_path, 'releases', '0.2.0.md')))
+
+    def test_missing_entries_dir(self):
+        """Check whether an error is raised when there are no entries"""
+
+        shutil.rmtree(os.path.join(self.git_path, 'releases'))
+
+        with self.assertRaisesRegex(ReleaseToolsError, "does not exist"):
+            render_notes(self.git_path, 'MyApp', '0.2.0')
+
+
+class TestPublishRelease(TestCaseAPI):
+    """Unit tests for publish_release"""
+
+    def test_publish_release(self):
+        """Check whether a release is created without printing anything"""
+
+        stdout = io.StringIO()
+
+        with contextlib.redirect_stdout(stdout):
+            result = publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>',
+                                     news=True, authors=True)
+
+        self.assertEqual(stdout.getvalue(), '')
+
+        self.assertIsInstance(result, PublishResult)
+        self.assertEqual(result.version, '0.2.0')
+        self.assertEqual(result.notes.entries, 2)
+        self.assertEqual(result.notes_file,
+                         os.path.join(self.git_path, 'releases', '0.2.0.md'))
+        self.assertTrue(result.news_updated)
+        self.assertTrue(result.authors_updated)
+        self.assertEqual(result.removed_entries, 2)
+        self.assertEqual(result.moved_entries, 0)
+        self.assertTrue(result.committed)
+        self.assertFalse(result.pushed)
+
+        self.assertEqual(self.git('tag').strip(), '0.2.0')
+        self.assertEqual(self.git('log', '-1', '--format=%s').strip(), 'Release 0.2.0')
+        self.assertEqual(self.git('status', '--porcelain'), '')
+
+        files = self.git('show', '--name-status', '--format=', 'HEAD').splitlines()
+        self.assertListEqual(sorted(files), [
+            'A\treleases/0.2.0.md',
+            'D\treleases/unreleased/add-spells.yml',
+            'D\treleases/unreleased/fix-bug.yml',
+            'M\tAUTHORS',
+            'M\tNEWS',
+            'M\tmyapp/_version.py',
+            'M\tpyproject.toml'
+        ])
+        self.assertIn('version = "0.2.0"', self.read('pyproject.toml'))
+        self.assertEqual(self.read('AUTHORS'), 'jdoe\njsmith\n\n')
+
+    def test_trailers(self):
+        """Check whether entries of commit trailers are released and kept"""
+
+        self.git('commit', '-q', '--allow-empty', '-m',
+                 'Fix crash\n\nChangelog-Title: Fix crash\n'
+                 'Changelog-Category: fixed\nChangelog-Issue: 3')
+
+        result = publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>',
+                                 trailers=True)
+
+        self.assertEqual(result.version, '0.2.0')
+        self.assertEqual(result.notes.entries, 3)
+        self.assertIn(' * Fix crash (#3)\n', result.notes.content)
+        self.assertListEqual(sorted(result.notes.authors), ['John Smith', 'jdoe', 'jsmith'])
+        self.assertEqual(result.removed_entries, 2)
+
+        # Trailers of the released commits are not read again
+        notes = render_notes(self.git_path, 'MyApp', '0.3.0', trailers=True)
+        self.assertEqual(notes.entries, 0)
+
+    def test_no_cleanup(self):
+        """Check whether entries are moved to the processed directory"""
+
+        result = publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>',
+                                 pre_release=True, cleanup=False)
+
+        self.assertEqual(result.version, '0.2.0-rc.1')
+        self.assertEqual(result.removed_entries, 0)
+        self.assertEqual(result.moved_entries, 2)
+
+        processed = self.git('ls-files', 'releases/unreleased/processed').splitlines()
+        self.assertListEqual(processed, ['releases/unreleased/processed/add-spells.yml',
+                                         'releases/unreleased/processed/fix-bug.yml'])
+
+        # The final release includes the processed entries
+        notes = render_notes(self.git_path, 'MyApp', '0.2.0')
+        self.assertEqual(notes.entries, 2)
+
+    def test_dry_run(self):
+        """Check whether nothing is changed on dry run mode"""
+
+        head = self.git('rev-parse', 'HEAD')
+
+        result = publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>',
+                                 dry_run=True)
+
+        self.assertEqual(result.version, '0.2.0')
+        self.assertIsNone(result.notes_file)
+        self.assertFalse(result.committed)
+        self.assertEqual(self.git('rev-parse', 'HEAD'), head)
+        self.assertEqual(self.git('status', '--porcelain'), '')
+
+    def test_existing_tag(self):
+        """Check whether the release commit is undone when the tag exists"""
+
+        self.git('tag', '0.2.0')
+        head = self.git('rev-parse', 'HEAD')
+
+        with self.assertRaisesRegex(ReleaseToolsError, "tag '0.2.0' already exists"):
+            publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>')
+
+        self.assertEqual(self.git('rev-parse', 'HEAD'), head)
+
+    def test_existing_notes(self):
+        """Check whether an error is raised when the notes already exist"""
+
+        self.write(os.path.join('releases', '0.2.0.md'), 'notes')
+
+        with self.assertRaisesRegex(ReleaseToolsError, "Release notes for version 0.2.0 already exist"):
+            publish_release(self.git_path, 'MyApp', 'John Smith <jsmith@example.com>')
+
+
+class TestMemoryBackend(TestCaseAPI):
+    """Check whether the API runs on the in-memory backend"""
+
+    def test_publish_release(self):
+        """Check whether a release is created without running Git"""
+
+        repo = MemoryGitHandler(self.git_path, remotes=['origin'])
+        repo.add_all()
+        repo.commit("Initial commit", "John Smith <jsmith@example.com>")
+
+        project = Project(self.git_path, repo=repo)
+
+        with unittest.mock.patch('subprocess.Popen') as mock_popen:
+            result = publish_release(project, 'MyApp', 'John Smith <jsmith@example.com>',
+                                     remote='origin')
+            mock_popen.assert_not_called()
+
+        self.assertTrue(result.committed)
+        self.assertTrue(result.pushed)
+        self.assertEqual(result.removed_entries, 2)
+
+        self.assertEqual(repo.commits[repo.head].message, 'Release 0.2.0')
+        self.assertListEqual([tag for tag, _ in repo.tags()], ['0.2.0'])
+        self.assertEqual(repo.remotes['origin']['refs/tags/0.2.0'], repo.head)
+        self.assertNotIn('releases/unreleased/fix-bug.yml', repo.index)
+        self.assertIn(b'__version__ = "0.2.0"', repo.index['myapp/_version.py'])
+
+        # The history of the release is read from the in-memory commits
+        releases = read_release_history(project)
+        self.assertEqual(len(releases), 1)
+        self.assertListEqual(sorted(releases[0].entries), ['add-spells.yml', 'fix-bug.yml'])
+
+        # The real repository is untouched
+        self.assertEqual(self.git('tag'), '')
+        self.assertEqual(self.git('log', '--format=%s').strip(), 'Initial commit')
+        self.assertEqual(os.path.dirname(project.cache_path), repo.git_dir)
+        self.assertFalse(project.cache_path.startswith(self.git_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
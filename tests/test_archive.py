@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from release_tools.archive import (read_release_archive,
+                                   write_release_archive)
+from release_tools.entry import (CategoryChange,
+                                 ChangelogEntry)
+
+
+class TestReleaseArchive(unittest.TestCase):
+    """Unit tests for release archives"""
+
+    def setUp(self):
+        self.entries = {
+            'b.yml': ChangelogEntry('second change', 'fixed', 'jdoe', issue=2),
+            'a.yml': ChangelogEntry('first change', 'added', 'jsmith',
+                                    notes='Ñandú notes')
+        }
+
+    def test_write_and_read(self):
+        """Check whether entries are stored and read back"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, '0.1.0.jsonl.gz')
+            write_release_archive(filepath, self.entries)
+
+            with gzip.open(filepath, mode='rt', encoding='utf-8') as fd:
+                lines = fd.readlines()
+
+            self.assertEqual(len(lines), 2)
+            self.assertTrue(lines[0].startswith('{"name": "a.yml"'))
+
+            entries = read_release_archive(filepath)
+            self.assertListEqual(sorted(entries), ['a.yml', 'b.yml'])
+            self.assertEqual(entries['a.yml'].notes, 'Ñandú notes')
+            self.assertEqual(entries['b.yml'].category, CategoryChange.FIXED)
+            self.assertEqual(entries['b.yml'].issue, 2)
+
+            self.assertListEqual(os.listdir(dirpath), ['0.1.0.jsonl.gz'])
+
+    def test_deterministic(self):
+        """Check whether the same entries produce the same archive"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'archive.jsonl.gz')
+
+            write_release_archive(filepath, self.entries)
+            with open(filepath, mode='rb') as fd:
+                data = fd.read()
+
+            write_release_archive(filepath, dict(reversed(list(self.entries.items()))))
+            with open(filepath, mode='rb') as fd:
+                self.assertEqual(fd.read(), data)
+
+    def test_empty(self):
+        """Check whether archives without entries are valid"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'archive.jsonl.gz')
+            write_release_archive(filepath, {})
+            self.assertDictEqual(read_release_archive(filepath), {})
+
+    def test_invalid_record(self):
+        """Check whether an error is raised reading invalid records"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'archive.jsonl.gz')
+
+            with gzip.open(filepath, mode='wt') as fd:
+                fd.write('{"name": "a.yml"}\n')
+
+            with self.assertRaisesRegex(ValueError, "invalid record in .+ on line 1"):
+                read_release_archive(filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
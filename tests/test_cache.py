@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.cache import EntryCache
+from release_tools.entry import (CategoryChange,
+                                 ChangelogEntry)
+
+
+ENTRY_CONTENT = (
+    "---\ntitle: new change\ncategory: fixed\n"
+    "author: jsmith\nissue: 1\nnotes: null\n"
+)
+
+
+class TestEntryCache(unittest.TestCase):
+    """Unit tests for EntryCache"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp_path.name, 'cache', 'cache.json')
+        self.entry_file = os.path.join(self.tmp_path.name, 'entry.yml')
+
+        with open(self.entry_file, mode='w') as fd:
+            fd.write(ENTRY_CONTENT)
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def test_read_entry(self):
+        """Check if entries are only parsed once"""
+
+        cache = EntryCache(self.cache_file)
+        entry = cache.read_entry(self.entry_file)
+
+        self.assertEqual(entry.title, 'new change')
+        self.assertEqual(entry.category, CategoryChange.FIXED)
+        self.assertEqual(entry.issue, 1)
+
+        cache.save()
+
+        cache = EntryCache(self.cache_file)
+        cache.load()
+
+        with unittest.mock.patch('release_tools.cache.ChangelogEntry.from_yaml') as mock_parse:
+            entry = cache.read_entry(self.entry_file)
+            mock_parse.assert_not_called()
+
+        self.assertEqual(entry.title, 'new change')
+        self.assertEqual(entry.category, CategoryChange.FIXED)
+        self.assertEqual(entry.author, 'jsmith')
+        self.assertEqual(entry.issue, 1)
+        self.assertEqual(entry.notes, None)
+
+    def test_modified_entry(self):
+        """Check if modified entries are parsed again"""
+
+        cache = EntryCache(self.cache_file)
+        cache.read_entry(self.entry_file)
+
+        with open(self.entry_file, mode='w') as fd:
+            fd.write(ENTRY_CONTENT.replace('new change', 'modified change'))
+
+        entry = cache.read_entry(self.entry_file)
+        self.assertEqual(entry.title, 'modified change')
+
+    def test_render_entry(self):
+        """Check if entries are only rendered once for the same context"""
+
+        entry = ChangelogEntry('new change', 'fixed', 'jsmith', issue=1)
+        render = unittest.mock.Mock(return_value='rendered')
+
+        cache = EntryCache(self.cache_file)
+        self.assertEqual(cache.render_entry(entry, render, context='a'), 'rendered')
+        self.assertEqual(cache.render_entry(entry, render, context='a'), 'rendered')
+        self.assertEqual(render.call_count, 1)
+
+        # A new context renders the entry again
+        cache.render_entry(entry, render, context='b')
+        self.assertEqual(render.call_count, 2)
+
+    def test_prune(self):
+        """Check if unused items are removed when the cache is pruned"""
+
+        entry = ChangelogEntry('new change', 'fixed', 'jsmith', issue=1)
+        render = unittest.mock.Mock(return_value='rendered')
+
+        cache = EntryCache(self.cache_file)
+        cache.read_entry(self.entry_file)
+        cache.render_entry(entry, render)
+        cache.save()
+
+        # Nothing is used before saving
+        cache = EntryCache(self.cache_file)
+        cache.load()
+        cache.save(prune=True)
+
+        cache = EntryCache(self.cache_file)
+        cache.load()
+
+        with unittest.mock.patch('release_tools.cache.ChangelogEntry.from_yaml') as mock_parse:
+            mock_parse.return_value = entry
+            cache.read_entry(self.entry_file)
+            mock_parse.assert_called_once()
+
+        cache.render_entry(entry, render)
+        self.assertEqual(render.call_count, 2)
+
+    def test_load_invalid_file(self):
+        """Check if invalid cache files are ignored"""
+
+        os.makedirs(os.path.dirname(self.cache_file))
+
+        with open(self.cache_file, mode='w') as fd:
+            fd.write('{invalid')
+
+        cache = EntryCache(self.cache_file)
+        cache.load()
+
+        entry = cache.read_entry(self.entry_file)
+        self.assertEqual(entry.title, 'new change')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,7 @@
 #     Venu Vardhan Reddy Tekula <venu@bitergia.com>
 #
 
+import json
 import os
 import unittest
 import unittest.mock
@@ -29,7 +30,10 @@ import click.testing
 import yaml
 
 from release_tools import changelog
+from release_tools.entry import shard_dirname
 from release_tools.repo import RepositoryError
+from release_tools.store import PackedEntryStore
+from release_tools.summary import determine_bump_summary_filepath
 
 CHANGELOG_ENTRIES_DIR_ERROR = (
     "Error: Changelog entries directory is needed to continue."
@@ -60,6 +64,26 @@ MOCK_REPOSITORY_ERROR = (
 CHANGELOG_ENTRY_CONTENT = (
     """---\ntitle: new change\ncategory: fixed\nauthor: null\nissue: null\nnotes: null"""
 )
+ENTRIES_JSONL_CONTENT = (
+    '{"title": "new change", "category": "fixed", "author": "John Smith", "issue": 1, "notes": "Lorem ipsum"}\n'
+    '\n'
+    '{"title": "last change", "category": 1}\n'
+)
+ENTRIES_JSONL_INVALID_CONTENT = (
+    '{"title": "new change", "category": "fixed"}\n'
+    '{"title": " ", "category": "fixed"}\n'
+    '{"title": "New Change!", "category": "added"}\n'
+    '{"title": "other change", "category": "invalid"}\n'
+    '{"title": "last change", "category": "added", "date": "2020-01-01"}\n'
+    '{"title": "issue change", "category": "added", "issue": "#12"}\n'
+    '{"title": "text issue", "category": "added", "issue": "abc"}\n'
+    '{"title": "float issue", "category": "added", "issue": 1.5}\n'
+)
+ENTRIES_CSV_CONTENT = (
+    'title,category,author,issue,notes\n'
+    'new change,removed,John Smith,1,"Lorem, ipsum"\n'
+    'last change,added,,,\n'
+)
 
 
 class TestChangelog(unittest.TestCase):
@@ -75,6 +99,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
                                    input=user_input)
@@ -93,6 +119,324 @@ class TestChangelog(unittest.TestCase):
                 self.assertEqual(entry['issue'], None)
                 self.assertEqual(entry['notes'], None)
 
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_bump_summary_is_updated(self, mock_project):
+        """Check whether the bump summary is updated with new entries"""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            params = ['--title', 'new change', '--category', 'fixed', '--no-editor']
+            result = runner.invoke(changelog.changelog, params, input="y\n")
+            self.assertEqual(result.exit_code, 0)
+
+            params = ['--title', 'last change', '--category', 'added', '--no-editor']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 0)
+
+            filepath = determine_bump_summary_filepath(os.path.join(fs, 'cache'), dirpath)
+            self.assertFalse(os.path.exists(os.path.join(dirpath, '.summary.json')))
+
+            with open(filepath, mode='r') as fd:
+                summary = json.load(fd)
+
+            self.assertEqual(summary['bump_version'], 'minor')
+            self.assertDictEqual(summary['counts'], {'added': 1, 'fixed': 1})
+            self.assertListEqual(sorted(summary['entries']),
+                                 ['last-change.yml', 'new-change.yml'])
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entry_is_created_on_shard(self, mock_project):
+        """Check whether entries are created on their shards in sharded directories"""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            os.makedirs(dirpath)
+            open(os.path.join(dirpath, '.sharded'), mode='w').close()
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            params = ['--title', 'new change', '--category', 'fixed', '--no-editor']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 0)
+
+            filepath = os.path.join(dirpath, shard_dirname('new-change.yml'), 'new-change.yml')
+            self.assertTrue(os.path.exists(filepath))
+
+            summary_filepath = determine_bump_summary_filepath(os.path.join(fs, 'cache'), dirpath)
+
+            with open(summary_filepath, mode='r') as fd:
+                summary = json.load(fd)
+
+            self.assertListEqual(list(summary['entries']),
+                                 [os.path.relpath(filepath, dirpath)])
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entries_from_jsonl_file(self, mock_project):
+        """Check whether entries are created from a JSONL file"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            os.makedirs(dirpath)
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            with open('entries.jsonl', 'w') as fd:
+                fd.write(ENTRIES_JSONL_CONTENT)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("2 changelog entries created", result.stdout)
+
+            with open(os.path.join(dirpath, 'new-change.yml'), mode='r') as fd:
+                entry = yaml.safe_load(fd)
+                self.assertEqual(entry['title'], 'new change')
+                self.assertEqual(entry['category'], 'fixed')
+                self.assertEqual(entry['author'], 'John Smith')
+                self.assertEqual(entry['issue'], 1)
+                self.assertEqual(entry['notes'], 'Lorem ipsum')
+
+            with open(os.path.join(dirpath, 'last-change.yml'), mode='r') as fd:
+                entry = yaml.safe_load(fd)
+                self.assertEqual(entry['category'], 'added')
+                self.assertEqual(entry['author'], None)
+
+            # Files are added with a single call
+            mock_add = mock_project.return_value.repo.add_files
+            mock_add.assert_called_once_with([os.path.join(dirpath, 'new-change.yml'),
+                                              os.path.join(dirpath, 'last-change.yml')])
+
+            # Existing entries are not replaced
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("line 1: changelog entry new-change.yml already exists", result.stderr)
+
+            result = runner.invoke(changelog.changelog,
+                                   ['--from-file', 'entries.jsonl', '--overwrite'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entries_from_csv_file(self, mock_project):
+        """Check whether entries are created from a CSV file"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            os.makedirs(dirpath)
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            with open('entries.csv', 'w') as fd:
+                fd.write(ENTRIES_CSV_CONTENT)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.csv', '--dry-run'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(os.listdir(dirpath), [])
+
+            docs = list(yaml.safe_load_all(result.stdout))
+            self.assertEqual(len(docs), 2)
+            self.assertEqual(docs[0]['title'], 'new change')
+            self.assertEqual(docs[0]['category'], 'removed')
+            self.assertEqual(docs[0]['notes'], 'Lorem, ipsum')
+            self.assertEqual(docs[0]['issue'], 1)
+            self.assertEqual(docs[1]['title'], 'last change')
+            self.assertEqual(docs[1]['issue'], None)
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entries_from_file_invalid(self, mock_project):
+        """Check whether no entries are created when any of them is invalid"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            os.makedirs(dirpath)
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            with open('entries.jsonl', 'w') as fd:
+                fd.write(ENTRIES_JSONL_INVALID_CONTENT)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl'])
+            self.assertEqual(result.exit_code, 1)
+
+            lines = result.stderr.split('\n')
+            self.assertEqual(lines[-9], "Error: invalid entries in entries.jsonl")
+            self.assertEqual(lines[-8], "line 2: title cannot be empty")
+            self.assertEqual(lines[-7], "line 3: entry new-change.yml already defined on line 1")
+            self.assertRegex(lines[-6], r"^line 4: invalid category; valid options are")
+            self.assertEqual(lines[-5], "line 5: unknown fields date")
+            self.assertEqual(lines[-4], "line 6: invalid issue '#12'; a number is expected")
+            self.assertEqual(lines[-3], "line 7: invalid issue 'abc'; a number is expected")
+            self.assertEqual(lines[-2], "line 8: invalid issue 1.5; a number is expected")
+
+            self.assertEqual(os.listdir(dirpath), [])
+            mock_project.return_value.repo.add_files.assert_not_called()
+
+            with open('entries.txt', 'w') as fd:
+                fd.write(ENTRIES_JSONL_CONTENT)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.txt'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("unsupported entries file", result.stderr)
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entries_auto_suffix(self, mock_project):
+        """Check whether suffixes are added to entries which names are in use"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            processed_path = os.path.join(dirpath, 'processed')
+            os.makedirs(processed_path)
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = processed_path
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            with open(os.path.join(processed_path, 'new-change.yml'), mode='w') as fd:
+                fd.write(CHANGELOG_ENTRY_CONTENT)
+
+            with open('entries.jsonl', 'w') as fd:
+                fd.write(ENTRIES_JSONL_CONTENT)
+                fd.write('{"title": "New Change!", "category": "added"}\n')
+
+            # Processed entries are also names in use
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("line 1: changelog entry new-change.yml already exists", result.stderr)
+            self.assertIn("line 4: changelog entry new-change.yml already exists", result.stderr)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl', '--auto-suffix'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("3 changelog entries created", result.stdout)
+
+            self.assertListEqual(sorted(f for f in os.listdir(dirpath) if f.endswith('.yml')),
+                                 ['last-change.yml', 'new-change-2.yml', 'new-change-3.yml'])
+
+            with open(os.path.join(dirpath, 'new-change-3.yml'), mode='r') as fd:
+                self.assertEqual(yaml.safe_load(fd)['title'], 'New Change!')
+
+            # Interactive entries check the same names
+            params = ['--title', 'new change', '--category', 'fixed', '--no-editor']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Changelog entry new-change.yml already exists", result.stderr)
+            self.assertFalse(os.path.exists(os.path.join(dirpath, 'new-change.yml')))
+
+            # The index is kept up to date
+            params = ['--title', 'new change', '--category', 'fixed', '--no-editor', '--auto-suffix']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("Changelog entry 'new-change-4.yml' created", result.stdout)
+            self.assertTrue(os.path.exists(os.path.join(fs, 'cache', 'entry-names.json')))
+
+            params = ['--title', 'new change', '--category', 'fixed', '--overwrite', '--auto-suffix']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn("'--auto-suffix' and '--overwrite' are mutually exclusive", result.stderr)
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_find_duplicates(self, mock_project):
+        """Check whether near-duplicate entries are listed"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            processed_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = processed_path
+
+            result = runner.invoke(changelog.changelog, ['--find-duplicates'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("changelog entries directory", result.stderr)
+
+            os.makedirs(processed_path)
+            entries = [
+                (dirpath, 'a.yml', 'Fix crash when reading empty files'),
+                (dirpath, 'b.yml', 'Add support for custom key bindings'),
+                (processed_path, 'c.yml', 'Fix crash reading empty file')
+            ]
+            for path, filename, title in entries:
+                content = changelog.create_changelog_entry_content(title, 'fixed', run_editor=False)
+                with open(os.path.join(path, filename), mode='w') as fd:
+                    fd.write(content)
+
+            # Title and category are not prompted
+            result = runner.invoke(changelog.changelog, ['--find-duplicates'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+            expected = (
+                "\n"
+                "  a.yml: Fix crash when reading empty files\n"
+                "  processed/c.yml: Fix crash reading empty file\n"
+                "\n"
+                "1 clusters of near-duplicate entries found\n"
+            )
+            self.assertEqual(result.stdout, expected)
+
+            os.remove(os.path.join(processed_path, 'c.yml'))
+
+            result = runner.invoke(changelog.changelog, ['--find-duplicates'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "\nNo near-duplicate entries found\n")
+
+    @unittest.mock.patch('release_tools.changelog.Project')
+    def test_entries_packed_store(self, mock_project):
+        """Check whether entries are added to an existing packed store"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            os.makedirs(dirpath)
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            store = PackedEntryStore(dirpath)
+            store.write_all({})
+
+            params = ['--title', 'new change', '--category', 'fixed', '--no-editor']
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("Changelog entry 'new-change.yml' created", result.stdout)
+
+            result = runner.invoke(changelog.changelog, params)
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Changelog entry new-change.yml already exists", result.stderr)
+
+            with open('entries.jsonl', 'w') as fd:
+                fd.write(ENTRIES_JSONL_CONTENT)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("line 1: changelog entry new-change.yml already exists", result.stderr)
+
+            result = runner.invoke(changelog.changelog, ['--from-file', 'entries.jsonl', '--overwrite'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            mock_project.return_value.repo.add_files.assert_called_once_with([store.filepath])
+
+            # No YAML files were created
+            self.assertListEqual(sorted(f for f in os.listdir(dirpath) if f.endswith('.yml')), [])
+            self.assertListEqual(store.names(), ['last-change.yml', 'new-change.yml'])
+            self.assertEqual(store.read('new-change.yml')['author'], 'John Smith')
+
     @unittest.mock.patch('release_tools.changelog.Project')
     def test_entry_repository_error(self, mock_project):
         """Check if it stops working when it encounters RepositoryError exception"""
@@ -124,6 +468,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             # Create an entry first
             params = [
@@ -153,6 +499,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             # Create an entry first
             params = [
@@ -197,6 +545,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             # Create an entry first
             params = [
@@ -248,6 +598,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             mock_edit.return_value = ""
 
@@ -270,6 +622,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
                                    input=user_input)
@@ -291,6 +645,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
                                    input=user_input)
@@ -315,6 +671,8 @@ class TestChangelog(unittest.TestCase):
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_os.side_effect = OSError('mock os error')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
                                    input=user_input)
@@ -352,6 +710,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
             mock_content.return_value = True
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
@@ -375,6 +735,8 @@ class TestChangelog(unittest.TestCase):
         with runner.isolated_filesystem() as fs:
             dirpath = os.path.join(fs, 'releases', 'unreleased')
             mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(dirpath, 'processed')
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
             mock_content.return_value = False
 
             result = runner.invoke(changelog.changelog, ['--no-editor'],
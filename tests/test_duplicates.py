@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+import unittest
+import unittest.mock
+
+from release_tools.duplicates import (NUM_HASHES,
+                                      entry_text,
+                                      find_duplicate_entries,
+                                      format_duplicate_clusters,
+                                      minhash_signature,
+                                      shingles,
+                                      signature_similarity)
+from release_tools.entry import ChangelogEntry
+
+
+def create_entry(title, notes=None):
+    return ChangelogEntry(title, 'fixed', 'jsmith', notes=notes)
+
+
+class TestMinHash(unittest.TestCase):
+    """Unit tests for MinHash signatures"""
+
+    def test_entry_text(self):
+        """Check whether the text of the entries is normalized"""
+
+        entry = create_entry("Fix  crash (#12)!", notes="When\nreading\tFILES.")
+        self.assertEqual(entry_text(entry), "fix crash 12 when reading files")
+        self.assertEqual(entry_text(create_entry("Fix")), "fix")
+
+    def test_shingles(self):
+        """Check whether texts are split in shingles"""
+
+        self.assertSetEqual(shingles("abcd"), {"abc", "bcd"})
+        self.assertSetEqual(shingles("ab"), {"ab"})
+        self.assertSetEqual(shingles(""), {""})
+
+    def test_signature(self):
+        """Check whether signatures estimate the similarity of texts"""
+
+        a = minhash_signature("fix crash when reading empty files")
+        b = minhash_signature("fix crash reading empty file")
+        c = minhash_signature("add support for custom key bindings")
+
+        self.assertEqual(len(a), NUM_HASHES)
+        self.assertEqual(a, minhash_signature("fix crash when reading empty files"))
+        self.assertEqual(signature_similarity(a, a), 1.0)
+        self.assertGreater(signature_similarity(a, b), 0.6)
+        self.assertLess(signature_similarity(a, c), 0.2)
+
+        # Short texts get complete signatures
+        self.assertNotIn(None, minhash_signature(""))
+
+
+class TestFindDuplicateEntries(unittest.TestCase):
+    """Unit tests for find_duplicate_entries"""
+
+    def setUp(self):
+        self.entries = {
+            'a.yml': create_entry("Fix crash when reading empty files"),
+            'b.yml': create_entry("Add support for custom key bindings"),
+            'c.yml': create_entry("Fix crash reading empty file"),
+            'd.yml': create_entry("Support custom keybindings"),
+            'e.yml': create_entry("Update dependencies",
+                                  notes="Lorem ipsum dolor sit amet"),
+            'f.yml': create_entry("Fix crash when reading empty files."),
+            'g.yml': create_entry("Remove deprecated options")
+        }
+
+    def test_find_duplicates(self):
+        """Check whether clusters of similar entries are found"""
+
+        clusters = find_duplicate_entries(self.entries)
+        self.assertListEqual(clusters, [['a.yml', 'c.yml', 'f.yml'],
+                                        ['b.yml', 'd.yml']])
+
+        clusters = find_duplicate_entries(self.entries, similarity=0.95)
+        self.assertListEqual(clusters, [['a.yml', 'f.yml']])
+
+        self.assertListEqual(find_duplicate_entries({}), [])
+
+    @unittest.mock.patch('release_tools.duplicates.PARALLEL_MIN_ENTRIES', 2)
+    def test_find_duplicates_parallel(self):
+        """Check whether signatures computed in parallel give the same result"""
+
+        rng = random.Random(0)
+        words = ['crash', 'file', 'empty', 'reading', 'support', 'bindings',
+                 'custom', 'options', 'remove', 'parser', 'error', 'cache']
+
+        entries = dict(self.entries)
+        for i in range(100):
+            entries['random-{}.yml'.format(i)] = create_entry(' '.join(rng.sample(words, 3)))
+
+        expected = find_duplicate_entries(entries, max_workers=1)
+        self.assertListEqual(find_duplicate_entries(entries, max_workers=2), expected)
+        self.assertIn(['a.yml', 'c.yml', 'f.yml'], [
+            [name for name in cluster if not name.startswith('random')] for cluster in expected
+        ])
+
+    def test_format(self):
+        """Check whether clusters are described"""
+
+        text = format_duplicate_clusters([['a.yml', 'f.yml'], ['b.yml', 'd.yml']], self.entries)
+        expected = (
+            "  a.yml: Fix crash when reading empty files\n"
+            "  f.yml: Fix crash when reading empty files.\n"
+            "\n"
+            "  b.yml: Add support for custom key bindings\n"
+            "  d.yml: Support custom keybindings"
+        )
+        self.assertEqual(text, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import unittest
+import unittest.mock
+
+import click.testing
+import yaml
+
+from release_tools.entries import entries
+from release_tools.entry import (SHARDED_LAYOUT_FILENAME,
+                                 read_changelog_entries,
+                                 shard_dirname)
+from release_tools.store import PackedEntryStore
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: John Smith\nissue: null\nnotes: null\n"
+)
+PACKED_STORE_NOT_FOUND_ERROR = (
+    "Error: packed store not found"
+)
+
+
+class TestEntries(unittest.TestCase):
+    """Unit tests for entries script"""
+
+    @staticmethod
+    def setup_entries(dirpath):
+        os.makedirs(dirpath)
+
+        for filename, title, category in [('first.yml', 'First', 'added'),
+                                          ('second.yml', 'Second', 'fixed')]:
+            with open(os.path.join(dirpath, filename), mode='w') as fd:
+                fd.write(ENTRY_TEMPLATE.format(title=title, category=category))
+
+    @unittest.mock.patch('release_tools.entries.Project')
+    def test_pack_and_unpack(self, mock_project):
+        """Check whether entries are converted in both directions"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            self.setup_entries(dirpath)
+            cache_path = os.path.join(fs, 'cache')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.cache_path = cache_path
+            mock_repo = mock_project.return_value.repo
+
+            expected = {
+                name: entry.to_dict()
+                for name, entry in read_changelog_entries(dirpath).items()
+            }
+
+            result = runner.invoke(entries, ['--pack'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "2 entries packed into 'entries.jsonl'\n")
+
+            store = PackedEntryStore(dirpath, cache_path=cache_path)
+            self.assertDictEqual(store.read_all(), expected)
+            self.assertListEqual([f for f in os.listdir(dirpath) if f.endswith('.yml')], [])
+
+            mock_repo.rm_files.assert_called_once_with([os.path.join(dirpath, 'first.yml'),
+                                                        os.path.join(dirpath, 'second.yml')])
+            mock_repo.add_files.assert_called_once_with([store.filepath])
+
+            # Entries are read transparently
+            self.assertDictEqual({
+                name: entry.to_dict()
+                for name, entry in read_changelog_entries(dirpath).items()
+            }, expected)
+
+            result = runner.invoke(entries, ['--unpack'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "2 entries unpacked from 'entries.jsonl'\n")
+
+            self.assertFalse(store.exists())
+            self.assertFalse(os.path.exists(store.index_filepath))
+
+            with open(os.path.join(dirpath, 'second.yml'), mode='r') as fd:
+                self.assertDictEqual(yaml.safe_load(fd), expected['second.yml'])
+
+            self.assertDictEqual({
+                name: entry.to_dict()
+                for name, entry in read_changelog_entries(dirpath).items()
+            }, expected)
+
+    @unittest.mock.patch('release_tools.entries.Project')
+    def test_compact(self, mock_project):
+        """Check whether the packed store is compacted"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            self.setup_entries(dirpath)
+            mock_project.return_value.unreleased_changes_path = dirpath
+
+            result = runner.invoke(entries, ['--compact'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.stderr.split('\n')[-2], PACKED_STORE_NOT_FOUND_ERROR)
+
+            result = runner.invoke(entries, ['--pack'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+            store = PackedEntryStore(dirpath)
+            store.delete('first.yml')
+
+            result = runner.invoke(entries, ['--compact'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "Packed store compacted; 2 records dropped\n")
+            self.assertListEqual(store.names(), ['second.yml'])
+
+    @staticmethod
+    def mv_files(srcpaths, dest_dirpath):
+        for srcpath in srcpaths:
+            os.rename(srcpath, os.path.join(dest_dirpath, os.path.basename(srcpath)))
+
+    @unittest.mock.patch('release_tools.entries.Project')
+    def test_shard_and_unshard(self, mock_project):
+        """Check whether entries are moved between layouts"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            self.setup_entries(dirpath)
+            cache_path = os.path.join(fs, 'cache')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.cache_path = cache_path
+            mock_repo = mock_project.return_value.repo
+            mock_repo.mv_files.side_effect = self.mv_files
+            marker = os.path.join(dirpath, SHARDED_LAYOUT_FILENAME)
+
+            expected = {
+                os.path.join(shard_dirname(name), name): entry.to_dict()
+                for name, entry in read_changelog_entries(dirpath).items()
+            }
+
+            result = runner.invoke(entries, ['--shard'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "2 entries moved to the sharded layout\n")
+
+            self.assertTrue(os.path.exists(marker))
+            mock_repo.add_files.assert_called_once_with([marker])
+            self.assertEqual(mock_repo.mv_files.call_count, 2)
+
+            self.assertDictEqual({
+                name: entry.to_dict()
+                for name, entry in read_changelog_entries(dirpath).items()
+            }, expected)
+
+            # Nothing to move when the layout does not change
+            result = runner.invoke(entries, ['--shard'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "0 entries moved to the sharded layout\n")
+
+            result = runner.invoke(entries, ['--unshard'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout, "2 entries moved to the flat layout\n")
+
+            self.assertFalse(os.path.exists(marker))
+            mock_repo.rm_files.assert_called_once_with([marker])
+            self.assertListEqual(sorted(os.listdir(dirpath)), ['first.yml', 'second.yml'])
+
+    @unittest.mock.patch('release_tools.entries.Project')
+    def test_shard_name_clash(self, mock_project):
+        """Check whether entries with the same name are not moved"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            self.setup_entries(dirpath)
+            cache_path = os.path.join(fs, 'cache')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.cache_path = cache_path
+            mock_repo = mock_project.return_value.repo
+
+            shard_path = os.path.join(dirpath, shard_dirname('first.yml'))
+            os.makedirs(shard_path)
+            with open(os.path.join(shard_path, 'first.yml'), mode='w') as fd:
+                fd.write(ENTRY_TEMPLATE.format(title='First', category='added'))
+
+            result = runner.invoke(entries, ['--unshard'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("have the same name", result.stderr)
+            mock_repo.mv_files.assert_not_called()
+
+    @unittest.mock.patch('release_tools.entries.Project')
+    def test_errors(self, mock_project):
+        """Check whether errors are reported"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+
+            result = runner.invoke(entries, [])
+            self.assertEqual(result.exit_code, 2)
+
+            result = runner.invoke(entries, ['--pack'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("changelog entries directory", result.stderr)
+
+            self.setup_entries(dirpath)
+
+            result = runner.invoke(entries, ['--unpack'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.stderr.split('\n')[-2], PACKED_STORE_NOT_FOUND_ERROR)
+
+            # Unpacking does not replace existing files
+            store = PackedEntryStore(dirpath)
+            store.append('first.yml', {'title': 'First'})
+
+            result = runner.invoke(entries, ['--unpack'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.stderr.split('\n')[-2],
+                             "Error: changelog entries first.yml already exist")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,8 +27,13 @@ import unittest.mock
 
 from release_tools.entry import (CategoryChange,
                                  ChangelogEntry,
+                                 SHARDED_LAYOUT_FILENAME,
                                  read_changelog_entries,
-                                 determine_filepath)
+                                 determine_filepath,
+                                 entry_filepath,
+                                 list_entry_files,
+                                 shard_dirname)
+from release_tools.store import PackedEntryStore
 
 
 class TestCategoryChange(unittest.TestCase):
@@ -203,6 +208,72 @@ class TestReadChangelogEntries(unittest.TestCase):
             entries = read_changelog_entries(dirpath)
             self.assertDictEqual(entries, {})
 
+    def test_read_packed_entries(self):
+        """Check if entries of a packed store are imported"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            store = PackedEntryStore(dirpath)
+            store.append_many({
+                'first-change.yml': {'title': 'first change', 'category': 'added',
+                                     'author': 'jsmith', 'issue': None, 'notes': None},
+                'last-change.yml': {'title': 'last change', 'category': 'fixed',
+                                    'author': 'jdoe', 'issue': 1, 'notes': None}
+            })
+
+            # YAML files take precedence
+            with open(os.path.join(dirpath, 'last-change.yml'), mode='w') as fd:
+                fd.write("---\ntitle: last change\ncategory: removed\n"
+                         "author: jdoe\nissue: 1\nnotes: null\n")
+
+            entries = read_changelog_entries(dirpath)
+            self.assertListEqual(sorted(entries), ['first-change.yml', 'last-change.yml'])
+            self.assertEqual(entries['first-change.yml'].category, CategoryChange.ADDED)
+            self.assertEqual(entries['last-change.yml'].category, CategoryChange.REMOVED)
+
+            # Even when they are stored on a shard
+            os.makedirs(os.path.join(dirpath, shard_dirname('first-change.yml')))
+            with open(entry_filepath(dirpath, 'first-change.yml', sharded=True), mode='w') as fd:
+                fd.write("---\ntitle: first change\ncategory: fixed\n"
+                         "author: jsmith\nissue: null\nnotes: null\n")
+
+            entries = read_changelog_entries(dirpath)
+            shard_path = os.path.join(shard_dirname('first-change.yml'), 'first-change.yml')
+            self.assertListEqual(sorted(entries), [shard_path, 'last-change.yml'])
+            self.assertEqual(entries[shard_path].category, CategoryChange.FIXED)
+
+    def test_read_sharded_entries(self):
+        """Check if entries stored on shard subdirectories are imported"""
+
+        content = "---\ntitle: {}\ncategory: added\nauthor: jsmith\nissue: null\nnotes: null\n"
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            open(os.path.join(dirpath, SHARDED_LAYOUT_FILENAME), mode='w').close()
+
+            for title in ['first change', 'last change']:
+                filepath = determine_filepath(dirpath, title)
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                with open(filepath, mode='w') as fd:
+                    fd.write(content.format(title))
+
+            # Flat entries and other directories are also found
+            with open(os.path.join(dirpath, 'flat-change.yml'), mode='w') as fd:
+                fd.write(content.format('flat change'))
+            os.makedirs(os.path.join(dirpath, 'processed'))
+            with open(os.path.join(dirpath, 'processed', 'old.yml'), mode='w') as fd:
+                fd.write(content.format('old change'))
+
+            expected = sorted([
+                'flat-change.yml',
+                os.path.join(shard_dirname('first-change.yml'), 'first-change.yml'),
+                os.path.join(shard_dirname('last-change.yml'), 'last-change.yml')
+            ])
+            self.assertListEqual(list_entry_files(dirpath), expected)
+
+            entries = read_changelog_entries(dirpath)
+            self.assertListEqual(sorted(entries), expected)
+            filepath = os.path.join(shard_dirname('last-change.yml'), 'last-change.yml')
+            self.assertEqual(entries[filepath].title, 'last change')
+
 
 class TestDetermineFilePath(unittest.TestCase):
     """Unit tests for determine_filepath"""
@@ -225,6 +296,19 @@ class TestDetermineFilePath(unittest.TestCase):
         filepath = determine_filepath(dirpath, '[release/publish] My "custom" change')
         self.assertEqual(filepath, expected)
 
+    def test_sharded_filepath(self):
+        """Check if the shard subdirectory is included on sharded directories"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            open(os.path.join(dirpath, SHARDED_LAYOUT_FILENAME), mode='w').close()
+
+            # Shards are the first digits of the SHA-1 of the filename
+            self.assertEqual(shard_dirname('my-change.yml'), '5f')
+
+            expected = os.path.join(dirpath, '5f', 'my-change.yml')
+            filepath = determine_filepath(dirpath, "my change")
+            self.assertEqual(filepath, expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from release_tools.farm import farm, read_manifest
+from release_tools.testing import RepositoryTemplate
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: jsmith\nissue: null\nnotes: null\n"
+)
+
+PROJECT_FILES = {
+    'pyproject.toml': '[tool.poetry]\nname = "myapp"\nversion = "0.1.0"\n',
+    'myapp/_version.py': '__version__ = "0.1.0"\n',
+    'NEWS': '',
+    'AUTHORS': ''
+}
+
+REPOSITORY_TEMPLATE = RepositoryTemplate(dict(
+    PROJECT_FILES,
+    **{'releases/unreleased/add-spells.yml': ENTRY_TEMPLATE.format(title='Add spells', category='added')}
+))
+EMPTY_REPOSITORY_TEMPLATE = RepositoryTemplate(PROJECT_FILES)
+
+
+class TestFarm(unittest.TestCase):
+    """Unit tests for farm script"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def git(self, dirpath, *args):
+        return subprocess.check_output(['git'] + list(args), cwd=dirpath,
+                                       universal_newlines=True)
+
+    def create_repository(self, name, template):
+        repo_path = template.clone(os.path.join(self.tmp_path, name))
+        remote_path = os.path.join(self.tmp_path, name + '.git')
+
+        self.git(self.tmp_path, 'init', '-q', '--bare', remote_path)
+        self.git(repo_path, 'remote', 'add', 'origin', remote_path)
+
+        return repo_path, remote_path
+
+    def write_manifest(self, content):
+        filepath = os.path.join(self.tmp_path, 'manifest.yml')
+
+        with open(filepath, 'w') as fd:
+            fd.write(content)
+
+        return filepath
+
+    def test_farm(self):
+        """Check whether every repository is released"""
+
+        _, remote_a = self.create_repository('a', REPOSITORY_TEMPLATE)
+        _, remote_b = self.create_repository('b', REPOSITORY_TEMPLATE)
+
+        manifest = self.write_manifest(
+            "---\n"
+            "defaults:\n"
+            "  author: John Smith <jsmith@example.com>\n"
+            "  remote: origin\n"
+            "repositories:\n"
+            "  - path: a\n"
+            "    name: MyApp A\n"
+            "  - path: b\n"
+            "    name: MyApp B\n"
+            "    bump_version: major\n"
+        )
+        log_dir = os.path.join(self.tmp_path, 'logs')
+
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(farm, [manifest, '--jobs', '2', '--log-dir', log_dir])
+
+        self.assertEqual(result.exit_code, 0, msg=result.stderr)
+        self.assertRegex(result.stdout, r"a\s+0\.2\.0\s+released")
+        self.assertRegex(result.stdout, r"b\s+1\.0\.0\s+released")
+        self.assertTrue(result.stdout.endswith("2 released\n"))
+        self.assertRegex(result.stderr, r"\[2/2\] .*: released")
+
+        self.assertEqual(self.git(remote_a, 'tag').strip(), '0.2.0')
+        self.assertEqual(self.git(remote_b, 'tag').strip(), '1.0.0')
+
+        self.assertListEqual(sorted(os.listdir(log_dir)), ['001-a.log', '002-b.log'])
+
+        with open(os.path.join(log_dir, '001-a.log'), 'r') as fd:
+            log = fd.read()
+        self.assertIn("Release 0.2.0 committed and tagged", log)
+        self.assertIn("Release 0.2.0 pushed to origin", log)
+
+    def test_failed_release(self):
+        """Check whether a failed release does not stop the others"""
+
+        self.create_repository('a', REPOSITORY_TEMPLATE)
+        self.create_repository('empty', EMPTY_REPOSITORY_TEMPLATE)
+
+        manifest = self.write_manifest(
+            "---\n"
+            "defaults:\n"
+            "  author: John Smith <jsmith@example.com>\n"
+            "repositories:\n"
+            "  - path: empty\n"
+            "    name: Empty\n"
+            "  - path: a\n"
+            "    name: MyApp A\n"
+        )
+        log_dir = os.path.join(self.tmp_path, 'logs')
+        report = os.path.join(self.tmp_path, 'report.json')
+
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(farm, [manifest, '--jobs', '2',
+                                      '--log-dir', log_dir, '--report', report])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertRegex(result.stdout, r"empty\s+-\s+failed: ")
+        self.assertTrue(result.stdout.endswith("1 released, 1 failed\n"))
+        self.assertEqual(result.stderr.splitlines()[-1], "Error: 1 of 2 repositories failed")
+
+        self.assertEqual(self.git(os.path.join(self.tmp_path, 'a'), 'tag').strip(), '0.2.0')
+        self.assertEqual(self.git(os.path.join(self.tmp_path, 'empty'), 'tag').strip(), '')
+
+        with open(report, 'r') as fd:
+            data = json.load(fd)
+
+        self.assertDictEqual(data['summary'], {'released': 1, 'checked': 0, 'failed': 1})
+        self.assertEqual(data['repositories'][0]['status'], 'failed')
+        self.assertIsNone(data['repositories'][0]['version'])
+        self.assertEqual(data['repositories'][0]['log'], os.path.join(log_dir, '001-empty.log'))
+        self.assertEqual(data['repositories'][1]['version'], '0.2.0')
+
+        with open(os.path.join(log_dir, '001-empty.log'), 'r') as fd:
+            self.assertIn("Error: " + data['repositories'][0]['error'], fd.read())
+
+    def test_dry_run(self):
+        """Check whether repositories are not modified on dry run mode"""
+
+        repo_path, _ = self.create_repository('a', REPOSITORY_TEMPLATE)
+        head = self.git(repo_path, 'rev-parse', 'HEAD')
+
+        manifest = self.write_manifest(
+            "---\n"
+            "repositories:\n"
+            "  - path: a\n"
+            "    name: MyApp A\n"
+            "    author: John Smith <jsmith@example.com>\n"
+        )
+
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(farm, [manifest, '--dry-run',
+                                      '--log-dir', os.path.join(self.tmp_path, 'logs')])
+
+        self.assertEqual(result.exit_code, 0, msg=result.stderr)
+        self.assertRegex(result.stdout, r"a\s+0\.2\.0\s+checked")
+        self.assertEqual(self.git(repo_path, 'rev-parse', 'HEAD'), head)
+        self.assertEqual(self.git(repo_path, 'status', '--porcelain'), '')
+
+    def test_invalid_manifest(self):
+        """Check whether invalid manifests are rejected"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        manifests = [
+            ("---\nrepositories: a\n",
+             "invalid manifest; 'repositories' must be a list"),
+            ("---\nrepositories:\n  - path: a\n    name: A\n",
+             "invalid manifest; repository 1: 'author' not set"),
+            ("---\nrepositories:\n  - path: a\n    name: A\n    author: jsmith\n    tag: 1\n",
+             "invalid manifest; repository 1: unknown field 'tag'"),
+            ("---\nrepositories: []\n",
+             "no repositories found in manifest")
+        ]
+
+        for content, error in manifests:
+            manifest = self.write_manifest(content)
+            result = runner.invoke(farm, [manifest, '--log-dir', os.path.join(self.tmp_path, 'logs')])
+
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.stderr, "Error: " + error + "\n")
+
+    def test_read_manifest(self):
+        """Check whether defaults are applied and paths are relative to the manifest"""
+
+        manifest = self.write_manifest(
+            "---\n"
+            "defaults:\n"
+            "  author: jsmith\n"
+            "  news: true\n"
+            "repositories:\n"
+            "  - path: a\n"
+            "    name: A\n"
+            "  - path: sub/b\n"
+            "    name: B\n"
+            "    author: jdoe\n"
+            "    news: false\n"
+        )
+
+        repositories = read_manifest(manifest)
+
+        self.assertEqual(len(repositories), 2)
+        self.assertEqual(repositories[0].path, os.path.join(self.tmp_path, 'a'))
+        self.assertEqual(repositories[0].author, 'jsmith')
+        self.assertTrue(repositories[0].news)
+        self.assertEqual(repositories[0].remote_branch, 'master')
+        self.assertEqual(repositories[1].path, os.path.join(self.tmp_path, 'sub', 'b'))
+        self.assertEqual(repositories[1].author, 'jdoe')
+        self.assertFalse(repositories[1].news)
+
+
+if __name__ == "__main__":
+    unittest.main()
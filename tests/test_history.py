@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import click.testing
+
+from release_tools.archive import write_release_archive
+from release_tools.entry import (CategoryChange,
+                                 ChangelogEntry)
+from release_tools.history import (read_release_history,
+                                   read_release_tags)
+from release_tools.notes import notes
+from release_tools.project import Project
+from release_tools.store import PackedEntryStore
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: jsmith\nissue: {issue}\nnotes: null\n"
+)
+RELEASE_NOTES_0_1_0 = """## release-tools 0.1.0 - (2019-01-01)
+
+**New features:**
+
+ * first feature (#1)
+
+**Bug fixes:**
+
+ * first bug fix
+
+"""
+RELEASE_NOTES_0_2_0_RC_1 = """## release-tools 0.2.0-rc.1 - (2019-01-01)
+
+**New features:**
+
+ * second feature
+
+"""
+RELEASE_NOTES_0_2_0 = """## release-tools 0.2.0 - (2019-01-01)
+
+**New features:**
+
+ * second feature
+
+**Bug fixes:**
+
+ * second bug fix (#2)
+
+"""
+NEWS_FILE_CONTENT = (
+    "# Releases\n\n" + RELEASE_NOTES_0_2_0 + "\n" + RELEASE_NOTES_0_2_0_RC_1 + "\n" + RELEASE_NOTES_0_1_0
+)
+NO_RELEASE_TAGS_ERROR = "Error: no release tags found"
+FILES_DO_NOT_MATCH_ERROR = "Error: 1 rebuilt files do not match the existing ones"
+VERIFY_ERROR = "Error: '--verify' flag must be set together with '--rebuild-history'"
+
+
+class TestCaseReleaseHistory(unittest.TestCase):
+    """Base class to test release histories on a Git repo"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.git_path = os.path.join(self.tmp_path, 'repo')
+        self.changes_path = os.path.join(self.git_path, 'releases', 'unreleased')
+        self.gitenv = dict(os.environ,
+                           GIT_AUTHOR_NAME='John Smith',
+                           GIT_AUTHOR_EMAIL='jsmith@example.com',
+                           GIT_COMMITTER_NAME='John Smith',
+                           GIT_COMMITTER_EMAIL='jsmith@example.com',
+                           GIT_AUTHOR_DATE='2019-01-01T12:00:00+00:00',
+                           GIT_COMMITTER_DATE='2019-01-01T12:00:00+00:00')
+
+        os.makedirs(self.changes_path)
+        self.git('init', '-q')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def git(self, *args):
+        subprocess.check_call(['git'] + list(args), cwd=self.git_path,
+                              env=self.gitenv, stdout=subprocess.DEVNULL)
+
+    def add_entry(self, filename, title, category, issue='null'):
+        filepath = os.path.join(self.changes_path, filename)
+        os.makedirs(self.changes_path, exist_ok=True)
+
+        with open(filepath, mode='w') as fd:
+            fd.write(ENTRY_TEMPLATE.format(title=title,
+                                           category=category.category,
+                                           issue=issue))
+        self.git('add', filepath)
+
+    def release(self, version):
+        self.git('commit', '-q', '--allow-empty', '-m', 'Release ' + version)
+        self.git('tag', '-a', version, '-m', 'Release ' + version)
+
+    def setup_release_history(self):
+        """Create a history with a final release, a candidate and a final release"""
+
+        self.add_entry('a.yml', 'first feature', CategoryChange.ADDED, issue=1)
+        self.add_entry('b.yml', 'first bug fix', CategoryChange.FIXED)
+        self.git('commit', '-q', '-m', 'Add entries')
+        self.git('tag', 'not-a-release')
+
+        self.git('rm', '-q', 'releases/unreleased/a.yml', 'releases/unreleased/b.yml')
+        self.release('0.1.0')
+
+        self.add_entry('c.yml', 'second feature', CategoryChange.ADDED)
+        self.git('commit', '-q', '-m', 'Add entry')
+
+        os.makedirs(os.path.join(self.changes_path, 'processed'))
+        self.git('mv', 'releases/unreleased/c.yml', 'releases/unreleased/processed/c.yml')
+        self.release('0.2.0-rc.1')
+
+        self.add_entry('d.yml', 'second bug fix', CategoryChange.FIXED, issue=2)
+        self.git('commit', '-q', '-m', 'Add entry')
+
+        self.git('rm', '-q', 'releases/unreleased/processed/c.yml', 'releases/unreleased/d.yml')
+        self.release('0.2.0')
+
+
+class TestReadReleaseHistory(TestCaseReleaseHistory):
+    """Unit tests for read_release_history"""
+
+    def test_read_release_tags(self):
+        """Check if only release tags are returned sorted by version"""
+
+        self.setup_release_history()
+
+        project = Project(self.git_path)
+        tags = read_release_tags(project)
+
+        expected = [
+            ('0.1.0', '2019-01-01'),
+            ('0.2.0-rc.1', '2019-01-01'),
+            ('0.2.0', '2019-01-01')
+        ]
+        self.assertListEqual(tags, expected)
+
+    def test_read_release_history(self):
+        """Check if the entries of each release are recovered"""
+
+        self.setup_release_history()
+
+        project = Project(self.git_path)
+        releases = read_release_history(project)
+
+        self.assertEqual(len(releases), 3)
+
+        self.assertEqual(releases[0].version, '0.1.0')
+        self.assertEqual(releases[0].date, '2019-01-01')
+        self.assertListEqual(sorted(releases[0].entries), ['a.yml', 'b.yml'])
+        self.assertEqual(releases[0].entries['a.yml'].title, 'first feature')
+        self.assertEqual(releases[0].entries['a.yml'].issue, 1)
+        self.assertEqual(releases[0].entries['b.yml'].category, CategoryChange.FIXED)
+
+        self.assertEqual(releases[1].version, '0.2.0-rc.1')
+        self.assertListEqual(sorted(releases[1].entries), ['c.yml'])
+        self.assertEqual(releases[1].entries['c.yml'].title, 'second feature')
+
+        self.assertEqual(releases[2].version, '0.2.0')
+        self.assertListEqual(sorted(releases[2].entries), ['c.yml', 'd.yml'])
+        self.assertEqual(releases[2].entries['d.yml'].title, 'second bug fix')
+
+    def test_resharded_entries(self):
+        """Check if entries moved between shards are not part of the release"""
+
+        self.add_entry('a.yml', 'first feature', CategoryChange.ADDED)
+        self.add_entry('b.yml', 'first bug fix', CategoryChange.FIXED)
+        self.git('commit', '-q', '-m', 'Add entries')
+
+        os.makedirs(os.path.join(self.changes_path, 'ab'))
+        self.git('mv', 'releases/unreleased/a.yml', 'releases/unreleased/ab/a.yml')
+        self.git('rm', '-q', 'releases/unreleased/b.yml')
+        self.release('0.1.0')
+
+        self.git('rm', '-q', 'releases/unreleased/ab/a.yml')
+        self.release('0.2.0')
+
+        project = Project(self.git_path)
+        releases = read_release_history(project)
+
+        self.assertEqual(len(releases), 2)
+        self.assertListEqual(sorted(releases[0].entries), ['b.yml'])
+        self.assertListEqual(sorted(releases[1].entries), ['a.yml'])
+
+    def test_packed_entries(self):
+        """Check if entries kept on packed stores are part of the releases"""
+
+        entry = ChangelogEntry('packed feature', 'added', 'jsmith', issue=3).to_dict()
+        fixed = ChangelogEntry('packed bug fix', 'fixed', 'jsmith').to_dict()
+
+        self.add_entry('a.yml', 'first feature', CategoryChange.ADDED)
+        store = PackedEntryStore(self.changes_path)
+        store.append_many({'p.yml': entry, 'q.yml': fixed})
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'Add entries')
+
+        # Packing an entry does not release it
+        self.git('rm', '-q', 'releases/unreleased/a.yml')
+        store.append('a.yml', ChangelogEntry('first feature', 'added', 'jsmith').to_dict())
+        os.makedirs(os.path.join(self.changes_path, 'processed'))
+        processed = PackedEntryStore(os.path.join(self.changes_path, 'processed'))
+        processed.append('p.yml', store.read('p.yml'))
+        store.delete('p.yml')
+        self.git('add', '-A')
+        self.release('0.1.0-rc.1')
+
+        processed.remove()
+        store.remove()
+        self.git('add', '-A')
+        self.release('0.1.0')
+
+        project = Project(self.git_path)
+        releases = read_release_history(project)
+
+        self.assertEqual(len(releases), 2)
+        self.assertListEqual(sorted(releases[0].entries), ['p.yml'])
+        self.assertEqual(releases[0].entries['p.yml'].title, 'packed feature')
+        self.assertEqual(releases[0].entries['p.yml'].issue, 3)
+        self.assertListEqual(sorted(releases[1].entries), ['a.yml', 'p.yml', 'q.yml'])
+        self.assertEqual(releases[1].entries['q.yml'].category, CategoryChange.FIXED)
+
+    def test_read_archived_releases(self):
+        """Check if entries of archived releases are read from their archives"""
+
+        self.setup_release_history()
+
+        archive = {'z.yml': ChangelogEntry('archived feature', 'added', 'jsmith')}
+        os.makedirs(os.path.join(self.git_path, 'releases'), exist_ok=True)
+        write_release_archive(os.path.join(self.git_path, 'releases', '0.2.0.jsonl.gz'), archive)
+
+        project = Project(self.git_path)
+        releases = read_release_history(project)
+
+        self.assertEqual(len(releases), 3)
+        self.assertListEqual(sorted(releases[0].entries), ['a.yml', 'b.yml'])
+        self.assertListEqual(sorted(releases[1].entries), ['c.yml'])
+        self.assertListEqual(sorted(releases[2].entries), ['z.yml'])
+        self.assertEqual(releases[2].entries['z.yml'].title, 'archived feature')
+
+    def test_no_releases(self):
+        """Check if an empty list is returned when there are no releases"""
+
+        self.add_entry('a.yml', 'first feature', CategoryChange.ADDED)
+        self.git('commit', '-q', '-m', 'Add entries')
+
+        project = Project(self.git_path)
+        releases = read_release_history(project)
+
+        self.assertListEqual(releases, [])
+
+
+class TestRebuildReleaseHistory(TestCaseReleaseHistory):
+    """Unit tests for notes command with '--rebuild-history' flag"""
+
+    def setUp(self):
+        super().setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.git_path)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        super().tearDown()
+
+    def read_file(self, filename):
+        with open(os.path.join(self.git_path, filename), 'r') as fd:
+            return fd.read()
+
+    def test_rebuild_history(self):
+        """Check if the release notes of every release are generated"""
+
+        self.setup_release_history()
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+        result = runner.invoke(notes, ['--rebuild-history', '--news', 'release-tools'])
+        self.assertEqual(result.exit_code, 0)
+
+        self.assertEqual(self.read_file('releases/0.1.0.md'), RELEASE_NOTES_0_1_0)
+        self.assertEqual(self.read_file('releases/0.2.0-rc.1.md'), RELEASE_NOTES_0_2_0_RC_1)
+        self.assertEqual(self.read_file('releases/0.2.0.md'), RELEASE_NOTES_0_2_0)
+        self.assertEqual(self.read_file('NEWS'), NEWS_FILE_CONTENT)
+
+    def test_verify_history(self):
+        """Check if rebuilt files are compared with the existing ones"""
+
+        self.setup_release_history()
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+        result = runner.invoke(notes, ['--rebuild-history', 'release-tools'])
+        self.assertEqual(result.exit_code, 0)
+
+        result = runner.invoke(notes, ['--rebuild-history', '--verify', 'release-tools'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("File '0.2.0.md' matches", result.stdout)
+
+        # Change the contents of a file
+        with open(os.path.join(self.git_path, 'releases', '0.2.0.md'), 'a') as fd:
+            fd.write('\n')
+
+        result = runner.invoke(notes, ['--rebuild-history', '--verify', 'release-tools'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("File '0.2.0.md' differs", result.stdout)
+
+        lines = result.stderr.split('\n')
+        self.assertEqual(lines[-2], FILES_DO_NOT_MATCH_ERROR)
+
+        # Files were not replaced
+        self.assertEqual(self.read_file('releases/0.2.0.md'), RELEASE_NOTES_0_2_0 + '\n')
+
+    def test_no_release_tags(self):
+        """Check if it fails when there are no releases to rebuild"""
+
+        self.add_entry('a.yml', 'first feature', CategoryChange.ADDED)
+        self.git('commit', '-q', '-m', 'Add entries')
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+        result = runner.invoke(notes, ['--rebuild-history', 'release-tools'])
+        self.assertEqual(result.exit_code, 1)
+
+        lines = result.stderr.split('\n')
+        self.assertEqual(lines[-2], NO_RELEASE_TAGS_ERROR)
+
+    def test_verify_without_rebuild(self):
+        """Check if '--verify' requires '--rebuild-history'"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+        result = runner.invoke(notes, ['--verify', 'release-tools', '0.2.0'])
+        self.assertEqual(result.exit_code, 1)
+
+        lines = result.stderr.split('\n')
+        self.assertEqual(lines[-2], VERIFY_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.entry import (MAX_FILENAME_LENGTH,
+                                 SHARDED_LAYOUT_FILENAME,
+                                 shard_dirname)
+from release_tools.names import (EntryNameIndex,
+                                 open_entry_name_index)
+from release_tools.store import PackedEntryStore
+
+
+def touch(filepath):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, mode='w') as fd:
+        fd.write('---\n')
+
+
+class TestEntryNameIndex(unittest.TestCase):
+    """Unit tests for EntryNameIndex"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.dirpath = os.path.join(self.tmp_path.name, 'unreleased')
+        self.processed_path = os.path.join(self.dirpath, 'processed')
+        self.index_path = os.path.join(self.tmp_path.name, 'cache', 'entry-names.json')
+
+        touch(os.path.join(self.dirpath, 'first.yml'))
+        touch(os.path.join(self.processed_path, 'processed.yml'))
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def test_build(self):
+        """Check whether names of files, shards and stores are indexed"""
+
+        open(os.path.join(self.processed_path, SHARDED_LAYOUT_FILENAME), mode='w').close()
+        touch(os.path.join(self.processed_path, shard_dirname('sharded.yml'), 'sharded.yml'))
+        PackedEntryStore(self.dirpath).append('packed.yml', {'title': 'packed'})
+
+        index = EntryNameIndex(self.index_path, [self.dirpath, self.processed_path])
+        index.build()
+
+        self.assertEqual(len(index), 4)
+        for name in ['first.yml', 'packed.yml', 'processed.yml', 'sharded.yml']:
+            self.assertIn(name, index)
+        self.assertNotIn('missing.yml', index)
+
+    def test_build_packed_index(self):
+        """Check whether the saved index of the packed store is reused"""
+
+        cache_path = os.path.dirname(self.index_path)
+        PackedEntryStore(self.dirpath, cache_path=cache_path).append('packed.yml', {'title': 'packed'})
+
+        index = EntryNameIndex(self.index_path, [self.dirpath, self.processed_path],
+                               cache_path=cache_path)
+
+        with unittest.mock.patch.object(PackedEntryStore, '_scan') as mock_scan:
+            index.build()
+            mock_scan.assert_not_called()
+
+        self.assertIn('packed.yml', index)
+
+    def test_reserve(self):
+        """Check whether suffixes are added to names in use"""
+
+        index = EntryNameIndex(self.index_path, [self.dirpath, self.processed_path])
+        index.build()
+
+        self.assertEqual(index.reserve('new.yml'), 'new.yml')
+        self.assertEqual(index.reserve('first.yml'), 'first-2.yml')
+        self.assertEqual(index.reserve('first.yml'), 'first-3.yml')
+        self.assertEqual(index.reserve('processed.yml'), 'processed-2.yml')
+        self.assertEqual(index.reserve('new.yml'), 'new-2.yml')
+
+        # Long names are truncated to keep the suffix
+        long_name = 'a' * (MAX_FILENAME_LENGTH - 1) + '.yml'
+        self.assertEqual(index.reserve(long_name), long_name)
+
+        name = index.reserve(long_name)
+        self.assertEqual(name, 'a' * (MAX_FILENAME_LENGTH - 3) + '-2.yml')
+        self.assertEqual(len(name), len(long_name))
+
+    def test_save_and_load(self):
+        """Check whether the index is valid until the directories change"""
+
+        index = EntryNameIndex(self.index_path, [self.dirpath, self.processed_path])
+        self.assertFalse(index.load())
+        self.assertFalse(index.is_valid())
+
+        index.build()
+        index.save()
+
+        index = EntryNameIndex(self.index_path, [self.dirpath, self.processed_path])
+        self.assertTrue(index.load())
+        self.assertTrue(index.is_valid())
+        self.assertIn('processed.yml', index)
+
+        # Indexes of other directories are not loaded
+        other = EntryNameIndex(self.index_path, [self.dirpath])
+        self.assertFalse(other.load())
+
+        # Adding entries or creating stores invalidates the index
+        st = os.stat(self.dirpath)
+        touch(os.path.join(self.dirpath, 'second.yml'))
+        os.utime(self.dirpath, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        self.assertFalse(index.is_valid())
+
+        index.build()
+        index.save()
+        self.assertTrue(index.is_valid())
+
+        PackedEntryStore(self.processed_path).append('packed.yml', {'title': 'packed'})
+        self.assertFalse(index.is_valid())
+
+    def test_open_entry_name_index(self):
+        """Check whether the index of a project is built and reused"""
+
+        project = unittest.mock.Mock()
+        project.cache_path = os.path.dirname(self.index_path)
+        project.unreleased_changes_path = self.dirpath
+        project.unreleased_processed_entries_path = self.processed_path
+
+        index = open_entry_name_index(project)
+        self.assertListEqual(sorted(index.names), ['first.yml', 'processed.yml'])
+        index.save()
+
+        with unittest.mock.patch.object(EntryNameIndex, 'build') as mock_build:
+            index = open_entry_name_index(project)
+            mock_build.assert_not_called()
+            self.assertListEqual(sorted(index.names), ['first.yml', 'processed.yml'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import click.testing
+
+from release_tools.news import NewsIndex
+from release_tools.notes import notes
+
+
+SECTION_0_1_0 = """## release-tools 0.1.0 - (2019-01-01)
+
+**New features:**
+
+ * Première feature (#1)\\
+   Lorem ipsum dolor sit amet."""
+SECTION_0_2_0 = """## release-tools 0.2.0 - (2019-02-01)
+
+No changes list available."""
+NEWS_FILE_CONTENT = (
+    "# Releases\n\n" + SECTION_0_2_0 + "\n\n\n" + SECTION_0_1_0 + "\n\n"
+)
+ENTRY_CONTENT = (
+    "---\ntitle: Third feature\ncategory: added\n"
+    "author: jsmith\nissue: null\nnotes: null\n"
+)
+SECTION_0_3_0 = """## release-tools 0.3.0 - (2019-03-01)
+
+**New features:**
+
+ * Third feature"""
+VERSION_NOT_FOUND_ERROR = "Error: version 0.0.1 not found in news file"
+
+
+class TestNewsIndex(unittest.TestCase):
+    """Unit tests for NewsIndex"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.index_file = os.path.join(self.tmp_path.name, 'cache', 'index.json')
+        self.news_file = os.path.join(self.tmp_path.name, 'NEWS')
+
+        with open(self.news_file, mode='w') as fd:
+            fd.write(NEWS_FILE_CONTENT)
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def test_build(self):
+        """Check if the sections of the news file are indexed"""
+
+        index = NewsIndex(self.index_file, self.news_file)
+        index.build()
+
+        self.assertListEqual(sorted(index.sections), ['0.1.0', '0.2.0'])
+        self.assertListEqual(index.sections['0.2.0'], [12, len(SECTION_0_2_0)])
+
+        self.assertEqual(index.read_section('0.1.0'), SECTION_0_1_0)
+        self.assertEqual(index.read_section('0.2.0'), SECTION_0_2_0)
+        self.assertIsNone(index.read_section('0.3.0'))
+
+    def test_build_missing_file(self):
+        """Check if the index is empty when the news file does not exist"""
+
+        index = NewsIndex(self.index_file, self.news_file + '.missing')
+        index.build()
+
+        self.assertDictEqual(index.sections, {})
+        self.assertIsNone(index.read_section('0.1.0'))
+
+    def test_save_and_load(self):
+        """Check if the index is stored together with the status of the news file"""
+
+        index = NewsIndex(self.index_file, self.news_file)
+        index.build()
+        index.save()
+
+        index = NewsIndex(self.index_file, self.news_file)
+        self.assertFalse(index.is_valid())
+
+        index.load()
+        self.assertTrue(index.is_valid())
+        self.assertEqual(index.read_section('0.1.0'), SECTION_0_1_0)
+
+        # Modifying the news file invalidates the index
+        with open(self.news_file, mode='a') as fd:
+            fd.write('\n')
+
+        self.assertFalse(index.is_valid())
+
+
+class TestNotesNewsIndex(unittest.TestCase):
+    """Unit tests for the news index on notes script"""
+
+    def setup_project(self, mock_project, fs):
+        changes_path = os.path.join(fs, 'releases', 'unreleased')
+        news_file = os.path.join(fs, 'NEWS')
+
+        os.makedirs(changes_path)
+
+        with open(os.path.join(changes_path, 'third-feature.yml'), mode='w') as fd:
+            fd.write(ENTRY_CONTENT)
+
+        with open(news_file, mode='w') as fd:
+            fd.write(NEWS_FILE_CONTENT)
+
+        mock_project.return_value.basepath = fs
+        mock_project.return_value.news_file = news_file
+        mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+        mock_project.return_value.unreleased_changes_path = changes_path
+        mock_project.return_value.unreleased_processed_entries_path = os.path.join(changes_path, 'processed')
+        mock_project.return_value.repo.mv = os.rename
+
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_show(self, mock_project):
+        """Check if the section of a version is printed"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            self.setup_project(mock_project, fs)
+
+            result = runner.invoke(notes, ['--show', '0.1.0'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, SECTION_0_1_0 + '\n')
+
+            # The index was created
+            self.assertTrue(os.path.exists(os.path.join(fs, 'cache', 'news-index.json')))
+
+            result = runner.invoke(notes, ['--show', '0.0.1'])
+            self.assertEqual(result.exit_code, 1)
+
+            lines = result.stderr.split('\n')
+            self.assertEqual(lines[-2], VERSION_NOT_FOUND_ERROR)
+
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_news_update_index(self, mock_project, mock_utcnow):
+        """Check if the index is updated when the news file is updated"""
+
+        mock_utcnow.return_value = "2019-03-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            self.setup_project(mock_project, fs)
+
+            result = runner.invoke(notes, ['--show', '0.2.0'])
+            self.assertEqual(result.exit_code, 0)
+
+            result = runner.invoke(notes, ['--news', 'release-tools', '0.3.0'])
+            self.assertEqual(result.exit_code, 0)
+
+            # The index was updated without scanning the file
+            with unittest.mock.patch('release_tools.news.NewsIndex.build') as mock_build:
+                for version, section in [('0.1.0', SECTION_0_1_0),
+                                         ('0.2.0', SECTION_0_2_0),
+                                         ('0.3.0', SECTION_0_3_0)]:
+                    result = runner.invoke(notes, ['--show', version])
+                    self.assertEqual(result.exit_code, 0)
+                    self.assertEqual(result.stdout, section + '\n')
+                mock_build.assert_not_called()
+
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_news_first_write(self, mock_project, mock_utcnow):
+        """Check if the index is built on the first write of the news file"""
+
+        mock_utcnow.return_value = "2019-03-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            self.setup_project(mock_project, fs)
+
+            result = runner.invoke(notes, ['--news', 'release-tools', '0.3.0'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue(os.path.exists(os.path.join(fs, 'cache', 'news-index.json')))
+
+            with open(os.path.join(fs, 'NEWS'), mode='r') as fd:
+                expected = NEWS_FILE_CONTENT.replace("# Releases\n\n",
+                                                     "# Releases\n\n" + SECTION_0_3_0 + "\n\n\n")
+                self.assertEqual(fd.read(), expected)
+
+            with unittest.mock.patch('release_tools.news.NewsIndex.build') as mock_build:
+                for version, section in [('0.1.0', SECTION_0_1_0),
+                                         ('0.2.0', SECTION_0_2_0),
+                                         ('0.3.0', SECTION_0_3_0)]:
+                    result = runner.invoke(notes, ['--show', version])
+                    self.assertEqual(result.exit_code, 0)
+                    self.assertEqual(result.stdout, section + '\n')
+                mock_build.assert_not_called()
+
+            # The same notes are not added twice
+            result = runner.invoke(notes, ['--news', '--overwrite', 'release-tools', '0.3.0'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("News file unchanged", result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
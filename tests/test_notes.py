@@ -29,9 +29,14 @@ import unittest.mock
 
 import click.testing
 
-from release_tools.notes import notes, ReleaseNotesComposer
-from release_tools.entry import CategoryChange
+from release_tools.notes import notes, ReleaseNotesComposer, warn_invalid_trailers
+from release_tools.entry import (CategoryChange,
+                                 ChangelogEntry,
+                                 SHARDED_LAYOUT_FILENAME,
+                                 read_changelog_entries,
+                                 shard_dirname)
 from release_tools.repo import RepositoryError
+from release_tools.store import PackedEntryStore
 
 
 RELEASE_NOTES_CONTENT = """## release-tools 0.8.10 - (2019-01-01)
@@ -209,6 +214,134 @@ class TestNotes(unittest.TestCase):
             self.assertListEqual(sorted(os.listdir(processed_changes_path)),
                                  ['0.yml', '1.yml', '2.yml', '3.yml', '4.yml'])
 
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_release_notes_packed_entries(self, mock_project, mock_utcnow):
+        """Check if it generates release notes from packed entries"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            processed_changes_path = os.path.join(changes_path, 'processed')
+            self.setup_unreleased_entries(changes_path)
+
+            # Pack the entries
+            entries = read_changelog_entries(changes_path)
+            store = PackedEntryStore(changes_path)
+            store.append_many({name: entry.to_dict() for name, entry in entries.items()})
+            for name in entries:
+                os.remove(os.path.join(changes_path, name))
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = processed_changes_path
+
+            result = runner.invoke(notes, ['release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0)
+
+            filepath = os.path.join(fs, 'releases', '0.8.10.md')
+            with open(filepath, 'r') as fd:
+                self.assertEqual(fd.read(), RELEASE_NOTES_CONTENT)
+
+            # Entries were moved to the processed store
+            processed = PackedEntryStore(processed_changes_path)
+            self.assertListEqual(store.names(), [])
+            self.assertListEqual(processed.names(), ['0.yml', '1.yml', '2.yml', '3.yml', '4.yml'])
+            mock_project.return_value.repo.add_files.assert_called_once_with([store.filepath,
+                                                                              processed.filepath])
+
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_release_notes_sharded_entries(self, mock_project, mock_utcnow):
+        """Check if entries of sharded directories are read and moved"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            processed_changes_path = os.path.join(changes_path, 'processed')
+            self.setup_unreleased_entries(changes_path)
+
+            # Shard the entries
+            filenames = ['0.yml', '1.yml', '2.yml', '3.yml', '4.yml']
+            open(os.path.join(changes_path, SHARDED_LAYOUT_FILENAME), mode='w').close()
+            for filename in filenames:
+                shard_path = os.path.join(changes_path, shard_dirname(filename))
+                os.makedirs(shard_path)
+                os.rename(os.path.join(changes_path, filename),
+                          os.path.join(shard_path, filename))
+
+            # Shards already in the processed directory are not replaced
+            os.makedirs(os.path.join(processed_changes_path, shard_dirname('1.yml')))
+            open(os.path.join(processed_changes_path, SHARDED_LAYOUT_FILENAME), mode='w').close()
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = processed_changes_path
+            mock_repo = mock_project.return_value.repo
+            mock_repo.mv.side_effect = os.rename
+
+            result = runner.invoke(notes, ['release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+            filepath = os.path.join(fs, 'releases', '0.8.10.md')
+            with open(filepath, 'r') as fd:
+                self.assertEqual(fd.read(), RELEASE_NOTES_CONTENT)
+
+            expected = sorted(os.path.join(shard_dirname(f), f) for f in filenames)
+            self.assertListEqual(sorted(read_changelog_entries(processed_changes_path)), expected)
+            self.assertDictEqual(read_changelog_entries(changes_path), {})
+
+            # Whole shards are moved with a single call
+            shard = shard_dirname('0.yml')
+            mock_repo.mv.assert_any_call(os.path.join(changes_path, shard),
+                                         os.path.join(processed_changes_path, shard))
+            shard = shard_dirname('1.yml')
+            mock_repo.mv.assert_any_call(os.path.join(changes_path, shard, '1.yml'),
+                                         os.path.join(processed_changes_path, shard, '1.yml'))
+            self.assertEqual(mock_repo.mv.call_count, 5)
+
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_check_duplicates(self, mock_project, mock_utcnow):
+        """Check if near-duplicate entries are reported as warnings"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            processed_changes_path = os.path.join(changes_path, 'processed')
+            self.setup_unreleased_entries(changes_path)
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = processed_changes_path
+
+            params = ['release-tools', '0.8.10', '--dry-run', '--check-duplicates']
+
+            # Entries with the same long notes are also similar
+            result = runner.invoke(notes, params)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stderr,
+                             "Warning: possible duplicate entries 'first feature', 'another fix'\n")
+
+            with open(os.path.join(changes_path, '5.yml'), mode='w') as fd:
+                fd.write("---\ntitle: second features\ncategory: added\n"
+                         "author: jsmith\nissue: null\nnotes: null\n")
+
+            result = runner.invoke(notes, params)
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn("Warning: possible duplicate entries 'second feature', 'second features'\n",
+                          result.stderr)
+            self.assertIn(" * second features", result.stdout)
+
     @unittest.mock.patch('release_tools.changelog.Project')
     def test_entry_repository_error(self, mock_project):
         """Check if it stops working when it encounters RepositoryError exception"""
@@ -263,6 +396,48 @@ class TestNotes(unittest.TestCase):
             self.assertListEqual(sorted(os.listdir(changes_path)),
                                  ['0.yml', '1.yml', '2.yml', '3.yml', '4.yml'])
 
+    @unittest.mock.patch('release_tools.notes.read_trailer_entries')
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_trailers(self, mock_project, mock_utcnow, mock_read_trailers):
+        """Check if entries defined by commit trailers are included in the notes"""
+
+        mock_utcnow.return_value = "2019-01-01"
+        mock_read_trailers.return_value = {
+            'commit:abc': ChangelogEntry('Fix crash', 'fixed', 'John Smith', issue=42)
+        }
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(changes_path,
+                                                                                       'processed')
+
+            # The entries directory is not needed
+            result = runner.invoke(notes, ['--dry-run', '--trailers', 'release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn("**Bug fixes:**\n\n * Fix crash (#42)\n", result.stdout)
+
+            mock_read_trailers.assert_called_once_with(mock_project.return_value,
+                                                       pre_release=False,
+                                                       on_invalid=warn_invalid_trailers)
+
+            self.setup_unreleased_entries(changes_path)
+
+            result = runner.invoke(notes, ['--dry-run', '--trailers', '--pre-release',
+                                           'release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn(" * Fix crash (#42)\n", result.stdout)
+            self.assertIn(" * first bug fix (#2)\n", result.stdout)
+
+            mock_read_trailers.assert_called_with(mock_project.return_value,
+                                                  pre_release=True,
+                                                  on_invalid=warn_invalid_trailers)
+
     @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
     @unittest.mock.patch('release_tools.notes.Project')
     def test_news_update(self, mock_project, mock_utcnow):
@@ -298,6 +473,50 @@ class TestNotes(unittest.TestCase):
 
             self.assertEqual(text, NEWS_FILE_CONTENT)
 
+    @unittest.mock.patch('release_tools.notes.NEWS_BLOCK_SIZE', 16)
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_news_update_blocks(self, mock_project, mock_utcnow):
+        """Check if the news file is copied in blocks"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            news_file = os.path.join(fs, 'NEWS')
+            self.setup_unreleased_entries(changes_path)
+            self.setup_news_file(news_file)
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(changes_path, 'processed')
+            mock_project.return_value.news_file = news_file
+
+            with unittest.mock.patch('builtins.open', wraps=open) as mock_open:
+                result = runner.invoke(notes, ['--news', 'release-tools', '0.8.10'])
+                self.assertEqual(result.exit_code, 0)
+
+                # The news file is only read in binary mode
+                modes = [c[0][1] for c in mock_open.call_args_list
+                         if c[0] and c[0][0] == news_file and len(c[0]) > 1]
+                self.assertListEqual(modes, ['rb'])
+
+            with open(news_file, 'r') as fd:
+                text = fd.read()
+
+            self.assertEqual(text, NEWS_FILE_CONTENT)
+
+            # The same notes are not added twice
+            result = runner.invoke(notes, ['--news', '--overwrite', 'release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertIn("News file unchanged", result.stdout)
+
+            with open(news_file, 'r') as fd:
+                self.assertEqual(fd.read(), NEWS_FILE_CONTENT)
+
     @unittest.mock.patch('release_tools.notes.Project')
     def test_authors_update(self, mock_project):
         """Check if it updates the authors file when the flag is set"""
@@ -516,6 +735,54 @@ class TestNotes(unittest.TestCase):
 
             self.assertEqual(text, RELEASE_NOTES_EMPTY)
 
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_unchanged_files_are_not_written(self, mock_project, mock_utcnow):
+        """Check whether files with the same content are not written again"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            news_file = os.path.join(fs, 'NEWS')
+            authors_file = os.path.join(fs, 'AUTHORS')
+            self.setup_unreleased_entries(changes_path)
+            self.setup_news_file(news_file)
+            self.setup_authors_file(authors_file)
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = os.path.join(changes_path, 'processed')
+            mock_project.return_value.news_file = news_file
+            mock_project.return_value.authors_file = authors_file
+            mock_project.return_value.repo.mv = os.rename
+
+            params = ['--news', '--authors', 'release-tools', '0.8.10']
+            result = runner.invoke(notes, params)
+            self.assertEqual(result.exit_code, 0)
+
+            filepath = os.path.join(fs, 'releases', '0.8.10.md')
+            files = [filepath, news_file, authors_file]
+            mtimes = [os.stat(f).st_mtime_ns for f in files]
+
+            # Generate the same notes again
+            result = runner.invoke(notes, ['--overwrite'] + params)
+            self.assertEqual(result.exit_code, 0)
+
+            self.assertIn("Release notes file '0.8.10.md' unchanged", result.stdout)
+            self.assertIn("News file unchanged", result.stdout)
+            self.assertIn("Authors file unchanged", result.stdout)
+            self.assertListEqual([os.stat(f).st_mtime_ns for f in files], mtimes)
+
+            with open(filepath, 'r') as fd:
+                self.assertEqual(fd.read(), RELEASE_NOTES_CONTENT)
+            with open(news_file, 'r') as fd:
+                self.assertEqual(fd.read(), NEWS_FILE_CONTENT)
+            with open(authors_file, 'r') as fd:
+                self.assertEqual(fd.read(), AUTHORS_FILE_CONTENT)
+
     @unittest.mock.patch('release_tools.notes.compose_release_notes')
     @unittest.mock.patch('release_tools.notes.Project')
     def test_abort_empty_notes(self, mock_project, mock_compose):
@@ -631,6 +898,128 @@ class TestNotes(unittest.TestCase):
 
             self.assertEqual(text, RELEASE_NOTES_CONTENT)
 
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_release_notes_cache(self, mock_project, mock_utcnow):
+        """Check if cached entries are not parsed nor rendered again"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            processed_changes_path = os.path.join(changes_path, 'processed')
+            cache_path = os.path.join(fs, '.git', 'release-tools')
+            self.setup_unreleased_entries(changes_path)
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = processed_changes_path
+            mock_project.return_value.cache_path = cache_path
+            mock_project.return_value.repo.mv = os.rename
+
+            # Dry runs do not write the cache
+            result = runner.invoke(notes, ['--cache', '--dry-run', 'release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertFalse(os.path.exists(os.path.join(cache_path, 'notes-cache.json')))
+
+            result = runner.invoke(notes, ['--cache', '--pre-release', 'release-tools', '0.8.10-rc.1'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue(os.path.exists(os.path.join(cache_path, 'notes-cache.json')))
+
+            # Cached entries are neither parsed nor rendered
+            with unittest.mock.patch('release_tools.cache.ChangelogEntry.from_yaml') as mock_parse, \
+                    unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._render_entry') as mock_render:
+                result = runner.invoke(notes, ['--cache', 'release-tools', '0.8.10'])
+                self.assertEqual(result.exit_code, 0)
+                mock_parse.assert_not_called()
+                mock_render.assert_not_called()
+
+            filepath = os.path.join(fs, 'releases', '0.8.10.md')
+            with open(filepath, 'r') as fd:
+                text = fd.read()
+
+            self.assertEqual(text, RELEASE_NOTES_CONTENT)
+
+    @unittest.mock.patch('release_tools.watch.open_waiter')
+    @unittest.mock.patch('release_tools.notes.ReleaseNotesComposer._datetime_utcnow_str')
+    @unittest.mock.patch('release_tools.notes.Project')
+    def test_watch(self, mock_project, mock_utcnow, mock_open_waiter):
+        """Check whether the notes are printed each time they change"""
+
+        mock_utcnow.return_value = "2019-01-01"
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            changes_path = os.path.join(fs, 'releases', 'unreleased')
+            processed_changes_path = os.path.join(changes_path, 'processed')
+            self.setup_unreleased_entries(changes_path)
+
+            mock_project.return_value.basepath = fs
+            mock_project.return_value.unreleased_changes_path = changes_path
+            mock_project.return_value.unreleased_processed_entries_path = processed_changes_path
+
+            def add_processed_entry():
+                os.makedirs(processed_changes_path)
+                with open(os.path.join(processed_changes_path, 'rc.yml'), 'w') as fd:
+                    fd.write("---\ntitle: processed fix\ncategory: fixed\n"
+                             "author: jdoe\nissue: null\nnotes: null\n")
+
+            def break_entry():
+                with open(os.path.join(changes_path, '1.yml'), 'w') as fd:
+                    fd.write("---\ntitle: first bug fix\n")
+
+            # Each call to 'wait' changes the entries; the last one stops the script
+            changes = [add_processed_entry, lambda: None, break_entry]
+
+            def wait():
+                if not changes:
+                    raise KeyboardInterrupt
+                changes.pop(0)()
+
+            mock_open_waiter.return_value.wait.side_effect = wait
+
+            result = runner.invoke(notes, ['--watch', 'release-tools', '0.8.10'])
+            self.assertEqual(result.exit_code, 0)
+
+            outputs = result.stdout.split("## release-tools 0.8.10 - (2019-01-01)")
+            self.assertEqual(len(outputs), 4)
+            self.assertTrue(result.stdout.startswith(RELEASE_NOTES_CONTENT + '\n'))
+            self.assertIn(" * processed fix", outputs[2])
+            self.assertIn(" * first bug fix (#2)", outputs[2])
+            self.assertIn(" * processed fix", outputs[3])
+            self.assertNotIn(" * first bug fix (#2)", outputs[3])
+
+            self.assertRegex(result.stderr,
+                             r"Warning: entry .+1\.yml ignored; invalid format for .+; "
+                             r"'category' attribute not found")
+
+            # Nothing is written or moved
+            self.assertFalse(os.path.exists(os.path.join(fs, 'releases', '0.8.10.md')))
+            self.assertListEqual(os.listdir(processed_changes_path), ['rc.yml'])
+
+    def test_trailers_error(self):
+        """Check whether '--trailers' cannot be set together with '--watch' or '--rebuild-history'"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        for args in [['--watch', 'release-tools', '0.8.10'], ['--rebuild-history', 'release-tools']]:
+            result = runner.invoke(notes, ['--trailers'] + args)
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn("'--trailers' cannot be used with '--watch' or '--rebuild-history'",
+                          result.stderr)
+
+    def test_watch_write_error(self):
+        """Check whether '--watch' cannot be set together with options that write files"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        result = runner.invoke(notes, ['--watch', '--news', 'release-tools', '0.8.10'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("'--watch' cannot be used with '--news'", result.stderr)
+
     @unittest.mock.patch('release_tools.notes.datetime')
     def test_datetime_utcnow_str(self, mock_datetime):
         """Check if the correct formatted string of the datetime is returned"""
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+import pstats
+import unittest
+
+import click
+from click.testing import CliRunner
+
+import release_tools.tracing
+from release_tools.profiling import (Profile,
+                                     phase_times,
+                                     profile_option)
+from release_tools.tracing import (Tracer,
+                                   span,
+                                   trace_option)
+
+
+@click.command()
+@profile_option
+def dummy():
+    with span('load', phase='entry load'):
+        with span('git log', phase='git'):
+            pass
+    with span('write', phase='write'):
+        click.echo("done")
+
+
+@click.command()
+@profile_option
+def failing():
+    with span('compose', phase='compose'):
+        raise click.ClickException("failed")
+
+
+@click.command()
+@profile_option
+@trace_option
+def traced():
+    with span('compose', phase='compose'):
+        click.echo("done")
+
+
+class TestPhaseTimes(unittest.TestCase):
+    """Unit tests for phase_times"""
+
+    def test_nested_phases(self):
+        """Check whether nested phases are added to the outermost one"""
+
+        tracer = Tracer()
+        tracer.start_span('notes')
+        tracer.start_span('read_changelog_entries', phase='entry load')
+        tracer.start_span('helper')
+        tracer.start_span('git log', phase='git')
+        tracer.end_span()
+        tracer.end_span()
+        tracer.end_span()
+        tracer.start_span('git ls-files', phase='git')
+        tracer.end_span()
+        tracer.end_span()
+
+        spans = {s.name: s for s in tracer.spans}
+        times = phase_times(tracer)
+
+        self.assertEqual(times['entry load'], spans['read_changelog_entries'].duration)
+        self.assertEqual(times['git'], spans['git ls-files'].duration)
+        self.assertEqual(times['compose'], 0.0)
+        self.assertLessEqual(sum(times.values()), spans['notes'].duration)
+
+
+class TestProfile(unittest.TestCase):
+    """Unit tests for Profile"""
+
+    def test_stop(self):
+        """Check whether the total time is the time of the root span"""
+
+        tracer = Tracer()
+        tracer.start_span('notes')
+        tracer.start_span('git log', phase='git')
+        tracer.end_span()
+        tracer.end_span()
+
+        profile = Profile()
+        profile.start()
+        profile.stop(tracer)
+
+        spans = {s.name: s for s in tracer.spans}
+        self.assertEqual(profile.total, spans['notes'].duration)
+        self.assertEqual(profile.phases['git'], spans['git log'].duration)
+
+    def test_format(self):
+        """Check the breakdown of the time by phase"""
+
+        profile = Profile()
+        profile.total = 2.0
+        profile.phases['discovery'] = 0.5
+        profile.phases['git'] = 1.0
+
+        expected = (
+            "Profile: 2.000 s\n"
+            "  discovery        0.500 s   25.0%\n"
+            "  entry load       0.000 s    0.0%\n"
+            "  compose          0.000 s    0.0%\n"
+            "  write            0.000 s    0.0%\n"
+            "  git              1.000 s   50.0%\n"
+            "  other            0.500 s   25.0%"
+        )
+        self.assertEqual(profile.format(), expected)
+
+
+class TestProfileOption(unittest.TestCase):
+    """Unit tests for '--profile' option"""
+
+    def test_profile_phases(self):
+        """Check whether the phases breakdown is printed"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(dummy, ['--profile', '-'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "done\n")
+
+            lines = result.stderr.split('\n')
+            self.assertRegex(lines[0], r'^Profile: \d+\.\d{3} s$')
+            names = [line.split()[0] for line in lines[1:] if line]
+            self.assertListEqual(names, ['discovery', 'entry', 'compose',
+                                         'write', 'git', 'other'])
+            self.assertListEqual(os.listdir('.'), [])
+
+        self.assertIsNone(release_tools.tracing._active)
+
+    def test_profile_file(self):
+        """Check whether statistics are written to a file"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(dummy, ['--profile', 'stats.prof'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn("Profile statistics written to 'stats.prof'", result.stderr)
+
+            stats = pstats.Stats('stats.prof')
+            functions = [func[2] for func in stats.stats]
+            self.assertIn('dummy', functions)
+
+    def test_profile_on_error(self):
+        """Check whether the profile is reported when the command fails"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(failing, ['--profile', '-'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Profile: ", result.stderr)
+            self.assertIn("Error: failed", result.stderr)
+
+        self.assertIsNone(release_tools.tracing._active)
+
+    def test_profile_and_trace(self):
+        """Check whether the profile and the trace share the same spans"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(traced, ['--profile', '-', '--trace', 'trace.json'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "done\n")
+            self.assertIn("Profile: ", result.stderr)
+
+            with open('trace.json', 'r') as fd:
+                data = json.load(fd)
+
+        spans = data['resourceSpans'][0]['scopeSpans'][0]['spans']
+        self.assertListEqual([s['name'] for s in spans], ['traced', 'compose'])
+        self.assertIn({'key': 'release_tools.phase', 'value': {'stringValue': 'compose'}},
+                      spans[1]['attributes'])
+
+        self.assertIsNone(release_tools.tracing._active)
+
+    def test_profile_invalid_file(self):
+        """Check whether it fails when statistics cannot be written"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(dummy, ['--profile', 'missing/stats.prof'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Error: unable to write profile statistics", result.stderr)
+
+    def test_no_profile(self):
+        """Check whether nothing is reported without the option"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        result = runner.invoke(dummy, [])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stderr, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
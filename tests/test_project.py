@@ -20,6 +20,8 @@
 #     Venu Vardhan Reddy Tekula <venu@bitergia.com>
 #
 
+import os
+import tempfile
 import unittest
 import unittest.mock
 
@@ -131,6 +133,57 @@ class TestProject(unittest.TestCase):
         self.assertEqual(project.version_file, expected)
         mock_find_file.assert_called_once_with('*_version.py')
 
+    @unittest.mock.patch('release_tools.project.GitHandler.git_dir',
+                         new_callable=unittest.mock.PropertyMock)
+    @unittest.mock.patch('release_tools.project.GitHandler.root_path',
+                         new_callable=unittest.mock.PropertyMock)
+    def test_cache_path(self, mock_root_path, mock_git_dir):
+        """Check if the property returns the cache path"""
+
+        mock_root_path.return_value = "/tmp/repo/"
+        mock_git_dir.return_value = "/tmp/repo/.git"
+
+        project = Project('/tmp/repo/')
+
+        expected = "/tmp/repo/.git/release-tools"
+        self.assertEqual(project.cache_path, expected)
+
+    @unittest.mock.patch('release_tools.project.GitHandler.tag_objects')
+    @unittest.mock.patch('release_tools.project.GitHandler.tags')
+    @unittest.mock.patch('release_tools.project.GitHandler.git_dir',
+                         new_callable=unittest.mock.PropertyMock)
+    @unittest.mock.patch('release_tools.project.GitHandler.root_path',
+                         new_callable=unittest.mock.PropertyMock)
+    def test_release_tags(self, mock_root_path, mock_git_dir, mock_tags, mock_tag_objects):
+        """Check if the release tags are read only once"""
+
+        mock_root_path.return_value = "/tmp/repo/"
+        mock_tags.return_value = [('0.2.0', '2020-02-01'),
+                                  ('0.1.0', '2020-01-01'),
+                                  ('mytag', '2020-01-15')]
+        mock_tag_objects.return_value = [('0.1.0', 'a' * 40),
+                                         ('0.2.0', 'b' * 40),
+                                         ('mytag', 'c' * 40)]
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            mock_git_dir.return_value = dirpath
+
+            project = Project('/tmp/repo/')
+
+            self.assertEqual(str(project.release_tags.latest()), '0.2.0')
+            self.assertListEqual(project.release_tags.tags,
+                                 [('0.1.0', '2020-01-01'), ('0.2.0', '2020-02-01')])
+            mock_tags.assert_called_once_with()
+
+            # The index is read from the cache by other projects
+            project = Project('/tmp/repo/')
+
+            self.assertListEqual(project.release_tags.tags,
+                                 [('0.1.0', '2020-01-01'), ('0.2.0', '2020-02-01')])
+            mock_tags.assert_called_once_with()
+            self.assertTrue(os.path.exists(os.path.join(dirpath, 'release-tools',
+                                                        'release-tags.json')))
+
 
 if __name__ == '__main__':
     unittest.main()
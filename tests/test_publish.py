@@ -21,13 +21,19 @@
 #
 
 import os
+import shutil
+import subprocess
+import tempfile
 import unittest
 import unittest.mock
 
 import click.testing
 
 from release_tools import publish
+from release_tools.archive import read_release_archive
+from release_tools.notes import notes
 from release_tools.repo import RepositoryError
+from release_tools.testing import RepositoryTemplate
 
 
 RELEASE_NOTES_CONTENT = """## release-tools 0.8.10 - (2019-01-01)
@@ -36,6 +42,9 @@ No changes list available.
 
 """
 AUTHORS_FILE_CONTENT = """jdoe\njsmith\n\n"""
+ARCHIVE_ONLY_PUSH_ERROR = (
+    r"Error: '--archive' flag cannot be set together with '--only-push'"
+)
 ONLY_PUSH_ERROR = (
     r"Error: '--only-push' flag must be set together with '--push'"
 )
@@ -54,6 +63,20 @@ AUTHORS_FILE_NOT_FOUND_ERROR = (
 REPOSITORY_ERROR = (
     r"Error: generated mock error"
 )
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: jsmith\nissue: null\nnotes: null\n"
+)
+
+REPOSITORY_TEMPLATE = RepositoryTemplate({
+    'pyproject.toml': '[tool.poetry]\nname = "myapp"\nversion = "0.1.0"\n',
+    'myapp/_version.py': '__version__ = "0.1.0"\n',
+    'NEWS': '',
+    'AUTHORS': '',
+    'releases/unreleased/add-spells.yml': ENTRY_TEMPLATE.format(title='Add spells',
+                                                                category='added')
+})
 VERSION_FILE_NOT_FOUND_ERROR = (
     r"Error: version file not found"
 )
@@ -268,6 +291,63 @@ class TestPublish(unittest.TestCase):
             mock_project.return_value.repo.push.assert_any_call('myremote', 'master')
             mock_project.return_value.repo.push.assert_any_call('myremote', '0.8.10')
 
+    @unittest.mock.patch('release_tools.publish.Project')
+    def test_publish_archive(self, mock_project):
+        """Test if the entries of the release are archived."""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            processed_path = os.path.join(fs, 'unreleased', 'processed')
+            notes_file = os.path.join(fs, '0.8.10.md')
+            news_file = os.path.join(fs, 'NEWS')
+            authors_file = os.path.join(fs, 'AUTHORS')
+
+            self.setup_release_notes(fs, notes_file, newsfile=news_file, authorsfile=authors_file)
+
+            os.makedirs(processed_path)
+            with open(os.path.join(processed_path, 'new-feature.yml'), mode='w') as fd:
+                fd.write("---\ntitle: new feature\ncategory: added\n"
+                         "author: jsmith\nissue: 1\nnotes: null\n")
+
+            mock_project.return_value.unreleased_processed_entries_path = processed_path
+            mock_project.return_value.releases_path = fs
+            mock_project.return_value.news_file = news_file
+            mock_project.return_value.authors_file = authors_file
+
+            result = runner.invoke(publish.publish,
+                                   ["--archive", "--add-all",
+                                    "0.8.10", "John Smith <jsmith@example.org>"])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn("Archiving changelog entries...done", result.output)
+
+            archive_file = os.path.join(fs, '0.8.10.jsonl.gz')
+            entries = read_release_archive(archive_file)
+            self.assertListEqual(list(entries), ['new-feature.yml'])
+            self.assertEqual(entries['new-feature.yml'].title, 'new feature')
+            self.assertEqual(entries['new-feature.yml'].issue, 1)
+
+            mock_project.return_value.repo.add.assert_any_call(archive_file)
+            mock_project.return_value.repo.rm.assert_called_once_with(
+                os.path.join(processed_path, 'new-feature.yml'))
+
+    @unittest.mock.patch('release_tools.publish.Project')
+    def test_archive_only_push_error(self, mock_project):
+        """Test if fails when '--archive' and '--only-push' are set."""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(publish.publish,
+                                   ["--only-push", "--push", "origin", "--archive",
+                                    "0.8.10", "John Smith <jsmith@example.org>"])
+            self.assertEqual(result.exit_code, 1)
+
+            lines = result.stderr.split('\n')
+            self.assertRegex(lines[-2], ARCHIVE_ONLY_PUSH_ERROR)
+
+            mock_project.return_value.repo.push.assert_not_called()
+
     @unittest.mock.patch('release_tools.publish.Project')
     def test_only_publish_no_push_error(self, mock_project):
         """Test if fails when '--only-push' is set but not remote is set."""
@@ -741,5 +821,54 @@ class TestPublish(unittest.TestCase):
             mock_project.return_value.repo.add.assert_any_call(authors_file)
 
 
+class TestPublishArchiveReleaseCandidates(unittest.TestCase):
+    """Unit tests for publish '--archive' on release candidates"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.git_path = REPOSITORY_TEMPLATE.clone(os.path.join(self.tmp_path, 'repo'))
+        self.cwd = os.getcwd()
+        os.chdir(self.git_path)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_path)
+
+    def release_candidate(self, version):
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        result = runner.invoke(notes, ['myapp', version, '--pre-release'])
+        self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+        result = runner.invoke(publish.publish, [version, 'John Smith <jsmith@example.org>',
+                                                 '--archive', '--no-cleanup'])
+        self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+    def test_archive_release_candidates(self):
+        """Check whether entries of previous release candidates are not archived"""
+
+        self.release_candidate('0.2.0-rc.1')
+
+        filepath = os.path.join('releases', 'unreleased', 'fix-bug.yml')
+        with open(filepath, mode='w') as fd:
+            fd.write(ENTRY_TEMPLATE.format(title='Fix bug', category='fixed'))
+        subprocess.check_call(['git', 'add', filepath])
+        subprocess.check_call(['git', 'commit', '-q', '-m', 'Fix bug'])
+
+        self.release_candidate('0.2.0-rc.2')
+
+        entries = read_release_archive(os.path.join('releases', '0.2.0-rc.1.jsonl.gz'))
+        self.assertListEqual(list(entries), ['add-spells.yml'])
+
+        entries = read_release_archive(os.path.join('releases', '0.2.0-rc.2.jsonl.gz'))
+        self.assertListEqual(list(entries), ['fix-bug.yml'])
+
+        # Notes rebuilt from the archives match the published ones
+        runner = click.testing.CliRunner(mix_stderr=False)
+        result = runner.invoke(notes, ['--rebuild-history', '--verify', 'myapp'])
+        self.assertEqual(result.exit_code, 0, msg=result.stdout)
+        self.assertIn("File '0.2.0-rc.2.md' matches", result.stdout)
+
+
 if __name__ == '__main__':
     unittest.main()
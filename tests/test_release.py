@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import unittest
+import unittest.mock
+
+import click.testing
+
+from release_tools import release
+from release_tools.changelog import create_changelog_entry_content
+from release_tools.repo import RepositoryError
+
+
+VERSION_FILE_CONTENT = "__version__ = \"0.1.0\"\n"
+PYPROJECT_FILE_CONTENT = "[tool.poetry]\nname = \"myapp\"\nversion = \"0.1.0\"\n"
+
+RELEASE_NOTES_CONTENT = """## MyApp 0.2.0 - (2020-01-01)
+
+**New features:**
+
+ * Add spells (#2)
+
+**Bug fixes:**
+
+ * Fix bug (#1)
+
+"""
+
+NO_CHANGES_ERROR = (
+    "Error: no changes found; version number not updated"
+)
+MOCK_REPOSITORY_ERROR = (
+    "Error: mock repository error"
+)
+
+
+class TestRelease(unittest.TestCase):
+    """Unit tests for release script"""
+
+    def setup_project(self, mock_project, dirpath, entries, processed=None):
+        """Set up a project with entries and version files."""
+
+        unreleased_path = os.path.join(dirpath, 'releases', 'unreleased')
+        processed_path = os.path.join(unreleased_path, 'processed')
+        os.makedirs(unreleased_path)
+
+        version_file = os.path.join(dirpath, '_version.py')
+        with open(version_file, 'w') as fd:
+            fd.write(VERSION_FILE_CONTENT)
+
+        pyproject_file = os.path.join(dirpath, 'pyproject.toml')
+        with open(pyproject_file, 'w') as fd:
+            fd.write(PYPROJECT_FILE_CONTENT)
+
+        for filename in ['NEWS', 'AUTHORS']:
+            open(os.path.join(dirpath, filename), 'w').close()
+
+        for path, group in [(unreleased_path, entries), (processed_path, processed or {})]:
+            os.makedirs(path, exist_ok=True)
+
+            for filename, (title, category, issue) in group.items():
+                content = create_changelog_entry_content(title, category, author='jsmith',
+                                                         issue=issue, run_editor=False)
+                with open(os.path.join(path, filename), 'w') as fd:
+                    fd.write(content)
+
+        project = mock_project.return_value
+        project.basepath = dirpath
+        project.releases_path = os.path.join(dirpath, 'releases')
+        project.unreleased_changes_path = unreleased_path
+        project.unreleased_processed_entries_path = processed_path
+        project.cache_path = os.path.join(dirpath, '.git', 'release-tools')
+        project.version_file = version_file
+        project.pyproject_file = pyproject_file
+        project.news_file = os.path.join(dirpath, 'NEWS')
+        project.authors_file = os.path.join(dirpath, 'AUTHORS')
+
+        return project
+
+    @unittest.mock.patch('release_tools.notes.datetime')
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_release(self, mock_project, mock_datetime):
+        """Test if a new release is created in a single step"""
+
+        mock_datetime.datetime.utcnow.return_value.strftime.return_value = '2020-01-01'
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs, {
+                'fix-bug.yml': ('Fix bug', 'fixed', 1),
+                'add-spells.yml': ('Add spells', 'added', 2)
+            })
+            project.repo.rm_files.side_effect = lambda paths: [os.remove(p) for p in paths]
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>',
+                                    '--news', '--authors'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+            self.assertIn("Version number updated to 0.2.0", result.stdout)
+            self.assertIn("2 changelog entries removed", result.stdout)
+            self.assertIn("Release 0.2.0 committed and tagged", result.stdout)
+
+            with open(project.version_file, 'r') as fd:
+                self.assertIn('__version__ = "0.2.0"', fd.read())
+            with open(project.pyproject_file, 'r') as fd:
+                self.assertIn('version = "0.2.0"', fd.read())
+
+            notes_file = os.path.join(fs, 'releases', '0.2.0.md')
+            with open(notes_file, 'r') as fd:
+                self.assertEqual(fd.read(), RELEASE_NOTES_CONTENT)
+            with open(project.news_file, 'r') as fd:
+                self.assertIn(RELEASE_NOTES_CONTENT, fd.read())
+            with open(project.authors_file, 'r') as fd:
+                self.assertEqual(fd.read(), "jsmith\n\n")
+
+            # Entries are removed with a single call
+            project.repo.rm_files.assert_called_once_with([
+                os.path.join(project.unreleased_changes_path, 'add-spells.yml'),
+                os.path.join(project.unreleased_changes_path, 'fix-bug.yml')
+            ])
+            project.repo.mv.assert_not_called()
+
+            project.repo.add_files.assert_called_once_with([
+                project.version_file, project.pyproject_file, notes_file,
+                project.news_file, project.authors_file
+            ])
+            project.repo.commit.assert_called_once_with("Release 0.2.0",
+                                                        "John Smith <jsmith@example.org>")
+            project.repo.tag.assert_called_once_with("0.2.0")
+            project.repo.push.assert_not_called()
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_release_processed_entries(self, mock_project):
+        """Check whether processed entries are included and removed"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs,
+                                         {'fix-bug.yml': ('Fix bug', 'fixed', 1)},
+                                         processed={'add-spells.yml': ('Add spells', 'added', 2)})
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+
+            # Processed entries do not change the version bump
+            with open(os.path.join(fs, 'releases', '0.1.1.md'), 'r') as fd:
+                content = fd.read()
+                self.assertIn(" * Add spells (#2)", content)
+                self.assertIn(" * Fix bug (#1)", content)
+
+            project.repo.rm_files.assert_called_once_with([
+                os.path.join(project.unreleased_changes_path, 'fix-bug.yml'),
+                os.path.join(project.unreleased_processed_entries_path, 'add-spells.yml')
+            ])
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_pre_release(self, mock_project):
+        """Check whether processed entries are ignored on release candidates"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs,
+                                         {'fix-bug.yml': ('Fix bug', 'fixed', 1)},
+                                         processed={'add-spells.yml': ('Add spells', 'added', 2)})
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>',
+                                    '--pre-release', '--no-cleanup'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+            self.assertIn("Version number updated to 0.1.1-rc.1", result.stdout)
+
+            with open(os.path.join(fs, 'releases', '0.1.1-rc.1.md'), 'r') as fd:
+                self.assertNotIn("Add spells", fd.read())
+
+            # Entries are moved to the processed directory
+            project.repo.rm_files.assert_not_called()
+            project.repo.mv.assert_called_once_with(
+                os.path.join(project.unreleased_changes_path, 'fix-bug.yml'),
+                os.path.join(project.unreleased_processed_entries_path, 'fix-bug.yml')
+            )
+            project.repo.tag.assert_called_once_with("0.1.1-rc.1")
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_dry_run(self, mock_project):
+        """Check whether nothing is changed on dry run mode"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs, {
+                'fix-bug.yml': ('Fix bug', 'fixed', 1),
+                'add-spells.yml': ('Add spells', 'added', 2)
+            })
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>', '--dry-run'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+
+            lines = result.stdout.split('\n')
+            self.assertEqual(lines[0], "0.2.0")
+            self.assertTrue(lines[1].startswith("## MyApp 0.2.0 - "))
+
+            with open(project.version_file, 'r') as fd:
+                self.assertEqual(fd.read(), VERSION_FILE_CONTENT)
+            self.assertFalse(os.path.exists(os.path.join(fs, 'releases', '0.2.0.md')))
+
+            project.repo.rm_files.assert_not_called()
+            project.repo.commit.assert_not_called()
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_bump_version(self, mock_project):
+        """Check whether the version bump can be forced"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            self.setup_project(mock_project, fs, {'fix-bug.yml': ('Fix bug', 'fixed', 1)})
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>',
+                                    '--bump-version', 'major', '--dry-run'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+            self.assertTrue(result.stdout.startswith("1.0.0\n"))
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_no_changes(self, mock_project):
+        """Check whether it fails when there are no entries"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs, {})
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn(NO_CHANGES_ERROR, result.stderr)
+
+            project.repo.commit.assert_not_called()
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_push(self, mock_project):
+        """Check whether the release is pushed to a remote"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs, {'fix-bug.yml': ('Fix bug', 'fixed', 1)})
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>',
+                                    '--push', 'origin', '--remote-branch', 'main'])
+            self.assertEqual(result.exit_code, 0, result.stderr)
+
+            project.repo.push.assert_any_call('origin', 'main')
+            project.repo.push.assert_any_call('origin', '0.1.1')
+
+    @unittest.mock.patch('release_tools.release.Project')
+    def test_repository_error(self, mock_project):
+        """Check whether Git errors are reported"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            project = self.setup_project(mock_project, fs, {'fix-bug.yml': ('Fix bug', 'fixed', 1)})
+            project.repo.rm_files.side_effect = RepositoryError("mock repository error")
+
+            result = runner.invoke(release.release,
+                                   ['MyApp', 'John Smith <jsmith@example.org>'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn(MOCK_REPOSITORY_ERROR, result.stderr)
+
+            project.repo.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
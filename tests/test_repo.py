@@ -26,10 +26,14 @@ import shutil
 import subprocess
 import tempfile
 import unittest
+import unittest.mock
 
-
+import release_tools.tracing
 from release_tools.repo import (GitHandler,
+                                MemoryGitHandler,
+                                RepositoryBackend,
                                 RepositoryError)
+from release_tools.tracing import Tracer
 
 
 REPOSITORY_ERROR = (
@@ -96,6 +100,40 @@ class TestGitHandler(TestCaseRepo):
         file_location = repo.find_file(filename)
         self.assertIsNone(file_location)
 
+    def test_ls_files(self):
+        repo = GitHandler(self.git_path)
+        files = repo.ls_files('*.md', '.gitmodules', 'missing')
+        self.assertListEqual(files, ['.gitmodules', 'README.md'])
+
+        self.assertListEqual(repo.ls_files('missing'), [])
+
+    def test_ls_tree(self):
+        repo = GitHandler(self.git_path)
+
+        self.assertListEqual(repo.ls_tree('HEAD', 'README.md'), ['README.md'])
+        self.assertListEqual(repo.ls_tree('HEAD', 'missing'), [])
+
+    def test_cat_files(self):
+        repo = GitHandler(self.git_path)
+        contents = repo.cat_files(['HEAD:README.md', 'HEAD:missing', 'HEAD:README.md'])
+
+        self.assertEqual(len(contents), 3)
+        with open(os.path.join(self.git_path, 'README.md'), 'r') as fd:
+            self.assertEqual(contents[0], fd.read())
+        self.assertIsNone(contents[1])
+        self.assertEqual(contents[2], contents[0])
+
+    def test_cat_files_empty(self):
+        repo = GitHandler(self.git_path)
+        self.assertListEqual(repo.cat_files([]), [])
+
+    def test_tag_objects(self):
+        repo = GitHandler(self.git_path)
+        subprocess.check_call(['git', 'tag', 'mytag'], cwd=self.git_path)
+
+        head = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=self.git_path)
+        self.assertIn(('mytag', head.decode('utf-8').strip()), repo.tag_objects())
+
     def test_mv_file(self):
         filename = 'README.md'
         dest_path = 'README_2.md'
@@ -104,6 +142,257 @@ class TestGitHandler(TestCaseRepo):
         location_dest = os.path.join(self.git_path, dest_path)
         self.assertTrue(os.path.exists(location_dest))
 
+    def test_mv_files(self):
+        repo = GitHandler(self.git_path)
+
+        os.makedirs(os.path.join(self.git_path, 'dir'))
+        repo.mv_files(['README.md', '.gitmodules'], 'dir')
+        repo.mv_files([], 'dir')
+
+        self.assertListEqual(repo.ls_files('dir/*'), ['dir/.gitmodules', 'dir/README.md'])
+        self.assertFalse(os.path.exists(os.path.join(self.git_path, 'README.md')))
+
+    def test_add_files(self):
+        repo = GitHandler(self.git_path)
+
+        filenames = ['new file.txt', 'dir/other.txt']
+        os.makedirs(os.path.join(self.git_path, 'dir'))
+        for filename in filenames:
+            with open(os.path.join(self.git_path, filename), 'w') as fd:
+                fd.write(filename)
+
+        repo.add_files(filenames)
+        repo.add_files([])
+
+        self.assertListEqual(repo.ls_files('*.txt'), ['dir/other.txt', 'new file.txt'])
+
+    def test_rm_files(self):
+        repo = GitHandler(self.git_path)
+
+        with open(os.path.join(self.git_path, 'untracked.txt'), 'w') as fd:
+            fd.write('untracked')
+
+        repo.rm_files(['README.md', 'untracked.txt'])
+        repo.rm_files([])
+
+        self.assertListEqual(repo.ls_files('README.md'), [])
+        self.assertFalse(os.path.exists(os.path.join(self.git_path, 'README.md')))
+        self.assertTrue(os.path.exists(os.path.join(self.git_path, 'untracked.txt')))
+
+    def test_exec_spans(self):
+        """Check whether each Git call is recorded as a span"""
+
+        tracer = Tracer()
+        repo = GitHandler(self.git_path)
+
+        with unittest.mock.patch.object(release_tools.tracing, '_active', tracer):
+            repo.ls_files('*.txt')
+
+            with self.assertRaises(RepositoryError):
+                repo.mv('missing.txt', 'dir')
+
+        self.assertListEqual([s.name for s in tracer.spans], ['git ls-files', 'git mv'])
+        self.assertListEqual([s.phase for s in tracer.spans], ['git', 'git'])
+        self.assertIsNone(tracer.spans[0].error)
+        self.assertIn("missing.txt", tracer.spans[1].error)
+
+
+class TestMemoryGitHandler(unittest.TestCase):
+    """Unit tests for MemoryGitHandler"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.repo = MemoryGitHandler(self.tmp_path, remotes=['origin'])
+
+        self.write('README.md', 'readme')
+        self.write('releases/unreleased/a.yml', 'a')
+        self.write('releases/unreleased/b.yml', 'b')
+
+        self.repo.add_all()
+        self.repo.commit("Initial commit", "John Smith <jsmith@example.com>")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def write(self, path, content):
+        filepath = os.path.join(self.tmp_path, path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'w') as fd:
+            fd.write(content)
+
+    def test_root_path(self):
+        self.assertEqual(self.repo.root_path, self.tmp_path)
+
+    def test_git_dir(self):
+        """Check whether the Git directory is not the one on disk"""
+
+        git_dir = self.repo.git_dir
+        self.assertTrue(os.path.isdir(git_dir))
+        self.assertFalse(git_dir.startswith(self.tmp_path))
+
+        # The temporary directory is removed with the backend
+        self.repo = None
+        self.assertFalse(os.path.exists(git_dir))
+
+        git_dir = os.path.join(self.tmp_path, 'git')
+        repo = MemoryGitHandler(self.tmp_path, git_dir=git_dir)
+        self.assertEqual(repo.git_dir, git_dir)
+
+    def test_abstract_backend(self):
+        """Check whether backends must implement every operation"""
+
+        class PartialBackend(RepositoryBackend):
+            @property
+            def root_path(self):
+                return '/tmp'
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+    def test_ls_files(self):
+        """Check whether tracked files are found using pathspecs"""
+
+        self.write('untracked.yml', 'untracked')
+
+        self.assertListEqual(self.repo.ls_files('*.yml'),
+                             ['releases/unreleased/a.yml', 'releases/unreleased/b.yml'])
+        self.assertListEqual(self.repo.ls_files('releases', 'README.md'),
+                             ['README.md', 'releases/unreleased/a.yml', 'releases/unreleased/b.yml'])
+        self.assertEqual(self.repo.find_file('README.md'), 'README.md')
+        self.assertIsNone(self.repo.find_file('untracked.yml'))
+
+    def test_ls_tree(self):
+        """Check whether the files of a revision are listed"""
+
+        self.repo.rm('releases/unreleased/a.yml')
+
+        self.assertListEqual(self.repo.ls_tree('HEAD', 'releases'),
+                             ['releases/unreleased/a.yml', 'releases/unreleased/b.yml'])
+        self.assertListEqual(self.repo.ls_tree('HEAD', 'missing'), [])
+
+    def test_release(self):
+        """Check whether files are committed, tagged and pushed"""
+
+        unreleased = os.path.join(self.tmp_path, 'releases', 'unreleased')
+
+        self.write('releases/0.1.0.md', 'notes')
+        self.repo.add_files([os.path.join(self.tmp_path, 'releases', '0.1.0.md')])
+        self.repo.rm_files([os.path.join(unreleased, 'a.yml'), 'missing.yml'])
+        self.repo.mv(os.path.join(unreleased, 'b.yml'), 'releases')
+
+        self.assertFalse(os.path.exists(os.path.join(unreleased, 'a.yml')))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_path, 'releases', 'b.yml')))
+
+        self.repo.commit("Release 0.1.0", "John Smith <jsmith@example.com>")
+        self.repo.tag('0.1.0', date='2020-01-01')
+        self.repo.push('origin', 'master')
+        self.repo.push('origin', '0.1.0')
+
+        self.assertEqual(len(self.repo.commits), 2)
+        self.assertListEqual(self.repo.tags(), [('0.1.0', '2020-01-01')])
+        self.assertListEqual(self.repo.tag_objects(), [('0.1.0', self.repo.head)])
+        self.assertDictEqual(self.repo.remotes['origin'], {
+            'refs/heads/master': self.repo.head,
+            'refs/tags/0.1.0': self.repo.head
+        })
+
+        changes = self.repo.log_name_status('HEAD^..0.1.0', 'releases')
+        self.assertListEqual([change[1:] for change in changes], [
+            ('A', ['releases/0.1.0.md']),
+            ('R100', ['releases/unreleased/b.yml', 'releases/b.yml']),
+            ('D', ['releases/unreleased/a.yml'])
+        ])
+
+        commit = changes[2][0]
+        contents = self.repo.cat_files([commit + '^:releases/unreleased/a.yml',
+                                        commit + ':releases/unreleased/a.yml'])
+        self.assertListEqual(contents, ['a', None])
+
+    def test_rollback(self):
+        """Check whether commits and staged changes are undone"""
+
+        initial = self.repo.head
+
+        self.write('README.md', 'changed')
+        self.repo.add('README.md')
+        self.repo.restore_staged()
+        self.assertEqual(self.repo.index['README.md'], b'readme')
+
+        self.repo.rm('releases/unreleased/a.yml')
+        self.repo.commit("Remove entry", "John Smith <jsmith@example.com>")
+        self.repo.reset_head()
+
+        self.assertEqual(self.repo.head, initial)
+        self.assertIn('releases/unreleased/a.yml', self.repo.index)
+
+        self.repo.restore_unstaged(os.path.join(self.tmp_path, 'releases', 'unreleased'))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_path, 'releases', 'unreleased', 'a.yml')))
+
+    def test_log_trailers(self):
+        """Check whether the trailers of the commits are read"""
+
+        initial = self.repo.head
+        self.repo.tag('0.1.0', date='2020-01-01')
+
+        self.write('README.md', 'fix')
+        self.repo.add('README.md')
+        self.repo.commit("Fix bug\n\nLong description.\n\n"
+                         "Changelog-Title: Fix bug\n  on startup\n"
+                         "changelog-category: fixed\n"
+                         "Signed-off-by: John Smith <jsmith@example.com>",
+                         "John Smith <jsmith@example.com>")
+        fix = self.repo.head
+
+        self.write('README.md', 'docs')
+        self.repo.add('README.md')
+        self.repo.commit("Update docs\n\nChangelog-Title: no trailers\nnot a trailer",
+                         "Jane Rae <jrae@example.com>")
+
+        commits = list(self.repo.log_trailers(['HEAD', '^0.1.0'],
+                                              ['Changelog-Title', 'Changelog-Category']))
+        self.assertListEqual(commits, [
+            (self.repo.head, 'Jane Rae', []),
+            (fix, 'John Smith', [('Changelog-Title', 'Fix bug on startup'),
+                                 ('changelog-category', 'fixed')])
+        ])
+
+        commits = list(self.repo.log_trailers(['HEAD', '^' + fix], ['Changelog-Title']))
+        self.assertListEqual([commit[0] for commit in commits], [self.repo.head])
+
+        self.assertTrue(self.repo.is_ancestor(initial, 'HEAD'))
+        self.assertTrue(self.repo.is_ancestor(fix, fix))
+        self.assertFalse(self.repo.is_ancestor(fix, '0.1.0'))
+        self.assertFalse(self.repo.is_ancestor('0' * 40, 'HEAD'))
+
+    def test_errors(self):
+        """Check whether errors are raised like Git does"""
+
+        with self.assertRaisesRegex(RepositoryError, "did not match any files; code error: 128"):
+            self.repo.add('missing.txt')
+        with self.assertRaisesRegex(RepositoryError, "outside repository"):
+            self.repo.add('../outside.txt')
+        with self.assertRaisesRegex(RepositoryError, "not removing 'releases' recursively"):
+            self.repo.rm('releases')
+        with self.assertRaisesRegex(RepositoryError, "not under version control"):
+            self.repo.mv('missing.txt', 'releases')
+        with self.assertRaisesRegex(RepositoryError, "nothing to commit"):
+            self.repo.commit("Empty", "John Smith <jsmith@example.com>")
+        with self.assertRaisesRegex(RepositoryError, "is not 'Name <email>'"):
+            self.write('new.txt', 'new')
+            self.repo.add('new.txt')
+            self.repo.commit("New", "jsmith")
+        with self.assertRaisesRegex(RepositoryError, "does not appear to be a git repository"):
+            self.repo.push('upstream', 'master')
+        with self.assertRaisesRegex(RepositoryError, "src refspec main does not match any"):
+            self.repo.push('origin', 'main')
+        with self.assertRaisesRegex(RepositoryError, "unknown revision"):
+            self.repo.reset_head()
+
+        self.repo.tag('0.1.0')
+        with self.assertRaisesRegex(RepositoryError, "tag '0.1.0' already exists"):
+            self.repo.tag('0.1.0')
+
 
 if __name__ == '__main__':
     unittest.main()
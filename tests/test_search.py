@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import click.testing
+
+from release_tools.notes import notes
+from release_tools.search import (SearchIndex,
+                                  parse_release_notes,
+                                  search)
+
+
+RELEASE_NOTES_0_1_0 = """## release-tools 0.1.0 - (2019-01-01)
+
+**New features:**
+
+ * First feature (#1)\\
+   Lorem ipsum dolor sit amet, consectetur
+   adipiscing elit.
+ * Second feature
+
+**Bug fixes:**
+
+ * First bug fix (#2)
+
+"""
+RELEASE_NOTES_0_2_0 = """## release-tools 0.2.0 - (2019-02-01)
+
+**Bug fixes:**
+
+ * Second bug fix on feature (#3)
+
+"""
+RELEASE_NOTES_0_10_0 = """## release-tools 0.10.0 - (2019-03-01)
+
+No changes list available.
+
+"""
+ENTRY_CONTENT = (
+    "---\ntitle: Third feature\ncategory: added\n"
+    "author:\n- John Smith\n- John Doe\nissue: 4\nnotes: Dolor sit amet\n"
+)
+
+
+class TestParseReleaseNotes(unittest.TestCase):
+    """Unit tests for parse_release_notes"""
+
+    def test_parse(self):
+        """Check if changes are extracted from release notes"""
+
+        changes = parse_release_notes(RELEASE_NOTES_0_1_0)
+
+        expected = [
+            ('First feature', 'added', '1',
+             'Lorem ipsum dolor sit amet, consectetur adipiscing elit.'),
+            ('Second feature', 'added', None, None),
+            ('First bug fix', 'fixed', '2', None)
+        ]
+        self.assertListEqual(changes, expected)
+
+    def test_parse_empty_notes(self):
+        """Check if nothing is extracted from empty release notes"""
+
+        changes = parse_release_notes(RELEASE_NOTES_0_10_0)
+        self.assertListEqual(changes, [])
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Unit tests for SearchIndex"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.releases_path = os.path.join(self.tmp_path.name, 'releases')
+        self.index_file = os.path.join(self.tmp_path.name, 'cache', 'index.json')
+
+        os.makedirs(self.releases_path)
+
+        for version, content in [('0.1.0', RELEASE_NOTES_0_1_0),
+                                 ('0.2.0', RELEASE_NOTES_0_2_0),
+                                 ('0.10.0', RELEASE_NOTES_0_10_0)]:
+            self.write_release_notes(version, content)
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def write_release_notes(self, version, content):
+        filepath = os.path.join(self.releases_path, version + '.md')
+
+        with open(filepath, mode='w') as fd:
+            fd.write(content)
+
+    def test_search(self):
+        """Check if changes matching every term are found"""
+
+        index = SearchIndex(self.index_file)
+        self.assertTrue(index.refresh(self.releases_path))
+
+        results = index.search('feature')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.2.0', 'Second bug fix on feature'),
+                              ('0.1.0', 'First feature'),
+                              ('0.1.0', 'Second feature')])
+
+        results = index.search('BUG fix')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.2.0', 'Second bug fix on feature'),
+                              ('0.1.0', 'First bug fix')])
+
+        # Notes are also indexed
+        results = index.search('adipiscing')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.1.0', 'First feature')])
+
+        # Search issues
+        results = index.search('#3')
+        self.assertListEqual([(v, doc['issue']) for v, doc in results],
+                             [('0.2.0', '3')])
+
+        self.assertListEqual(index.search('feature #2'), [])
+        self.assertListEqual(index.search('unknown'), [])
+        self.assertListEqual(index.search(''), [])
+
+    def test_refresh(self):
+        """Check if only new or modified files are indexed again"""
+
+        index = SearchIndex(self.index_file)
+        index.refresh(self.releases_path)
+        index.save()
+
+        index = SearchIndex(self.index_file)
+        index.load()
+        self.assertFalse(index.refresh(self.releases_path))
+
+        # Modify a file and remove another
+        self.write_release_notes('0.2.0', RELEASE_NOTES_0_2_0.replace('Second', 'Last'))
+        os.remove(os.path.join(self.releases_path, '0.1.0.md'))
+
+        self.assertTrue(index.refresh(self.releases_path))
+        self.assertListEqual(sorted(index.versions), ['0.10.0', '0.2.0'])
+
+        results = index.search('feature')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.2.0', 'Last bug fix on feature')])
+        self.assertListEqual(index.search('second'), [])
+        self.assertListEqual(index.search('adipiscing'), [])
+
+    def test_update_authors(self):
+        """Check if authors of the documents are indexed"""
+
+        index = SearchIndex(self.index_file)
+        index.refresh(self.releases_path)
+
+        docs = [
+            index.create_document('Third feature', 'added', issue=4,
+                                  authors=['John Smith <jsmith@example.com>']),
+            index.create_document('Fourth feature', 'added',
+                                  authors='John Doe')
+        ]
+        index.update('0.3.0', docs)
+
+        results = index.search('author:jsmith')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.3.0', 'Third feature')])
+
+        results = index.search('feature author:John')
+        self.assertListEqual([(v, doc['title']) for v, doc in results],
+                             [('0.3.0', 'Third feature'),
+                              ('0.3.0', 'Fourth feature')])
+
+
+class TestSearch(unittest.TestCase):
+    """Unit tests for search script"""
+
+    @staticmethod
+    def setup_release_notes(dirpath):
+        os.makedirs(dirpath)
+
+        for version, content in [('0.1.0', RELEASE_NOTES_0_1_0),
+                                 ('0.2.0', RELEASE_NOTES_0_2_0)]:
+            with open(os.path.join(dirpath, version + '.md'), mode='w') as fd:
+                fd.write(content)
+
+    @unittest.mock.patch('release_tools.search.Project')
+    def test_search(self, mock_project):
+        """Check if changes are found"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            releases_path = os.path.join(fs, 'releases')
+            cache_path = os.path.join(fs, 'cache')
+            self.setup_release_notes(releases_path)
+
+            mock_project.return_value.releases_path = releases_path
+            mock_project.return_value.cache_path = cache_path
+
+            result = runner.invoke(search, ['bug', 'fix'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout,
+                             "0.2.0: Second bug fix on feature (#3)\n"
+                             "0.1.0: First bug fix (#2)\n")
+            self.assertTrue(os.path.exists(os.path.join(cache_path, 'search-index.json')))
+
+            result = runner.invoke(search, ['--reindex', 'second', 'feature'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout,
+                             "0.2.0: Second bug fix on feature (#3)\n"
+                             "0.1.0: Second feature\n")
+
+            result = runner.invoke(search, ['unknown'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "No changes found\n")
+
+    @unittest.mock.patch('release_tools.notes.Project')
+    @unittest.mock.patch('release_tools.search.Project')
+    def test_notes_update_index(self, mock_project, mock_notes_project):
+        """Check if notes command updates an existing index"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            releases_path = os.path.join(fs, 'releases')
+            changes_path = os.path.join(releases_path, 'unreleased')
+            cache_path = os.path.join(fs, 'cache')
+            self.setup_release_notes(releases_path)
+
+            os.makedirs(changes_path)
+            with open(os.path.join(changes_path, 'third-feature.yml'), mode='w') as fd:
+                fd.write(ENTRY_CONTENT)
+
+            for mock in [mock_project, mock_notes_project]:
+                mock.return_value.basepath = fs
+                mock.return_value.releases_path = releases_path
+                mock.return_value.unreleased_changes_path = changes_path
+                mock.return_value.unreleased_processed_entries_path = os.path.join(changes_path, 'processed')
+                mock.return_value.cache_path = cache_path
+                mock.return_value.repo.mv = os.rename
+
+            # Create the index
+            result = runner.invoke(search, ['feature'])
+            self.assertEqual(result.exit_code, 0)
+
+            result = runner.invoke(notes, ['release-tools', '0.3.0'])
+            self.assertEqual(result.exit_code, 0)
+
+            with unittest.mock.patch('release_tools.search.parse_release_notes') as mock_parse:
+                result = runner.invoke(search, ['author:doe'])
+                self.assertEqual(result.exit_code, 0)
+                mock_parse.assert_not_called()
+
+            self.assertEqual(result.stdout, "0.3.0: Third feature (#4)\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
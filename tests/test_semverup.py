@@ -22,7 +22,9 @@
 #
 
 import os
+import random
 import re
+import shutil
 import unittest
 import unittest.mock
 
@@ -31,8 +33,11 @@ import semver
 import tomlkit.toml_file
 
 from release_tools import semverup
-from release_tools.entry import CategoryChange
+from release_tools.entry import CategoryChange, ChangelogEntry
+from release_tools.notes import warn_invalid_trailers
 from release_tools.repo import RepositoryError
+from release_tools.summary import update_bump_summary
+from release_tools.tags import TagIndex
 
 
 VERSION_FILE_NOT_FOUND = (
@@ -65,6 +70,24 @@ MOCK_REPOSIORY_ERROR = (
 INVALID_CURRENT_VERSION = (
     r"Error: version number 'invalid' is not a valid semver string"
 )
+RELEASE_TAGS_NOT_FOUND = (
+    "Error: no release tags found"
+)
+PYPROJECT_UNSUPPORTED_LAYOUTS = [
+    # Multi-line strings
+    '[tool.poetry]\nversion = "0.1.0"\ndescription = \"\"\"\n[tool.other]\nversion = "1"\n\"\"\"\n',
+    # Dotted keys
+    '[tool]\npoetry.version = "0.1.0"\n',
+    'tool.poetry.version = "0.1.0"\n',
+    '[tool.poetry]\n"version" = "0.1.0"\n',
+    # Inline tables
+    '[tool]\npoetry = { name = "release-tools", version = "0.1.0" }\n',
+    # Quoted table names
+    '["tool".poetry]\nversion = "0.1.0"\n',
+    # Version with escaped characters or in a multi-line array
+    '[tool.poetry]\nversion = "0.1.0\\u0030"\n',
+    '[tool.poetry]\nclassifiers = [\n  ["a"],\n]\nversion = "0.1.0"\n',
+]
 
 
 class TestSemVerUp(unittest.TestCase):
@@ -186,6 +209,41 @@ class TestSemVerUp(unittest.TestCase):
             version = self.read_version_number_from_pyproject(project_file)
             self.assertEqual(version, "0.2.0")
 
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_bump_summary(self, mock_project):
+        """Check whether the bump summary is used when it is in sync"""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            version_file = os.path.join(fs, '_version.py')
+            mock_project.return_value.version_file = version_file
+
+            project_file = os.path.join(fs, 'pyproject.toml')
+            mock_project.return_value.pyproject_file = project_file
+
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            self.setup_files(version_file, project_file, "0.1.0")
+            self.setup_unreleased_entries(dirpath, only_fixed=True)
+
+            update_bump_summary(mock_project.return_value)
+
+            with unittest.mock.patch('release_tools.semverup.read_changelog_entries') as mock_read:
+                result = runner.invoke(semverup.semverup, ['--dry-run'])
+                self.assertEqual(result.exit_code, 0)
+                self.assertEqual(result.stdout, "0.1.1\n")
+                mock_read.assert_not_called()
+
+            # Entries added out of 'changelog' are detected
+            self.setup_major_entry(dirpath)
+
+            result = runner.invoke(semverup.semverup, ['--dry-run'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "0.2.0\n")
+
     @unittest.mock.patch('release_tools.semverup.Project')
     def test_dry_run(self, mock_project):
         """Check whether the version file is not updated in dry mode"""
@@ -380,6 +438,131 @@ class TestSemVerUp(unittest.TestCase):
             version = self.read_version_number_from_pyproject(project_file)
             self.assertEqual(version, "0.8.10")
 
+    @unittest.mock.patch('release_tools.watch.open_waiter')
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_watch(self, mock_project, mock_open_waiter):
+        """Check whether the next version is printed each time it changes"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            version_file = os.path.join(fs, '_version.py')
+            mock_project.return_value.version_file = version_file
+
+            project_file = os.path.join(fs, 'pyproject.toml')
+            mock_project.return_value.pyproject_file = project_file
+
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+
+            self.setup_files(version_file, project_file, "0.8.10")
+            self.setup_unreleased_entries(dirpath, only_fixed=True)
+
+            def remove_entries():
+                for filename in os.listdir(dirpath):
+                    os.remove(os.path.join(dirpath, filename))
+
+            # Each call to 'wait' changes the entries; the last one stops the script
+            changes = [
+                lambda: self.setup_major_entry(dirpath),
+                lambda: None,
+                remove_entries,
+                lambda: self.setup_major_entry(dirpath)
+            ]
+
+            def wait():
+                if not changes:
+                    raise KeyboardInterrupt
+                changes.pop(0)()
+
+            mock_open_waiter.return_value.wait.side_effect = wait
+
+            result = runner.invoke(semverup.semverup, ['--watch'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "0.8.11\n0.9.0\n0.9.0\n")
+            self.assertEqual(result.stderr, VERSION_NOT_UPDATED + "\n")
+
+            mock_open_waiter.return_value.close.assert_called_once_with()
+
+            # Files are not written
+            version = self.read_version_number(version_file)
+            self.assertEqual(version, "0.8.10")
+
+    @unittest.mock.patch('release_tools.semverup.read_trailer_entries')
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_trailers(self, mock_project, mock_read_trailers):
+        """Check whether entries defined by commit trailers are included"""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            version_file = os.path.join(fs, '_version.py')
+            mock_project.return_value.version_file = version_file
+
+            project_file = os.path.join(fs, 'pyproject.toml')
+            mock_project.return_value.pyproject_file = project_file
+
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            self.setup_files(version_file, project_file, "0.8.10")
+            self.setup_unreleased_entries(dirpath, only_fixed=True)
+
+            mock_read_trailers.return_value = {
+                'commit:abc': ChangelogEntry('new feature', 'added', 'John Smith')
+            }
+
+            result = runner.invoke(semverup.semverup, ['--dry-run', '--trailers'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "0.9.0\n")
+
+            mock_read_trailers.assert_called_once_with(mock_project.return_value,
+                                                       pre_release=False,
+                                                       on_invalid=warn_invalid_trailers)
+
+            # The entries directory is not needed
+            shutil.rmtree(dirpath)
+
+            result = runner.invoke(semverup.semverup, ['--dry-run', '--trailers'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "0.9.0\n")
+
+            # Commits with invalid trailers are skipped with a warning
+            def read_trailers(project, pre_release, on_invalid):
+                on_invalid("invalid trailers for commit abc")
+                return {}
+
+            mock_read_trailers.side_effect = read_trailers
+
+            runner = click.testing.CliRunner(mix_stderr=False)
+            result = runner.invoke(semverup.semverup, ['--dry-run', '--trailers'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.stderr,
+                             "Warning: invalid trailers for commit abc; commit skipped\n"
+                             "Error: no changes found; version number not updated\n")
+
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_trailers_error(self, mock_project):
+        """Check whether '--trailers' cannot be set with '--watch' or '--all'"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        for option in ['--watch', '--all']:
+            result = runner.invoke(semverup.semverup, ['--trailers', option])
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn("'--trailers' cannot be used with '--watch' or '--all'", result.stderr)
+
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_watch_all_error(self, mock_project):
+        """Check whether '--watch' and '--all' cannot be set together"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        result = runner.invoke(semverup.semverup, ['--watch', '--all'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("'--watch' cannot be used with '--all'", result.stderr)
+
     @unittest.mock.patch('release_tools.semverup.Project')
     def test_changelog_dir_not_exists_error(self, mock_project):
         """Check if it returns an error when the changelog dir does not exist"""
@@ -929,6 +1112,329 @@ class TestSemVerUp(unittest.TestCase):
             lines = result.stderr.split('\n')
             self.assertRegex(lines[-2], INVALID_CURRENT_VERSION)
 
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_from_tags(self, mock_project):
+        """Check whether it uses the latest release tag instead of version file"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            version_file = os.path.join(fs, '_version.py')
+            mock_project.return_value.version_file = version_file
+
+            project_file = os.path.join(fs, 'pyproject.toml')
+            mock_project.return_value.pyproject_file = project_file
+
+            dirpath = os.path.join(fs, 'releases', 'unreleased')
+            mock_project.return_value.unreleased_changes_path = dirpath
+
+            tags = [('0.2.0', '2020-02-01'), ('0.3.0-rc.1', '2020-03-01'),
+                    ('0.10.0-rc.1', '2020-04-01'), ('latest', '2020-04-02'),
+                    ('0.1.0', '2020-01-01')]
+            mock_project.return_value.release_tags = TagIndex(tags)
+
+            self.setup_files(version_file, project_file, "0.1.0")
+            self.setup_unreleased_entries(dirpath)
+
+            # Run the script command
+            result = runner.invoke(semverup.semverup, args=['--from-tags', '--pre-release'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "0.10.0-rc.2\n")
+
+            version = self.read_version_number(version_file)
+            self.assertEqual(version, "0.10.0-rc.2")
+
+            version = self.read_version_number_from_pyproject(project_file)
+            self.assertEqual(version, "0.10.0-rc.2")
+
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_from_tags_not_found(self, mock_project):
+        """Check whether it fails when there are no release tags"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            mock_project.return_value.release_tags = TagIndex([('latest', '2020-04-02')])
+
+            result = runner.invoke(semverup.semverup, args=['--from-tags', '--dry-run'])
+            self.assertEqual(result.exit_code, 1)
+
+            lines = result.stderr.split('\n')
+            self.assertEqual(lines[-2], RELEASE_TAGS_NOT_FOUND)
+
+            result = runner.invoke(semverup.semverup,
+                                   args=['--from-tags', '--current-version=0.1.0'])
+            self.assertEqual(result.exit_code, 2)
+
+    @staticmethod
+    def setup_packages(fs):
+        """Set up a repository with many packages"""
+
+        files = []
+
+        for name, version, only_fixed in [('pkg-a', '0.1.0', True),
+                                          ('pkg-b', '1.2.0', False),
+                                          ('pkg-c', '0.3.0', None)]:
+            version_file = os.path.join(name, name.replace('-', '_'), '_version.py')
+            project_file = os.path.join(name, 'pyproject.toml')
+            os.makedirs(os.path.join(fs, os.path.dirname(version_file)))
+
+            TestSemVerUp.setup_files(os.path.join(fs, version_file),
+                                     os.path.join(fs, project_file), version)
+
+            dirpath = os.path.join(fs, name, 'releases', 'unreleased')
+            if only_fixed is None:
+                os.makedirs(dirpath)
+            else:
+                TestSemVerUp.setup_unreleased_entries(dirpath, only_fixed=only_fixed)
+
+            files.extend([project_file, version_file])
+
+        # Nested version files do not belong to the package
+        os.makedirs(os.path.join(fs, 'pkg-a', 'tests'))
+        TestSemVerUp.setup_version_file(os.path.join(fs, 'pkg-a', 'tests', 'data_version.py'), '9.9.9')
+        files.append(os.path.join('pkg-a', 'tests', 'data_version.py'))
+
+        return sorted(files)
+
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_all_packages(self, mock_project):
+        """Check whether the version of every package is updated"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            mock_project.return_value.repo.ls_files.return_value = self.setup_packages(fs)
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            result = runner.invoke(semverup.semverup, ['--all'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+
+            expected = (
+                "Package  Current  New\n"
+                "pkg-a    0.1.0    0.1.1\n"
+                "pkg-b    1.2.0    1.3.0\n"
+                "pkg-c    0.3.0    -\n"
+            )
+            self.assertEqual(result.stdout, expected)
+
+            for name, version in [('pkg-a', '0.1.1'), ('pkg-b', '1.3.0'), ('pkg-c', '0.3.0')]:
+                version_file = os.path.join(fs, name, name.replace('-', '_'), '_version.py')
+                project_file = os.path.join(fs, name, 'pyproject.toml')
+                self.assertEqual(self.read_version_number(version_file), version)
+                self.assertEqual(self.read_version_number_from_pyproject(project_file), version)
+
+            version_file = os.path.join(fs, 'pkg-a', 'tests', 'data_version.py')
+            self.assertEqual(self.read_version_number(version_file), '9.9.9')
+
+            # Only the given packages are updated
+            result = runner.invoke(semverup.semverup,
+                                   ['--all', '--dry-run', '--bump-version=major', 'pkg-c'])
+            self.assertEqual(result.exit_code, 0, msg=result.stderr)
+            self.assertEqual(result.stdout,
+                             "Package  Current  New\n"
+                             "pkg-c    0.3.0    1.0.0\n")
+
+    @unittest.mock.patch('release_tools.semverup.Project')
+    def test_all_packages_error(self, mock_project):
+        """Check whether no files are written when a package fails"""
+
+        runner = click.testing.CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem() as fs:
+            mock_project.return_value.repo.ls_files.return_value = self.setup_packages(fs)
+            mock_project.return_value.cache_path = os.path.join(fs, 'cache')
+
+            with open(os.path.join(fs, 'pkg-b', 'releases', 'unreleased', 'invalid.yml'), 'w') as fd:
+                fd.write("---\ntitle: invalid entry\n")
+
+            result = runner.invoke(semverup.semverup, ['--all'])
+            self.assertEqual(result.exit_code, 1)
+
+            lines = result.stderr.split('\n')
+            self.assertEqual(lines[-3], "Error: unable to update packages")
+            self.assertRegex(lines[-2], r"^pkg-b: invalid format for .+; 'category' attribute not found")
+
+            version_file = os.path.join(fs, 'pkg-a', 'pkg_a', '_version.py')
+            self.assertEqual(self.read_version_number(version_file), '0.1.0')
+
+            result = runner.invoke(semverup.semverup, ['--all', 'pkg-d'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Error: pyproject file not found in package pkg-d", result.stderr)
+
+            result = runner.invoke(semverup.semverup, ['pkg-a'])
+            self.assertEqual(result.exit_code, 2)
+
+    def test_write_version_number_unchanged(self):
+        """Check whether version files are not written when the version does not change"""
+
+        runner = click.testing.CliRunner()
+
+        with runner.isolated_filesystem() as fs:
+            version_file = os.path.join(fs, '_version.py')
+            project_file = os.path.join(fs, 'pyproject.toml')
+            self.setup_files(version_file, project_file, "0.1.0")
+
+            version = semver.VersionInfo.parse("0.2.0")
+
+            self.assertTrue(semverup.write_version_number(version_file, version))
+            self.assertTrue(semverup.write_version_number_pyproject(project_file, version))
+
+            with open(version_file, mode='r') as fd:
+                content = fd.read()
+            mtime = os.stat(project_file).st_mtime_ns
+
+            # Same version; only the timestamp would change
+            self.assertFalse(semverup.write_version_number(version_file, version))
+            self.assertFalse(semverup.write_version_number_pyproject(project_file, version))
+
+            with open(version_file, mode='r') as fd:
+                self.assertEqual(fd.read(), content)
+            self.assertEqual(os.stat(project_file).st_mtime_ns, mtime)
+
+            # A new version is written
+            version = semver.VersionInfo.parse("0.2.1")
+
+            self.assertTrue(semverup.write_version_number(version_file, version))
+            self.assertTrue(semverup.write_version_number_pyproject(project_file, version))
+            self.assertEqual(self.read_version_number(version_file), "0.2.1")
+            self.assertEqual(self.read_version_number_from_pyproject(project_file), "0.2.1")
+
+
+class TestPatchPyprojectVersion(unittest.TestCase):
+    """Unit tests for patch_pyproject_version"""
+
+    FUZZ_ITERATIONS = 100
+
+    @staticmethod
+    def generate_pyproject(rnd):
+        """Generate a random pyproject document with a poetry version"""
+
+        def spacing():
+            return rnd.choice(['', ' ', '  ', '\t'])
+
+        def comment():
+            return rnd.choice(['', '', ' # comment', '  #version = "9.9.9"'])
+
+        def quote(value):
+            return rnd.choice(['"{}"', "'{}'"]).format(value)
+
+        def assignment(key, value):
+            return spacing() + key + spacing() + '=' + spacing() + value + comment() + '\n'
+
+        poetry = [
+            assignment('name', quote('release-tools')),
+            assignment('version', quote('0.1.0')),
+            assignment('description', '\'version = "0.0.1"\''),
+            assignment('authors', '[\n    ' + quote('John Smith') + ',\n]'),
+            assignment('packages', '[\n    { include = "release_tools" },\n]'),
+            '# version = "0.0.1"\n',
+            '\n',
+        ]
+        rnd.shuffle(poetry)
+
+        tables = [
+            ['[tool.poetry.dependencies]\n',
+             assignment('python', quote('^3.9')),
+             assignment('click', '{ version = "^7.0", optional = true }')],
+            ['[tool.other]\n', assignment('version', quote('1.0'))],
+            ['[[tool.poetry.source]]\n', assignment('name', quote('pypi')),
+             assignment('version', quote('2.0'))],
+            ['[build-system]\n', assignment('requires', '["poetry-core>=1.0.0"]')],
+        ]
+        rnd.shuffle(tables)
+
+        header = spacing() + '[' + rnd.choice(['tool.poetry', 'tool . poetry']) + ']' + comment() + '\n'
+        position = rnd.randint(0, len(tables))
+        tables.insert(position, [header] + poetry)
+
+        content = '\n'.join(''.join(table) for table in tables)
+
+        if rnd.random() < 0.2:
+            content = content.replace('\n', '\r\n')
+
+        return content
+
+    @staticmethod
+    def tomlkit_update(content, version):
+        """Update the version with a full tomlkit round-trip"""
+
+        metadata = tomlkit.parse(content)
+        metadata["tool"]["poetry"]["version"] = str(version)
+        return metadata.as_string()
+
+    def test_patch(self):
+        """Check if only the value of the version is replaced"""
+
+        content = (
+            "# Project file\n"
+            "[tool.poetry]  # poetry\n"
+            "name = 'release-tools'\n"
+            "version   =  '0.1.0'  # current version\n"
+            "\n"
+            "[tool.poetry.dependencies]\n"
+            "version = \"0.1.0\"\n"
+        )
+        expected = content.replace("'0.1.0'", "'0.2.0-rc.1'")
+
+        version = semver.VersionInfo.parse("0.2.0-rc.1")
+        patched = semverup.patch_pyproject_version(content, version)
+        self.assertEqual(patched, expected)
+
+    def test_fuzz_equivalence(self):
+        """Check if patched documents are equivalent to tomlkit ones"""
+
+        rnd = random.Random(0)
+        version = semver.VersionInfo.parse("1.2.3-rc.4")
+
+        for _ in range(self.FUZZ_ITERATIONS):
+            content = self.generate_pyproject(rnd)
+
+            patched = semverup.patch_pyproject_version(content, version)
+            self.assertIsNotNone(patched, msg=content)
+
+            expected = self.tomlkit_update(content, version)
+            self.assertEqual(tomlkit.parse(patched), tomlkit.parse(expected), msg=content)
+            self.assertEqual(tomlkit.parse(patched)["tool"]["poetry"]["version"], "1.2.3-rc.4")
+
+            # Only the value of the key changed
+            prefix = os.path.commonprefix([content, patched])
+            suffix = os.path.commonprefix([content[::-1], patched[::-1]])
+            self.assertEqual(content[len(prefix):len(content) - len(suffix)], "0.1.0")
+            self.assertEqual(patched[len(prefix):len(patched) - len(suffix)], "1.2.3-rc.4")
+
+    def test_unsupported_layouts(self):
+        """Check if unsupported layouts are not patched"""
+
+        version = semver.VersionInfo.parse("0.2.0")
+
+        for content in PYPROJECT_UNSUPPORTED_LAYOUTS:
+            self.assertIsNone(semverup.patch_pyproject_version(content, version), msg=content)
+
+        self.assertIsNone(semverup.patch_pyproject_version('[tool.poetry]\nname = "x"\n', version))
+        self.assertIsNone(semverup.patch_pyproject_version('[tool.poetry.dependencies]\n', version))
+        self.assertIsNone(semverup.patch_pyproject_version(
+            '[tool.poetry]\nversion = "0.1.0"\n[tool.poetry]\nname = "x"\n', version))
+
+    def test_write_fallback(self):
+        """Check if unsupported layouts are written with tomlkit"""
+
+        runner = click.testing.CliRunner()
+        version = semver.VersionInfo.parse("0.2.0")
+
+        with runner.isolated_filesystem() as fs:
+            project_file = os.path.join(fs, 'pyproject.toml')
+
+            for content in PYPROJECT_UNSUPPORTED_LAYOUTS[:5]:
+                with open(project_file, mode='w') as fd:
+                    fd.write(content)
+
+                self.assertTrue(semverup.write_version_number_pyproject(project_file, version))
+
+                with open(project_file, mode='r') as fd:
+                    metadata = tomlkit.parse(fd.read())
+                self.assertEqual(metadata["tool"]["poetry"]["version"], "0.2.0")
+
 
 if __name__ == '__main__':
     unittest.main()
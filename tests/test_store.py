@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.store import PackedEntryStore
+
+
+def entry_data(title, category='added'):
+    return {
+        'title': title,
+        'category': category,
+        'author': 'John Smith',
+        'issue': None,
+        'notes': 'Ñandú'
+    }
+
+
+class TestPackedEntryStore(unittest.TestCase):
+    """Unit tests for PackedEntryStore"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.dirpath = os.path.join(self.tmp_path.name, 'unreleased')
+        self.cache_path = os.path.join(self.tmp_path.name, 'cache')
+        os.makedirs(self.dirpath)
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def test_append_and_read(self):
+        """Check if entries are added, replaced and removed"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        self.assertFalse(store.exists())
+        self.assertListEqual(store.names(), [])
+        self.assertDictEqual(store.read_all(), {})
+
+        store.append('first.yml', entry_data('First'))
+        store.append_many({'second.yml': entry_data('Second'),
+                           'third.yml': entry_data('Third')})
+        store.append('first.yml', entry_data('First', category='fixed'))
+        store.delete('second.yml')
+        store.delete('unknown.yml')
+
+        self.assertTrue(store.exists())
+        self.assertListEqual(store.names(), ['first.yml', 'third.yml'])
+        self.assertIn('third.yml', store)
+        self.assertNotIn('second.yml', store)
+
+        self.assertDictEqual(store.read('first.yml'), entry_data('First', category='fixed'))
+        self.assertIsNone(store.read('second.yml'))
+        self.assertDictEqual(store.read_all(),
+                             {'first.yml': entry_data('First', category='fixed'),
+                              'third.yml': entry_data('Third')})
+
+        # Records are never modified
+        with open(store.filepath, mode='rb') as fd:
+            self.assertEqual(len(fd.readlines()), 5)
+
+    def test_index(self):
+        """Check if the index is only updated with the new records"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        store.append_many({'first.yml': entry_data('First'),
+                           'second.yml': entry_data('Second')})
+
+        self.assertTrue(os.path.exists(store.index_filepath))
+        self.assertEqual(os.path.dirname(store.index_filepath), self.cache_path)
+        self.assertListEqual(os.listdir(self.dirpath), ['entries.jsonl'])
+
+        # Records appended by other processes are indexed
+        other = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        other.append('third.yml', entry_data('Third'))
+
+        with unittest.mock.patch.object(PackedEntryStore, '_scan',
+                                        autospec=True,
+                                        side_effect=PackedEntryStore._scan) as mock_scan:
+            store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+            self.assertListEqual(store.names(), ['first.yml', 'second.yml', 'third.yml'])
+            mock_scan.assert_not_called()
+
+            store.append('fourth.yml', entry_data('Fourth'))
+            self.assertEqual(mock_scan.call_count, 1)
+            self.assertGreater(mock_scan.call_args[0][1], 0)
+
+    def test_index_rebuilt(self):
+        """Check if the index is rebuilt when the store is replaced"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        store.append_many({'first.yml': entry_data('First'),
+                           'second.yml': entry_data('Second')})
+
+        # Rewrite the store in place
+        other = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        with open(other.filepath, mode='r+b') as fd:
+            data = fd.read().replace(b'First', b'Fresh')
+            fd.seek(0)
+            fd.write(data)
+            fd.write(b'{"name": "first.yml", "deleted": true}\n')
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        self.assertListEqual(store.names(), ['second.yml'])
+
+    def test_incomplete_record(self):
+        """Check if incomplete records are ignored"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        store.append('first.yml', entry_data('First'))
+
+        with open(store.filepath, mode='ab') as fd:
+            fd.write(b'{"name": "second.yml", "entr')
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        self.assertListEqual(store.names(), ['first.yml'])
+
+    def test_invalid_record(self):
+        """Check if an error is raised when a record is invalid"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+
+        with open(store.filepath, mode='wb') as fd:
+            fd.write(b'{"entry": {}}\n')
+
+        with self.assertRaisesRegex(ValueError, "invalid record in .+ at offset 0"):
+            store.names()
+
+    def test_compact(self):
+        """Check if only live records are kept after compacting the store"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        self.assertEqual(store.compact(), 0)
+
+        store.append_many({'first.yml': entry_data('First'),
+                           'second.yml': entry_data('Second')})
+        store.append('first.yml', entry_data('First', category='fixed'))
+        store.delete('second.yml')
+
+        expected = store.read_all()
+
+        self.assertEqual(store.compact(), 3)
+        self.assertDictEqual(store.read_all(), expected)
+
+        with open(store.filepath, mode='rb') as fd:
+            self.assertEqual(len(fd.readlines()), 1)
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        self.assertDictEqual(store.read_all(), expected)
+
+    def test_no_cache_path(self):
+        """Check if the index is kept in memory without a cache path"""
+
+        store = PackedEntryStore(self.dirpath)
+        store.append_many({'first.yml': entry_data('First'),
+                           'second.yml': entry_data('Second')})
+        store.delete('first.yml')
+
+        self.assertIsNone(store.index_filepath)
+        self.assertListEqual(store.names(), ['second.yml'])
+        self.assertListEqual(os.listdir(self.dirpath), ['entries.jsonl'])
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        store.remove()
+        self.assertFalse(store.exists())
+
+    def test_remove(self):
+        """Check if the store and its index are removed"""
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.cache_path)
+        store.append('first.yml', entry_data('First'))
+        store.remove()
+
+        self.assertFalse(store.exists())
+        self.assertFalse(os.path.exists(store.index_filepath))
+        self.assertListEqual(store.names(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.entry import ChangelogEntry
+from release_tools.store import PackedEntryStore
+from release_tools.summary import (BumpSummary,
+                                   open_bump_summary,
+                                   strongest_bump_version,
+                                   update_bump_summary)
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: null\nissue: null\nnotes: null\n"
+)
+
+
+class TestStrongestBumpVersion(unittest.TestCase):
+    """Unit tests for strongest_bump_version"""
+
+    def test_bump_version(self):
+        """Check if the strongest bump is returned"""
+
+        self.assertEqual(strongest_bump_version(['fixed', 'dependency']), 'patch')
+        self.assertEqual(strongest_bump_version(['fixed', 'added']), 'minor')
+        self.assertEqual(strongest_bump_version(['removed', 'added', 'fixed']), 'major')
+        self.assertIsNone(strongest_bump_version([]))
+
+
+class TestBumpSummary(unittest.TestCase):
+    """Unit tests for BumpSummary"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.dirpath = os.path.join(self.tmp_path.name, 'unreleased')
+        os.mkdir(self.dirpath)
+
+        self.project = unittest.mock.MagicMock()
+        self.project.cache_path = os.path.join(self.tmp_path.name, 'cache')
+        self.project.unreleased_changes_path = self.dirpath
+        self.filepath = os.path.join(self.project.cache_path, 'summary.json')
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def write_entry(self, filename, title, category):
+        with open(os.path.join(self.dirpath, filename), mode='w') as fd:
+            fd.write(ENTRY_TEMPLATE.format(title=title, category=category))
+
+    def test_refresh(self):
+        """Check if the summary is updated with the entries of the directory"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+        self.write_entry('second.yml', 'Second', 'added')
+
+        summary = BumpSummary(self.filepath, self.dirpath)
+        self.assertFalse(summary.is_valid())
+        self.assertTrue(summary.refresh())
+        self.assertTrue(summary.is_valid())
+
+        self.assertDictEqual(summary.counts, {'fixed': 1, 'added': 1})
+        self.assertEqual(summary.bump_version, 'minor')
+
+        # Only new or modified files are parsed
+        self.write_entry('third.yml', 'Third', 'removed')
+        os.remove(os.path.join(self.dirpath, 'first.yml'))
+
+        with unittest.mock.patch('release_tools.summary.ChangelogEntry.from_yaml_file',
+                                 wraps=ChangelogEntry.from_yaml_file) as mock_read:
+            self.assertTrue(summary.refresh())
+            mock_read.assert_called_once_with(os.path.join(self.dirpath, 'third.yml'))
+
+        self.assertDictEqual(summary.counts, {'added': 1, 'removed': 1})
+        self.assertEqual(summary.bump_version, 'major')
+        self.assertFalse(summary.refresh())
+
+    def test_invalid_entries(self):
+        """Check if entries that cannot be parsed invalidate the summary"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+
+        with open(os.path.join(self.dirpath, 'invalid.yml'), mode='w') as fd:
+            fd.write("---\ntitle: Invalid\n")
+
+        summary = BumpSummary(self.filepath, self.dirpath)
+        summary.refresh()
+
+        self.assertDictEqual(summary.counts, {'fixed': 1})
+        self.assertFalse(summary.is_valid())
+
+    def test_category_changed(self):
+        """Check if changing the category of an entry invalidates the summary"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+
+        summary = BumpSummary(self.filepath, self.dirpath)
+        summary.refresh()
+        summary.save()
+        self.assertEqual(summary.bump_version, 'patch')
+
+        # Same size, different category; files modified right
+        # after saving the summary cannot be trusted by their stat
+        self.write_entry('first.yml', 'First', 'added')
+        self.assertFalse(summary.is_valid())
+
+        self.assertTrue(summary.refresh())
+        self.assertEqual(summary.bump_version, 'minor')
+
+    def test_stat_changed(self):
+        """Check if entries are validated by their stat, without reading them"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+        filepath = os.path.join(self.dirpath, 'first.yml')
+        os.utime(filepath, ns=(0, 0))
+
+        summary = BumpSummary(self.filepath, self.dirpath)
+        summary.refresh()
+        summary.save()
+
+        with unittest.mock.patch('builtins.open') as mock_open:
+            self.assertTrue(summary.is_valid())
+            mock_open.assert_not_called()
+
+        os.utime(filepath, ns=(10 ** 9, 10 ** 9))
+        self.assertFalse(summary.is_valid())
+
+    def test_packed_entries(self):
+        """Check if the entries of the packed store are summarized"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+        os.utime(os.path.join(self.dirpath, 'first.yml'), ns=(0, 0))
+
+        store = PackedEntryStore(self.dirpath, cache_path=self.project.cache_path)
+        store.append_many({
+            'second.yml': ChangelogEntry('Second', 'added', None).to_dict(),
+            'first.yml': ChangelogEntry('First', 'removed', None).to_dict()
+        })
+        os.utime(store.filepath, ns=(0, 0))
+
+        update_bump_summary(self.project)
+
+        summary = open_bump_summary(self.project.cache_path, self.dirpath)
+        self.assertTrue(summary.is_valid())
+
+        # YAML files replace the packed entries with the same name
+        self.assertDictEqual(summary.counts, {'fixed': 1, 'added': 1})
+        self.assertEqual(summary.bump_version, 'minor')
+
+        # Only appended records are parsed
+        store.append('third.yml', ChangelogEntry('Third', 'removed', None).to_dict())
+        self.assertFalse(summary.is_valid())
+
+        with unittest.mock.patch('release_tools.summary.ChangelogEntry.from_dict',
+                                 wraps=ChangelogEntry.from_dict) as mock_read:
+            self.assertTrue(summary.refresh())
+            self.assertEqual(mock_read.call_count, 1)
+
+        self.assertEqual(summary.bump_version, 'major')
+
+        store.compact()
+        store.delete('third.yml')
+        self.assertTrue(summary.refresh())
+        self.assertEqual(summary.bump_version, 'minor')
+
+    def test_save_and_load(self):
+        """Check if the summary is stored and validated against the directory"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+
+        update_bump_summary(self.project)
+
+        # The summary is not stored with the entries
+        self.assertListEqual(os.listdir(self.dirpath), ['first.yml'])
+
+        summary = open_bump_summary(self.project.cache_path, self.dirpath)
+        self.assertTrue(summary.exists())
+        self.assertTrue(summary.is_valid())
+        self.assertEqual(summary.bump_version, 'patch')
+
+        # Modified entries invalidate the summary
+        self.write_entry('first.yml', 'First', 'changed')
+        self.assertFalse(summary.is_valid())
+
+        update_bump_summary(self.project)
+
+        summary = open_bump_summary(self.project.cache_path, self.dirpath)
+        self.assertTrue(summary.is_valid())
+        self.assertEqual(summary.bump_version, 'major')
+
+    def test_update_not_created(self):
+        """Check if the summary is not created when it is not requested"""
+
+        self.write_entry('first.yml', 'First', 'fixed')
+
+        update_bump_summary(self.project, create=False)
+
+        summary = open_bump_summary(self.project.cache_path, self.dirpath)
+        self.assertFalse(summary.exists())
+        self.assertFalse(summary.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import semver
+
+from release_tools.repo import MemoryGitHandler
+from release_tools.tags import TagIndex, open_tag_index
+
+
+TAGS = [
+    ('0.10.0', '2020-05-01'),
+    ('0.2.0-rc.1', '2020-01-15'),
+    ('v0.3.0', '2020-02-15'),
+    ('0.2.0', '2020-02-01'),
+    ('0.11.0-rc.2', '2020-06-02'),
+    ('0.1.0', '2020-01-01'),
+    ('latest', '2020-06-03'),
+    ('0.11.0-rc.1', '2020-06-01'),
+]
+
+
+class TestTagIndex(unittest.TestCase):
+    """Unit tests for TagIndex"""
+
+    def test_index(self):
+        """Check if release tags are indexed by version"""
+
+        index = TagIndex(TAGS)
+
+        expected = [
+            ('0.1.0', '2020-01-01'),
+            ('0.2.0-rc.1', '2020-01-15'),
+            ('0.2.0', '2020-02-01'),
+            ('0.10.0', '2020-05-01'),
+            ('0.11.0-rc.1', '2020-06-01'),
+            ('0.11.0-rc.2', '2020-06-02'),
+        ]
+        self.assertListEqual(index.tags, expected)
+        self.assertEqual(len(index), 6)
+
+        self.assertIn('0.2.0-rc.1', index)
+        self.assertIn(semver.VersionInfo.parse('0.10.0'), index)
+        self.assertNotIn('0.3.0', index)
+        self.assertEqual(index.tag('0.10.0'), ('0.10.0', '2020-05-01'))
+        self.assertIsNone(index.tag('0.3.0'))
+
+    def test_latest(self):
+        """Check if the latest release is found"""
+
+        index = TagIndex(TAGS)
+
+        self.assertEqual(str(index.latest()), '0.11.0-rc.2')
+        self.assertEqual(str(index.latest(prerelease=False)), '0.10.0')
+
+        index = TagIndex([('latest', '2020-06-03')])
+        self.assertIsNone(index.latest())
+        self.assertIsNone(index.latest(prerelease=False))
+
+    def test_previous(self):
+        """Check if the release previous to a version is found"""
+
+        index = TagIndex(TAGS)
+
+        self.assertEqual(str(index.previous('0.11.0-rc.2')), '0.11.0-rc.1')
+        self.assertEqual(str(index.previous('0.11.0-rc.2', prerelease=False)), '0.10.0')
+        self.assertEqual(str(index.previous('0.2.0')), '0.2.0-rc.1')
+        self.assertEqual(str(index.previous('0.2.0', prerelease=False)), '0.1.0')
+        self.assertEqual(str(index.previous('0.5.0')), '0.2.0')
+        self.assertEqual(str(index.previous('1.0.0')), '0.11.0-rc.2')
+        self.assertIsNone(index.previous('0.1.0'))
+        self.assertIsNone(index.previous('0.0.1'))
+
+
+class TestOpenTagIndex(unittest.TestCase):
+    """Unit tests for open_tag_index"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tmp_path.name, 'cache', 'release-tags.json')
+        self.repo = MemoryGitHandler(self.tmp_path.name)
+        self.commit('README', 'Initial commit')
+
+        for tag, date in TAGS:
+            self.repo.tag(tag, date=date)
+
+    def tearDown(self):
+        self.tmp_path.cleanup()
+
+    def commit(self, filename, message):
+        with open(os.path.join(self.tmp_path.name, filename), 'w') as fd:
+            fd.write(message)
+        self.repo.add(filename)
+        self.repo.commit(message, 'John Smith <jsmith@example.com>')
+
+    def test_stored_index(self):
+        """Check if the index is read from its file while tags do not change"""
+
+        index = open_tag_index(self.repo, self.filepath)
+        self.assertEqual(str(index.latest()), '0.11.0-rc.2')
+
+        with open(self.filepath, 'r') as fd:
+            data = json.load(fd)
+        self.assertListEqual(data['tags'], [list(tag) for tag in index.tags])
+
+        with unittest.mock.patch.object(self.repo, 'tags', wraps=self.repo.tags) as mock_tags:
+            stored = open_tag_index(self.repo, self.filepath)
+            mock_tags.assert_not_called()
+
+        self.assertListEqual(stored.tags, index.tags)
+        self.assertListEqual(stored.versions, index.versions)
+        self.assertListEqual(stored.final_versions, index.final_versions)
+
+    def test_tags_changed(self):
+        """Check if the index is built again when tags change"""
+
+        open_tag_index(self.repo, self.filepath)
+
+        self.commit('NEWS', 'Release 0.11.0')
+        self.repo.tag('0.11.0', date='2020-06-04')
+
+        index = open_tag_index(self.repo, self.filepath)
+        self.assertEqual(str(index.latest()), '0.11.0')
+        self.assertEqual(str(open_tag_index(self.repo, self.filepath).latest()), '0.11.0')
+
+    def test_invalid_file(self):
+        """Check if invalid index files are ignored"""
+
+        os.makedirs(os.path.dirname(self.filepath))
+        with open(self.filepath, 'w') as fd:
+            fd.write('[]')
+
+        index = open_tag_index(self.repo, self.filepath)
+        self.assertEqual(len(index), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
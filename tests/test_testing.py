@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.repo import GitHandler
+from release_tools.testing import RepositoryTemplate
+
+
+FILES = {
+    'pyproject.toml': '[tool.poetry]\nname = "myapp"\nversion = "0.1.0"\n',
+    'myapp/_version.py': '__version__ = "0.1.0"\n',
+    'data.bin': b'\x00\x01'
+}
+
+
+class TestRepositoryTemplate(unittest.TestCase):
+    """Unit tests for RepositoryTemplate"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.cache_path = os.path.join(self.tmp_path, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def git(self, dirpath, *args):
+        return subprocess.check_output(['git'] + list(args), cwd=dirpath,
+                                       universal_newlines=True)
+
+    def test_clone(self):
+        """Check whether the template is built once and copied"""
+
+        template = RepositoryTemplate(FILES, tags=['0.1.0'], cache_dirpath=self.cache_path)
+
+        with unittest.mock.patch.object(GitHandler, '_exec', wraps=GitHandler._exec) as mock_exec:
+            repo_a = template.clone(os.path.join(self.tmp_path, 'a'))
+            calls = mock_exec.call_count
+            repo_b = template.clone(os.path.join(self.tmp_path, 'b'))
+
+            # Git is not run to create more copies
+            self.assertGreater(calls, 0)
+            self.assertEqual(mock_exec.call_count, calls)
+
+        self.assertListEqual(os.listdir(self.cache_path), [template.key])
+
+        for repo in [repo_a, repo_b]:
+            self.assertEqual(self.git(repo, 'status', '--porcelain'), '')
+            self.assertEqual(self.git(repo, 'tag').strip(), '0.1.0')
+            self.assertEqual(self.git(repo, 'rev-parse', '--abbrev-ref', 'HEAD').strip(), 'master')
+            self.assertEqual(self.git(repo, 'log', '--format=%an <%ae>').strip(),
+                             'John Smith <jsmith@example.com>')
+
+        with open(os.path.join(repo_a, 'data.bin'), 'rb') as fd:
+            self.assertEqual(fd.read(), b'\x00\x01')
+
+    def test_clones_are_independent(self):
+        """Check whether changes on a copy do not modify the others"""
+
+        template = RepositoryTemplate(FILES, cache_dirpath=self.cache_path)
+
+        repo_a = template.clone(os.path.join(self.tmp_path, 'a'))
+        repo_b = template.clone(os.path.join(self.tmp_path, 'b'))
+        head = self.git(repo_b, 'rev-parse', 'HEAD')
+
+        with open(os.path.join(repo_a, 'myapp', '_version.py'), 'w') as fd:
+            fd.write('__version__ = "0.2.0"\n')
+        self.git(repo_a, 'commit', '-q', '-a', '-m', 'Release 0.2.0')
+
+        self.assertNotEqual(self.git(repo_a, 'rev-parse', 'HEAD'), head)
+        self.assertEqual(self.git(repo_b, 'rev-parse', 'HEAD'), head)
+        self.assertEqual(self.git(template.path, 'status', '--porcelain'), '')
+
+        with open(os.path.join(repo_b, 'myapp', '_version.py'), 'r') as fd:
+            self.assertEqual(fd.read(), '__version__ = "0.1.0"\n')
+
+        # Objects of the template are shared
+        objects_path = os.path.join(repo_b, '.git', 'objects')
+        nlinks = [
+            os.stat(os.path.join(root, name)).st_nlink
+            for root, _, files in os.walk(objects_path) for name in files
+        ]
+        self.assertTrue(any(n > 1 for n in nlinks))
+
+    def test_parallel_build(self):
+        """Check whether the same template can be built concurrently"""
+
+        template = RepositoryTemplate(FILES, cache_dirpath=self.cache_path)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            repos = list(executor.map(lambda i: template.clone(os.path.join(self.tmp_path, str(i))),
+                                      range(4)))
+
+        for repo in repos:
+            self.assertEqual(self.git(repo, 'status', '--porcelain'), '')
+
+        # Temporary build directories are removed
+        self.assertListEqual(os.listdir(self.cache_path), [template.key])
+
+    def test_key(self):
+        """Check whether templates are identified by their content"""
+
+        template = RepositoryTemplate(FILES, cache_dirpath=self.cache_path)
+
+        self.assertEqual(template.key, RepositoryTemplate(dict(FILES)).key)
+        self.assertNotEqual(template.key, RepositoryTemplate(FILES, tags=['0.1.0']).key)
+        self.assertNotEqual(template.key, RepositoryTemplate(dict(FILES, NEWS='')).key)
+
+
+if __name__ == "__main__":
+    unittest.main()
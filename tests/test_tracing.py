@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import unittest
+
+import click
+from click.testing import CliRunner
+
+import release_tools.tracing
+from release_tools.tracing import (STATUS_CODE_ERROR,
+                                   STATUS_CODE_UNSET,
+                                   Tracer,
+                                   span,
+                                   start_tracer,
+                                   stop_tracer,
+                                   trace_option)
+
+
+@span('load', source='dir', count=3)
+def load():
+    with span('git rev-parse', phase='git'):
+        pass
+
+
+@click.command()
+@trace_option
+def dummy():
+    load()
+    click.echo("done")
+
+
+@click.command()
+@trace_option
+def failing():
+    with span('compose'):
+        raise click.ClickException("failed")
+
+
+def read_spans(data):
+    return data['resourceSpans'][0]['scopeSpans'][0]['spans']
+
+
+class TestTracer(unittest.TestCase):
+    """Unit tests for Tracer"""
+
+    def test_nested_spans(self):
+        """Check whether spans are linked to their parents"""
+
+        tracer = Tracer()
+        root = tracer.start_span('notes')
+        child = tracer.start_span('read_changelog_entries', {'entries': 2})
+        tracer.end_span()
+        tracer.end_span()
+
+        self.assertEqual(len(tracer.trace_id), 32)
+        self.assertEqual(len(root.span_id), 16)
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(child.parent_id, root.span_id)
+        self.assertEqual(child.trace_id, root.trace_id)
+        self.assertGreaterEqual(root.end_time, child.end_time)
+        self.assertGreaterEqual(child.start_time, root.start_time)
+
+    def test_export(self):
+        """Check whether spans are exported in OTLP/JSON format"""
+
+        tracer = Tracer()
+        tracer.start_span('notes')
+        tracer.start_span('load', {'path': 'releases', 'count': 2,
+                                   'cached': False, 'ratio': 0.5})
+        tracer.end_span(error=ValueError("invalid entry"))
+        tracer.end_span()
+
+        data = tracer.export()
+
+        resource = data['resourceSpans'][0]['resource']
+        self.assertDictEqual(resource['attributes'][0],
+                             {'key': 'service.name', 'value': {'stringValue': 'release-tools'}})
+
+        spans = read_spans(data)
+        self.assertListEqual([s['name'] for s in spans], ['notes', 'load'])
+
+        root, child = spans
+        self.assertEqual(root['parentSpanId'], '')
+        self.assertEqual(child['parentSpanId'], root['spanId'])
+        self.assertEqual(root['kind'], 1)
+        self.assertIsInstance(root['startTimeUnixNano'], str)
+        self.assertDictEqual(root['status'], {'code': STATUS_CODE_UNSET})
+        self.assertDictEqual(child['status'], {'code': STATUS_CODE_ERROR,
+                                               'message': 'invalid entry'})
+
+        expected = [
+            {'key': 'path', 'value': {'stringValue': 'releases'}},
+            {'key': 'count', 'value': {'intValue': '2'}},
+            {'key': 'cached', 'value': {'boolValue': False}},
+            {'key': 'ratio', 'value': {'doubleValue': 0.5}}
+        ]
+        self.assertListEqual(child['attributes'], expected)
+
+    def test_span_inactive(self):
+        """Check whether spans do nothing when no command is traced"""
+
+        self.assertIsNone(release_tools.tracing._active)
+        load()
+        self.assertIsNone(release_tools.tracing._active)
+
+
+class TestStartStopTracer(unittest.TestCase):
+    """Unit tests for start_tracer and stop_tracer"""
+
+    def test_start_stop(self):
+        """Check whether open spans are ended and callbacks are called"""
+
+        finished = []
+
+        tracer = start_tracer('notes')
+        tracer.on_finish.append(finished.append)
+
+        self.assertIs(start_tracer('semverup'), tracer)
+
+        span('load').__enter__()
+        error = ValueError("invalid entry")
+        stop_tracer(error=error)
+
+        self.assertIsNone(release_tools.tracing._active)
+        self.assertListEqual(finished, [tracer])
+        self.assertListEqual([s.name for s in tracer.spans], ['load', 'notes'])
+        self.assertListEqual([s.error for s in tracer.spans],
+                             ['invalid entry', 'invalid entry'])
+
+
+class TestTraceOption(unittest.TestCase):
+    """Unit tests for '--trace' option"""
+
+    def test_trace_file(self):
+        """Check whether spans are written to a file"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(dummy, ['--trace', 'trace.json'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.stdout, "done\n")
+
+            with open('trace.json', 'r') as fd:
+                data = json.load(fd)
+
+        spans = read_spans(data)
+        self.assertListEqual([s['name'] for s in spans],
+                             ['dummy', 'load', 'git rev-parse'])
+        self.assertEqual(spans[1]['parentSpanId'], spans[0]['spanId'])
+        self.assertEqual(spans[2]['parentSpanId'], spans[1]['spanId'])
+        self.assertEqual(len(spans[1]['attributes']), 2)
+        self.assertListEqual(spans[2]['attributes'],
+                             [{'key': 'release_tools.phase', 'value': {'stringValue': 'git'}}])
+
+        self.assertIsNone(release_tools.tracing._active)
+
+    def test_trace_stderr(self):
+        """Check whether spans are printed to the standard error"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        result = runner.invoke(dummy, ['--trace', '-'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout, "done\n")
+
+        data = json.loads(result.stderr)
+        self.assertEqual(len(read_spans(data)), 3)
+
+    def test_trace_on_error(self):
+        """Check whether failed spans are marked as errors"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(failing, ['--trace', 'trace.json'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Error: failed", result.stderr)
+
+            with open('trace.json', 'r') as fd:
+                data = json.load(fd)
+
+        spans = read_spans(data)
+        self.assertListEqual([s['name'] for s in spans], ['failing', 'compose'])
+
+        for s in spans:
+            self.assertDictEqual(s['status'], {'code': STATUS_CODE_ERROR,
+                                               'message': 'failed'})
+
+        self.assertIsNone(release_tools.tracing._active)
+
+    def test_trace_invalid_file(self):
+        """Check whether it fails when the trace cannot be written"""
+
+        runner = CliRunner(mix_stderr=False)
+
+        with runner.isolated_filesystem():
+            with open('file', 'w') as fd:
+                fd.write('')
+
+            result = runner.invoke(dummy, ['--trace', 'file/trace.json'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("Error: unable to write trace file", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.project import Project
+from release_tools.repo import GitHandler
+from release_tools.testing import RepositoryTemplate
+from release_tools.trailers import (TRAILERS_CURSOR_FILENAME,
+                                    parse_trailers,
+                                    read_trailer_entries)
+
+
+REPOSITORY_TEMPLATE = RepositoryTemplate({
+    'pyproject.toml': '[tool.poetry]\nname = "myapp"\nversion = "0.1.0"\n',
+    'myapp/_version.py': '__version__ = "0.1.0"\n'
+}, tags=['0.1.0'])
+
+
+class TestParseTrailers(unittest.TestCase):
+    """Unit tests for parse_trailers"""
+
+    def test_parse_trailers(self):
+        """Check whether an entry is created from the trailers"""
+
+        data = parse_trailers('abc', 'John Smith', [
+            ('changelog-title', 'Fix bug'),
+            ('Changelog-Category', 'Fixed'),
+            ('Changelog-Issue', '#42'),
+            ('Signed-off-by', 'John Smith <jsmith@example.com>')
+        ])
+        self.assertDictEqual(data, {
+            'title': 'Fix bug',
+            'category': 'fixed',
+            'author': 'John Smith',
+            'issue': 42,
+            'notes': None
+        })
+
+        data = parse_trailers('abc', 'John Smith', [
+            ('Changelog-Title', 'Add spells'),
+            ('Changelog-Category', 'added')
+        ])
+        self.assertIsNone(data['issue'])
+
+    def test_no_entry(self):
+        """Check whether commits without changelog trailers are ignored"""
+
+        self.assertIsNone(parse_trailers('abc', 'John Smith', []))
+        self.assertIsNone(parse_trailers('abc', 'John Smith', [('Signed-off-by', 'jsmith')]))
+
+    def test_invalid_trailers(self):
+        """Check whether an error is raised for invalid trailers"""
+
+        cases = [
+            ([('Changelog-Title', 'Fix bug')],
+             "invalid trailers for commit abc; 'Changelog-Category' trailer not found"),
+            ([('Changelog-Category', 'fixed')],
+             "invalid trailers for commit abc; 'Changelog-Title' trailer not found"),
+            ([('Changelog-Title', 'Fix bug'), ('Changelog-Category', 'bugfix')],
+             "invalid trailers for commit abc; 'bugfix' is not a valid category"),
+            ([('Changelog-Title', 'Fix bug'), ('Changelog-Title', 'Fix it'),
+              ('Changelog-Category', 'fixed')],
+             "invalid trailers for commit abc; 'Changelog-Title' set more than once")
+        ]
+
+        for trailers, error in cases:
+            with self.assertRaisesRegex(ValueError, error):
+                parse_trailers('abc', 'John Smith', trailers)
+
+
+class TestReadTrailerEntries(unittest.TestCase):
+    """Unit tests for read_trailer_entries"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.git_path = REPOSITORY_TEMPLATE.clone(os.path.join(self.tmp_path, 'repo'))
+        self.project = Project(self.git_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def git(self, *args):
+        return subprocess.check_output(['git'] + list(args), cwd=self.git_path,
+                                       universal_newlines=True).strip()
+
+    def commit(self, subject, title=None, category=None):
+        msg = subject
+        if title:
+            msg += "\n\nChangelog-Title: {}\nChangelog-Category: {}".format(title, category)
+
+        self.git('commit', '-q', '--allow-empty', '-m', msg)
+        return self.git('rev-parse', 'HEAD')
+
+    def read_cursor(self):
+        filepath = os.path.join(self.project.cache_path, TRAILERS_CURSOR_FILENAME)
+
+        with open(filepath, 'r') as fd:
+            return json.load(fd)
+
+    def test_read_entries(self):
+        """Check whether entries are read from the commits since the latest release"""
+
+        self.commit("Previous change", 'Previous change', 'added')
+        self.git('tag', '-a', '0.2.0', '-m', 'Release 0.2.0')
+
+        fix = self.commit("Fix bug", 'Fix bug', 'fixed')
+        self.commit("Update docs")
+        spells = self.commit("Add spells", 'Add spells', 'added')
+
+        entries = read_trailer_entries(self.project)
+
+        # Entries are sorted from the oldest to the newest
+        self.assertListEqual(list(entries), ['commit:' + fix, 'commit:' + spells])
+        self.assertEqual(entries['commit:' + fix].title, 'Fix bug')
+        self.assertEqual(entries['commit:' + fix].category.category, 'fixed')
+        self.assertEqual(entries['commit:' + fix].author, 'John Smith')
+
+        cursor = self.read_cursor()
+        self.assertEqual(cursor['base'], '0.2.0')
+        self.assertEqual(cursor['commit'], spells)
+
+    def test_incremental_read(self):
+        """Check whether only the commits after the cursor are read"""
+
+        fix = self.commit("Fix bug", 'Fix bug', 'fixed')
+        read_trailer_entries(self.project)
+
+        spells = self.commit("Add spells", 'Add spells', 'added')
+
+        with unittest.mock.patch.object(GitHandler, 'log_trailers',
+                                        wraps=self.project.repo.log_trailers) as mock_log:
+            entries = read_trailer_entries(self.project)
+            mock_log.assert_called_once()
+            self.assertListEqual(mock_log.call_args[0][0], ['HEAD', '^0.1.0', '^' + fix])
+
+        self.assertListEqual(list(entries), ['commit:' + fix, 'commit:' + spells])
+        self.assertEqual(self.read_cursor()['commit'], spells)
+
+        # Nothing changed; the cursor is not written again
+        mtime = os.stat(os.path.join(self.project.cache_path, TRAILERS_CURSOR_FILENAME)).st_mtime_ns
+        entries = read_trailer_entries(self.project)
+        self.assertListEqual(list(entries), ['commit:' + fix, 'commit:' + spells])
+        self.assertEqual(os.stat(os.path.join(self.project.cache_path,
+                                              TRAILERS_CURSOR_FILENAME)).st_mtime_ns, mtime)
+
+    def test_rewritten_history(self):
+        """Check whether every commit is read again when the cursor is not valid"""
+
+        self.commit("Fix bug", 'Fix bug', 'fixed')
+        read_trailer_entries(self.project)
+
+        self.git('reset', '-q', '--hard', 'HEAD^')
+        spells = self.commit("Add spells", 'Add spells', 'added')
+
+        entries = read_trailer_entries(self.project)
+        self.assertListEqual(list(entries), ['commit:' + spells])
+
+    def test_new_release(self):
+        """Check whether the cursor is reset after a new release"""
+
+        self.commit("Fix bug", 'Fix bug', 'fixed')
+        read_trailer_entries(self.project)
+
+        self.git('tag', '-a', '0.2.0-rc.1', '-m', 'Release 0.2.0-rc.1')
+        spells = self.commit("Add spells", 'Add spells', 'added')
+
+        # Tags are indexed once per project
+        self.project = Project(self.git_path)
+
+        # Final releases include the entries of release candidates
+        entries = read_trailer_entries(self.project)
+        self.assertEqual(len(entries), 2)
+
+        entries = read_trailer_entries(self.project, pre_release=True)
+        self.assertListEqual(list(entries), ['commit:' + spells])
+        self.assertEqual(self.read_cursor()['base'], '0.2.0-rc.1')
+
+    def test_invalid_trailers(self):
+        """Check whether commits with invalid trailers are skipped and reported"""
+
+        invalid = self.commit("Fix bug", 'Fix bug', 'bugfix')
+        spells = self.commit("Add spells", 'Add spells', 'added')
+
+        errors = []
+        entries = read_trailer_entries(self.project, on_invalid=errors.append)
+
+        self.assertListEqual(list(entries), ['commit:' + spells])
+        self.assertListEqual(errors, [
+            "invalid trailers for commit {}; 'bugfix' is not a valid category".format(invalid)
+        ])
+        self.assertEqual(self.read_cursor()['commit'], spells)
+
+        # Invalid commits are reported again when the cursor is used
+        errors = []
+        entries = read_trailer_entries(self.project, on_invalid=errors.append)
+
+        self.assertListEqual(list(entries), ['commit:' + spells])
+        self.assertEqual(len(errors), 1)
+
+    def test_invalid_cursor(self):
+        """Check whether cursor files that are not JSON objects are ignored"""
+
+        fix = self.commit("Fix bug", 'Fix bug', 'fixed')
+
+        filepath = os.path.join(self.project.cache_path, TRAILERS_CURSOR_FILENAME)
+        os.makedirs(self.project.cache_path, exist_ok=True)
+
+        for content in ['["a", "b"]', '"cursor"', '1']:
+            with open(filepath, 'w') as fd:
+                fd.write(content)
+
+            entries = read_trailer_entries(self.project)
+            self.assertListEqual(list(entries), ['commit:' + fix])
+
+
+if __name__ == "__main__":
+    unittest.main()
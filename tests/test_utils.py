@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.utils import (file_content_equals,
+                                 write_file)
+
+
+class TestFileContentEquals(unittest.TestCase):
+    """Unit tests for file_content_equals"""
+
+    def test_content(self):
+        """Check if file contents are compared"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'file')
+
+            with open(filepath, mode='w', encoding='utf-8') as fd:
+                fd.write("Lorem ipsum dolor\\nsit amet ñ\\n")
+
+            self.assertTrue(file_content_equals(filepath, "Lorem ipsum dolor\\nsit amet ñ\\n"))
+            self.assertFalse(file_content_equals(filepath, "Lorem ipsum dolor\\nsit amet n\\n"))
+            self.assertFalse(file_content_equals(filepath, "Lorem ipsum"))
+            self.assertFalse(file_content_equals(filepath + '.missing', ""))
+
+    @unittest.mock.patch('release_tools.utils.CHUNK_SIZE', 4)
+    def test_content_read_in_chunks(self):
+        """Check if files larger than a chunk are compared"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'file')
+
+            with open(filepath, mode='w') as fd:
+                fd.write("0123456789")
+
+            self.assertTrue(file_content_equals(filepath, "0123456789"))
+            self.assertFalse(file_content_equals(filepath, "0123456788"))
+
+
+class TestWriteFile(unittest.TestCase):
+    """Unit tests for write_file"""
+
+    def test_write(self):
+        """Check if files are only written when their content changes"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'file')
+
+            self.assertTrue(write_file(filepath, "content"))
+
+            with unittest.mock.patch('release_tools.utils.open', wraps=open) as mock_open:
+                self.assertFalse(write_file(filepath, "content"))
+                mock_open.assert_called_once_with(filepath, mode='rb')
+
+            self.assertTrue(write_file(filepath, "new content"))
+
+            with open(filepath, mode='r') as fd:
+                self.assertEqual(fd.read(), "new content")
+
+    def test_write_exclusive(self):
+        """Check if an error is raised when the file exists in exclusive mode"""
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            filepath = os.path.join(dirpath, 'file')
+
+            self.assertTrue(write_file(filepath, "content", mode='x'))
+
+            with self.assertRaises(FileExistsError):
+                write_file(filepath, "content", mode='x')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2020 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+from release_tools.entry import ChangelogEntry
+from release_tools.store import PackedEntryStore
+from release_tools.watch import (EntryWatcher,
+                                 InotifyWaiter,
+                                 watch_entries)
+
+
+ENTRY_TEMPLATE = (
+    "---\ntitle: {title}\ncategory: {category}\n"
+    "author: jsmith\nissue: null\nnotes: null\n"
+)
+
+
+class ScriptedWaiter:
+    """Waiter that applies a change on each call and then stops"""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.watched = []
+        self.closed = False
+
+    def watch(self, dirpaths):
+        self.watched = dirpaths
+
+    def wait(self):
+        if not self.changes:
+            raise KeyboardInterrupt
+        self.changes.pop(0)()
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+class TestCaseWatch(unittest.TestCase):
+    """Base class to test watchers on a temporary directory"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='release_tools_')
+        self.dirpath = os.path.join(self.tmp_path, 'unreleased')
+        os.makedirs(self.dirpath)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def write_entry(self, filename, title, category='added'):
+        filepath = os.path.join(self.dirpath, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'w') as fd:
+            fd.write(ENTRY_TEMPLATE.format(title=title, category=category))
+
+        # Make sure the modification is detected on coarse clocks
+        st = os.stat(filepath)
+        os.utime(filepath, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+
+        return filepath
+
+
+class TestEntryWatcher(TestCaseWatch):
+    """Unit tests for EntryWatcher"""
+
+    def test_refresh(self):
+        """Check whether the entries are read once and then updated"""
+
+        self.write_entry('a.yml', 'first change')
+        self.write_entry('b.yml', 'second change')
+
+        watcher = EntryWatcher([self.dirpath])
+
+        self.assertTrue(watcher.refresh())
+        entries = watcher.entries(self.dirpath)
+        self.assertListEqual(sorted(entries), ['a.yml', 'b.yml'])
+        self.assertEqual(entries['a.yml'].title, 'first change')
+
+        with unittest.mock.patch.object(ChangelogEntry, 'from_yaml_file',
+                                        wraps=ChangelogEntry.from_yaml_file) as mock_read:
+            # Nothing changed
+            self.assertFalse(watcher.refresh())
+            mock_read.assert_not_called()
+
+            self.write_entry('b.yml', 'second change', category='fixed')
+            self.write_entry('c.yml', 'third change')
+            os.remove(os.path.join(self.dirpath, 'a.yml'))
+
+            self.assertTrue(watcher.refresh())
+
+            # Only modified and new entries were read again
+            self.assertEqual(mock_read.call_count, 2)
+
+        entries = watcher.entries(self.dirpath)
+        self.assertListEqual(sorted(entries), ['b.yml', 'c.yml'])
+        self.assertEqual(entries['b.yml'].category.category, 'fixed')
+
+    def test_refresh_files(self):
+        """Check whether only the given files are checked"""
+
+        self.write_entry('a.yml', 'first change')
+
+        watcher = EntryWatcher([self.dirpath])
+        watcher.refresh()
+
+        self.write_entry('a.yml', 'first change', category='fixed')
+        filepath = self.write_entry('b.yml', 'second change')
+
+        self.assertTrue(watcher.refresh([filepath, os.path.join(self.tmp_path, 'other.yml')]))
+
+        entries = watcher.entries(self.dirpath)
+        self.assertListEqual(sorted(entries), ['a.yml', 'b.yml'])
+        self.assertEqual(entries['a.yml'].category.category, 'added')
+
+    def test_invalid_entry(self):
+        """Check whether invalid entries are ignored until they are fixed"""
+
+        self.write_entry('a.yml', 'first change')
+
+        watcher = EntryWatcher([self.dirpath])
+        watcher.refresh()
+
+        filepath = os.path.join(self.dirpath, 'a.yml')
+        with open(filepath, 'w') as fd:
+            fd.write("---\ntitle: first change\n")
+
+        self.assertTrue(watcher.refresh())
+        self.assertDictEqual(watcher.entries(self.dirpath), {})
+        self.assertRegex(watcher.errors[filepath], "'category' attribute not found")
+
+        # The same error is not a change
+        os.utime(filepath)
+        self.assertFalse(watcher.refresh())
+
+        self.write_entry('a.yml', 'first change')
+        self.assertTrue(watcher.refresh())
+        self.assertDictEqual(watcher.errors, {})
+        self.assertListEqual(list(watcher.entries(self.dirpath)), ['a.yml'])
+
+    def test_sharded_and_packed_entries(self):
+        """Check whether shard subdirectories and packed stores are watched"""
+
+        processed = os.path.join(self.dirpath, 'processed')
+
+        store = PackedEntryStore(self.dirpath)
+        store.append('packed.yml', ChangelogEntry('packed change', 'added', 'jsmith').to_dict())
+
+        watcher = EntryWatcher([self.dirpath, processed])
+        watcher.refresh()
+        self.assertListEqual(list(watcher.entries(self.dirpath)), ['packed.yml'])
+        self.assertDictEqual(watcher.entries(processed), {})
+
+        self.write_entry(os.path.join('ab', 'a.yml'), 'sharded change')
+        self.write_entry(os.path.join('processed', 'b.yml'), 'processed change')
+
+        self.assertTrue(watcher.refresh())
+        self.assertListEqual(sorted(watcher.entries(self.dirpath)),
+                             [os.path.join('ab', 'a.yml'), 'packed.yml'])
+        self.assertListEqual(list(watcher.entries(processed)), ['b.yml'])
+        self.assertListEqual(watcher.directories(),
+                             [self.dirpath, os.path.join(self.dirpath, 'ab'), processed])
+
+        store.delete('packed.yml')
+
+        self.assertTrue(watcher.refresh([store.filepath]))
+        self.assertListEqual(list(watcher.entries(self.dirpath)), [os.path.join('ab', 'a.yml')])
+
+
+class TestWatchEntries(TestCaseWatch):
+    """Unit tests for watch_entries"""
+
+    def test_watch_entries(self):
+        """Check whether the function is called after every change"""
+
+        self.write_entry('a.yml', 'first change')
+
+        watcher = EntryWatcher([self.dirpath])
+        waiter = ScriptedWaiter([
+            lambda: self.write_entry('b.yml', 'second change'),
+            lambda: None,
+            lambda: os.remove(os.path.join(self.dirpath, 'a.yml'))
+        ])
+        titles = []
+
+        def update():
+            titles.append(sorted(e.title for e in watcher.entries(self.dirpath).values()))
+
+        with unittest.mock.patch('release_tools.watch.open_waiter', return_value=waiter):
+            watch_entries(watcher, update)
+
+        self.assertListEqual(titles, [
+            ['first change'],
+            ['first change', 'second change'],
+            ['second change']
+        ])
+        self.assertListEqual(waiter.watched, [self.dirpath])
+        self.assertTrue(waiter.closed)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "inotify is only available on Linux")
+class TestInotifyWaiter(TestCaseWatch):
+    """Unit tests for InotifyWaiter"""
+
+    def test_wait(self):
+        """Check whether the changed files are returned"""
+
+        waiter = InotifyWaiter()
+        self.addCleanup(waiter.close)
+
+        waiter.watch([self.dirpath])
+
+        filepath = self.write_entry('a.yml', 'first change')
+        self.assertSetEqual(waiter.wait(), {filepath})
+
+        os.remove(filepath)
+        self.assertSetEqual(waiter.wait(), {filepath})
+
+        # New directories require a new scan
+        os.makedirs(os.path.join(self.dirpath, 'ab'))
+        self.assertIsNone(waiter.wait())
+
+
+if __name__ == "__main__":
+    unittest.main()